@@ -142,8 +142,7 @@ async def diagnose_specific_removal():
             
             verifier = GroupChangeVerifier(api_client)
             verification_result = verifier.verify_member_removal(
-                group_email, user_email,
-                max_retries=2, retry_delay=3
+                group_email, user_email, timeout=10
             )
             
             print(f"📊 Верификация: {'✅ Подтверждено' if verification_result else '❌ Не подтверждено'}")
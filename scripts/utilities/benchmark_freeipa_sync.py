@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замер производительности синхронизации с FreeIPA на локальном сервере.
+
+Для каждого размера набора данных запускает FakeFreeIPAServer (HTTP на
+localhost или в процессе) и выполняет через FreeIPAIntegration:
+- первичную синхронизацию (создание всех пользователей);
+- полную повторную синхронизацию после изменения 1% пользователей в Google;
+- инкрементальную синхронизацию после изменения еще 1%;
+- сравнение пользователей Google и FreeIPA.
+
+Google Directory API подменяется генератором пользователей, сеть FreeIPA -
+задержкой сервера. Выводит время, число запросов и пропускную способность
+каждого этапа и сохраняет отчет в JSON.
+
+Использование (из корня проекта):
+    python scripts/utilities/benchmark_freeipa_sync.py
+    python scripts/utilities/benchmark_freeipa_sync.py --sizes 1000 10000 --latency 0.005
+    python scripts/utilities/benchmark_freeipa_sync.py --in-process --size-limit 2000
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from tests.helpers.freeipa_fake_server import FakeFreeIPAServer  # noqa: E402
+from src.services.freeipa_sync_state import FreeIPASyncStateStore  # noqa: E402
+
+DOMAIN = 'bench.example.com'
+DEFAULT_GROUP = 'staff'
+
+
+class FakeGoogleDirectory:
+    """Google Directory API: users().list(...).execute() постранично"""
+
+    def __init__(self, users: List[Dict[str, Any]]):
+        self.users_data = users
+        self.pages = 0
+
+    def users(self):
+        return self
+
+    def list(self, maxResults: int = 500, pageToken: str = None, **kwargs):
+        start = int(pageToken or 0)
+        end = start + maxResults
+        page = {'users': self.users_data[start:end]}
+        if end < len(self.users_data):
+            page['nextPageToken'] = str(end)
+        self.pages += 1
+        return SimpleNamespace(execute=lambda: page)
+
+
+class PlainCipher:
+    """Шифр хранилища сессий бенчмарка (без ключей SecurityManager)"""
+
+    def encrypt_data(self, data: str) -> str:
+        return base64.b64encode(data.encode()).decode()
+
+    def decrypt_data(self, data: str) -> str:
+        return base64.b64decode(data.encode()).decode()
+
+
+def make_google_users(count: int) -> List[Dict[str, Any]]:
+    return [{'primaryEmail': f"user{i:06d}@{DOMAIN}",
+             'name': {'givenName': f"Name{i}", 'familyName': f"Surname{i}"},
+             'suspended': False,
+             'organizations': [{'title': 'Engineer', 'department': f"Dept{i % 20}"}]}
+            for i in range(count)]
+
+
+def change_titles(users: List[Dict[str, Any]], share: float, offset: int, title: str) -> int:
+    """Меняет должность у доли пользователей; возвращает число измененных"""
+    step = max(1, int(1 / share))
+    changed = 0
+    for index in range(offset, len(users), step):
+        users[index]['organizations'] = [{'title': title, 'department': 'Changed'}]
+        changed += 1
+    return changed
+
+
+def build_integration(server: FakeFreeIPAServer, google: FakeGoogleDirectory, in_process: bool,
+                      tmp_dir: Path):
+    from src.integrations.freeipa_integration import FreeIPAIntegration
+
+    user_service = SimpleNamespace(user_repo=SimpleNamespace(client=SimpleNamespace(service=google)))
+    integration = FreeIPAIntegration(user_service, group_service=None)
+    integration.sync_state = FreeIPASyncStateStore(':memory:')
+    if in_process:
+        integration.freeipa_service = server
+        integration._connected = True
+        return integration
+
+    from src.services.freeipa_client import FreeIPAConfig, FreeIPAService
+    from src.services.freeipa_session import FreeIPASessionCache, get_freeipa_session
+
+    # Сессия с временным хранилищем cookie, чтобы не трогать настоящее
+    get_freeipa_session(server.url, server.username, server.password, verify_ssl=False,
+                        cache=FreeIPASessionCache(tmp_dir / 'sessions.json', cipher=PlainCipher()))
+    integration.config = FreeIPAConfig(server_url=server.url, domain=DOMAIN, username=server.username,
+                                       password=server.password, verify_ssl=False)
+    integration.freeipa_service = FreeIPAService(integration.config)
+    return integration
+
+
+async def run_size(size: int, args, tmp_dir: Path) -> Dict[str, Any]:
+    from src.utils.data_cache import data_cache
+
+    server = FakeFreeIPAServer(latency=args.latency, command_latency=args.command_latency,
+                               size_limit=args.size_limit)
+    server.execute('group_add', [DEFAULT_GROUP], {'description': 'Все сотрудники'})
+    if not args.in_process:
+        server.start()
+    google = FakeGoogleDirectory(make_google_users(size))
+    integration = build_integration(server, google, args.in_process, tmp_dir)
+    if not args.in_process and not await integration.connect():
+        server.stop()
+        raise RuntimeError(f"Не удалось подключиться к {server.url}")
+
+    stages: Dict[str, Any] = {}
+
+    async def measure(name: str, entries: int, coroutine_factory):
+        data_cache.get_users(google, force_refresh=True)
+        before = dict(server.stats)
+        started = time.perf_counter()
+        result = await coroutine_factory()
+        elapsed = time.perf_counter() - started
+        stage = {
+            'seconds': round(elapsed, 3),
+            'entries': entries,
+            'entries_per_second': round(entries / elapsed, 1) if elapsed else None,
+            'requests': server.stats['requests'] - before['requests'],
+            'commands': server.stats['commands'] - before['commands'],
+            'logins': server.stats['logins'] - before['logins'],
+        }
+        report = integration.last_sync_report
+        if name != 'compare' and report is not None:
+            stage['summary'] = {k: v for k, v in report.summary().items() if not isinstance(v, dict)}
+        stages[name] = stage
+        print(f"  {name:<18} {elapsed:8.2f} с  {stage['requests']:6d} запросов  "
+              f"{stage['commands']:7d} команд  {stage['entries_per_second'] or 0:10.0f} зап/с")
+        return result
+
+    def full_sync():
+        return integration.sync_all_users_to_freeipa(domain=DOMAIN, default_groups=[DEFAULT_GROUP])
+
+    def incremental_sync():
+        return integration.sync_all_users_to_freeipa(domain=DOMAIN, default_groups=[DEFAULT_GROUP],
+                                                     incremental=True)
+
+    try:
+        await measure('initial', size, full_sync)
+        changed = change_titles(google.users_data, 0.01, 0, 'Lead')
+        await measure('resync_1pct', size, full_sync)
+        stages['resync_1pct']['changed'] = changed
+        changed = change_titles(google.users_data, 0.01, 1, 'Manager')
+        await measure('incremental_1pct', size, incremental_sync)
+        stages['incremental_1pct']['changed'] = changed
+        comparison = await measure('compare', size, lambda: integration.compare_users_with_google(DOMAIN))
+        stages['compare']['in_both'] = len(comparison.get('in_both', []))
+    finally:
+        if not args.in_process:
+            await integration.disconnect()
+            server.stop()
+    return stages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Замер синхронизации с FreeIPA на локальном сервере')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help='Размеры наборов пользователей (по умолчанию 1000 10000 50000)')
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='Задержка сети на запрос, сек (по умолчанию 0.002)')
+    parser.add_argument('--command-latency', type=float, default=0.0,
+                        help='Время выполнения одной команды на сервере, сек')
+    parser.add_argument('--size-limit', type=int, default=0,
+                        help='Ограничение *_find сервера (0 - без ограничения; 2000 - как в FreeIPA)')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Без HTTP: сервер передается в интеграцию вместо FreeIPAService')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Путь к JSON отчету (по умолчанию logs/freeipa_sync_benchmark_<время>.json)')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⏱️  ЗАМЕР СИНХРОНИЗАЦИИ FREEIPA")
+    print("=" * 70)
+    print(f"Режим: {'в процессе' if args.in_process else 'HTTP localhost'}, задержка {args.latency * 1000:.1f} мс, "
+          f"ограничение поиска {args.size_limit or 'нет'}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            print(f"\n👥 Пользователей: {size}")
+            try:
+                results[str(size)] = asyncio.run(run_size(size, args, Path(tmp)))
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                return 1
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'mode': 'in_process' if args.in_process else 'http',
+        'latency': args.latency,
+        'command_latency': args.command_latency,
+        'size_limit': args.size_limit,
+        'results': results,
+    }
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        output_path = PROJECT_ROOT / 'logs' / f"freeipa_sync_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n💾 Отчет сохранен: {output_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
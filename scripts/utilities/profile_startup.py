@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Профилирование времени запуска главного окна.
+
+Запускает дочерний процесс `python -X importtime`, который импортирует
+главное окно, создает его и дожидается первой отрисовки. Выводит время до
+первого кадра и самые тяжелые импорты, а также сохраняет отчет в JSON,
+чтобы отслеживать динамику между версиями.
+
+Использование (из корня проекта):
+    python scripts/utilities/profile_startup.py
+    python scripts/utilities/profile_startup.py --runs 5 --top 30
+    python scripts/utilities/profile_startup.py --no-window --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Код дочернего процесса: метки времени выводятся строкой с префиксом,
+# чтобы отделить их от вывода приложения
+CHILD_CODE = '''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.ui.main_window import AdminToolsMainWindow
+imported = time.perf_counter()
+result = {{"import_main_window": imported - start}}
+if {with_window!r}:
+    window = AdminToolsMainWindow(service=None)
+    window.update_idletasks()
+    window.update()
+    result["first_frame"] = time.perf_counter() - start
+    from src.ui.window_registry import window_registry
+    result["loaded_windows"] = [n for n in window_registry.names() if window_registry.is_loaded(n)]
+    window.destroy()
+result["modules"] = len(sys.modules)
+print("@@STARTUP@@" + json.dumps(result))
+'''
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Разбирает вывод `-X importtime`.
+
+    Returns:
+        Список импортов с полями module, self_us, cumulative_us
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            _, payload = line.split(':', 1)
+            self_us, cumulative_us, name = payload.split('|', 2)
+            imports.append({
+                'module': name.strip(),
+                'depth': (len(name) - len(name.lstrip())) // 2,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+            })
+        except ValueError:
+            continue
+    return imports
+
+
+def run_once(with_window: bool) -> Dict[str, Any]:
+    """Выполняет один замер в отдельном процессе."""
+    code = CHILD_CODE.format(root=str(PROJECT_ROOT), with_window=with_window)
+    env = dict(os.environ, PYTHONIOENCODING='utf-8')
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=str(PROJECT_ROOT), env=env,
+        capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    wall_time = time.perf_counter() - started
+
+    marker = next((l for l in proc.stdout.splitlines() if l.startswith('@@STARTUP@@')), None)
+    if proc.returncode != 0 or marker is None:
+        tail = '\n'.join(proc.stderr.splitlines()[-15:])
+        raise RuntimeError(f'Дочерний процесс завершился с кодом {proc.returncode}:\n{tail}')
+
+    result = json.loads(marker[len('@@STARTUP@@'):])
+    result['process_wall'] = wall_time
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def summarize_packages(imports: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Суммирует собственное время импорта по корневым пакетам."""
+    totals: Dict[str, int] = {}
+    for item in imports:
+        root = item['module'].split('.')[0]
+        totals[root] = totals.get(root, 0) + item['self_us']
+    return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Профилирование запуска главного окна')
+    parser.add_argument('--runs', type=int, default=3, help='Количество замеров (по умолчанию 3)')
+    parser.add_argument('--top', type=int, default=20, help='Сколько самых тяжелых импортов показать')
+    parser.add_argument('--no-window', action='store_true',
+                        help='Только импорт, без создания окна (для среды без дисплея)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Путь к JSON отчету (по умолчанию logs/startup_profile_<время>.json)')
+    args = parser.parse_args()
+
+    with_window = not args.no_window
+    runs = []
+    for index in range(args.runs):
+        try:
+            runs.append(run_once(with_window))
+        except RuntimeError as e:
+            print(f"❌ Замер {index + 1} не выполнен: {e}")
+            return 1
+
+    import_times = [r['import_main_window'] for r in runs]
+    print("=" * 70)
+    print("⏱️  ПРОФИЛЬ ЗАПУСКА ГЛАВНОГО ОКНА")
+    print("=" * 70)
+    print(f"Замеров: {len(runs)}")
+    print(f"Импорт main_window (медиана): {statistics.median(import_times) * 1000:.0f} мс")
+    if with_window:
+        frame_times = [r['first_frame'] for r in runs]
+        print(f"До первого кадра (медиана):  {statistics.median(frame_times) * 1000:.0f} мс")
+        print(f"Окна, загруженные при старте: {runs[-1].get('loaded_windows') or 'нет'}")
+    print(f"Процесс целиком (медиана):   {statistics.median(r['process_wall'] for r in runs) * 1000:.0f} мс")
+    print(f"Загружено модулей: {runs[-1]['modules']}")
+
+    # Детализация по последнему замеру (кэш байткода уже прогрет)
+    imports = runs[-1]['imports']
+    heaviest = sorted(imports, key=lambda i: i['cumulative_us'], reverse=True)[:args.top]
+    print(f"\n📦 Топ-{args.top} импортов по накопленному времени:")
+    for item in heaviest:
+        print(f"  {item['cumulative_us'] / 1000:8.1f} мс  {item['module']}")
+
+    packages = summarize_packages(imports)
+    print("\n📊 Собственное время по пакетам:")
+    for name, total_us in list(packages.items())[:10]:
+        print(f"  {total_us / 1000:8.1f} мс  {name}")
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'with_window': with_window,
+        'runs': [{k: v for k, v in r.items() if k != 'imports'} for r in runs],
+        'heaviest_imports': heaviest,
+        'packages_self_us': packages,
+    }
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        output_path = PROJECT_ROOT / 'logs' / f"startup_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\n💾 Отчет сохранен: {output_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетное выполнение запросов Google API.
+
+Запросы группируются в batch HTTP запросы (new_batch_http_request), что
+заменяет сотни отдельных HTTP вызовов несколькими. Запросы, отклоненные
+из-за квот (429/5xx), повторяются отдельным пакетом с экспоненциальной задержкой.
+"""
+
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..utils.rate_limiter import RateLimiter, is_retryable_error
+
+logger = logging.getLogger(__name__)
+
+# Ограничение Google на количество запросов в одном batch
+MAX_BATCH_SIZE = 1000
+# Для Directory API Google рекомендует пакеты не больше 50 запросов
+DEFAULT_BATCH_SIZE = 50
+
+
+@dataclass
+class BatchResult:
+    """Результаты пакетного выполнения по ключам запросов"""
+    responses: Dict[Hashable, Any] = field(default_factory=dict)
+    errors: Dict[Hashable, Exception] = field(default_factory=dict)
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> int:
+        return len(self.responses)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def execute_batched(service: Any,
+                    calls: Iterable[Tuple[Hashable, Callable[[], Any]]],
+                    batch_size: int = DEFAULT_BATCH_SIZE,
+                    limiter: Optional[RateLimiter] = None,
+                    max_attempts: int = 5,
+                    base_delay: float = 1.0,
+                    is_success: Optional[Callable[[Exception], bool]] = None) -> BatchResult:
+    """
+    Выполняет запросы пакетами.
+
+    Args:
+        service: Сервис googleapiclient (нужен new_batch_http_request)
+        calls: Пары (ключ, фабрика запроса без execute()), например
+            ('a@x.com', lambda: service.members().insert(...))
+        batch_size: Запросов в одном batch (не больше MAX_BATCH_SIZE)
+        limiter: Ограничитель частоты; каждый запрос пакета расходует квоту
+        max_attempts: Попыток для запросов с временными ошибками
+        base_delay: Начальная задержка перед повтором в секундах
+        is_success: Считать ли ошибку успехом (например, 409 при добавлении
+            уже существующего участника)
+
+    Returns:
+        BatchResult с ответами и ошибками по ключам
+    """
+    result = BatchResult()
+    started = time.perf_counter()
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    pending = list(calls)
+    attempt = 0
+
+    while pending and attempt < max_attempts:
+        attempt += 1
+        retry: List[Tuple[Hashable, Callable[[], Any]]] = []
+
+        for chunk in _chunks(pending, batch_size):
+            factories = {str(index): (key, factory) for index, (key, factory) in enumerate(chunk)}
+
+            def callback(request_id, response, exception, factories=factories):
+                key, factory = factories[request_id]
+                if exception is None:
+                    result.responses[key] = response
+                    result.errors.pop(key, None)
+                elif is_success is not None and is_success(exception):
+                    result.responses[key] = None
+                    result.errors.pop(key, None)
+                elif is_retryable_error(exception) and attempt < max_attempts:
+                    retry.append((key, factory))
+                else:
+                    result.errors[key] = exception
+
+            if limiter is not None:
+                for _ in chunk:
+                    limiter.acquire()
+
+            batch = service.new_batch_http_request(callback=callback)
+            for request_id, (_, factory) in factories.items():
+                batch.add(factory(), request_id=request_id)
+
+            try:
+                batch.execute()
+            except Exception as e:
+                # Ошибка всего batch (сеть, авторизация): повторяем пакет целиком
+                # или отмечаем все его запросы неудачными
+                if is_retryable_error(e) and attempt < max_attempts:
+                    retry.extend(chunk)
+                else:
+                    for key, _ in chunk:
+                        result.errors[key] = e
+            result.batches += 1
+
+        if retry:
+            result.retries += len(retry)
+            delay = base_delay * (2 ** (attempt - 1))
+            logger.info(f"Повтор {len(retry)} запросов через {delay:.1f} с (попытка {attempt + 1})")
+            time.sleep(delay + random.uniform(0, delay / 2))
+        pending = retry
+
+    result.elapsed = time.perf_counter() - started
+    return result
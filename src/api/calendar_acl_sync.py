@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Синхронизация участников календаря (ACL) пакетными запросами.
+
+Список правил доступа загружается и хранится как снимок email -> роль.
+Снимок действует ограниченное время (snapshot_ttl), а перед изменениями
+его возраст не должен превышать write_max_age: участников календаря меняют
+и другие клиенты, и по устаревшему снимку нельзя решать, кого добавлять
+или удалять. Желаемый состав сравнивается со снимком, а добавления,
+изменения ролей и удаления отправляются batch запросами. Для правил
+пользователей используется детерминированный ID "user:<email>", поэтому
+для изменения или удаления правила не нужно заново искать его в ACL.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Set
+
+from .batch_requests import DEFAULT_BATCH_SIZE, execute_batched
+from ..utils.rate_limiter import RateLimiter, execute_with_backoff, get_http_status
+
+logger = logging.getLogger(__name__)
+
+# Роли, которые не удаляются, даже если их нет в желаемом составе
+PROTECTED_ROLES = {'owner'}
+
+# Время жизни снимка ACL в секундах
+SNAPSHOT_TTL = 300.0
+# Максимальный возраст снимка, по которому вычисляются изменения
+WRITE_MAX_AGE = 30.0
+
+
+def acl_rule_id(email: str) -> str:
+    """ID правила доступа пользователя к календарю."""
+    return f'user:{email.strip().lower()}'
+
+
+@dataclass
+class AclDiff:
+    """Разница между желаемым и текущим составом участников календаря"""
+    to_insert: Dict[str, str] = field(default_factory=dict)
+    to_patch: Dict[str, str] = field(default_factory=dict)
+    to_delete: Set[str] = field(default_factory=set)
+    unchanged: int = 0
+    protected: Set[str] = field(default_factory=set)
+
+    @property
+    def changes(self) -> int:
+        return len(self.to_insert) + len(self.to_patch) + len(self.to_delete)
+
+
+@dataclass
+class AclSyncReport:
+    """Итог синхронизации участников календаря"""
+    diff: AclDiff = field(default_factory=AclDiff)
+    dry_run: bool = True
+    inserted: Set[str] = field(default_factory=set)
+    patched: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+    failures: Dict[str, str] = field(default_factory=dict)
+    batches: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def succeeded(self, email: str) -> bool:
+        email = email.strip().lower()
+        return email in self.inserted or email in self.patched or email in self.deleted
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'planned_inserts': len(self.diff.to_insert),
+            'planned_patches': len(self.diff.to_patch),
+            'planned_deletes': len(self.diff.to_delete),
+            'unchanged': self.diff.unchanged,
+            'protected': len(self.diff.protected),
+            'inserted': len(self.inserted),
+            'patched': len(self.patched),
+            'deleted': len(self.deleted),
+            'failed': len(self.failures),
+            'batches': self.batches,
+            'dry_run': self.dry_run,
+            'timings': {k: round(v, 3) for k, v in self.timings.items()},
+        }
+
+
+class CalendarAclSync:
+    """
+    Снимок ACL календаря и пакетное применение изменений.
+    """
+
+    def __init__(self, service: Any, calendar_id: str,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 rate_per_second: float = 10.0,
+                 protected_roles: Optional[Set[str]] = None,
+                 snapshot_ttl: float = SNAPSHOT_TTL,
+                 write_max_age: float = WRITE_MAX_AGE):
+        """
+        Инициализация.
+
+        Args:
+            service: Сервис Google Calendar API
+            calendar_id: ID календаря
+            batch_size: Запросов в одном batch
+            rate_per_second: Ограничение частоты запросов
+            protected_roles: Роли, которые не удаляются при синхронизации
+            snapshot_ttl: Время жизни снимка ACL в секундах
+            write_max_age: Максимальный возраст снимка перед изменениями ACL
+        """
+        self.service = service
+        self.calendar_id = calendar_id
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_per_second)
+        self.protected_roles = PROTECTED_ROLES if protected_roles is None else protected_roles
+        self.snapshot_ttl = snapshot_ttl
+        self.write_max_age = write_max_age
+        self._snapshot: Optional[Dict[str, str]] = None
+        self._loaded_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None and time.monotonic() - self._loaded_at < self.snapshot_ttl
+
+    def invalidate(self):
+        """Сбрасывает снимок; следующее обращение загрузит ACL заново."""
+        self._snapshot = None
+
+    def get_snapshot(self, force_refresh: bool = False,
+                     max_age: Optional[float] = None) -> Dict[str, str]:
+        """
+        Текущие участники календаря (только правила пользователей).
+
+        Args:
+            force_refresh: Загрузить ACL заново, даже если снимок уже есть
+            max_age: Допустимый возраст снимка в секундах (по умолчанию snapshot_ttl)
+
+        Returns:
+            Словарь email -> роль (копия снимка)
+        """
+        max_age = self.snapshot_ttl if max_age is None else min(max_age, self.snapshot_ttl)
+        if self._snapshot is None or force_refresh or time.monotonic() - self._loaded_at >= max_age:
+            snapshot = {}
+            page_token = None
+            while True:
+                params = {'calendarId': self.calendar_id, 'maxResults': 250}
+                if page_token:
+                    params['pageToken'] = page_token
+                result = execute_with_backoff(
+                    lambda: self.service.acl().list(**params).execute(), limiter=self.limiter
+                )
+                for item in result.get('items', []):
+                    scope = item.get('scope', {})
+                    if scope.get('type') == 'user' and scope.get('value'):
+                        snapshot[scope['value'].lower()] = item.get('role', '')
+                page_token = result.get('nextPageToken')
+                if not page_token:
+                    break
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+            logger.info(f"Загружен ACL календаря {self.calendar_id}: {len(snapshot)} участников")
+        return dict(self._snapshot)
+
+    def plan(self, desired: Dict[str, str], remove_extra: bool = True,
+             update_roles: bool = True, max_age: Optional[float] = None) -> AclSyncReport:
+        """
+        Вычисляет изменения без их применения.
+
+        Args:
+            desired: Email -> желаемая роль
+            remove_extra: Удалять участников, которых нет в желаемом составе
+            update_roles: Менять роль существующих участников
+            max_age: Допустимый возраст снимка ACL (по умолчанию snapshot_ttl)
+
+        Returns:
+            Отчет с разницей (dry-run)
+        """
+        report = AclSyncReport(dry_run=True)
+        started = time.perf_counter()
+        current = self.get_snapshot(max_age=max_age)
+        report.timings['load_acl'] = time.perf_counter() - started
+
+        diff = report.diff
+        wanted = {email.strip().lower(): role for email, role in desired.items() if email.strip()}
+        for email, role in wanted.items():
+            if email not in current:
+                diff.to_insert[email] = role
+            elif current[email] != role and update_roles:
+                diff.to_patch[email] = role
+            else:
+                diff.unchanged += 1
+        if remove_extra:
+            for email in set(current) - set(wanted):
+                if current[email] in self.protected_roles:
+                    diff.protected.add(email)
+                else:
+                    diff.to_delete.add(email)
+
+        report.timings['plan'] = time.perf_counter() - started - report.timings['load_acl']
+        return report
+
+    def apply(self, report: AclSyncReport) -> AclSyncReport:
+        """
+        Применяет вычисленные изменения пакетными запросами.
+
+        Args:
+            report: Результат plan()
+
+        Returns:
+            Тот же отчет с результатами применения
+        """
+        started = time.perf_counter()
+        report.dry_run = False
+        diff = report.diff
+
+        upserts = []
+        for email, role in sorted(diff.to_insert.items()):
+            upserts.append((('insert', email), self._insert_factory(email, role)))
+        for email, role in sorted(diff.to_patch.items()):
+            upserts.append((('patch', email), self._patch_factory(email, role)))
+        deletes = [(('delete', email), self._delete_factory(email)) for email in sorted(diff.to_delete)]
+
+        # 409 при добавлении и 404/410 при удалении означают, что состояние уже нужное;
+        # 404 при изменении роли - ошибка (снимок устарел), поэтому удаления идут отдельно
+        for calls, already_applied in ((upserts, (409,)), (deletes, (404, 410))):
+            if not calls:
+                continue
+            result = execute_batched(
+                self.service, calls, batch_size=self.batch_size, limiter=self.limiter,
+                is_success=lambda e, statuses=already_applied: get_http_status(e) in statuses
+            )
+            report.batches += result.batches
+            for (operation, email) in result.responses:
+                {'insert': report.inserted, 'patch': report.patched,
+                 'delete': report.deleted}[operation].add(email)
+            for (operation, email), error in result.errors.items():
+                report.failures[email] = f'{operation}: {error}'
+        self._update_snapshot(report)
+
+        report.timings['apply'] = time.perf_counter() - started
+        logger.info(f"Синхронизация ACL календаря {self.calendar_id}: {report.summary()}")
+        return report
+
+    def sync(self, desired: Dict[str, str], dry_run: bool = False,
+             remove_extra: bool = True, update_roles: bool = True) -> AclSyncReport:
+        """Вычисляет разницу и, если это не dry-run, применяет её."""
+        report = self.plan(desired, remove_extra=remove_extra, update_roles=update_roles,
+                           max_age=None if dry_run else self.write_max_age)
+        if not dry_run:
+            self.apply(report)
+        return report
+
+    def add_members(self, members: Dict[str, str]) -> AclSyncReport:
+        """Добавляет отсутствующих участников; существующие не меняются."""
+        return self.sync(members, remove_extra=False, update_roles=False)
+
+    def set_roles(self, members: Dict[str, str]) -> AclSyncReport:
+        """Добавляет участников или меняет их роли; остальные не затрагиваются."""
+        return self.sync(members, remove_extra=False)
+
+    def remove_members(self, emails: Iterable[str]) -> AclSyncReport:
+        """Удаляет участников, которые есть в снимке ACL."""
+        current = self.get_snapshot(max_age=self.write_max_age)
+        report = AclSyncReport(dry_run=True)
+        for email in emails:
+            email = email.strip().lower()
+            if email in current:
+                report.diff.to_delete.add(email)
+        return self.apply(report)
+
+    def _insert_factory(self, email: str, role: str):
+        body = {'scope': {'type': 'user', 'value': email}, 'role': role}
+        return lambda: self.service.acl().insert(
+            calendarId=self.calendar_id, body=body, sendNotifications=False
+        )
+
+    def _patch_factory(self, email: str, role: str):
+        return lambda: self.service.acl().patch(
+            calendarId=self.calendar_id, ruleId=acl_rule_id(email),
+            body={'role': role}, sendNotifications=False
+        )
+
+    def _delete_factory(self, email: str):
+        return lambda: self.service.acl().delete(calendarId=self.calendar_id, ruleId=acl_rule_id(email))
+
+    def _update_snapshot(self, report: AclSyncReport):
+        """Обновляет снимок ACL на месте вместо повторной загрузки."""
+        if self._snapshot is None:
+            return
+        for email in report.inserted:
+            self._snapshot[email] = report.diff.to_insert[email]
+        for email in report.patched:
+            self._snapshot[email] = report.diff.to_patch[email]
+        for email in report.deleted:
+            self._snapshot.pop(email, None)
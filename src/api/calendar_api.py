@@ -24,6 +24,8 @@ except ImportError as e:
 
 # Пути проекта
 from ..utils.file_paths import get_config_path
+from ..utils.rate_limiter import get_http_status
+from .calendar_acl_sync import acl_rule_id
 
 logger = logging.getLogger(__name__)
 
@@ -366,7 +368,10 @@ class GoogleCalendarAPI:
     
     def remove_user_from_calendar(self, calendar_id: str, user_email: str) -> bool:
         """
-        Удаление пользователя из календаря с поддержкой пагинации
+        Удаление пользователя из календаря
+        
+        Правило пользователя имеет ID "user:<email>", поэтому ACL не
+        просматривается: правило удаляется одним запросом.
         
         Args:
             calendar_id: ID календаря
@@ -380,52 +385,19 @@ class GoogleCalendarAPI:
             return False
         
         try:
-            # Ищем ACL ID для пользователя с пагинацией
-            acl_id = None
-            next_page_token = None
-            
-            while True:
-                # Запрос с пагинацией
-                if next_page_token:
-                    acl_list = self.service.acl().list(
-                        calendarId=calendar_id,
-                        pageToken=next_page_token
-                    ).execute()
-                else:
-                    acl_list = self.service.acl().list(calendarId=calendar_id).execute()
-                
-                # Ищем пользователя на текущей странице
-                for acl_item in acl_list.get('items', []):
-                    scope = acl_item.get('scope', {})
-                    if (scope.get('value', '').lower() == user_email.lower() and 
-                        scope.get('type') == 'user'):
-                        acl_id = acl_item.get('id')
-                        break
-                
-                # Если нашли пользователя, выходим
-                if acl_id:
-                    break
-                
-                # Проверяем, есть ли следующая страница
-                next_page_token = acl_list.get('nextPageToken')
-                if not next_page_token:
-                    break
-            
-            if not acl_id:
-                logger.warning(f"Пользователь {user_email} не найден в календаре {calendar_id}")
-                return False
-            
-            # Удаляем разрешение
             self.service.acl().delete(
                 calendarId=calendar_id,
-                ruleId=acl_id
+                ruleId=acl_rule_id(user_email)
             ).execute()
             
             logger.info(f"✅ Пользователь {user_email} удален из календаря {calendar_id}")
             return True
             
         except HttpError as e:
-            logger.error(f"❌ Ошибка удаления пользователя {user_email} из календаря {calendar_id}: {e}")
+            if get_http_status(e) in (404, 410):
+                logger.warning(f"Пользователь {user_email} не найден в календаре {calendar_id}")
+            else:
+                logger.error(f"❌ Ошибка удаления пользователя {user_email} из календаря {calendar_id}: {e}")
             return False
     
     def update_user_role(self, calendar_id: str, user_email: str, new_role: str) -> bool:
@@ -445,40 +417,20 @@ class GoogleCalendarAPI:
             return False
         
         try:
-            # Сначала находим ACL ID для пользователя
-            acl_list = self.service.acl().list(calendarId=calendar_id).execute()
-            
-            acl_id = None
-            for acl_item in acl_list.get('items', []):
-                scope = acl_item.get('scope', {})
-                if scope.get('value') == user_email and scope.get('type') == 'user':
-                    acl_id = acl_item.get('id')
-                    break
-            
-            if not acl_id:
-                logger.warning(f"Пользователь {user_email} не найден в календаре {calendar_id}")
-                return False
-            
-            # Обновляем роль
-            acl_rule = {
-                'scope': {
-                    'type': 'user',
-                    'value': user_email
-                },
-                'role': new_role
-            }
-            
-            self.service.acl().update(
+            self.service.acl().patch(
                 calendarId=calendar_id,
-                ruleId=acl_id,
-                body=acl_rule
+                ruleId=acl_rule_id(user_email),
+                body={'role': new_role}
             ).execute()
             
             logger.info(f"✅ Роль пользователя {user_email} в календаре {calendar_id} обновлена на {new_role}")
             return True
             
         except HttpError as e:
-            logger.error(f"❌ Ошибка обновления роли пользователя {user_email} в календаре {calendar_id}: {e}")
+            if get_http_status(e) in (404, 410):
+                logger.warning(f"Пользователь {user_email} не найден в календаре {calendar_id}")
+            else:
+                logger.error(f"❌ Ошибка обновления роли пользователя {user_email} в календаре {calendar_id}: {e}")
             return False
     
     def find_calendar_by_name(self, calendar_name: str) -> Optional[CalendarInfo]:
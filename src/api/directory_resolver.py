@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Массовое определение адресов Google Workspace: пользователь, группа или нет.
+
+Вместо users().get / groups().get на каждый адрес сначала используется
+индекс по кэшу справочника (data_cache), а оставшиеся адреса проверяются
+пакетными запросами: сначала users().get, затем groups().get для тех,
+кто не оказался пользователем. Результаты запросов кэшируются на время
+жизни кэша справочника.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .batch_requests import DEFAULT_BATCH_SIZE, execute_batched
+from ..utils.data_cache import data_cache
+from ..utils.rate_limiter import RateLimiter, get_http_status
+
+logger = logging.getLogger(__name__)
+
+# Виды адресов
+KIND_USER = 'user'
+KIND_GROUP = 'group'
+KIND_MISSING = 'missing'
+KIND_EXTERNAL = 'external'
+KIND_UNKNOWN = 'unknown'
+
+
+@dataclass
+class ResolvedEmail:
+    """Результат определения адреса"""
+    email: str
+    kind: str
+    profile: Optional[Dict[str, Any]] = None
+    source: str = 'api'
+    error: Optional[str] = None
+
+    @property
+    def exists(self) -> Optional[bool]:
+        """True - есть в домене, False - нет, None - определить не удалось"""
+        if self.kind in (KIND_USER, KIND_GROUP):
+            return True
+        if self.kind in (KIND_MISSING, KIND_EXTERNAL):
+            return False
+        return None
+
+    @property
+    def is_user(self) -> bool:
+        return self.kind == KIND_USER
+
+    @property
+    def is_group(self) -> bool:
+        return self.kind == KIND_GROUP
+
+
+def _workspace_domain() -> str:
+    try:
+        from ..config.enhanced_config import config
+        return config.settings.google_workspace_domain
+    except Exception:
+        return "sputnik8.com"
+
+
+class DirectoryResolver:
+    """
+    Потокобезопасный массовый резолвер адресов с индексом по кэшу справочника.
+    """
+
+    def __init__(self, cache=data_cache, batch_size: int = DEFAULT_BATCH_SIZE,
+                 rate_per_second: float = 10.0, domain: Optional[str] = None):
+        """
+        Args:
+            cache: DataCache со списками пользователей и групп
+            batch_size: Запросов в одном batch
+            rate_per_second: Ограничение частоты запросов (0 - без ограничения)
+            domain: Домен Workspace (по умолчанию из конфигурации)
+        """
+        self.cache = cache
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_per_second)
+        self._domain = domain
+        self._lock = threading.Lock()
+        self._index: Dict[str, ResolvedEmail] = {}
+        self._index_stamp: Tuple[Any, Any] = (None, None)
+        self._resolved: Dict[str, Tuple[ResolvedEmail, float]] = {}
+
+    @property
+    def domain(self) -> str:
+        if self._domain is None:
+            self._domain = _workspace_domain()
+        return self._domain
+
+    # ----- Индекс по кэшу справочника -----
+
+    def _refresh_index(self):
+        """Перестраивает индекс, если кэш справочника обновился"""
+        cache = self.cache
+        stamp = (cache.last_users_update, cache.last_groups_update)
+        if stamp == self._index_stamp:
+            return
+        index: Dict[str, ResolvedEmail] = {}
+        if cache.is_cache_valid(cache.last_groups_update):
+            for group in cache.groups_cache:
+                for email in [group.get('email', '')] + list(group.get('aliases', [])):
+                    if email:
+                        index[email.lower()] = ResolvedEmail(email.lower(), KIND_GROUP, group, 'cache')
+        if cache.is_cache_valid(cache.last_users_update):
+            for user in cache.users_cache:
+                email = user.get('primaryEmail', '').lower()
+                if email:
+                    index[email] = ResolvedEmail(email, KIND_USER, user, 'cache')
+        self._index = index
+        self._index_stamp = stamp
+
+    def lookup_cached(self, email: str) -> Optional[ResolvedEmail]:
+        """Ищет адрес в индексе и ранее полученных результатах, без запросов"""
+        email = email.strip().lower()
+        with self._lock:
+            self._refresh_index()
+            entry = self._index.get(email)
+            if entry is not None:
+                return entry
+            cached = self._resolved.get(email)
+            if cached and time.monotonic() - cached[1] < self.cache.cache_duration:
+                return cached[0]
+        return None
+
+    def invalidate(self, email: Optional[str] = None):
+        """Сбрасывает результаты запросов (для адреса или все)"""
+        with self._lock:
+            if email is None:
+                self._resolved.clear()
+            else:
+                self._resolved.pop(email.strip().lower(), None)
+
+    # ----- Массовое определение -----
+
+    def resolve(self, service: Any, emails: Iterable[str],
+                kinds: Tuple[str, ...] = (KIND_USER, KIND_GROUP)) -> Dict[str, ResolvedEmail]:
+        """
+        Определяет вид и профиль для набора адресов
+
+        Args:
+            service: Сервис Google Directory API
+            emails: Адреса (регистр не важен, повторы допускаются)
+            kinds: Что искать: KIND_USER и/или KIND_GROUP
+
+        Returns:
+            Адрес в нижнем регистре -> ResolvedEmail
+        """
+        results: Dict[str, ResolvedEmail] = {}
+        misses: List[str] = []
+        for email in dict.fromkeys(e.strip().lower() for e in emails if e and e.strip()):
+            entry = self.lookup_cached(email)
+            if entry is not None:
+                results[email] = entry
+            else:
+                misses.append(email)
+
+        if misses:
+            logger.info(f"Определение адресов: {len(results)} из кэша, {len(misses)} запросом")
+            resolved = self._resolve_remote(service, misses, kinds)
+            # Отсутствие адреса запоминается, только если проверены оба вида
+            complete = KIND_USER in kinds and KIND_GROUP in kinds
+            now = time.monotonic()
+            with self._lock:
+                for email, entry in resolved.items():
+                    if entry.kind in (KIND_USER, KIND_GROUP) or (complete and entry.kind != KIND_UNKNOWN):
+                        self._resolved[email] = (entry, now)
+            results.update(resolved)
+        return results
+
+    def _resolve_remote(self, service: Any, emails: List[str],
+                        kinds: Tuple[str, ...]) -> Dict[str, ResolvedEmail]:
+        results: Dict[str, ResolvedEmail] = {}
+        denied = set()
+        pending = list(emails)
+
+        if KIND_USER in kinds and pending:
+            response = execute_batched(
+                service,
+                [(email, lambda e=email: service.users().get(userKey=e)) for email in pending],
+                batch_size=self.batch_size, limiter=self.limiter,
+                is_success=lambda error: get_http_status(error) == 404
+            )
+            pending = []
+            for email, profile in response.responses.items():
+                if profile is None:
+                    pending.append(email)
+                else:
+                    results[email] = ResolvedEmail(email, KIND_USER, profile)
+            for email, error in response.errors.items():
+                if get_http_status(error) == 403:
+                    # Для чужих доменов Google отвечает 403, а не 404
+                    denied.add(email)
+                    pending.append(email)
+                else:
+                    results[email] = ResolvedEmail(email, KIND_UNKNOWN, error=str(error))
+
+        if KIND_GROUP in kinds and pending:
+            response = execute_batched(
+                service,
+                [(email, lambda e=email: service.groups().get(groupKey=e)) for email in pending],
+                batch_size=self.batch_size, limiter=self.limiter,
+                is_success=lambda error: get_http_status(error) == 404
+            )
+            for email, profile in response.responses.items():
+                if profile is not None:
+                    results[email] = ResolvedEmail(email, KIND_GROUP, profile)
+            for email, error in response.errors.items():
+                if get_http_status(error) == 403:
+                    denied.add(email)
+                else:
+                    results[email] = ResolvedEmail(email, KIND_UNKNOWN, error=str(error))
+
+        for email in pending:
+            if email in results:
+                continue
+            if email.split('@')[-1] != self.domain.lower():
+                results[email] = ResolvedEmail(email, KIND_EXTERNAL)
+            elif email in denied:
+                results[email] = ResolvedEmail(email, KIND_UNKNOWN, error='Недостаточно прав для проверки адреса (403)')
+            else:
+                results[email] = ResolvedEmail(email, KIND_MISSING)
+        return results
+
+
+directory_resolver = DirectoryResolver()
+
+
+def resolve_emails(service: Any, emails: Iterable[str],
+                   kinds: Tuple[str, ...] = (KIND_USER, KIND_GROUP)) -> Dict[str, ResolvedEmail]:
+    """Определяет адреса общим резолвером (см. DirectoryResolver.resolve)"""
+    return directory_resolver.resolve(service, emails, kinds)
@@ -16,6 +16,8 @@ except ImportError:
     build = None
     HttpError = Exception
 
+from .drive_permissions import DrivePermissionFanOut, FanOutResult, permission_index
+
 logger = logging.getLogger(__name__)
 
 
@@ -207,6 +209,7 @@ class DriveAPI:
                 request_params['emailMessage'] = message
             
             result = self.service.permissions().create(**request_params).execute()
+            permission_index.set_role(file_id, email, role)
             
             logger.info(f"✅ Разрешение добавлено: {email} -> {role} для файла {file_id}")
             return True
@@ -229,6 +232,7 @@ class DriveAPI:
                         request_params['emailMessage'] = message
                     
                     result = self.service.permissions().create(**request_params).execute()
+                    permission_index.set_role(file_id, email, role)
                     logger.info(f"✅ Разрешение добавлено с уведомлением: {email} -> {role} для файла {file_id}")
                     return True
                     
@@ -245,6 +249,7 @@ class DriveAPI:
                     request_params['emailMessage'] = f"Вам предоставлен доступ к документу с ролью '{role}'"
                     
                     result = self.service.permissions().create(**request_params).execute()
+                    permission_index.set_role(file_id, email, role)
                     logger.info(f"✅ Разрешение добавлено для корпоративного email: {email} -> {role}")
                     return True
                     
@@ -258,6 +263,34 @@ class DriveAPI:
             logger.error(f"❌ Ошибка при добавлении разрешения: {e}")
             return False
     
+    def add_permissions_bulk(self, file_ids: List[str], emails: List[str], role: str = 'reader',
+                             notify: bool = False, message: str = None) -> FanOutResult:
+        """
+        Добавляет разрешения всем пользователям ко всем файлам пакетными запросами
+        
+        Пары, у которых доступ с такой или более высокой ролью уже есть,
+        пропускаются по кэшированному индексу разрешений.
+        
+        Args:
+            file_ids: ID файлов
+            emails: Email пользователей
+            role: Роль ('reader', 'commenter', 'writer')
+            notify: Отправлять ли уведомление всем адресатам
+            message: Сообщение для уведомления
+            
+        Returns:
+            Результат по парам (файл, email)
+        """
+        result = FanOutResult()
+        if not self.service:
+            logger.error("Drive service не инициализирован")
+            for file_id in file_ids:
+                for email in emails:
+                    result.failed[(file_id, email.lower())] = 'Drive service не инициализирован'
+            return result
+        
+        return DrivePermissionFanOut(self.service).grant(file_ids, emails, role, notify, message)
+    
     def remove_permission(self, file_id: str, permission_id: str) -> bool:
         """
         Удаляет разрешение на доступ к файлу
@@ -278,6 +311,7 @@ class DriveAPI:
                 fileId=file_id,
                 permissionId=permission_id
             ).execute()
+            permission_index.invalidate(file_id)
             
             logger.info(f"✅ Разрешение удалено: {permission_id} для файла {file_id}")
             return True
@@ -313,6 +347,7 @@ class DriveAPI:
                 permissionId=permission_id,
                 body=permission
             ).execute()
+            permission_index.invalidate(file_id)
             
             logger.info(f"✅ Разрешение обновлено: {permission_id} -> {new_role} для файла {file_id}")
             return True
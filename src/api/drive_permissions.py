@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Массовая выдача доступа к файлам Google Drive.
+
+Запрос "файлы × пользователи × роль" раскладывается на пары, пары, у
+которых доступ уже есть, отбрасываются по кэшированному индексу
+разрешений, а остальные отправляются batch запросами permissions().create
+с единой политикой уведомлений. Адреса без Google аккаунта, для которых
+Drive требует уведомление, повторяются одним дополнительным пакетом
+с sendNotificationEmail=True.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .batch_requests import execute_batched
+from ..utils.rate_limiter import RateLimiter, execute_with_backoff, get_http_status
+
+logger = logging.getLogger(__name__)
+
+# Drive принимает не больше 100 запросов в одном batch
+DRIVE_BATCH_SIZE = 100
+
+# Время жизни разрешений файла в индексе в секундах: доступ меняют и в самом Drive
+PERMISSION_TTL = 300.0
+
+# Порядок ролей: доступ с ролью не ниже запрошенной повторно не выдается
+ROLE_RANK = {
+    'reader': 1,
+    'commenter': 2,
+    'writer': 3,
+    'fileOrganizer': 4,
+    'organizer': 4,
+    'owner': 5,
+}
+
+Pair = Tuple[str, str]
+
+
+def requires_notification(error: Exception) -> bool:
+    """Drive отклонил запрос, потому что адресату нужно отправить приглашение."""
+    text = str(getattr(error, 'error_details', '') or error)
+    return 'invalidSharingRequest' in text and 'notif' in text.lower()
+
+
+@dataclass
+class FanOutResult:
+    """Итог массовой выдачи доступа по парам (файл, email)"""
+    granted: Set[Pair] = field(default_factory=set)
+    notified: Set[Pair] = field(default_factory=set)
+    skipped: Dict[Pair, str] = field(default_factory=dict)
+    failed: Dict[Pair, str] = field(default_factory=dict)
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.granted) + len(self.skipped) + len(self.failed)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'pairs': self.total,
+            'granted': len(self.granted),
+            'notified': len(self.notified),
+            'skipped': len(self.skipped),
+            'failed': len(self.failed),
+            'batches': self.batches,
+            'elapsed': round(self.elapsed, 3),
+        }
+
+
+class PermissionIndex:
+    """
+    Кэш разрешений файлов: ID файла -> {email: роль}.
+
+    Разрешения файлов, которых еще нет в кэше или которые загружены раньше
+    чем ttl секунд назад, загружаются одним пакетом permissions().list;
+    после выдачи доступа индекс обновляется на месте. Устаревшие файлы не
+    видны ни в поиске, ни в обратном поиске до повторной загрузки.
+    """
+
+    def __init__(self, ttl: float = PERMISSION_TTL):
+        self.ttl = ttl
+        self._files: Dict[str, Dict[str, str]] = {}
+        self._ids: Dict[str, Dict[str, str]] = {}
+        self._loaded_at: Dict[str, float] = {}
+
+    def _fresh(self, file_id: str) -> bool:
+        loaded_at = self._loaded_at.get(file_id)
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def __contains__(self, file_id: str) -> bool:
+        return file_id in self._files and self._fresh(file_id)
+
+    def get_role(self, file_id: str, email: str) -> Optional[str]:
+        if file_id not in self:
+            return None
+        return self._files[file_id].get(email.lower())
+
+    def get_permission_id(self, file_id: str, email: str) -> Optional[str]:
+        if file_id not in self:
+            return None
+        return self._ids.get(file_id, {}).get(email.lower())
+
+    def files_for(self, email: str) -> List[str]:
+        """Обратный поиск: загруженные файлы, к которым у пользователя есть доступ."""
+        email = email.lower()
+        return [file_id for file_id, roles in self._files.items() if email in roles and self._fresh(file_id)]
+
+    def set_role(self, file_id: str, email: str, role: str, permission_id: Optional[str] = None):
+        """Обновляет роль в уже загруженном файле (неполные записи не создаются)."""
+        if file_id in self:
+            self._files[file_id][email.lower()] = role
+            if permission_id:
+                self._ids[file_id][email.lower()] = permission_id
+
+    def remove(self, file_id: str, email: str):
+        self._files.get(file_id, {}).pop(email.lower(), None)
+        self._ids.get(file_id, {}).pop(email.lower(), None)
+
+    def put(self, file_id: str, permissions: Iterable[Dict[str, Any]]):
+        """Сохраняет разрешения файла (элементы ответа permissions().list)."""
+        permissions = [p for p in permissions if p.get('emailAddress')]
+        self._files[file_id] = {p['emailAddress'].lower(): p.get('role', '') for p in permissions}
+        self._ids[file_id] = {p['emailAddress'].lower(): p['id'] for p in permissions if p.get('id')}
+        self._loaded_at[file_id] = time.monotonic()
+
+    def invalidate(self, file_id: Optional[str] = None):
+        if file_id is None:
+            self._files.clear()
+            self._ids.clear()
+            self._loaded_at.clear()
+        else:
+            self._files.pop(file_id, None)
+            self._ids.pop(file_id, None)
+            self._loaded_at.pop(file_id, None)
+
+    def load(self, service: Any, file_ids: Iterable[str], limiter: Optional[RateLimiter] = None,
+             batch_size: int = DRIVE_BATCH_SIZE) -> Dict[str, Exception]:
+        """
+        Загружает разрешения файлов, которых нет в индексе или которые устарели.
+
+        Returns:
+            Ошибки загрузки по ID файла
+        """
+        for file_id in [f for f in self._files if not self._fresh(f)]:
+            self.invalidate(file_id)
+        missing = [file_id for file_id in dict.fromkeys(file_ids) if file_id not in self._files]
+        if not missing:
+            return {}
+
+        fields = 'permissions(id,emailAddress,role,type),nextPageToken'
+        calls = [(file_id, self._list_factory(service, file_id, fields)) for file_id in missing]
+        result = execute_batched(service, calls, batch_size=batch_size, limiter=limiter)
+
+        errors = dict(result.errors)
+        for file_id, response in result.responses.items():
+            permissions = list(response.get('permissions', []))
+            page_token = response.get('nextPageToken')
+            # Продолжение списка у файлов с большим числом разрешений
+            try:
+                while page_token:
+                    page = execute_with_backoff(
+                        self._page_factory(service, file_id, fields, page_token), limiter=limiter
+                    )
+                    permissions.extend(page.get('permissions', []))
+                    page_token = page.get('nextPageToken')
+            except Exception as e:
+                # Неполный список разрешений в индекс не попадает
+                errors[file_id] = e
+                continue
+            self.put(file_id, permissions)
+        return errors
+
+    @staticmethod
+    def _list_factory(service: Any, file_id: str, fields: str):
+        return lambda: service.permissions().list(
+            fileId=file_id, fields=fields, pageSize=100, supportsAllDrives=True
+        )
+
+    @staticmethod
+    def _page_factory(service: Any, file_id: str, fields: str, page_token: str):
+        return lambda: service.permissions().list(
+            fileId=file_id, fields=fields, pageSize=100,
+            pageToken=page_token, supportsAllDrives=True
+        ).execute()
+
+
+# Общий индекс разрешений для окон и сервисов приложения (записи живут PERMISSION_TTL)
+permission_index = PermissionIndex()
+
+
+class DrivePermissionFanOut:
+    """
+    Выдача доступа нескольким пользователям к нескольким файлам.
+    """
+
+    def __init__(self, service: Any,
+                 index: Optional[PermissionIndex] = None,
+                 batch_size: int = DRIVE_BATCH_SIZE,
+                 rate_per_second: float = 10.0):
+        """
+        Инициализация.
+
+        Args:
+            service: Сервис Google Drive API v3
+            index: Индекс разрешений (по умолчанию общий permission_index)
+            batch_size: Запросов в одном batch (не больше 100)
+            rate_per_second: Ограничение частоты запросов
+        """
+        self.service = service
+        self.index = permission_index if index is None else index
+        self.batch_size = min(batch_size, DRIVE_BATCH_SIZE)
+        self.limiter = RateLimiter(rate_per_second)
+
+    def plan(self, file_ids: Iterable[str], emails: Iterable[str], role: str,
+             result: FanOutResult) -> List[Pair]:
+        """
+        Пары (файл, email), которым нужно выдать доступ.
+
+        Пары с уже имеющимся доступом не ниже role попадают в result.skipped.
+        """
+        file_ids = list(dict.fromkeys(f for f in file_ids if f))
+        emails = list(dict.fromkeys(e.strip().lower() for e in emails if e.strip()))
+
+        for file_id, error in self.index.load(self.service, file_ids, self.limiter, self.batch_size).items():
+            logger.warning(f"Не удалось загрузить разрешения файла {file_id}: {error}")
+            for email in emails:
+                result.failed[(file_id, email)] = f'нет доступа к файлу: {error}'
+
+        pairs = []
+        for file_id in file_ids:
+            if file_id not in self.index:
+                continue
+            for email in emails:
+                current = self.index.get_role(file_id, email)
+                if current is not None and ROLE_RANK.get(current, 0) >= ROLE_RANK.get(role, 0):
+                    result.skipped[(file_id, email)] = current
+                else:
+                    pairs.append((file_id, email))
+        return pairs
+
+    def grant(self, file_ids: Iterable[str], emails: Iterable[str], role: str = 'reader',
+              notify: bool = False, message: Optional[str] = None,
+              dry_run: bool = False) -> FanOutResult:
+        """
+        Выдает роль role всем пользователям emails ко всем файлам file_ids.
+
+        Args:
+            file_ids: ID файлов
+            emails: Email пользователей
+            role: Роль ('reader', 'commenter', 'writer')
+            notify: Отправлять приглашения всем адресатам; без этого
+                приглашение получают только адресаты, для которых его
+                требует Drive
+            message: Текст приглашения
+            dry_run: Только вычислить пары без выдачи доступа
+
+        Returns:
+            FanOutResult по парам (файл, email)
+        """
+        result = FanOutResult()
+        started = time.perf_counter()
+        pairs = self.plan(file_ids, emails, role, result)
+
+        if pairs and not dry_run:
+            pending = self._create(pairs, role, notify, message, result)
+            if pending and not notify:
+                logger.info(f"Повтор {len(pending)} запросов с приглашением по email")
+                self._create(pending, role, True, message, result)
+
+        result.elapsed = time.perf_counter() - started
+        logger.info(f"Массовая выдача доступа ({role}): {result.summary()}")
+        return result
+
+    def _create(self, pairs: List[Pair], role: str, notify: bool, message: Optional[str],
+                result: FanOutResult) -> List[Pair]:
+        """Создает разрешения пакетами; возвращает пары, для которых нужно приглашение."""
+        calls = [(pair, self._create_factory(pair, role, notify, message)) for pair in pairs]
+        batch = execute_batched(
+            self.service, calls, batch_size=self.batch_size, limiter=self.limiter,
+            is_success=lambda e: get_http_status(e) == 409
+        )
+        result.batches += batch.batches
+
+        for pair in batch.responses:
+            result.granted.add(pair)
+            result.failed.pop(pair, None)
+            if notify:
+                result.notified.add(pair)
+            response = batch.responses[pair] or {}
+            self.index.set_role(pair[0], pair[1], role, response.get('id'))
+
+        needs_notification = []
+        for pair, error in batch.errors.items():
+            if not notify and requires_notification(error):
+                needs_notification.append(pair)
+            else:
+                result.failed[pair] = str(error)
+        return needs_notification
+
+    def _create_factory(self, pair: Pair, role: str, notify: bool, message: Optional[str]):
+        file_id, email = pair
+        params = {
+            'fileId': file_id,
+            'body': {'type': 'user', 'role': role, 'emailAddress': email},
+            'sendNotificationEmail': notify,
+            'supportsAllDrives': True,
+            'fields': 'id',
+        }
+        if notify:
+            params['emailMessage'] = message or f"Вам предоставлен доступ к документу с ролью '{role}'"
+        return lambda: self.service.permissions().create(**params)
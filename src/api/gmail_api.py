@@ -6,6 +6,8 @@ Gmail API модуль для отправки приветственных пи
 
 import logging
 import base64
+import html
+from string import Template
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional, Dict, Any
@@ -19,98 +21,24 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Шаблоны приветственного письма разбираются один раз при импорте модуля;
+# для каждого пользователя выполняется только подстановка значений
+WELCOME_SUBJECT = 'Добро пожаловать в Google Workspace!'
 
-class GmailService:
-    """Сервис для работы с Gmail API"""
-    
-    def __init__(self, credentials):
-        """
-        Инициализация Gmail сервиса
-        
-        Args:
-            credentials: Google OAuth2 credentials
-        """
-        self.credentials = credentials
-        self.service = None
-        self._initialize_service()
-    
-    def _initialize_service(self):
-        """Инициализация Gmail API сервиса"""
-        try:
-            if build is None:
-                logger.error("❌ Google API библиотеки не установлены")
-                return
-            
-            self.service = build('gmail', 'v1', credentials=self.credentials)
-            logger.info("✅ Gmail API сервис инициализирован")
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка инициализации Gmail API: {e}")
-    
-    def create_welcome_message(self, to_email: str, user_name: str, 
-                             temporary_password: str, admin_email: str) -> Optional[Dict]:
-        """
-        Создание приветственного письма для нового пользователя
-        
-        Args:
-            to_email: Email получателя (нового пользователя)
-            user_name: Имя пользователя
-            temporary_password: Временный пароль
-            admin_email: Email администратора (отправителя)
-            
-        Returns:
-            Словарь с данными сообщения или None при ошибке
-        """
-        try:
-            # Создаем многочастное сообщение
-            msg = MIMEMultipart('alternative')
-            msg['To'] = to_email
-            msg['From'] = admin_email
-            msg['Subject'] = 'Добро пожаловать в Google Workspace!'
-            
-            # HTML версия письма
-            html_content = self._create_html_welcome_template(
-                user_name, to_email, temporary_password
-            )
-            
-            # Текстовая версия письма
-            text_content = self._create_text_welcome_template(
-                user_name, to_email, temporary_password
-            )
-            
-            # Добавляем части сообщения
-            text_part = MIMEText(text_content, 'plain', 'utf-8')
-            html_part = MIMEText(html_content, 'html', 'utf-8')
-            
-            msg.attach(text_part)
-            msg.attach(html_part)
-            
-            # Кодируем сообщение в base64
-            raw_message = base64.urlsafe_b64encode(msg.as_bytes()).decode('utf-8')
-            
-            return {'raw': raw_message}
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка создания письма: {e}")
-            return None
-    
-    def _create_html_welcome_template(self, user_name: str, email: str, 
-                                    password: str) -> str:
-        """Создание HTML шаблона приветственного письма"""
-        return f"""
+WELCOME_HTML_TEMPLATE = Template("""
         <!DOCTYPE html>
         <html>
         <head>
             <meta charset="utf-8">
             <style>
-                body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 0; padding: 20px; }}
-                .container {{ max-width: 600px; margin: 0 auto; background: #ffffff; }}
-                .header {{ background: #4285f4; color: white; padding: 30px; text-align: center; }}
-                .content {{ padding: 30px; line-height: 1.6; }}
-                .credentials {{ background: #f8f9fa; padding: 20px; border-left: 4px solid #4285f4; margin: 20px 0; }}
-                .button {{ display: inline-block; background: #4285f4; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px; margin: 20px 0; }}
-                .footer {{ background: #f8f9fa; padding: 20px; text-align: center; font-size: 12px; color: #666; }}
-                .warning {{ background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 4px; margin: 20px 0; }}
+                body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 0; padding: 20px; }
+                .container { max-width: 600px; margin: 0 auto; background: #ffffff; }
+                .header { background: #4285f4; color: white; padding: 30px; text-align: center; }
+                .content { padding: 30px; line-height: 1.6; }
+                .credentials { background: #f8f9fa; padding: 20px; border-left: 4px solid #4285f4; margin: 20px 0; }
+                .button { display: inline-block; background: #4285f4; color: white; padding: 12px 24px; text-decoration: none; border-radius: 4px; margin: 20px 0; }
+                .footer { background: #f8f9fa; padding: 20px; text-align: center; font-size: 12px; color: #666; }
+                .warning { background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 4px; margin: 20px 0; }
             </style>
         </head>
         <body>
@@ -121,7 +49,7 @@ class GmailService:
                 </div>
                 
                 <div class="content">
-                    <h2>Здравствуйте, {user_name}!</h2>
+                    <h2>Здравствуйте, $user_name!</h2>
                     
                     <p>Для вас была создана учетная запись в Google Workspace. Теперь у вас есть доступ к:</p>
                     
@@ -135,8 +63,8 @@ class GmailService:
                     
                     <div class="credentials">
                         <h3>🔐 Данные для входа:</h3>
-                        <p><strong>Email:</strong> {email}</p>
-                        <p><strong>Временный пароль:</strong> <code>{password}</code></p>
+                        <p><strong>Email:</strong> $email</p>
+                        <p><strong>Временный пароль:</strong> <code>$password</code></p>
                     </div>
                     
                     <div class="warning">
@@ -171,21 +99,18 @@ class GmailService:
             </div>
         </body>
         </html>
-        """
-    
-    def _create_text_welcome_template(self, user_name: str, email: str, 
-                                    password: str) -> str:
-        """Создание текстового шаблона приветственного письма"""
-        return f"""
+        """)
+
+WELCOME_TEXT_TEMPLATE = Template("""
 Добро пожаловать в Google Workspace!
 
-Здравствуйте, {user_name}!
+Здравствуйте, $user_name!
 
 Для вас была создана учетная запись в Google Workspace.
 
 ДАННЫЕ ДЛЯ ВХОДА:
-Email: {email}
-Временный пароль: {password}
+Email: $email
+Временный пароль: $password
 
 ВАЖНО: Обязательно смените пароль при первом входе!
 
@@ -207,7 +132,121 @@ Email: {email}
 
 --
 Google Workspace Admin Tools
+        """)
+
+
+class GmailService:
+    """Сервис для работы с Gmail API"""
+    
+    def __init__(self, credentials):
         """
+        Инициализация Gmail сервиса
+        
+        Args:
+            credentials: Google OAuth2 credentials
+        """
+        self.credentials = credentials
+        self.service = None
+        self._initialize_service()
+    
+    def _initialize_service(self):
+        """Инициализация Gmail API сервиса"""
+        try:
+            if build is None:
+                logger.error("❌ Google API библиотеки не установлены")
+                return
+            
+            self.service = build('gmail', 'v1', credentials=self.credentials)
+            logger.info("✅ Gmail API сервис инициализирован")
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка инициализации Gmail API: {e}")
+    
+    def create_welcome_message(self, to_email: str, user_name: str, 
+                             temporary_password: str, admin_email: str) -> Optional[Dict]:
+        """
+        Создание приветственного письма для нового пользователя
+        
+        Args:
+            to_email: Email получателя (нового пользователя)
+            user_name: Имя пользователя
+            temporary_password: Временный пароль
+            admin_email: Email администратора (отправителя)
+            
+        Returns:
+            Словарь с данными сообщения или None при ошибке
+        """
+        try:
+            # Создаем многочастное сообщение
+            msg = MIMEMultipart('alternative')
+            msg['To'] = to_email
+            msg['From'] = admin_email
+            msg['Subject'] = WELCOME_SUBJECT
+            
+            # HTML версия письма
+            html_content = self._create_html_welcome_template(
+                user_name, to_email, temporary_password
+            )
+            
+            # Текстовая версия письма
+            text_content = self._create_text_welcome_template(
+                user_name, to_email, temporary_password
+            )
+            
+            # Добавляем части сообщения
+            text_part = MIMEText(text_content, 'plain', 'utf-8')
+            html_part = MIMEText(html_content, 'html', 'utf-8')
+            
+            msg.attach(text_part)
+            msg.attach(html_part)
+            
+            # Кодируем сообщение в base64
+            raw_message = base64.urlsafe_b64encode(msg.as_bytes()).decode('utf-8')
+            
+            return {'raw': raw_message}
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка создания письма: {e}")
+            return None
+    
+    def _create_html_welcome_template(self, user_name: str, email: str, 
+                                    password: str) -> str:
+        """Создание HTML шаблона приветственного письма"""
+        return WELCOME_HTML_TEMPLATE.substitute(
+            user_name=html.escape(user_name), email=html.escape(email), password=html.escape(password)
+        )
+    
+    def _create_text_welcome_template(self, user_name: str, email: str, 
+                                    password: str) -> str:
+        """Создание текстового шаблона приветственного письма"""
+        return WELCOME_TEXT_TEMPLATE.substitute(user_name=user_name, email=email, password=password)
+    
+    def deliver_welcome_email(self, to_email: str, user_name: str,
+                              temporary_password: str, admin_email: str) -> Dict[str, Any]:
+        """
+        Отправка приветственного письма без перехвата ошибок
+        
+        Используется очередью писем, которая сама решает, повторять ли отправку.
+        
+        Returns:
+            Ответ messages().send
+            
+        Raises:
+            RuntimeError: Сервис не инициализирован или письмо не создано
+            HttpError: Ошибка Gmail API
+        """
+        if not self.service:
+            raise RuntimeError("Gmail сервис не инициализирован")
+        
+        message = self.create_welcome_message(
+            to_email, user_name, temporary_password, admin_email
+        )
+        if not message:
+            raise RuntimeError("Не удалось создать сообщение")
+        
+        return self.service.users().messages().send(
+            userId='me', body=message
+        ).execute()
     
     def send_welcome_email(self, to_email: str, user_name: str, 
                           temporary_password: str, admin_email: str) -> bool:
@@ -228,20 +267,10 @@ Google Workspace Admin Tools
             return False
         
         try:
-            # Создаем сообщение
-            message = self.create_welcome_message(
+            result = self.deliver_welcome_email(
                 to_email, user_name, temporary_password, admin_email
             )
             
-            if not message:
-                logger.error("❌ Не удалось создать сообщение")
-                return False
-            
-            # Отправляем письмо
-            result = self.service.users().messages().send(
-                userId='me', body=message
-            ).execute()
-            
             logger.info(f"✅ Приветственное письмо отправлено: {to_email}")
             logger.info(f"📧 Message ID: {result.get('id')}")
             
@@ -6,6 +6,8 @@ API функции для работы с группами Google Workspace.
 import logging
 from typing import Any, List, Dict
 from ..utils.data_cache import data_cache
+from ..utils.statistics_engine import statistics_engine
+from .directory_resolver import resolve_emails
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +104,7 @@ def create_group(service: Any, name: str, email: str, description: str = "") ->
                 
                 # Очищаем кэш для обновления списка групп
                 data_cache.clear_cache()
+                statistics_engine.group_upserted(group)
                 
                 return f"Группа создана: {group['email']}"
                 
@@ -114,6 +117,7 @@ def create_group(service: Any, name: str, email: str, description: str = "") ->
             
             # Очищаем кэш для обновления списка групп
             data_cache.clear_cache()
+            statistics_engine.group_upserted(group)
             
             return f"Группа создана: {group['email']}"
         
@@ -195,6 +199,7 @@ def delete_group(service: Any, group_email: str) -> str:
                 
                 google_service.groups().delete(groupKey=group_email).execute()
                 data_cache.clear_cache()
+                statistics_engine.group_removed(group_email)
                 return f"Группа {group_email} успешно удалена."
                 
             except Exception as e:
@@ -204,6 +209,7 @@ def delete_group(service: Any, group_email: str) -> str:
         elif hasattr(service, 'groups') and callable(getattr(service, 'groups')):
             service.groups().delete(groupKey=group_email).execute()
             data_cache.clear_cache()
+            statistics_engine.group_removed(group_email)
             return f"Группа {group_email} успешно удалена."
         
         else:
@@ -213,13 +219,15 @@ def delete_group(service: Any, group_email: str) -> str:
         return f'Ошибка удаления группы: {e}'
 
 
-def get_group_members(service: Any, group_email: str) -> List[Dict[str, Any]]:
+def get_group_members(service: Any, group_email: str, raise_errors: bool = False) -> List[Dict[str, Any]]:
     """
     Получает список участников группы.
     
     Args:
         service: Сервис Google Directory API или ServiceAdapter
         group_email: Email группы
+        raise_errors: Пробрасывать ошибки API вместо пустого списка
+            (пустой список нельзя отличить от группы без участников)
         
     Returns:
         Список участников группы
@@ -252,6 +260,8 @@ def get_group_members(service: Any, group_email: str) -> List[Dict[str, Any]]:
                 
             except Exception as e:
                 print(f"Ошибка получения участников через прямой API: {e}")
+                if raise_errors:
+                    raise
                 return []
         
         # Обычный Google API сервис
@@ -276,10 +286,14 @@ def get_group_members(service: Any, group_email: str) -> List[Dict[str, Any]]:
         
         else:
             print(f"Неподдерживаемый тип сервиса: {type(service)}")
+            if raise_errors:
+                raise TypeError(f"Неподдерживаемый тип сервиса: {type(service)}")
             return []
         
     except Exception as e:
         print(f"Ошибка получения участников группы: {e}")
+        if raise_errors:
+            raise
         return []
 
 
@@ -316,33 +330,20 @@ def add_user_to_group(service: Any, group_email: str, user_email: str) -> str:
         if not google_service:
             return f'Не удалось получить доступ к Google API'
         
-        # Проверяем, существует ли группа
-        try:
-            group_info = google_service.groups().get(groupKey=group_email).execute()
-            print(f"[add_user_to_group] ✅ {group_email} - это группа: {group_info.get('name', 'N/A')}")
-        except Exception as group_check_error:
-            if '404' in str(group_check_error) or 'notFound' in str(group_check_error):
-                # Дополнительная проверка: может это пользователь?
-                try:
-                    user_info = google_service.users().get(userKey=group_email).execute()
-                    user_name = user_info.get('name', {}).get('fullName', 'N/A')
-                    print(f"[add_user_to_group] ❌ {group_email} - это пользователь: {user_name}")
-                    return f'❌ Ошибка: {group_email} является пользователем ({user_name}), а не группой.\n💡 Для добавления пользователей используйте email группы, например: teamname@sputnik8.com'
-                except Exception:
-                    pass
-                return f'❌ Ошибка: {group_email} не является группой или не существует.\n💡 Убедитесь, что вы указали email группы, а не пользователя.'
-            elif '403' in str(group_check_error) or 'forbidden' in str(group_check_error):
-                # При ошибке 403 тоже проверим, не пользователь ли это
-                try:
-                    user_info = google_service.users().get(userKey=group_email).execute()
-                    user_name = user_info.get('name', {}).get('fullName', 'N/A')
-                    print(f"[add_user_to_group] ❌ {group_email} - это пользователь: {user_name}")
-                    return f'❌ Ошибка: {group_email} является пользователем ({user_name}), а не группой.\n💡 Для добавления пользователей используйте email группы, например: teamname@sputnik8.com'
-                except Exception:
-                    pass
-                return f'❌ Ошибка доступа: Недостаточно прав для проверки группы {group_email}.\n💡 Убедитесь, что у вас есть права администратора групп.'
-            else:
-                return f'❌ Ошибка при проверке группы {group_email}: {group_check_error}'
+        # Определяем, чем является адрес: кэш справочника, затем пакетные users/groups get
+        entry = resolve_emails(google_service, [group_email]).get(group_email.strip().lower())
+        if entry is not None and entry.is_group:
+            print(f"[add_user_to_group] ✅ {group_email} - это группа: {entry.profile.get('name', 'N/A')}")
+        elif entry is not None and entry.is_user:
+            user_name = entry.profile.get('name', {}).get('fullName', 'N/A')
+            print(f"[add_user_to_group] ❌ {group_email} - это пользователь: {user_name}")
+            return f'❌ Ошибка: {group_email} является пользователем ({user_name}), а не группой.\n💡 Для добавления пользователей используйте email группы, например: teamname@sputnik8.com'
+        elif entry is not None and entry.exists is False:
+            return f'❌ Ошибка: {group_email} не является группой или не существует.\n💡 Убедитесь, что вы указали email группы, а не пользователя.'
+        elif entry is not None and '403' in (entry.error or ''):
+            return f'❌ Ошибка доступа: Недостаточно прав для проверки группы {group_email}.\n💡 Убедитесь, что у вас есть права администратора групп.'
+        else:
+            return f'❌ Ошибка при проверке группы {group_email}: {entry.error if entry else "пустой адрес"}'
         
         # Если группа существует, добавляем пользователя
         print(f"[add_user_to_group] Добавляем {user_email} в группу {group_email}...")
@@ -353,6 +354,7 @@ def add_user_to_group(service: Any, group_email: str, user_email: str) -> str:
         }
         
         result = google_service.members().insert(groupKey=group_email, body=body).execute()
+        statistics_engine.group_members_changed(group_email, 1)
         return f'✅ Пользователь {user_email} добавлен в группу {group_email}.'
         
     except Exception as e:
@@ -388,6 +390,7 @@ def remove_user_from_group(service: Any, group_email: str, user_email: str) -> s
                 google_service = get_service()
                 
                 google_service.members().delete(groupKey=group_email, memberKey=user_email).execute()
+                statistics_engine.group_members_changed(group_email, -1)
                 return f'Пользователь {user_email} удален из группы {group_email}.'
                 
             except Exception as e:
@@ -398,6 +401,7 @@ def remove_user_from_group(service: Any, group_email: str, user_email: str) -> s
         # Обычный Google API сервис
         elif hasattr(service, 'members') and callable(getattr(service, 'members')):
             service.members().delete(groupKey=group_email, memberKey=user_email).execute()
+            statistics_engine.group_members_changed(group_email, -1)
             return f'Пользователь {user_email} удален из группы {group_email}.'
         
         else:
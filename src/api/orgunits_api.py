@@ -3,10 +3,20 @@
 API функции для работы с организационными подразделениями (OU) Google Workspace.
 """
 
+import json
 import logging
-from typing import Any, List, Dict, Optional
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Dict, Optional, Iterable, Tuple
 from googleapiclient.errors import HttpError
 
+from .batch_requests import DEFAULT_BATCH_SIZE, execute_batched
+from ..utils.data_cache import data_cache
+from ..utils.rate_limiter import RateLimiter
+from ..utils.statistics_engine import statistics_engine
+
 logger = logging.getLogger(__name__)
 
 
@@ -388,6 +398,152 @@ def move_user_to_orgunit(service: Any, user_email: str, org_unit_path: str) -> D
         }
 
 
+@dataclass
+class BulkMoveResult:
+    """Результат массового перемещения пользователей между OU"""
+    moved: Dict[str, str] = field(default_factory=dict)        # email -> новый OU
+    skipped: Dict[str, str] = field(default_factory=dict)      # email -> OU (уже на месте)
+    failed: Dict[str, str] = field(default_factory=dict)       # email -> ошибка
+    rollback: Dict[str, str] = field(default_factory=dict)     # email -> прежний OU
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return not self.failed
+
+    def rollback_moves(self) -> List[Tuple[str, str]]:
+        """Пары (email, прежний OU) для отката через bulk_move_users_to_orgunits"""
+        return sorted(self.rollback.items())
+
+    def save_rollback(self, path: str):
+        """Сохраняет информацию для отката в JSON"""
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            'created_at': datetime.now().isoformat(),
+            'moves': [{'email': email, 'org_unit_path': ou} for email, ou in self.rollback_moves()],
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def load_rollback(path: str) -> List[Tuple[str, str]]:
+    """Загружает пары (email, OU) из файла, сохраненного BulkMoveResult.save_rollback"""
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    return [(item['email'], item['org_unit_path']) for item in data.get('moves', [])]
+
+
+def _resolve_google_service(service: Any) -> Any:
+    """ServiceAdapter не дает прямого доступа к API: получаем сервис один раз на операцию"""
+    if hasattr(service, '_users') and hasattr(service, '_groups'):
+        from ..auth import get_service
+        return get_service()
+    return service
+
+
+def _cached_user_records(service: Any) -> List[List[Dict[str, Any]]]:
+    """Списки пользователей в кэшах, которые нужно обновить на месте"""
+    records = [data_cache.users_cache]
+    adapter_users = getattr(service, '_users', None)
+    if isinstance(adapter_users, list) and adapter_users is not data_cache.users_cache:
+        records.append(adapter_users)
+    return records
+
+
+def bulk_move_users_to_orgunits(service: Any, moves: Iterable[Tuple[str, str]],
+                                current_paths: Optional[Dict[str, str]] = None,
+                                batch_size: int = DEFAULT_BATCH_SIZE,
+                                rate_per_second: float = 10.0) -> BulkMoveResult:
+    """
+    Перемещает пользователей между OU пакетными запросами.
+    
+    Вместо отдельного users().update (и нового сервиса) на каждого
+    пользователя запросы отправляются batch пакетами. Количество запросов в
+    пакете (batch_size) и ограничитель частоты задают, сколько изменений
+    выполняется одновременно. Текущий OU каждого пользователя запрашивается
+    пакетом users().get: по нему решается, нужно ли перемещение, и он
+    сохраняется в результате для отката. Записи пользователей в кэшах
+    обновляются на месте без полной перезагрузки.
+    
+    Args:
+        service: Сервис Google Directory API или ServiceAdapter
+        moves: Пары (email пользователя, целевой OU)
+        current_paths: Известные вызывающему OU (email -> путь) - только
+            подсказка: расхождение с API записывается в журнал и исправляется в кэше
+        batch_size: Запросов в одном batch
+        rate_per_second: Ограничение частоты запросов
+        
+    Returns:
+        BulkMoveResult с перемещенными, пропущенными, ошибками и данными для отката
+    """
+    started = time.perf_counter()
+    result = BulkMoveResult()
+    targets = {email.lower(): target or '/' for email, target in moves}
+    if not targets:
+        return result
+
+    google_service = _resolve_google_service(service)
+    limiter = RateLimiter(rate_per_second)
+    cached_records = _cached_user_records(service)
+
+    # Кэш и переданные OU могут устареть: пропуск перемещения и цель отката
+    # определяются только по текущему OU из API
+    hints = {email.lower(): path for email, path in (current_paths or {}).items()}
+    for records in cached_records:
+        for user in records:
+            email = user.get('primaryEmail', '').lower()
+            if email in targets and email not in hints:
+                hints[email] = user.get('orgUnitPath', '/')
+
+    known: Dict[str, str] = {}
+    lookup = execute_batched(
+        google_service,
+        [(email, lambda e=email: google_service.users().get(
+            userKey=e, fields='primaryEmail,orgUnitPath')) for email in targets],
+        batch_size=batch_size, limiter=limiter
+    )
+    result.batches += lookup.batches
+    for email, user in lookup.responses.items():
+        known[email] = (user or {}).get('orgUnitPath', '/')
+        if email in hints and hints[email] != known[email]:
+            logger.debug(f"OU {email} в кэше устарел: {hints[email]} -> {known[email]}")
+    for email, error in lookup.errors.items():
+        result.failed[email] = f'не удалось получить текущий OU: {error}'
+
+    calls = []
+    for email, target in targets.items():
+        if email in result.failed:
+            continue
+        if known[email] == target:
+            result.skipped[email] = target
+            continue
+        calls.append((email, lambda e=email, t=target: google_service.users().update(
+            userKey=e, body={'orgUnitPath': t}, fields='primaryEmail,orgUnitPath')))
+
+    if calls:
+        logger.info(f"📁 Массовое перемещение {len(calls)} пользователей, пакеты по {batch_size}")
+        update = execute_batched(google_service, calls, batch_size=batch_size, limiter=limiter)
+        result.batches += update.batches
+        for email in update.responses:
+            result.moved[email] = targets[email]
+            result.rollback[email] = known[email]
+        for email, error in update.errors.items():
+            result.failed[email] = str(error)
+
+    # Обновляем кэши на месте: перемещенных и тех, чей OU в кэше устарел
+    actual = {**known, **result.moved}
+    for records in cached_records:
+        for user in records:
+            email = user.get('primaryEmail', '').lower()
+            if email in actual and user.get('orgUnitPath', '/') != actual[email]:
+                user['orgUnitPath'] = actual[email]
+                statistics_engine.user_upserted(user)
+
+    result.elapsed = time.perf_counter() - started
+    logger.info(f"✅ Перемещено: {len(result.moved)}, без изменений: {len(result.skipped)}, "
+                f"ошибок: {len(result.failed)} за {result.elapsed:.1f} с ({result.batches} batch)")
+    return result
+
+
 def create_orgunit(service: Any, name: str, parent_ou_path: str = "/", description: str = "") -> Dict[str, Any]:
     """
     Создает новое организационное подразделение.
@@ -10,6 +10,7 @@ from typing import List, Optional, Dict, Any
 from dataclasses import dataclass
 
 from .calendar_api import GoogleCalendarAPI, CalendarInfo, CalendarPermission
+from .calendar_acl_sync import AclSyncReport, CalendarAclSync
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +44,14 @@ class SputnikCalendarManager:
         self.calendar_api = GoogleCalendarAPI(credentials_path)
         self.calendar_id = self.SPUTNIK_CALENDAR_ID
         self.calendar_info: Optional[CalendarInfo] = None
+        self._acl_sync: Optional[CalendarAclSync] = None
+        
+    @property
+    def acl_sync(self) -> CalendarAclSync:
+        """Снимок ACL календаря и пакетные изменения участников"""
+        if self._acl_sync is None or self._acl_sync.service is not self.calendar_api.service:
+            self._acl_sync = CalendarAclSync(self.calendar_api.service, self.calendar_id)
+        return self._acl_sync
         
     def initialize(self) -> bool:
         """
@@ -88,19 +97,9 @@ class SputnikCalendarManager:
             Список участников
         """
         try:
-            permissions = self.calendar_api.get_calendar_permissions(self.calendar_id)
-            members = []
-            
-            for permission in permissions:
-                # Пропускаем системные разрешения
-                if permission.scope_type != 'user':
-                    continue
-                
-                member = SputnikMember(
-                    email=permission.user_email,
-                    role=permission.role
-                )
-                members.append(member)
+            # Список участников всегда загружается заново и обновляет снимок ACL
+            snapshot = self.acl_sync.get_snapshot(force_refresh=True)
+            members = [SputnikMember(email=email, role=role) for email, role in snapshot.items()]
             
             logger.info(f"Найдено участников календаря SPUTNIK: {len(members)}")
             return members
@@ -123,15 +122,14 @@ class SputnikCalendarManager:
             True если участник добавлен успешно
         """
         try:
-            # Проверяем, не добавлен ли уже этот пользователь
-            existing_members = self.get_members()
-            for member in existing_members:
-                if member.email.lower() == email.lower():
-                    logger.warning(f"Участник {email} уже добавлен к календарю SPUTNIK")
-                    return False
+            # Проверяем по снимку ACL, не добавлен ли уже этот пользователь
+            if email.lower() in self.acl_sync.get_snapshot(max_age=self.acl_sync.write_max_age):
+                logger.warning(f"Участник {email} уже добавлен к календарю SPUTNIK")
+                return False
             
             # Добавляем участника
-            success = self.calendar_api.add_user_to_calendar(self.calendar_id, email, role)
+            report = self.acl_sync.add_members({email: role})
+            success = report.succeeded(email)
             
             if success:
                 logger.info(f"✅ Участник {email} добавлен к календарю SPUTNIK с ролью {role}")
@@ -159,21 +157,14 @@ class SputnikCalendarManager:
             True если участник удален успешно
         """
         try:
-            # Проверяем, есть ли такой участник
-            existing_members = self.get_members()
-            member_found = False
-            
-            for member in existing_members:
-                if member.email.lower() == email.lower():
-                    member_found = True
-                    break
-            
-            if not member_found:
+            # Проверяем по снимку ACL, есть ли такой участник
+            if email.lower() not in self.acl_sync.get_snapshot(max_age=self.acl_sync.write_max_age):
                 logger.warning(f"Участник {email} не найден в календаре SPUTNIK")
                 return False
             
-            # Удаляем участника
-            success = self.calendar_api.remove_user_from_calendar(self.calendar_id, email)
+            # Удаляем правило по его ID user:<email>
+            report = self.acl_sync.remove_members([email])
+            success = report.succeeded(email)
             
             if success:
                 logger.info(f"✅ Участник {email} удален из календаря SPUTNIK")
@@ -198,24 +189,22 @@ class SputnikCalendarManager:
             True если роль изменена успешно
         """
         try:
-            # Проверяем, есть ли такой участник
-            existing_members = self.get_members()
-            current_member = None
-            
-            for member in existing_members:
-                if member.email.lower() == email.lower():
-                    current_member = member
-                    break
+            # Проверяем по снимку ACL, есть ли такой участник
+            current_role = self.acl_sync.get_snapshot(max_age=self.acl_sync.write_max_age).get(email.lower())
             
-            if not current_member:
+            if current_role is None:
                 logger.warning(f"Участник {email} не найден в календаре SPUTNIK")
                 return False
             
+            if current_role == new_role:
+                return True
+            
             # Изменяем роль
-            success = self.calendar_api.update_user_role(self.calendar_id, email, new_role)
+            report = self.acl_sync.set_roles({email: new_role})
+            success = report.succeeded(email)
             
             if success:
-                logger.info(f"✅ Роль участника {email} в календаре SPUTNIK изменена с {current_member.role} на {new_role}")
+                logger.info(f"✅ Роль участника {email} в календаре SPUTNIK изменена с {current_role} на {new_role}")
             else:
                 logger.error(f"❌ Не удалось изменить роль участника {email} в календаре SPUTNIK")
             
@@ -236,33 +225,58 @@ class SputnikCalendarManager:
         Returns:
             Словарь с результатами добавления {email: success}
         """
-        results = {}
-        
         logger.info(f"Начинаем массовое добавление {len(members_data)} участников к календарю SPUTNIK")
         
+        desired = {}
         for member_data in members_data:
             email = member_data.get('email', '').strip()
-            role = member_data.get('role', default_role)
-            name = member_data.get('name', '')
-            department = member_data.get('department', '')
-            
             if not email:
                 logger.warning("Пропускаем участника без email")
                 continue
-            
-            # Добавляем участника
-            success = self.add_member(email, role, name, department)
-            results[email] = success
-            
-            # Небольшая пауза между запросами для избежания лимитов API
-            import time
-            time.sleep(0.5)
+            desired[email] = member_data.get('role') or default_role
+        
+        # Уже добавленные участники не меняются и считаются неуспешными, как в add_member
+        report = self.acl_sync.add_members(desired)
+        for email, error in report.failures.items():
+            logger.error(f"❌ Не удалось добавить участника {email} к календарю SPUTNIK: {error}")
+        results = {email: report.succeeded(email) for email in desired}
         
         successful_adds = sum(1 for success in results.values() if success)
-        logger.info(f"Массовое добавление завершено: {successful_adds}/{len(results)} успешно")
+        logger.info(f"Массовое добавление завершено: {successful_adds}/{len(results)} успешно "
+                    f"({report.batches} пакетов)")
         
         return results
     
+    def remove_members(self, emails: List[str]) -> Dict[str, bool]:
+        """
+        Массовое удаление участников календаря SPUTNIK
+        
+        Args:
+            emails: Email участников для удаления
+            
+        Returns:
+            Словарь с результатами удаления {email: success}
+        """
+        report = self.acl_sync.remove_members(emails)
+        for email, error in report.failures.items():
+            logger.error(f"❌ Не удалось удалить участника {email} из календаря SPUTNIK: {error}")
+        return {email: report.succeeded(email) for email in emails}
+    
+    def sync_members(self, desired: Dict[str, str], dry_run: bool = False,
+                     remove_extra: bool = True) -> AclSyncReport:
+        """
+        Приведение состава календаря SPUTNIK к желаемому
+        
+        Args:
+            desired: Email -> роль
+            dry_run: Только вычислить изменения
+            remove_extra: Удалять участников, которых нет в desired (кроме владельцев)
+            
+        Returns:
+            Отчет синхронизации
+        """
+        return self.acl_sync.sync(desired, dry_run=dry_run, remove_extra=remove_extra)
+    
     def get_member_statistics(self) -> Dict[str, int]:
         """
         Получение статистики участников календаря SPUTNIK
@@ -28,7 +28,8 @@ def create_user_with_welcome_email(
     send_welcome_email: bool = True
 ) -> str:
     """
-    Создаёт нового пользователя в домене и отправляет приветственное письмо.
+    Создаёт нового пользователя в домене и ставит приветственное письмо
+    в очередь отправки.
     
     Args:
         service: Сервис Google Directory API
@@ -56,34 +57,24 @@ def create_user_with_welcome_email(
     if "создан" not in creation_result.lower():
         return creation_result
     
-    # Если пользователь создан и нужно отправить письмо
+    # Письмо ставится в фоновую очередь: создание пользователя не ждет Gmail API
     if send_welcome_email:
         try:
-            # Создаем Gmail сервис
-            gmail_service = create_gmail_service(gmail_credentials)
+            from ..services.welcome_mail_queue import get_welcome_mail_queue
             
-            if not gmail_service:
-                logger.warning("⚠️ Не удалось инициализировать Gmail сервис")
-                return f"{creation_result}\n⚠️ Приветственное письмо не отправлено (ошибка Gmail API)"
-            
-            # Отправляем приветственное письмо
             full_name = f"{first_name} {last_name}".strip()
-            email_sent = gmail_service.send_welcome_email(
+            get_welcome_mail_queue(gmail_credentials).enqueue(
                 to_email=email,
                 user_name=full_name,
                 temporary_password=password,
                 admin_email=admin_email
             )
             
-            if email_sent:
-                logger.info(f"✅ Приветственное письмо отправлено: {email}")
-                return f"{creation_result}\n✅ Приветственное письмо отправлено на {email}"
-            else:
-                logger.warning(f"⚠️ Не удалось отправить приветственное письмо: {email}")
-                return f"{creation_result}\n⚠️ Приветственное письмо не отправлено (ошибка отправки)"
+            logger.info(f"✉️ Приветственное письмо поставлено в очередь: {email}")
+            return f"{creation_result}\n✉️ Приветственное письмо поставлено в очередь отправки на {email}"
                 
         except Exception as e:
-            logger.error(f"❌ Ошибка при отправке приветственного письма: {e}")
+            logger.error(f"❌ Ошибка постановки приветственного письма в очередь: {e}")
             return f"{creation_result}\n❌ Ошибка отправки приветственного письма: {e}"
     
     return creation_result
@@ -18,6 +18,8 @@ from .service_adapter import get_user_list as adapter_get_user_list
 from typing import Any, List, Dict, Optional, Tuple
 from googleapiclient.errors import HttpError
 from ..utils.data_cache import data_cache
+from ..utils.statistics_engine import statistics_engine
+from .directory_resolver import KIND_USER, directory_resolver, resolve_emails
 
 
 def user_exists(service: Any, email: str) -> Optional[bool]:
@@ -31,6 +33,11 @@ def user_exists(service: Any, email: str) -> Optional[bool]:
     Returns:
         True если пользователь найден, False если не найден, None при ошибке
     """
+    # Пользователь из кэша справочника существует без запроса к API
+    cached = directory_resolver.lookup_cached(email)
+    if cached is not None and cached.is_user:
+        return True
+    
     max_retries = 3
     retry_count = 0
     
@@ -116,6 +123,32 @@ def user_exists(service: Any, email: str) -> Optional[bool]:
     return None
 
 
+def users_exist(service: Any, emails: List[str]) -> Dict[str, Optional[bool]]:
+    """
+    Проверяет существование набора пользователей.
+    
+    Сначала используется кэш справочника, остальные адреса проверяются
+    пакетными запросами users().get.
+    
+    Args:
+        service: Сервис Google Directory API
+        emails: Email пользователей
+        
+    Returns:
+        Email в нижнем регистре -> True/False, None если проверить не удалось
+    """
+    result: Dict[str, Optional[bool]] = {}
+    for email, entry in resolve_emails(service, emails, kinds=(KIND_USER,)).items():
+        if entry.is_user:
+            result[email] = True
+        elif entry.exists is None:
+            result[email] = None
+        else:
+            # Нет в домене или это группа
+            result[email] = False
+    return result
+
+
 def create_user(service: Any, email: str, first_name: str, last_name: str, 
                 password: str, secondary_email: Optional[str] = None, 
                 phone: Optional[str] = None, org_unit_path: Optional[str] = None) -> str:
@@ -233,6 +266,8 @@ def create_user(service: Any, email: str, first_name: str, last_name: str,
         
         # Очищаем кэш пользователей для обновления
         data_cache.clear_cache()
+        directory_resolver.invalidate(email)
+        statistics_engine.user_upserted(user)
         
         org_display = org_unit_path or '/'
         return f"Пользователь создан: {user['primaryEmail']} в подразделении {org_display}"
@@ -259,6 +294,9 @@ def update_user(service: Any, email: str, fields: Dict[str, Any]) -> str:
         
         # Очищаем кэш для обновления данных
         data_cache.clear_cache()
+        if user.get('primaryEmail', '').lower() != email.lower():
+            statistics_engine.user_removed(email)
+        statistics_engine.user_upserted(user)
         
         return f"Данные пользователя {user['primaryEmail']} успешно обновлены."
     except Exception as e:
@@ -281,6 +319,8 @@ def delete_user(service: Any, email: str) -> str:
         
         # Очищаем кэш для обновления данных
         data_cache.clear_cache()
+        directory_resolver.invalidate(email)
+        statistics_engine.user_removed(email)
         
         return f'Пользователь {email} успешно удалён.'
     except Exception as e:
@@ -10,6 +10,7 @@ import logging
 from typing import List, Optional
 from pathlib import Path
 
+from ..core.di_container import container
 from ..integrations.freeipa_integration import FreeIPAIntegration, setup_freeipa_integration
 from ..services.user_service import UserService
 from ..services.group_service import GroupService
@@ -124,7 +125,12 @@ async def sync_user(email: str, groups: tuple, config: str):
 @click.option('--groups', '-g', multiple=True, help='Группы по умолчанию для всех пользователей')
 @click.option('--config', '-c', default='config/freeipa_config.json', help='Путь к файлу конфигурации')
 @click.option('--confirm', is_flag=True, help='Подтвердить синхронизацию без запроса')
-async def sync_all_users(domain: Optional[str], groups: tuple, config: str, confirm: bool):
+@click.option('--dry-run', is_flag=True, help='Только показать изменения')
+@click.option('--disable-missing', is_flag=True, help='Блокировать пользователей домена, которых нет в Google')
+@click.option('--incremental', is_flag=True,
+              help='Только пользователи, изменившиеся в Google с прошлой синхронизации')
+async def sync_all_users(domain: Optional[str], groups: tuple, config: str, confirm: bool,
+                         dry_run: bool, disable_missing: bool, incremental: bool):
     """Синхронизировать всех пользователей из Google Workspace в FreeIPA"""
     try:
         user_service = container.resolve(UserService)
@@ -136,39 +142,65 @@ async def sync_all_users(domain: Optional[str], groups: tuple, config: str, conf
             click.echo("❌ Не удалось загрузить конфигурацию", err=True)
             return
         
-        # Предварительная проверка
-        users = await user_service.list_users(domain=domain)
-        click.echo(f"📊 Найдено {len(users)} пользователей для синхронизации")
-        
-        if groups:
-            click.echo(f"📁 Группы по умолчанию: {', '.join(groups)}")
+        if disable_missing and not domain:
+            click.echo("❌ Для --disable-missing укажите --domain", err=True)
+            return
         
-        if not confirm:
-            if not click.confirm('Продолжить синхронизацию?'):
-                click.echo("Отменено")
-                return
+        groups_list = list(groups) if groups else []
+        if groups_list:
+            click.echo(f"📁 Группы по умолчанию: {', '.join(groups_list)}")
         
         async with integration:
-            groups_list = list(groups) if groups else []
-            results = await integration.sync_all_users_to_freeipa(domain, groups_list)
+            # Предварительный расчет изменений
+            await integration.sync_all_users_to_freeipa(domain, groups_list, dry_run=True,
+                                                        disable_missing=disable_missing,
+                                                        incremental=incremental)
+            plan = integration.last_sync_report
+            if plan is None or not plan.dry_run:
+                click.echo("❌ Не удалось вычислить изменения", err=True)
+                return
             
-            # Показываем результаты
-            success_count = sum(1 for result in results.values() if result)
-            total_count = len(results)
+            summary = plan.summary()
+            click.echo(f"📊 Создать: {summary['planned_creates']}, изменить: {summary['planned_updates']}, "
+                       f"заблокировать: {summary['planned_disables']}, "
+                       f"добавить в группы: {summary['planned_memberships']}, "
+                       f"без изменений: {summary['unchanged']}, пропущено: {summary['skipped']}")
+            if incremental:
+                click.echo(f"💾 Не изменились с прошлой синхронизации: {summary['cached']}")
+            
+            if dry_run or not plan.diff.changes:
+                return
+            
+            if not confirm:
+                if not click.confirm('Продолжить синхронизацию?'):
+                    click.echo("Отменено")
+                    return
+            
+            await integration.sync_all_users_to_freeipa(domain, groups_list, disable_missing=disable_missing,
+                                                        incremental=incremental)
+            report = integration.last_sync_report
+            if report is None or report.dry_run:
+                click.echo("❌ Синхронизация не выполнена, подробности в журнале", err=True)
+                return
+            summary = report.summary()
             
+            # Показываем результаты
             click.echo(f"\n📋 Результаты синхронизации:")
-            click.echo(f"  ✅ Успешно: {success_count}")
-            click.echo(f"  ❌ Ошибки: {total_count - success_count}")
-            click.echo(f"  📊 Всего: {total_count}")
+            click.echo(f"  ➕ Создано: {summary['created']}")
+            click.echo(f"  ✏️ Изменено: {summary['updated']}")
+            click.echo(f"  🔒 Заблокировано: {summary['disabled']}")
+            click.echo(f"  👥 Добавлено в группы: {summary['memberships_added']}")
+            click.echo(f"  ❌ Ошибки: {summary['failed']}")
+            click.echo(f"  ⏱️ {summary['timings'].get('total', 0)} с, RPC вызовов: {summary['rpc_calls']}")
             
             # Показываем неудачные синхронизации
-            failed_users = [email for email, result in results.items() if not result]
-            if failed_users:
-                click.echo(f"\n❌ Пользователи с ошибками:")
-                for email in failed_users[:10]:  # Показываем только первые 10
-                    click.echo(f"  • {email}")
-                if len(failed_users) > 10:
-                    click.echo(f"  ... и еще {len(failed_users) - 10}")
+            failures = list(report.failures.items())
+            if failures:
+                click.echo(f"\n❌ Ошибки синхронизации:")
+                for key, error in failures[:10]:  # Показываем только первые 10
+                    click.echo(f"  • {key}: {error}")
+                if len(failures) > 10:
+                    click.echo(f"  ... и еще {len(failures) - 10}")
                     
     except Exception as e:
         click.echo(f"❌ Ошибка массовой синхронизации: {e}", err=True)
@@ -208,7 +240,12 @@ async def create_group(name: str, description: Optional[str], config: str):
 @click.option('--domain', '-d', help='Домен для фильтрации групп')
 @click.option('--config', '-c', default='config/freeipa_config.json', help='Путь к файлу конфигурации')
 @click.option('--confirm', is_flag=True, help='Подтвердить синхронизацию без запроса')
-async def sync_groups(domain: Optional[str], config: str, confirm: bool):
+@click.option('--incremental', is_flag=True, help='Пропускать группы, не изменившиеся с прошлой синхронизации')
+@click.option('--members', is_flag=True, help='Добавить участников групп Google в группы FreeIPA')
+@click.option('--workers', '-w', type=int, default=None,
+              help='Одновременно обрабатываемых групп (по умолчанию из конфигурации)')
+async def sync_groups(domain: Optional[str], config: str, confirm: bool, incremental: bool,
+                      members: bool, workers: Optional[int]):
     """Синхронизировать группы из Google Workspace в FreeIPA"""
     try:
         user_service = container.resolve(UserService)
@@ -229,8 +266,14 @@ async def sync_groups(domain: Optional[str], config: str, confirm: bool):
                 click.echo("Отменено")
                 return
         
+        def on_progress(event):
+            if event.status != 'started':
+                mark = '✅' if event.status == 'done' and event.result not in (False, None) else '❌'
+                click.echo(f"  [{event.done}/{event.total}] {mark} {event.key} ({event.elapsed:.1f} с)")
+        
         async with integration:
-            results = await integration.sync_google_groups_to_freeipa(domain)
+            results = await integration.sync_google_groups_to_freeipa(
+                domain, incremental=incremental, max_workers=workers, progress_callback=on_progress)
             
             # Показываем результаты
             success_count = sum(1 for result in results.values() if result)
@@ -241,6 +284,15 @@ async def sync_groups(domain: Optional[str], config: str, confirm: bool):
             click.echo(f"  ❌ Ошибки: {total_count - success_count}")
             click.echo(f"  📊 Всего: {total_count}")
             
+            if members:
+                group_emails = [group.email for group in groups if group.email]
+                click.echo(f"\n👥 Синхронизация участников {len(group_emails)} групп...")
+                member_results = await integration.sync_google_groups_members_to_freeipa(
+                    group_emails, max_workers=workers, progress_callback=on_progress)
+                added = sum(1 for group in member_results.values() for ok in group.values() if ok)
+                total = sum(len(group) for group in member_results.values())
+                click.echo(f"  👥 Добавлено участников: {added}/{total}")
+            
     except Exception as e:
         click.echo(f"❌ Ошибка синхронизации групп: {e}", err=True)
 
@@ -312,6 +364,70 @@ async def compare_users(domain: Optional[str], config: str):
         click.echo(f"❌ Ошибка сравнения: {e}", err=True)
 
 
+@freeipa.command()
+@click.option('--group', '-g', 'groups', multiple=True,
+              help='Группа (адрес Google или имя FreeIPA); по умолчанию все группы')
+@click.option('--config', '-c', default='config/freeipa_config.json', help='Путь к файлу конфигурации')
+@click.option('--apply', 'apply_changes', is_flag=True, help='Применить изменения состава в FreeIPA')
+@click.option('--keep-extra', is_flag=True, help='Не удалять участников FreeIPA, которых нет в Google')
+@click.option('--create-missing', is_flag=True, help='Создавать группы, которых нет в FreeIPA')
+@click.option('--confirm', is_flag=True, help='Подтвердить изменения без запроса')
+async def compare_groups(groups: tuple, config: str, apply_changes: bool, keep_extra: bool,
+                         create_missing: bool, confirm: bool):
+    """Сравнить состав групп Google Workspace и FreeIPA"""
+    try:
+        user_service = container.resolve(UserService)
+        group_service = container.resolve(GroupService)
+        
+        integration = FreeIPAIntegration(user_service, group_service)
+        
+        if not integration.load_config(config):
+            click.echo("❌ Не удалось загрузить конфигурацию", err=True)
+            return
+        
+        async with integration:
+            comparison = await integration.compare_group_memberships(list(groups) or None,
+                                                                     remove_extra=not keep_extra)
+            if comparison is None:
+                click.echo("❌ Не удалось сравнить состав групп", err=True)
+                return
+            
+            summary = comparison.summary()
+            click.echo("📊 Сравнение групп:")
+            click.echo(f"  Google Workspace: {summary['google_groups']}, FreeIPA: {summary['freeipa_groups']}")
+            click.echo(f"  Только в Google: {summary['only_in_google']}, только в FreeIPA: {summary['only_in_freeipa']}")
+            click.echo(f"  Групп с различиями состава: {summary['groups_changed']}")
+            click.echo(f"  Добавить: {summary['planned_adds']}, удалить: {summary['planned_removes']}, "
+                       f"без изменений: {summary['unchanged']}, нет пользователя FreeIPA: {summary['unresolved']}")
+            
+            for diff in comparison.changed[:20]:
+                click.echo(f"  • {diff.cn}: +{len(diff.to_add)} / -{len(diff.to_remove)}"
+                           f"{'' if diff.exists else ' (нет в FreeIPA)'}")
+            if len(comparison.changed) > 20:
+                click.echo(f"  ... и еще {len(comparison.changed) - 20}")
+            
+            if not apply_changes or not comparison.changed:
+                return
+            
+            if not confirm:
+                if not click.confirm('Применить изменения состава групп?'):
+                    click.echo("Отменено")
+                    return
+            
+            result = await integration.sync_group_memberships(create_missing=create_missing,
+                                                              comparison=comparison)
+            if result is None:
+                click.echo("❌ Ошибка применения изменений", err=True)
+                return
+            click.echo(f"\n📋 Добавлено: {result.added}, удалено: {result.removed}, "
+                       f"создано групп: {len(result.created_groups)}, ошибок: {len(result.failures)}")
+            for key, error in list(result.failures.items())[:10]:
+                click.echo(f"  • {key}: {error}")
+                
+    except Exception as e:
+        click.echo(f"❌ Ошибка сравнения групп: {e}", err=True)
+
+
 # Регистрируем async команды
 def _run_async_command(func):
     """Wrapper для запуска async команд"""
@@ -323,7 +439,10 @@ def _run_async_command(func):
 stats.callback = _run_async_command(stats.callback)
 sync_user.callback = _run_async_command(sync_user.callback)
 sync_all_users.callback = _run_async_command(sync_all_users.callback)
+# freeipa sync [--incremental] - короткое имя синхронизации пользователей
+freeipa.add_command(sync_all_users, name='sync')
 create_group.callback = _run_async_command(create_group.callback)
 sync_groups.callback = _run_async_command(sync_groups.callback)
 add_user_to_group.callback = _run_async_command(add_user_to_group.callback)
 compare_users.callback = _run_async_command(compare_users.callback)
+compare_groups.callback = _run_async_command(compare_groups.callback)
@@ -115,6 +115,263 @@ async def members(email: str):
         click.echo(f"❌ Ошибка получения членов группы: {e}", err=True)
 
 
+@users.command()
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', '-w', default=4, show_default=True, help='Количество параллельных потоков')
+@click.option('--rate', '-r', default=5.0, show_default=True, help='Максимум запросов создания в секунду')
+@click.option('--checkpoint', '-c', default=None, help='Файл контрольной точки (по умолчанию рядом с входным)')
+@click.option('--report', '-o', default=None, help='Отчет по строкам (.csv или .json)')
+@click.option('--welcome/--no-welcome', default=False, help='Отправлять приветственные письма')
+@click.option('--dry-run', is_flag=True, help='Только проверить файл, не создавая пользователей')
+def provision(input_file: str, workers: int, rate: float, checkpoint: Optional[str],
+              report: Optional[str], welcome: bool, dry_run: bool):
+    """Массовое создание пользователей из CSV или JSONL
+
+    Колонки: email, first_name, last_name, password и необязательные
+    secondary_email, phone, org_unit_path. Повторный запуск с той же
+    контрольной точкой продолжает импорт с места остановки.
+    """
+    from ..auth import get_service
+    from ..services.bulk_provisioning import (
+        BulkUserProvisioner, ProvisioningCheckpoint, default_checkpoint_path,
+        make_welcome_sender, read_rows, resolve_allowed_domains, validate_rows
+    )
+    
+    try:
+        service = get_service()
+        rows, invalid = validate_rows(read_rows(input_file), resolve_allowed_domains(service))
+    except Exception as e:
+        click.echo(f"❌ Ошибка подготовки импорта: {e}", err=True)
+        return
+    
+    click.echo(f"📄 Строк к созданию: {len(rows)}, с ошибками: {len(invalid)}")
+    for result in invalid:
+        click.echo(f"  ⚠️ Строка {result.line} ({result.email or '-'}): {result.message}")
+    if dry_run or not rows:
+        return
+    
+    welcome_sender = None
+    if welcome:
+        from ..config.enhanced_config import config
+        credentials = getattr(getattr(service, '_http', None), 'credentials', None)
+        welcome_sender = make_welcome_sender(credentials, config.settings.google_workspace_admin)
+    
+    provisioner = BulkUserProvisioner(
+        service_factory=get_service,
+        max_workers=workers,
+        rate_per_second=rate,
+        checkpoint=ProvisioningCheckpoint(checkpoint or default_checkpoint_path(input_file)),
+        welcome_sender=welcome_sender
+    )
+    
+    def on_progress(result, done, total):
+        icon = {'created': '✅', 'exists': 'ℹ️'}.get(result.status, '❌')
+        click.echo(f"  {icon} [{done}/{total}] {result.email}: {result.message} ({result.duration_ms:.0f} мс)")
+    
+    try:
+        result = provisioner.run(rows, invalid, progress_callback=on_progress)
+    except KeyboardInterrupt:
+        provisioner.cancel()
+        click.echo("⏹️ Импорт прерван, повторный запуск продолжит с контрольной точки", err=True)
+        return
+    
+    summary = result.summary()
+    click.echo(f"📊 Создано: {summary['created']}, уже существовали: {summary['exists']}, "
+               f"ошибок: {summary['failed']}, некорректных строк: {summary['invalid']}, "
+               f"пропущено по контрольной точке: {summary['skipped']}")
+    click.echo(f"⏱️ {summary['elapsed_seconds']} с, {summary['rows_per_second']} строк/с")
+    if report:
+        result.save(report)
+        click.echo(f"💾 Отчет сохранен: {report}")
+    
+    if welcome:
+        from ..services.welcome_mail_queue import get_welcome_mail_queue
+        mail_queue = get_welcome_mail_queue(credentials)
+        click.echo(f"✉️ Отправка приветственных писем: в очереди {mail_queue.pending}")
+        try:
+            mail_queue.wait()
+        except KeyboardInterrupt:
+            click.echo("⏹️ Отправка прервана, оставшиеся письма сохранены и будут отправлены при следующем запуске с --welcome", err=True)
+            return
+        click.echo(f"✉️ Писем отправлено: {mail_queue.stats['sent']}, ошибок: {mail_queue.stats['failed']}")
+        if mail_queue.deferred:
+            click.echo(f"⏳ Дневной лимит Gmail исчерпан, отложено писем: {mail_queue.deferred}; "
+                       f"они будут отправлены при следующем запуске с --welcome", err=True)
+
+
+@users.command()
+@click.argument('emails', nargs=-1)
+@click.option('--from-file', '-f', 'emails_file', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='Файл со списком email (по одному в строке)')
+@click.option('--calendar/--no-calendar', default=True, show_default=True, help='Удалить из календаря SPUTNIK')
+@click.option('--doc', 'doc_urls', multiple=True, help='URL документа, доступ к которому нужно отозвать')
+@click.option('--keep-active', is_flag=True, help='Не блокировать учетные записи')
+@click.option('--dry-run', is_flag=True, help='Только показать найденные доступы')
+@click.option('--report', '-o', default=None, help='Отчет по пользователям (.csv или .json)')
+async def offboard(emails, emails_file: Optional[str], calendar: bool, doc_urls, keep_active: bool,
+                   dry_run: bool, report: Optional[str]):
+    """Отключить уходящих сотрудников
+
+    Блокирует учетные записи, удаляет пользователей из всех групп, из
+    календаря SPUTNIK и из указанных документов. Все изменения выполняются
+    пакетными запросами одновременно; в аудит пишется запись на пользователя.
+    """
+    targets = [e.strip() for e in emails if e.strip()]
+    if emails_file:
+        with open(emails_file, encoding='utf-8-sig') as f:
+            targets.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not targets:
+        click.echo("❌ Укажите email пользователей или файл --from-file", err=True)
+        return
+    
+    try:
+        calendar_sync = None
+        if calendar:
+            from ..api.sputnik_calendar import create_sputnik_calendar_manager
+            manager = create_sputnik_calendar_manager()
+            if manager:
+                calendar_sync = manager.acl_sync
+            else:
+                click.echo("⚠️ Календарь SPUTNIK недоступен, доступ к нему не отзывается", err=True)
+        
+        drive_service, file_ids = None, []
+        if doc_urls:
+            from ..auth import get_service
+            from ..api.drive_api import DriveAPI
+            credentials = getattr(getattr(get_service(), '_http', None), 'credentials', None)
+            drive_api = DriveAPI(credentials)
+            drive_service = drive_api.service
+            file_ids = [fid for fid in (drive_api.extract_file_id_from_url(url) for url in doc_urls) if fid]
+        
+        user_service = container.resolve(UserService)
+        result = await user_service.offboard_users(
+            targets, offboarded_by="cli", calendar_sync=calendar_sync,
+            drive_service=drive_service, file_ids=file_ids,
+            dry_run=dry_run, suspend=not keep_active
+        )
+    except Exception as e:
+        click.echo(f"❌ Ошибка отключения пользователей: {e}", err=True)
+        return
+    
+    for user in result.users.values():
+        icon = '✅' if user.completed else '⚠️'
+        calendar_state = user.calendar_role or '-'
+        click.echo(f"{icon} {user.email}: групп {len(user.groups)}, календарь {calendar_state}, "
+                   f"документов {len(user.files)}")
+        if not dry_run:
+            timings = ', '.join(f"{step} {seconds:.2f} с" for step, seconds in user.timings.items())
+            click.echo(f"    ⏱️ {timings or '-'}")
+        for step, error in user.errors.items():
+            click.echo(f"    ❌ {step}: {error}", err=True)
+    
+    summary = result.summary()
+    mode = 'план (dry-run)' if dry_run else 'применено'
+    click.echo(f"📊 {mode}: пользователей {summary['users']}, заблокировано {summary['suspended']}, "
+               f"удалений из групп {summary['groups_removed']}, из календаря {summary['calendar_revoked']}, "
+               f"из документов {summary['files_revoked']}, с ошибками {summary['failed']}")
+    click.echo(f"⏱️ {summary['elapsed_seconds']} с, batch запросов: {summary['batches']}")
+    if report:
+        result.save(report)
+        click.echo(f"💾 Отчет сохранен: {report}")
+
+
+@groups.command()
+@click.argument('desired_file', required=False, type=click.Path(exists=True, dir_okay=False))
+@click.option('--ou', 'org_unit', default=None, help='Правило: все активные сотрудники подразделения')
+@click.option('--group', 'group_email', default=None, help='Группа для правила --ou')
+@click.option('--dry-run', is_flag=True, help='Только показать изменения')
+@click.option('--keep-extra', is_flag=True, help='Не удалять участников, которых нет в желаемом составе')
+@click.option('--batch-size', default=50, show_default=True, help='Запросов в одном batch')
+@click.option('--report', '-o', default=None, help='Сохранить отчет в JSON')
+def reconcile(desired_file: Optional[str], org_unit: Optional[str], group_email: Optional[str],
+              dry_run: bool, keep_extra: bool, batch_size: int, report: Optional[str]):
+    """Привести состав групп к желаемому
+
+    Желаемый состав задается файлом (CSV group_email,member_email или JSON
+    {"группа": ["участник", ...]}) и/или правилом --ou PATH --group EMAIL.
+    """
+    import json
+    from ..auth import get_service
+    from ..utils.data_cache import data_cache
+    from ..services.group_reconcile import (
+        MembershipReconciler, desired_from_org_unit, load_desired_membership
+    )
+    
+    if not desired_file and not (org_unit and group_email):
+        click.echo("❌ Укажите файл состава или правило --ou и --group", err=True)
+        return
+    
+    try:
+        service = get_service()
+        desired = load_desired_membership(desired_file) if desired_file else {}
+        if org_unit and group_email:
+            desired[group_email.lower()] = desired_from_org_unit(data_cache.get_users(service), org_unit)
+        
+        reconciler = MembershipReconciler(service, batch_size=batch_size)
+        result = reconciler.reconcile(desired, dry_run=dry_run, remove_extra=not keep_extra)
+    except Exception as e:
+        click.echo(f"❌ Ошибка синхронизации состава групп: {e}", err=True)
+        return
+    
+    for diff in result.diffs:
+        if not diff.changes:
+            continue
+        click.echo(f"👥 {diff.group_email}: +{len(diff.to_add)} / -{len(diff.to_remove)}")
+        for email in sorted(diff.to_add):
+            click.echo(f"    ➕ {email}")
+        for email in sorted(diff.to_remove):
+            click.echo(f"    ➖ {email}")
+        if diff.protected:
+            click.echo(f"    🔒 не удаляются (владельцы/менеджеры): {', '.join(sorted(diff.protected))}")
+    for key, error in result.failures.items():
+        click.echo(f"  ❌ {key}: {error}", err=True)
+    
+    summary = result.summary()
+    mode = 'план (dry-run)' if dry_run else 'применено'
+    click.echo(f"📊 {mode}: групп {summary['groups']}, изменено {summary['groups_changed']}, "
+               f"добавлений {summary['planned_adds']}, удалений {summary['planned_removes']}, "
+               f"ошибок {summary['failed']}")
+    timings = ', '.join(f"{name} {seconds:.2f} с" for name, seconds in summary['timings'].items())
+    click.echo(f"⏱️ {timings}; batch запросов: {summary['batches']}, из кэша: {summary['cache_hits']}")
+    if report:
+        payload = {
+            'summary': summary,
+            'groups': [{'group': d.group_email, 'add': sorted(d.to_add), 'remove': sorted(d.to_remove),
+                        'protected': sorted(d.protected), 'unchanged': d.unchanged} for d in result.diffs],
+            'failures': result.failures,
+        }
+        with open(report, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        click.echo(f"💾 Отчет сохранен: {report}")
+
+
+@groups.command('timing-report')
+@click.option('--operation', default=None, type=click.Choice(['add_member', 'remove_member']),
+              help='Тип операции (по умолчанию все)')
+@click.option('--group', 'group_email', default=None, help='Группа (по умолчанию все)')
+@click.option('--bucket', default='day', show_default=True, type=click.Choice(['hour', 'day', 'week']),
+              help='Период агрегации')
+@click.option('--periods', default=14, show_default=True, help='Сколько последних периодов показать')
+def timing_report(operation: Optional[str], group_email: Optional[str], bucket: str, periods: int):
+    """Перцентили задержек API и времени распространения изменений в группах"""
+    from ..utils.timing_store import get_timing_store
+
+    store = get_timing_store()
+    statistics = store.get_statistics(by_group=bool(group_email))
+    titles = {'api': 'Задержка API', 'propagation': 'Распространение изменений'}
+    for kind, operations in statistics.items():
+        click.echo(f"⏱️ {titles.get(kind, kind)}, сек")
+        for name, stats in sorted(operations.items()):
+            if group_email and not name.endswith(f" {group_email.lower()}"):
+                continue
+            if operation and not name.startswith(operation):
+                continue
+            click.echo(f"    {name:<40} n={stats['count']:<6} p50 {stats['p50']:.2f}  "
+                       f"p90 {stats['p90']:.2f}  p99 {stats['p99']:.2f}")
+    click.echo("")
+    click.echo(store.trend_report(operation, group_email, bucket, periods))
+
+
 # Регистрируем группу команд FreeIPA (упрощенная версия)
 try:
     from .freeipa_simple import freeipa
@@ -134,6 +391,7 @@ def _run_async_command(func):
 # Применяем wrapper к async командам
 users.commands['list'].callback = _run_async_command(users.commands['list'].callback)
 users.commands['show'].callback = _run_async_command(users.commands['show'].callback)
+users.commands['offboard'].callback = _run_async_command(users.commands['offboard'].callback)
 groups.commands['list'].callback = _run_async_command(groups.commands['list'].callback)
 groups.commands['members'].callback = _run_async_command(groups.commands['members'].callback)
 
@@ -16,6 +16,11 @@ class MainWindowConfig:
     STATISTICS_LOAD_DELAY = 2000
     RETRY_DELAY = 500
     
+    # Мониторинг цикла событий (в миллисекундах)
+    UI_HEARTBEAT_INTERVAL = 100
+    UI_STALL_THRESHOLD = 250
+    UI_LATENCY_REFRESH = 1000
+    
     # UI элементы
     HEADER_HEIGHT = 60
     TOOLBAR_HEIGHT = 80
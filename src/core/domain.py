@@ -212,3 +212,29 @@ class AuditLog:
             'ip_address': self.ip_address,
             'user_agent': self.user_agent
         }
+
+
+@dataclass
+class AuditQuery:
+    """Фильтры выборки записей аудита"""
+    user: Optional[str] = None
+    action: Optional[str] = None
+    resource: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    # Полнотекстовый поиск по ресурсу и деталям
+    text: Optional[str] = None
+    page_size: int = 200
+
+
+@dataclass
+class AuditPage:
+    """Страница записей аудита (новые первыми)"""
+    entries: List[Dict[str, Any]] = field(default_factory=list)
+    # Курсор следующей страницы; None - записей больше нет
+    next_cursor: Optional[str] = None
+    
+    @property
+    def has_more(self) -> bool:
+        """Есть ли следующая страница"""
+        return self.next_cursor is not None
@@ -5,15 +5,28 @@
 """
 
 import asyncio
+import functools
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from pathlib import Path
 
 from ..services.freeipa_client import FreeIPAService, FreeIPAConfig, FreeIPAUser, FreeIPAGroup
+from ..services.freeipa_sync import FreeIPASyncEngine, FreeIPASyncReport
+from ..services.freeipa_group_membership import GroupMembershipComparator, MembershipComparison, group_cn
+from ..services.freeipa_parallel import (
+    DEFAULT_RPC_RATE, DEFAULT_WORKERS, ParallelSyncExecutor, RateLimitedFreeIPA, SyncProgressEvent,
+    get_server_limiter
+)
+from ..services.freeipa_sync import ALREADY_APPLIED_CODES, ALREADY_APPLIED_ERRORS, MEMBERS_PER_CALL
+from ..services.freeipa_sync_state import (
+    KIND_GROUP, FreeIPASyncStateStore, content_hash, get_sync_state_store, server_id
+)
 from ..services.user_service import UserService
 from ..services.group_service import GroupService
 from ..core.domain import User, Group
 from ..utils.exceptions import AdminToolsError
+from ..api.directory_resolver import KIND_USER, resolve_emails
+from ..utils.data_cache import data_cache
 
 
 logger = logging.getLogger(__name__)
@@ -28,6 +41,36 @@ class FreeIPAIntegration:
         self.freeipa_service: Optional[FreeIPAService] = None
         self.config: Optional[FreeIPAConfig] = None
         self._connected = False
+        self.last_sync_report: Optional[FreeIPASyncReport] = None
+        self.last_membership_comparison: Optional[MembershipComparison] = None
+        # Состояние инкрементальной синхронизации (None - общее хранилище сервера из конфигурации)
+        self.sync_state: Optional[FreeIPASyncStateStore] = None
+    
+    def _sync_state(self) -> FreeIPASyncStateStore:
+        if self.sync_state is None:
+            server = server_id(self.config.server_url, self.config.domain) if self.config else 'freeipa'
+            return get_sync_state_store(server)
+        return self.sync_state
+    
+    def _rate_limited_service(self) -> RateLimitedFreeIPA:
+        """Сервис FreeIPA с общим для сервера ограничением частоты RPC"""
+        server = self.config.server_url if self.config else 'freeipa'
+        rate = self.config.rpc_rate_limit if self.config else DEFAULT_RPC_RATE
+        return RateLimitedFreeIPA(self.freeipa_service, get_server_limiter(server, rate))
+    
+    def _parallel_executor(self, max_workers: Optional[int] = None,
+                           progress_callback: Optional[Callable[[SyncProgressEvent], None]] = None
+                           ) -> ParallelSyncExecutor:
+        if max_workers is None:
+            max_workers = self.config.sync_workers if self.config else DEFAULT_WORKERS
+        return ParallelSyncExecutor(max_workers, progress_callback)
+    
+    def _google_service(self):
+        """Сервис Google Directory API из репозитория пользователей"""
+        google_service = getattr(getattr(self.user_service.user_repo, 'client', None), 'service', None)
+        if google_service is None or isinstance(google_service, str):
+            return None
+        return google_service
     
     @property
     def freeipa_client(self):
@@ -103,78 +146,123 @@ class FreeIPAIntegration:
     
     async def sync_user_to_freeipa(self, user_email: str, groups: List[str] = None) -> bool:
         """Синхронизация пользователя из Google Workspace в FreeIPA"""
+        results = await self.sync_users_to_freeipa([user_email], groups)
+        return results.get(user_email.strip().lower(), False)
+    
+    async def sync_users_to_freeipa(self, user_emails: List[str], groups: List[str] = None) -> Dict[str, bool]:
+        """
+        Синхронизация набора пользователей из Google Workspace в FreeIPA
+        
+        Профили определяются одним массовым запросом (кэш справочника,
+        затем пакетные users().get), а не запросом на каждого пользователя.
+        
+        Returns:
+            Email в нижнем регистре -> результат синхронизации
+        """
         if not self._connected:
             logger.error("Нет подключения к FreeIPA")
-            return False
+            return {}
         
         if groups is None:
             groups = []
         
-        try:
-            # Получаем пользователя из Google Workspace
-            google_user = await self.user_service.get_user(user_email)
-            if not google_user:
-                logger.error(f"Пользователь {user_email} не найден в Google Workspace")
-                return False
-            
-            # Синхронизируем в FreeIPA
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None, 
-                self.freeipa_service.sync_user_from_google,
-                google_user.__dict__,
-                groups
-            )
+        google_service = self._google_service()
+        if google_service is None:
+            logger.error("Google API недоступен, профили пользователей получить невозможно")
+            return {email.strip().lower(): False for email in user_emails}
+        
+        loop = asyncio.get_event_loop()
+        resolved = await loop.run_in_executor(
+            None, resolve_emails, google_service, user_emails, (KIND_USER,)
+        )
+        
+        results: Dict[str, bool] = {}
+        for email, entry in resolved.items():
+            if not entry.is_user:
+                logger.error(f"Пользователь {email} не найден в Google Workspace"
+                             f"{f': {entry.error}' if entry.error else ''}")
+                results[email] = False
+                continue
+            try:
+                result = await loop.run_in_executor(
+                    None,
+                    self.freeipa_service.sync_user_from_google,
+                    entry.profile,
+                    groups
+                )
+            except Exception as e:
+                logger.error(f"Ошибка синхронизации пользователя {email}: {e}")
+                result = False
             
             if result:
-                logger.info(f"✅ Пользователь {user_email} синхронизирован в FreeIPA")
+                logger.info(f"✅ Пользователь {email} синхронизирован в FreeIPA")
             else:
-                logger.error(f"❌ Ошибка синхронизации пользователя {user_email}")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Ошибка синхронизации пользователя {user_email}: {e}")
-            return False
+                logger.error(f"❌ Ошибка синхронизации пользователя {email}")
+            results[email] = result
+        
+        return results
     
-    async def sync_all_users_to_freeipa(self, domain: str = None, default_groups: List[str] = None) -> Dict[str, bool]:
-        """Синхронизация всех пользователей домена в FreeIPA"""
+    async def sync_all_users_to_freeipa(self, domain: str = None, default_groups: List[str] = None,
+                                        dry_run: bool = False, disable_missing: bool = False,
+                                        incremental: bool = False) -> Dict[str, bool]:
+        """
+        Синхронизация всех пользователей домена в FreeIPA
+        
+        Обе стороны загружаются целиком, применяется только разница
+        (создание, изменение, блокировка, членство в группах по умолчанию)
+        командой batch. Подробный отчет сохраняется в last_sync_report
+        (None, если синхронизация не выполнена).
+        
+        Args:
+            domain: Домен пользователей Google
+            default_groups: Группы FreeIPA для всех активных пользователей
+            dry_run: Только вычислить изменения
+            disable_missing: Блокировать пользователей FreeIPA домена, которых нет в Google
+            incremental: Обработать только пользователей, изменившихся в Google
+                с прошлой синхронизации (по сохраненным хешам)
+        """
+        # Отчет прошлого запуска не должен выдаваться за результат этого
+        self.last_sync_report = None
         if not self._connected:
             logger.error("Нет подключения к FreeIPA")
             return {}
         
-        if default_groups is None:
-            default_groups = []
-        
-        results = {}
+        google_service = self._google_service()
+        if google_service is None:
+            logger.error("Google API недоступен, синхронизация невозможна")
+            return {}
         
         try:
-            # Получаем всех пользователей из Google Workspace
-            users = await self.user_service.list_users(domain=domain)
-            
-            logger.info(f"Найдено {len(users)} пользователей для синхронизации")
-            
-            for user in users:
-                try:
-                    result = await self.sync_user_to_freeipa(user.email, default_groups)
-                    results[user.email] = result
-                    
-                    # Небольшая пауза между запросами
-                    await asyncio.sleep(0.1)
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка синхронизации пользователя {user.email}: {e}")
-                    results[user.email] = False
-            
-            # Статистика
-            success_count = sum(1 for result in results.values() if result)
-            logger.info(f"Синхронизировано: {success_count}/{len(results)} пользователей")
-            
-            return results
+            loop = asyncio.get_event_loop()
+            google_users = await loop.run_in_executor(None, data_cache.get_users, google_service)
+            if domain:
+                suffix = f"@{domain.lower()}"
+                google_users = [u for u in google_users if u.get('primaryEmail', '').lower().endswith(suffix)]
+            logger.info(f"Найдено {len(google_users)} пользователей для синхронизации")
+            
+            engine = FreeIPASyncEngine(self.freeipa_service)
+            state = self._sync_state()
+            if incremental:
+                report = await loop.run_in_executor(
+                    None, engine.sync_incremental, google_users, state, default_groups or [], dry_run, True,
+                    domain if disable_missing else None
+                )
+            else:
+                report = await loop.run_in_executor(
+                    None, engine.sync, google_users, default_groups or [], dry_run, True,
+                    domain if disable_missing else None, state
+                )
+            self.last_sync_report = report
+            
+            summary = report.summary()
+            logger.info(f"Синхронизация FreeIPA: создано {summary['created']}, изменено {summary['updated']}, "
+                        f"заблокировано {summary['disabled']}, без изменений {summary['unchanged'] + summary['cached']}, "
+                        f"ошибок {summary['failed']}, RPC вызовов {summary['rpc_calls']}")
+            return report.user_results()
             
         except Exception as e:
             logger.error(f"Ошибка массовой синхронизации пользователей: {e}")
-            return results
+            return {}
     
     # === Управление группами ===
     
@@ -208,8 +296,42 @@ class FreeIPAIntegration:
             logger.error(f"Ошибка создания группы {group_name}: {e}")
             return False
     
-    async def sync_google_groups_to_freeipa(self, domain: str = None) -> Dict[str, bool]:
-        """Синхронизация групп из Google Workspace в FreeIPA"""
+    @staticmethod
+    def _apply_group(freeipa, cn: str, description: str) -> bool:
+        """
+        Создает группу или обновляет описание существующей
+
+        group_add и group_mod уходят одним batch запросом: для существующей
+        группы group_add возвращает DuplicateEntry, для новой или не
+        изменившейся group_mod - EmptyModlist; обе ошибки означают, что
+        группа уже в нужном состоянии.
+        """
+        outcomes = freeipa.batch([('group_add', [cn], {'description': description}),
+                                  ('group_mod', [cn], {'description': description})], chunk_size=2)
+        for outcome in outcomes:
+            if outcome.get('error') and not (outcome.get('error_name') in ALREADY_APPLIED_ERRORS
+                                             or outcome.get('error_code') in ALREADY_APPLIED_CODES):
+                raise AdminToolsError(f"Группа {cn}: {outcome['error']}")
+        return True
+
+    async def sync_google_groups_to_freeipa(self, domain: str = None, incremental: bool = False,
+                                            max_workers: Optional[int] = None,
+                                            progress_callback: Optional[Callable[[SyncProgressEvent], None]] = None
+                                            ) -> Dict[str, bool]:
+        """
+        Синхронизация групп из Google Workspace в FreeIPA
+        
+        Группы создаются параллельно (см. ParallelSyncExecutor) с общим для
+        сервера ограничением частоты RPC; у существующих групп обновляется
+        описание.
+        
+        Args:
+            domain: Домен групп Google
+            incremental: Пропускать группы, не изменившиеся с прошлой
+                успешной синхронизации (по сохраненным хешам)
+            max_workers: Одновременно создаваемых групп (по умолчанию из конфигурации)
+            progress_callback: Получает SyncProgressEvent по каждой группе
+        """
         if not self._connected:
             logger.error("Нет подключения к FreeIPA")
             return {}
@@ -222,23 +344,33 @@ class FreeIPAIntegration:
             
             logger.info(f"Найдено {len(google_groups)} групп для синхронизации")
             
+            state = self._sync_state()
+            stored = state.hashes(KIND_GROUP) if incremental else {}
+            freeipa = self._rate_limited_service()
+            digests = {}
+            tasks = []
             for group in google_groups:
-                try:
-                    result = await self.create_freeipa_group(
-                        group.name,
-                        group.description
-                    )
-                    results[group.name] = result
-                    
-                    await asyncio.sleep(0.1)
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка синхронизации группы {group.name}: {e}")
-                    results[group.name] = False
+                digest = content_hash({'name': group.name, 'description': group.description})
+                if stored.get(group.name) == digest or group.name in digests:
+                    continue
+                digests[group.name] = digest
+                description = group.description or f"Группа {group.name}"
+                tasks.append((group.name, functools.partial(self._apply_group, freeipa, group.name, description)))
+            
+            outcomes = await self._parallel_executor(max_workers, progress_callback).run(tasks)
+            synced = {}
+            for name, outcome in outcomes.items():
+                if isinstance(outcome, Exception):
+                    logger.error(f"Ошибка синхронизации группы {name}: {outcome}")
+                result = outcome is True
+                results[name] = result
+                synced[name] = (digests[name], 'synced') if result else (None, 'failed')
+            state.record(KIND_GROUP, synced)
             
             # Статистика
             success_count = sum(1 for result in results.values() if result)
-            logger.info(f"Синхронизировано: {success_count}/{len(results)} групп")
+            logger.info(f"Синхронизировано: {success_count}/{len(results)} групп, "
+                        f"без изменений {len(google_groups) - len(tasks)}")
             
             return results
             
@@ -279,39 +411,146 @@ class FreeIPAIntegration:
     
     async def sync_google_group_members_to_freeipa(self, group_email: str) -> Dict[str, bool]:
         """Синхронизация членов группы Google в FreeIPA"""
+        results = await self.sync_google_groups_members_to_freeipa([group_email])
+        return results.get(group_email, {})
+    
+    async def sync_google_groups_members_to_freeipa(
+            self, group_emails: List[str], max_workers: Optional[int] = None,
+            progress_callback: Optional[Callable[[SyncProgressEvent], None]] = None
+    ) -> Dict[str, Dict[str, bool]]:
+        """
+        Параллельное добавление участников групп Google в группы FreeIPA
+        
+        Участники групп загружаются из Google одновременно, затем группы
+        обрабатываются параллельно: один вызов group_add_member на группу
+        (порциями по MEMBERS_PER_CALL) с общим для сервера ограничением частоты RPC.
+        
+        Args:
+            group_emails: Адреса групп Google (группа FreeIPA - часть адреса до @)
+            max_workers: Одновременно обрабатываемых групп (по умолчанию из конфигурации)
+            progress_callback: Получает SyncProgressEvent по каждой группе
+        
+        Returns:
+            Адрес группы -> {адрес участника: добавлен ли}
+        """
         if not self._connected:
             logger.error("Нет подключения к FreeIPA")
             return {}
         
-        results = {}
+        executor = self._parallel_executor(max_workers, progress_callback)
+        semaphore = asyncio.Semaphore(executor.max_workers)
+        
+        async def load_members(group_email: str):
+            async with semaphore:
+                return await self.group_service.get_group_members(group_email)
+        
+        loaded = await asyncio.gather(*(load_members(email) for email in group_emails), return_exceptions=True)
+        freeipa = self._rate_limited_service()
+        results: Dict[str, Dict[str, bool]] = {}
+        tasks = []
+        for group_email, members in zip(group_emails, loaded):
+            if isinstance(members, Exception):
+                logger.error(f"Ошибка получения членов группы {group_email}: {members}")
+                results[group_email] = {}
+                continue
+            emails = [member.email for member in members if getattr(member, 'email', None)]
+            logger.info(f"Синхронизация {len(emails)} членов группы {group_email}")
+            tasks.append((group_email, functools.partial(self._add_group_members, freeipa,
+                                                         group_cn(group_email), emails)))
+        
+        outcomes = await executor.run(tasks)
+        for group_email, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
+                logger.error(f"Ошибка синхронизации членов группы {group_email}: {outcome}")
+                outcome = {}
+            results[group_email] = outcome
+        
+        # Статистика
+        added = sum(1 for members in results.values() for result in members.values() if result)
+        total = sum(len(members) for members in results.values())
+        logger.info(f"Добавлено в группы: {added}/{total} пользователей, групп {len(results)}")
+        return results
+    
+    @staticmethod
+    def _add_group_members(freeipa, cn: str, emails: List[str]) -> Dict[str, bool]:
+        """Добавляет пользователей в группу FreeIPA (выполняется в рабочем потоке)"""
+        emails_by_uid: Dict[str, List[str]] = {}
+        for email in emails:
+            emails_by_uid.setdefault(email.split('@')[0].lower(), []).append(email)
+        results = {email: True for email in emails}
+        uids = sorted(emails_by_uid)
+        for start in range(0, len(uids), MEMBERS_PER_CALL):
+            chunk = uids[start:start + MEMBERS_PER_CALL]
+            try:
+                outcome = freeipa.call('group_add_member', [cn], {'user': chunk})
+            except Exception as e:
+                logger.error(f"Ошибка добавления участников в группу {cn}: {e}")
+                failed = [[uid, str(e)] for uid in chunk]
+            else:
+                failed = ((outcome.get('failed') or {}).get('member') or {}).get('user') or []
+            for entry in failed:
+                uid, reason = (entry[0], entry[1]) if isinstance(entry, (list, tuple)) else (entry, '')
+                # Уже состоит в группе - нужное состояние
+                if 'already a member' in str(reason):
+                    continue
+                for email in emails_by_uid.get(str(uid).lower(), []):
+                    results[email] = False
+        return results
+    
+    async def compare_group_memberships(self, groups: Optional[List[str]] = None,
+                                        remove_extra: bool = True) -> Optional[MembershipComparison]:
+        """
+        Сравнение состава групп Google и FreeIPA (см. GroupMembershipComparator)
+        
+        Args:
+            groups: Адреса групп Google или имена групп FreeIPA (по умолчанию все группы Google)
+            remove_extra: Планировать удаление участников FreeIPA, которых нет в группе Google
+        
+        Returns:
+            Разница по группам или None при ошибке
+        """
+        if not self._connected:
+            logger.error("Нет подключения к FreeIPA")
+            return None
         
         try:
-            # Получаем членов группы из Google Workspace
-            members = await self.group_service.get_group_members(group_email)
-            group_name = group_email.split('@')[0]  # Используем часть до @ как имя группы
-            
-            logger.info(f"Синхронизация {len(members)} членов группы {group_email}")
-            
-            for member in members:
-                try:
-                    result = await self.add_user_to_freeipa_group(member.email, group_name)
-                    results[member.email] = result
-                    
-                    await asyncio.sleep(0.1)
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка добавления {member.email} в группу {group_name}: {e}")
-                    results[member.email] = False
-            
-            # Статистика
-            success_count = sum(1 for result in results.values() if result)
-            logger.info(f"Добавлено в группу: {success_count}/{len(results)} пользователей")
-            
-            return results
-            
+            comparator = GroupMembershipComparator(self.freeipa_service, self._google_service())
+            loop = asyncio.get_event_loop()
+            comparison = await loop.run_in_executor(None, comparator.run, groups, remove_extra)
+            self.last_membership_comparison = comparison
+            return comparison
         except Exception as e:
-            logger.error(f"Ошибка синхронизации членов группы {group_email}: {e}")
-            return results
+            logger.error(f"Ошибка сравнения состава групп: {e}")
+            return None
+    
+    async def sync_group_memberships(self, groups: Optional[List[str]] = None, remove_extra: bool = True,
+                                     create_missing: bool = False,
+                                     comparison: Optional[MembershipComparison] = None
+                                     ) -> Optional[MembershipComparison]:
+        """
+        Выравнивание состава групп FreeIPA по группам Google
+        
+        Args:
+            groups: Адреса групп Google или имена групп FreeIPA (по умолчанию все группы Google)
+            remove_extra: Удалять участников FreeIPA, которых нет в группе Google
+            create_missing: Создавать группы, которых нет в FreeIPA
+            comparison: Готовое сравнение (например, показанное пользователю);
+                по умолчанию выполняется новое
+        """
+        if comparison is None:
+            comparison = await self.compare_group_memberships(groups, remove_extra)
+            if comparison is None:
+                return None
+        
+        try:
+            comparator = GroupMembershipComparator(self.freeipa_service, self._google_service())
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, comparator.apply, comparison, create_missing)
+            self.last_membership_comparison = comparison
+            return comparison
+        except Exception as e:
+            logger.error(f"Ошибка синхронизации состава групп: {e}")
+            return None
     
     # === Отчеты и статистика ===
     
@@ -323,9 +562,9 @@ class FreeIPAIntegration:
         try:
             loop = asyncio.get_event_loop()
             
-            # Получаем статистику параллельно
-            users_task = loop.run_in_executor(None, self.freeipa_service.list_users, None, 1000)
-            groups_task = loop.run_in_executor(None, self.freeipa_service.list_groups, None, 1000)
+            # Считаем только ключи (pkey_only), без загрузки записей
+            users_task = loop.run_in_executor(None, self.freeipa_service.list_user_uids)
+            groups_task = loop.run_in_executor(None, self.freeipa_service.list_group_cns)
             
             users, groups = await asyncio.gather(users_task, groups_task)
             
@@ -347,17 +586,32 @@ class FreeIPAIntegration:
             return {"error": "Нет подключения к FreeIPA"}
         
         try:
-            # Получаем пользователей из обеих систем
-            loop = asyncio.get_event_loop()
-            
-            google_users_task = self.user_service.list_users(domain=domain)
-            freeipa_users_task = loop.run_in_executor(None, self.freeipa_service.list_users, None, 1000)
+            google_service = self._google_service()
+            if google_service is None:
+                return {"error": "Google API недоступен"}
             
-            google_users, freeipa_users = await asyncio.gather(google_users_task, freeipa_users_task)
+            loop = asyncio.get_event_loop()
             
-            # Создаем множества email адресов
-            google_emails = {user.email for user in google_users}
-            freeipa_emails = {user.get('mail', [''])[0] for user in freeipa_users if user.get('mail')}
+            def load_google_emails():
+                suffix = f"@{domain.lower()}" if domain else ''
+                return {user.get('primaryEmail', '').lower() for user in data_cache.get_users(google_service)
+                        if user.get('primaryEmail', '').lower().endswith(suffix)}
+            
+            def load_freeipa_emails():
+                # Полное перечисление порциями, в памяти остаются только адреса
+                emails = set()
+                for entry in self.freeipa_service.iter_users(attributes=['mail'], members=False):
+                    mails = entry.get('mail') or []
+                    if isinstance(mails, str):
+                        mails = [mails]
+                    emails.update(mail.lower() for mail in mails if mail)
+                return emails
+            
+            google_emails, freeipa_emails = await asyncio.gather(
+                loop.run_in_executor(None, load_google_emails),
+                loop.run_in_executor(None, load_freeipa_emails)
+            )
+            google_emails.discard('')
             
             # Сравниваем
             only_in_google = google_emails - freeipa_emails
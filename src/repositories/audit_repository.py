@@ -4,152 +4,316 @@
 Реализация репозитория аудита.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from .interfaces import IAuditRepository
 from ..core.di_container import service
+from ..core.domain import AuditQuery, AuditPage
+from ..utils.log_reader import read_page_backward
 import logging
 import json
 import sqlite3
-from datetime import datetime, timedelta
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import asyncio
 
 
+# Событий в одной транзакции фонового писателя
+DEFAULT_BATCH_SIZE = 500
+# Сколько писатель ждет следующих событий перед записью пачки, секунды
+DEFAULT_FLUSH_INTERVAL = 0.2
+# Записей, возвращаемых get_logs
+MAX_LOGS = 1000
+# Формат CURRENT_TIMESTAMP SQLite (UTC), в котором хранились прежние записи
+SQLITE_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_STOP = object()
+
+
+def _utc_timestamp(moment: Optional[datetime] = None) -> str:
+    """Время UTC в формате CURRENT_TIMESTAMP: записи сравниваются как строки"""
+    return (moment or datetime.now(timezone.utc)).strftime(SQLITE_TIMESTAMP_FORMAT)
+
+
+def _fts_expression(text: str) -> str:
+    """Запрос FTS5: все слова текста, каждое как префикс фразы"""
+    words = text.split()
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
 @service(singleton=True)
 class SQLiteAuditRepository(IAuditRepository):
-    """SQLite репозиторий аудита"""
+    """
+    SQLite репозиторий аудита.
+
+    Одно долгоживущее соединение в режиме WAL. log_action только ставит
+    событие в очередь и сразу возвращается; фоновый поток записывает
+    накопленные события пачками, по одной транзакции на пачку. Чтение
+    выполняется в пуле потоков после записи уже поставленных событий,
+    постранично с ключевой пагинацией по (timestamp, id); поиск по тексту
+    использует индекс FTS5.
+    """
     
-    def __init__(self):
+    def __init__(self, db_path=None, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        Args:
+            db_path: Файл базы данных (по умолчанию data/audit.db)
+            batch_size: Максимум событий в одной транзакции
+            flush_interval: Ожидание следующих событий перед записью пачки
+        """
         self.logger = logging.getLogger(__name__)
-        self.db_path = Path("data/audit.db")
-        self.db_path.parent.mkdir(exist_ok=True)
-        asyncio.create_task(self._init_db())
+        self.db_path = Path(db_path or "data/audit.db")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.fts_enabled = False
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_db()
+        
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._writer_loop, name='audit-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self._stop_writer)
     
-    async def _init_db(self):
+    def _init_db(self):
         """Инициализация базы данных"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS audit_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    user TEXT NOT NULL,
-                    action TEXT NOT NULL,
-                    resource TEXT NOT NULL,
-                    details TEXT,
-                    ip_address TEXT,
-                    user_agent TEXT
-                )
-            ''')
-            
-            # Создаем индексы
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user ON audit_logs(user)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_action ON audit_logs(action)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON audit_logs(timestamp)')
-            
-            conn.commit()
-            conn.close()
+            with self._lock:
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS audit_logs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        user TEXT NOT NULL,
+                        action TEXT NOT NULL,
+                        resource TEXT NOT NULL,
+                        details TEXT,
+                        ip_address TEXT,
+                        user_agent TEXT
+                    )
+                ''')
+                
+                # Индексы под фильтры get_logs с сортировкой по времени;
+                # одиночные индексы прежних версий покрываются составными
+                self._conn.execute('DROP INDEX IF EXISTS idx_user')
+                self._conn.execute('DROP INDEX IF EXISTS idx_action')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON audit_logs(timestamp)')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS idx_user_timestamp ON audit_logs(user, timestamp)')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS idx_action_timestamp ON audit_logs(action, timestamp)')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS idx_resource_timestamp ON audit_logs(resource, timestamp)')
+                self.fts_enabled = self._init_fts()
+                self._conn.commit()
             
             self.logger.info("База данных аудита инициализирована")
         
         except Exception as e:
             self.logger.error(f"Ошибка инициализации БД аудита: {e}")
     
-    async def log_action(self, user: str, action: str, resource: str, details: Dict[str, Any] = None) -> bool:
-        """Записать действие в аудит"""
+    def _init_fts(self) -> bool:
+        """Полнотекстовый индекс FTS5 по ресурсу и деталям (если SQLite собран с FTS5)"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_fts'"
+        ).fetchone()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            details_json = json.dumps(details, ensure_ascii=False) if details else None
-            
-            cursor.execute('''
-                INSERT INTO audit_logs (user, action, resource, details)
-                VALUES (?, ?, ?, ?)
-            ''', (user, action, resource, details_json))
-            
-            conn.commit()
-            conn.close()
-            
-            self.logger.debug(f"Аудит: {user} -> {action} -> {resource}")
-            return True
+            self._conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS audit_fts
+                USING fts5(resource, details, content='audit_logs', content_rowid='id')
+            ''')
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"FTS5 недоступен, поиск по аудиту без индекса: {e}")
+            return False
         
+        self._conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs BEGIN
+                INSERT INTO audit_fts (rowid, resource, details) VALUES (new.id, new.resource, new.details);
+            END
+        ''')
+        self._conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs BEGIN
+                INSERT INTO audit_fts (audit_fts, rowid, resource, details)
+                VALUES ('delete', old.id, old.resource, old.details);
+            END
+        ''')
+        if not exists:
+            # Индексируем записи, сделанные до появления индекса
+            self._conn.execute("INSERT INTO audit_fts (audit_fts) VALUES ('rebuild')")
+        return True
+    
+    def _writer_loop(self):
+        """Фоновая запись событий пачками"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._write_batch(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+    
+    def _write_batch(self, batch: List[tuple]):
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany('''
+                        INSERT INTO audit_logs (timestamp, user, action, resource, details)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', batch)
+            self.logger.debug(f"Записано {len(batch)} событий аудита")
         except Exception as e:
+            self.dropped += len(batch)
+            self.logger.error(f"Ошибка записи {len(batch)} событий аудита: {e}")
+    
+    def flush(self):
+        """Ждет записи всех поставленных в очередь событий (блокирующий вызов)"""
+        if self._writer.is_alive():
+            self._queue.join()
+    
+    def _stop_writer(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+    
+    async def close(self):
+        """Записывает оставшиеся события и закрывает соединение"""
+        await asyncio.get_event_loop().run_in_executor(None, self._stop_writer)
+        atexit.unregister(self._stop_writer)
+    
+    async def log_action(self, user: str, action: str, resource: str, details: Dict[str, Any] = None) -> bool:
+        """Записать действие в аудит (событие записывается на диск в фоне)"""
+        if self._closed:
+            self.logger.error(f"Аудит закрыт, событие не записано: {user} -> {action} -> {resource}")
+            return False
+        try:
+            details_json = json.dumps(details, ensure_ascii=False, default=str) if details else None
+        except (TypeError, ValueError) as e:
             self.logger.error(f"Ошибка записи аудита: {e}")
             return False
+        
+        # Записи одной секунды упорядочиваются по id
+        timestamp = _utc_timestamp()
+        self._queue.put((timestamp, user, action, resource, details_json))
+        self.logger.debug(f"Аудит: {user} -> {action} -> {resource}")
+        return True
     
-    async def get_logs(self, user: str = None, action: str = None, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
-        """Получить записи аудита"""
+    def _build_select(self, query: AuditQuery, cursor: Optional[str]) -> Tuple[str, List[Any]]:
+        conditions = []
+        params: List[Any] = []
+        
+        for column, value in (('user', query.user), ('action', query.action), ('resource', query.resource)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        
+        if query.start_date:
+            conditions.append("timestamp >= ?")
+            params.append(query.start_date)
+        
+        if query.end_date:
+            conditions.append("timestamp <= ?")
+            params.append(query.end_date)
+        
+        if query.text and query.text.strip():
+            if self.fts_enabled:
+                conditions.append("id IN (SELECT rowid FROM audit_fts WHERE audit_fts MATCH ?)")
+                params.append(_fts_expression(query.text))
+            else:
+                conditions.append("(resource LIKE ? OR details LIKE ?)")
+                params.extend([f"%{query.text.strip()}%"] * 2)
+        
+        if cursor:
+            # Ключевая пагинация: строки строго после последней строки предыдущей страницы
+            timestamp, _, row_id = cursor.rpartition('|')
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend([timestamp, int(row_id)])
+        
+        sql = "SELECT * FROM audit_logs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        return sql, params
+    
+    def _select_page(self, query: AuditQuery, cursor: Optional[str] = None) -> AuditPage:
+        self.flush()
+        page_size = max(1, query.page_size)
+        sql, params = self._build_select(query, cursor)
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params + [page_size + 1]).fetchall()
+        
+        page = AuditPage(entries=[{
+            'id': row['id'],
+            'timestamp': row['timestamp'],
+            'user': row['user'],
+            'action': row['action'],
+            'resource': row['resource'],
+            'details': json.loads(row['details']) if row['details'] else {},
+            'ip_address': row['ip_address'],
+            'user_agent': row['user_agent']
+        } for row in rows[:page_size]])
+        if len(rows) > page_size:
+            last = page.entries[-1]
+            page.next_cursor = f"{last['timestamp']}|{last['id']}"
+        return page
+    
+    async def query_logs(self, query: AuditQuery, cursor: Optional[str] = None) -> AuditPage:
+        """Получить страницу записей аудита, начиная с курсора предыдущей страницы"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            query = "SELECT * FROM audit_logs WHERE 1=1"
-            params = []
-            
-            if user:
-                query += " AND user = ?"
-                params.append(user)
-            
-            if action:
-                query += " AND action = ?"
-                params.append(action)
-            
-            if start_date:
-                query += " AND timestamp >= ?"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND timestamp <= ?"
-                params.append(end_date)
-            
-            query += " ORDER BY timestamp DESC LIMIT 1000"
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            logs = []
-            for row in rows:
-                log_entry = {
-                    'id': row['id'],
-                    'timestamp': row['timestamp'],
-                    'user': row['user'],
-                    'action': row['action'],
-                    'resource': row['resource'],
-                    'details': json.loads(row['details']) if row['details'] else {},
-                    'ip_address': row['ip_address'],
-                    'user_agent': row['user_agent']
-                }
-                logs.append(log_entry)
-            
-            conn.close()
-            
-            self.logger.debug(f"Получено {len(logs)} записей аудита")
-            return logs
+            page = await asyncio.get_event_loop().run_in_executor(None, self._select_page, query, cursor)
+            self.logger.debug(f"Получено {len(page.entries)} записей аудита")
+            return page
         
         except Exception as e:
             self.logger.error(f"Ошибка получения логов аудита: {e}")
-            return []
+            return AuditPage()
+    
+    async def get_logs(self, user: str = None, action: str = None, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+        """Получить записи аудита"""
+        query = AuditQuery(user=user, action=action, start_date=start_date, end_date=end_date,
+                           page_size=MAX_LOGS)
+        return (await self.query_logs(query)).entries
+    
+    def _delete_before(self, cutoff: str) -> int:
+        self.flush()
+        with self._lock:
+            with self._conn:
+                return self._conn.execute('DELETE FROM audit_logs WHERE timestamp < ?', (cutoff,)).rowcount
     
     async def cleanup_old_logs(self, days: int = 90) -> int:
         """Очистить старые записи аудита"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            cursor.execute('''
-                DELETE FROM audit_logs 
-                WHERE timestamp < ?
-            ''', (cutoff_date.isoformat(),))
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+            deleted_count = await asyncio.get_event_loop().run_in_executor(
+                None, self._delete_before, _utc_timestamp(cutoff_date)
+            )
             
             self.logger.info(f"Удалено {deleted_count} старых записей аудита")
             return deleted_count
@@ -169,6 +333,10 @@ class FileAuditRepository(IAuditRepository):
         self.logs_dir.mkdir(exist_ok=True)
         self.audit_file = self.logs_dir / "audit.jsonl"
     
+    async def close(self):
+        """Файл открывается на каждую запись, закрывать нечего"""
+        pass
+    
     async def log_action(self, user: str, action: str, resource: str, details: Dict[str, Any] = None) -> bool:
         """Записать действие в аудит"""
         try:
@@ -190,49 +358,60 @@ class FileAuditRepository(IAuditRepository):
             self.logger.error(f"Ошибка записи аудита: {e}")
             return False
     
-    async def get_logs(self, user: str = None, action: str = None, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
-        """Получить записи аудита"""
+    @staticmethod
+    def _matcher(query: AuditQuery):
+        """Строка журнала -> запись, если она подходит под фильтры, иначе None"""
+        text = query.text.strip().lower() if query.text else ''
+        
+        def parse(line: str) -> Optional[Dict[str, Any]]:
+            try:
+                log_entry = json.loads(line)
+            except json.JSONDecodeError:
+                return None
+            
+            # Фильтрация
+            for key, value in (('user', query.user), ('action', query.action), ('resource', query.resource)):
+                if value and log_entry.get(key) != value:
+                    return None
+            
+            timestamp = log_entry.get('timestamp', '')
+            if query.start_date and timestamp < query.start_date:
+                return None
+            
+            if query.end_date and timestamp > query.end_date:
+                return None
+            
+            if text:
+                haystack = log_entry.get('resource', '') + ' ' + json.dumps(log_entry.get('details') or {}, ensure_ascii=False)
+                if text not in haystack.lower():
+                    return None
+            
+            return log_entry
+        return parse
+    
+    def _read_page(self, query: AuditQuery, cursor: Optional[str] = None) -> AuditPage:
+        # Записи дописываются в конец файла: читаем с конца, курсор - смещение в файле
+        entries, next_offset = read_page_backward(
+            self.audit_file, int(cursor) if cursor else None, max(1, query.page_size), self._matcher(query)
+        )
+        return AuditPage(entries=entries, next_cursor=str(next_offset) if next_offset is not None else None)
+    
+    async def query_logs(self, query: AuditQuery, cursor: Optional[str] = None) -> AuditPage:
+        """Получить страницу записей аудита, начиная с курсора предыдущей страницы"""
         try:
-            if not self.audit_file.exists():
-                return []
-            
-            logs = []
-            
-            with open(self.audit_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        log_entry = json.loads(line.strip())
-                        
-                        # Фильтрация
-                        if user and log_entry.get('user') != user:
-                            continue
-                        
-                        if action and log_entry.get('action') != action:
-                            continue
-                        
-                        if start_date and log_entry.get('timestamp', '') < start_date:
-                            continue
-                        
-                        if end_date and log_entry.get('timestamp', '') > end_date:
-                            continue
-                        
-                        logs.append(log_entry)
-                    
-                    except json.JSONDecodeError:
-                        continue
-            
-            # Сортируем по времени (новые первые)
-            logs.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            
-            # Ограничиваем результат
-            logs = logs[:1000]
-            
-            self.logger.debug(f"Получено {len(logs)} записей аудита")
-            return logs
+            page = await asyncio.get_event_loop().run_in_executor(None, self._read_page, query, cursor)
+            self.logger.debug(f"Получено {len(page.entries)} записей аудита")
+            return page
         
         except Exception as e:
             self.logger.error(f"Ошибка получения логов аудита: {e}")
-            return []
+            return AuditPage()
+    
+    async def get_logs(self, user: str = None, action: str = None, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+        """Получить записи аудита"""
+        query = AuditQuery(user=user, action=action, start_date=start_date, end_date=end_date,
+                           page_size=MAX_LOGS)
+        return (await self.query_logs(query)).entries
     
     async def cleanup_old_logs(self, days: int = 90) -> int:
         """Очистить старые записи аудита"""
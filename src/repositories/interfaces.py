@@ -5,8 +5,8 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
-from ..core.domain import User, Group, OrganizationalUnit, CalendarEvent
+from typing import AsyncIterator, List, Optional, Dict, Any
+from ..core.domain import User, Group, OrganizationalUnit, CalendarEvent, AuditQuery, AuditPage
 
 
 class IUserRepository(ABC):
@@ -192,6 +192,21 @@ class IAuditRepository(ABC):
         """Получить записи аудита"""
         pass
     
+    @abstractmethod
+    async def query_logs(self, query: AuditQuery, cursor: Optional[str] = None) -> AuditPage:
+        """Получить страницу записей аудита, начиная с курсора предыдущей страницы"""
+        pass
+    
+    async def iter_log_pages(self, query: AuditQuery) -> AsyncIterator[AuditPage]:
+        """Последовательно получить все страницы записей аудита"""
+        cursor = None
+        while True:
+            page = await self.query_logs(query, cursor)
+            yield page
+            if not page.has_more:
+                return
+            cursor = page.next_cursor
+    
     @abstractmethod
     async def cleanup_old_logs(self, days: int = 90) -> int:
         """Очистить старые записи аудита"""
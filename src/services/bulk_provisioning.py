@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Массовое создание пользователей из CSV или JSONL.
+
+Все строки проверяются до первого запроса к API. Пользователи создаются
+несколькими потоками с общим ограничением частоты; каждый обработанный ряд
+сразу дописывается в файл контрольной точки, поэтому прерванный импорт
+продолжается с места остановки, а уже созданные пользователи пропускаются.
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..utils.data_cache import data_cache
+from ..utils.rate_limiter import RateLimiter, execute_with_backoff, get_http_status
+from ..utils.statistics_engine import statistics_engine
+from ..utils.validators import validate_email, validate_phone
+
+logger = logging.getLogger(__name__)
+
+# Колонки входного файла; обязательные - первые четыре
+FIELDS = ['email', 'first_name', 'last_name', 'password',
+          'secondary_email', 'phone', 'org_unit_path']
+REQUIRED_FIELDS = FIELDS[:4]
+
+# Статусы, после которых строка при возобновлении не обрабатывается повторно
+DONE_STATUSES = {'created', 'exists'}
+
+
+@dataclass
+class ProvisioningRow:
+    """Строка входного файла"""
+    line: int
+    email: str
+    first_name: str
+    last_name: str
+    password: str
+    secondary_email: str = ''
+    phone: str = ''
+    org_unit_path: str = '/'
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def to_user_body(self) -> Dict[str, Any]:
+        """Тело запроса users().insert"""
+        body = {
+            'primaryEmail': self.email,
+            'name': {'givenName': self.first_name, 'familyName': self.last_name},
+            'password': self.password,
+            'orgUnitPath': self.org_unit_path or '/',
+        }
+        if self.secondary_email:
+            body['emails'] = [{'address': self.secondary_email, 'type': 'home'}]
+        if self.phone:
+            body['phones'] = [{'value': self.phone, 'type': 'work'}]
+        return body
+
+
+@dataclass
+class RowResult:
+    """Результат обработки строки"""
+    line: int
+    email: str
+    status: str  # 'created', 'exists', 'failed', 'invalid', 'skipped'
+    message: str = ''
+    duration_ms: float = 0.0
+    welcome_sent: Optional[bool] = None
+
+
+@dataclass
+class ProvisioningReport:
+    """Итог массового создания"""
+    results: List[RowResult] = field(default_factory=list)
+    started_at: datetime = field(default_factory=datetime.now)
+    elapsed: float = 0.0
+    resumed: int = 0
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    @property
+    def processed(self) -> int:
+        """Строки, отправленные в API в этом запуске"""
+        return sum(1 for r in self.results if r.status in ('created', 'exists', 'failed'))
+
+    @property
+    def throughput(self) -> float:
+        """Обработано строк в секунду"""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'total': len(self.results),
+            'created': self.count('created'),
+            'exists': self.count('exists'),
+            'failed': self.count('failed'),
+            'invalid': self.count('invalid'),
+            'skipped': self.count('skipped'),
+            'resumed': self.resumed,
+            'elapsed_seconds': round(self.elapsed, 2),
+            'rows_per_second': round(self.throughput, 2),
+        }
+
+    def save(self, path: str):
+        """Сохраняет построчный отчет в CSV (или JSON, если расширение .json)"""
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        rows = sorted(self.results, key=lambda r: r.line)
+        if output.suffix.lower() == '.json':
+            output.write_text(json.dumps(
+                {'summary': self.summary(), 'results': [asdict(r) for r in rows]},
+                ensure_ascii=False, indent=2
+            ), encoding='utf-8')
+            return
+        with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=list(RowResult.__dataclass_fields__))
+            writer.writeheader()
+            for result in rows:
+                writer.writerow(asdict(result))
+
+
+def read_rows(path: str) -> List[Dict[str, Any]]:
+    """
+    Читает строки CSV или JSONL файла.
+
+    Returns:
+        Список словарей с номером строки в ключе '_line'
+    """
+    source = Path(path)
+    rows = []
+    if source.suffix.lower() in ('.jsonl', '.ndjson'):
+        with open(source, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = {'_error': f'Некорректный JSON: {e}'}
+                if not isinstance(record, dict):
+                    record = {'_error': 'Строка должна быть JSON объектом'}
+                record['_line'] = line_number
+                rows.append(record)
+    else:
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            # Первая строка - заголовок
+            for line_number, record in enumerate(reader, start=2):
+                record = {(k or '').strip().lower(): (v or '').strip() for k, v in record.items()}
+                record['_line'] = line_number
+                rows.append(record)
+    return rows
+
+
+def validate_rows(records: Iterable[Dict[str, Any]],
+                  allowed_domains: Optional[Set[str]] = None
+                  ) -> Tuple[List[ProvisioningRow], List[RowResult]]:
+    """
+    Проверяет все строки до начала создания.
+
+    Args:
+        records: Строки из read_rows
+        allowed_domains: Домены Google Workspace, в которых можно создавать пользователей
+
+    Returns:
+        Кортеж (корректные строки, ошибки валидации)
+    """
+    valid: List[ProvisioningRow] = []
+    errors: List[RowResult] = []
+    seen: Dict[str, int] = {}
+    domains = {d.lower() for d in allowed_domains} if allowed_domains else None
+
+    for record in records:
+        line = record.get('_line', 0)
+        email = str(record.get('email', '')).strip().lower()
+        problems = []
+
+        if record.get('_error'):
+            problems.append(record['_error'])
+        for name in REQUIRED_FIELDS:
+            if not str(record.get(name, '') or '').strip():
+                problems.append(f"не заполнено поле '{name}'")
+
+        if email and not validate_email(email):
+            problems.append('неверный формат email')
+        elif email and domains and email.split('@')[-1] not in domains:
+            problems.append(f"домен {email.split('@')[-1]} не входит в {', '.join(sorted(domains))}")
+        if email in seen:
+            problems.append(f'email повторяется (строка {seen[email]})')
+
+        password = str(record.get('password', '') or '')
+        if password and len(password) < 8:
+            problems.append('пароль короче 8 символов')
+
+        secondary_email = str(record.get('secondary_email', '') or '').strip()
+        if secondary_email and not validate_email(secondary_email):
+            problems.append('неверный формат secondary_email')
+        phone = str(record.get('phone', '') or '').strip()
+        if phone and not validate_phone(phone):
+            problems.append('неверный формат телефона')
+        org_unit_path = str(record.get('org_unit_path', '') or '').strip() or '/'
+        if not org_unit_path.startswith('/'):
+            problems.append("org_unit_path должен начинаться с '/'")
+
+        if email:
+            seen.setdefault(email, line)
+
+        if problems:
+            errors.append(RowResult(line=line, email=email, status='invalid',
+                                    message='; '.join(problems)))
+            continue
+
+        valid.append(ProvisioningRow(
+            line=line,
+            email=email,
+            first_name=str(record['first_name']).strip(),
+            last_name=str(record['last_name']).strip(),
+            password=password,
+            secondary_email=secondary_email,
+            phone=phone,
+            org_unit_path=org_unit_path,
+        ))
+
+    return valid, errors
+
+
+class ProvisioningCheckpoint:
+    """
+    Контрольная точка импорта: JSONL файл с результатами обработанных строк.
+
+    Пароли в файл не записываются.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, RowResult]:
+        """Возвращает последние результаты по email."""
+        results: Dict[str, RowResult] = {}
+        if not self.path.exists():
+            return results
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                    result = RowResult(**data)
+                except (json.JSONDecodeError, TypeError):
+                    # Последняя строка могла быть записана не полностью при сбое
+                    continue
+                results[result.email] = result
+        return results
+
+    def append(self, result: RowResult):
+        """Дописывает результат и сбрасывает его на диск."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(asdict(result), ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        """Удаляет контрольную точку."""
+        with self._lock:
+            if self.path.exists():
+                self.path.unlink()
+
+
+def default_checkpoint_path(input_path: str) -> str:
+    """Контрольная точка по умолчанию лежит рядом с входным файлом."""
+    return str(Path(input_path).with_suffix('.checkpoint.jsonl'))
+
+
+def resolve_allowed_domains(service: Any) -> Set[str]:
+    """
+    Получает домены Google Workspace одним запросом.
+
+    При ошибке используется домен из конфигурации.
+    """
+    try:
+        result = service.domains().list(customer='my_customer').execute()
+        domains = {d['domainName'].lower() for d in result.get('domains', []) if d.get('domainName')}
+        if domains:
+            return domains
+    except Exception as e:
+        logger.warning(f"Не удалось получить список доменов: {e}")
+
+    try:
+        from ..config.enhanced_config import config
+        domain = config.settings.google_workspace_domain
+        if domain and domain != 'yourdomain.com':
+            return {domain.lower()}
+    except Exception:
+        pass
+    return set()
+
+
+class BulkUserProvisioner:
+    """
+    Параллельное создание пользователей с ограничением частоты и контрольной точкой.
+    """
+
+    def __init__(self, service_factory: Callable[[], Any],
+                 max_workers: int = 4,
+                 rate_per_second: float = 5.0,
+                 checkpoint: Optional[ProvisioningCheckpoint] = None,
+                 welcome_sender: Optional[Callable[[ProvisioningRow], bool]] = None):
+        """
+        Инициализация.
+
+        Args:
+            service_factory: Создает сервис Directory API. Вызывается один раз
+                на поток: клиент googleapiclient не потокобезопасен
+            max_workers: Количество параллельных потоков
+            rate_per_second: Ограничение частоты запросов insert (0 - без ограничения)
+            checkpoint: Контрольная точка для возобновления
+            welcome_sender: Отправка приветственного письма созданному пользователю
+        """
+        self.service_factory = service_factory
+        self.max_workers = max(1, max_workers)
+        self.limiter = RateLimiter(rate_per_second)
+        self.checkpoint = checkpoint
+        self.welcome_sender = welcome_sender
+        self._local = threading.local()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Останавливает запуск новых строк (текущие запросы завершаются)."""
+        self._cancelled.set()
+
+    def _service(self) -> Any:
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = self.service_factory()
+        return service
+
+    def run(self, rows: List[ProvisioningRow],
+            invalid: Optional[List[RowResult]] = None,
+            progress_callback: Optional[Callable[[RowResult, int, int], None]] = None
+            ) -> ProvisioningReport:
+        """
+        Создает пользователей.
+
+        Args:
+            rows: Корректные строки из validate_rows
+            invalid: Ошибки валидации (попадают в отчет)
+            progress_callback: Вызывается из рабочих потоков после каждой строки
+                с (результат, обработано, всего)
+
+        Returns:
+            Отчет с результатами по строкам и пропускной способностью
+        """
+        report = ProvisioningReport(results=list(invalid or []))
+        started = time.perf_counter()
+
+        done = self.checkpoint.load() if self.checkpoint else {}
+        pending = []
+        for row in rows:
+            previous = done.get(row.email)
+            if previous is not None and previous.status in DONE_STATUSES:
+                report.results.append(RowResult(
+                    line=row.line, email=row.email, status='skipped',
+                    message=f'обработан ранее: {previous.status}'
+                ))
+                report.resumed += 1
+            else:
+                pending.append(row)
+
+        total = len(pending)
+        completed = 0
+        progress_lock = threading.Lock()
+        logger.info(f"Массовое создание: {total} строк, {self.max_workers} потоков, "
+                    f"пропущено по контрольной точке: {report.resumed}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='provisioning') as executor:
+            futures = [executor.submit(self._process_row, row) for row in pending]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is None:
+                        continue
+                    report.results.append(result)
+                    with progress_lock:
+                        completed += 1
+                        current = completed
+                    if progress_callback:
+                        progress_callback(result, current, total)
+            except BaseException:
+                # Прерывание (Ctrl+C): оставшиеся в очереди строки не запускаются
+                self.cancel()
+                raise
+
+        # Кэш списков сбрасывается один раз на весь импорт
+        if report.count('created'):
+            data_cache.clear_cache()
+
+        report.elapsed = time.perf_counter() - started
+        logger.info(f"Массовое создание завершено: {report.summary()}")
+        return report
+
+    def _process_row(self, row: ProvisioningRow) -> Optional[RowResult]:
+        """Создает одного пользователя (выполняется в рабочем потоке)."""
+        if self._cancelled.is_set():
+            return None
+
+        started = time.perf_counter()
+        try:
+            service = self._service()
+            user = execute_with_backoff(
+                lambda: service.users().insert(body=row.to_user_body()).execute(),
+                limiter=self.limiter
+            )
+            statistics_engine.user_upserted(user)
+            result = RowResult(line=row.line, email=row.email, status='created',
+                               message=f"создан в {row.org_unit_path}")
+        except Exception as e:
+            if get_http_status(e) == 409 or 'duplicate' in str(e).lower():
+                result = RowResult(line=row.line, email=row.email, status='exists',
+                                   message='пользователь уже существует')
+            else:
+                result = RowResult(line=row.line, email=row.email, status='failed', message=str(e))
+
+        if result.status == 'created' and self.welcome_sender is not None:
+            try:
+                result.welcome_sent = bool(self.welcome_sender(row))
+            except Exception as e:
+                logger.warning(f"Приветственное письмо для {row.email} не отправлено: {e}")
+                result.welcome_sent = False
+
+        result.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        if self.checkpoint:
+            self.checkpoint.append(result)
+        return result
+
+
+def make_welcome_sender(gmail_credentials: Any, admin_email: str) -> Callable[[ProvisioningRow], bool]:
+    """
+    Создает функцию постановки приветственных писем в очередь.
+
+    Письма отправляются общей очередью welcome_mail_queue с учетом квот
+    Gmail, поэтому создание пользователей не ждет отправки. Функция
+    возвращает True, если письмо поставлено в очередь.
+    """
+    from .welcome_mail_queue import get_welcome_mail_queue
+
+    mail_queue = get_welcome_mail_queue(gmail_credentials)
+
+    def send(row: ProvisioningRow) -> bool:
+        mail_queue.enqueue(
+            to_email=row.email,
+            user_name=row.full_name,
+            temporary_password=row.password,
+            admin_email=admin_email
+        )
+        return True
+
+    return send
@@ -9,6 +9,7 @@ from typing import Optional, List, Dict, Any
 from dataclasses import dataclass
 
 from ..api.drive_api import DriveAPI, DriveFile, DrivePermission
+from ..api.drive_permissions import FanOutResult
 
 logger = logging.getLogger(__name__)
 
@@ -123,6 +124,50 @@ class DocumentService:
             self.logger.error(f"Ошибка при предоставлении доступа: {e}")
             return False
     
+    def grant_access_bulk(self, document_urls: List[str], user_emails: List[str], role: str,
+                          notify: bool = False, message: Optional[str] = None) -> FanOutResult:
+        """
+        Предоставляет доступ нескольким пользователям к нескольким документам
+        
+        Args:
+            document_urls: URL документов
+            user_emails: Email пользователей
+            role: Роль ('reader', 'commenter', 'writer')
+            notify: Отправлять уведомления всем пользователям (пользователи без
+                Google аккаунта получают приглашение в любом случае)
+            message: Текст уведомления
+            
+        Returns:
+            Результат по парам (ID файла, email)
+        """
+        result = FanOutResult()
+        
+        valid_roles = ['reader', 'commenter', 'writer']
+        if role not in valid_roles:
+            self.logger.error(f"Неверная роль: {role}. Допустимые: {valid_roles}")
+            for url in document_urls:
+                for email in user_emails:
+                    result.failed[(url, email.lower())] = f'неверная роль: {role}'
+            return result
+        
+        file_ids = []
+        for url in document_urls:
+            file_id = self.drive_api.extract_file_id_from_url(url)
+            if file_id:
+                file_ids.append(file_id)
+            else:
+                self.logger.error(f"Не удалось извлечь ID файла из URL: {url}")
+                for email in user_emails:
+                    result.failed[(url, email.lower())] = 'не удалось извлечь ID файла из URL'
+        
+        if file_ids:
+            bulk = self.drive_api.add_permissions_bulk(file_ids, user_emails, role, notify, message)
+            bulk.failed.update(result.failed)
+            result = bulk
+        
+        self.logger.info(f"✅ Массовое предоставление доступа: {result.summary()}")
+        return result
+    
     def revoke_access(self, document_url: str, user_email: str) -> bool:
         """
         Отзывает доступ к документу
@@ -7,10 +7,14 @@ FreeIPA Client для интеграции с Google Workspace Admin Tools
 
 import json
 import logging
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union, Any
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
+from .freeipa_client_stub import FreeIPAClientStub
+from .freeipa_enumeration import FreeIPAEnumerator
+from .freeipa_parallel import DEFAULT_RPC_RATE, DEFAULT_WORKERS
+from .freeipa_sync import google_user_attributes
 from .freeipa_safe_import import (
     FREEIPA_AVAILABLE, 
     KERBEROS_AVAILABLE, 
@@ -29,6 +33,10 @@ from requests.auth import HTTPBasicAuth
 
 logger = logging.getLogger(__name__)
 
+# Вызовов в одном запросе batch: сервер выполняет их последовательно,
+# слишком большие пакеты упираются в таймаут HTTP запроса
+BATCH_CHUNK_SIZE = 100
+
 
 @dataclass
 class FreeIPAConfig:
@@ -41,6 +49,9 @@ class FreeIPAConfig:
     verify_ssl: bool = True
     ca_cert_path: Optional[str] = None
     timeout: int = 30
+    # Параллельная синхронизация групп: одновременных задач и RPC вызовов в секунду к серверу
+    sync_workers: int = DEFAULT_WORKERS
+    rpc_rate_limit: float = DEFAULT_RPC_RATE
     
     @classmethod
     def from_file(cls, config_path: str) -> 'FreeIPAConfig':
@@ -108,6 +119,17 @@ class FreeIPAGroup:
         return data
 
 
+def freeipa_user_from_google(google_user: Dict[str, Any]) -> Optional[FreeIPAUser]:
+    """
+    Преобразует пользователя Google Directory API в пользователя FreeIPA
+    
+    Returns:
+        FreeIPAUser или None, если у пользователя нет primaryEmail
+    """
+    attributes = google_user_attributes(google_user)
+    return FreeIPAUser(**attributes) if attributes else None
+
+
 class FreeIPAService:
     """Сервис для работы с FreeIPA API"""
     
@@ -121,27 +143,33 @@ class FreeIPAService:
     
     def connect(self) -> bool:
         """Подключение к FreeIPA серверу"""
-        if not FREEIPA_AVAILABLE:
+        if self.config.use_kerberos and not FREEIPA_AVAILABLE:
             logger.error("FreeIPA библиотека не доступна")
             return False
         
         try:
-            # Создаем клиент
-            self.client = create_freeipa_client(
-                server=self.config.server_url,
-                verify_ssl=self.config.verify_ssl,
-                timeout=self.config.timeout
-            )
-            
             # Аутентификация
             if self.config.use_kerberos:
                 # Kerberos аутентификация
+                self.client = create_freeipa_client(
+                    server=self.config.server_url,
+                    verify_ssl=self.config.verify_ssl,
+                    timeout=self.config.timeout
+                )
                 logger.info("Подключение через Kerberos...")
                 self.client.login_kerberos()
             elif self.config.username and self.config.password:
-                # Аутентификация по паролю
+                # Аутентификация по паролю через общую сессию: сохраненный
+                # cookie переиспользуется, повторный вход только при 401
+                self.client = FreeIPAClientStub(
+                    server=self.config.server_url,
+                    verify_ssl=self.config.verify_ssl,
+                    timeout=self.config.timeout
+                )
                 logger.info(f"Подключение как пользователь: {self.config.username}")
-                self.client.login(self.config.username, self.config.password)
+                if not self.client.login(self.config.username, self.config.password):
+                    self.client = None
+                    return False
             else:
                 logger.error("Не указан метод аутентификации")
                 return False
@@ -153,11 +181,20 @@ class FreeIPAService:
             logger.error(f"Ошибка подключения к FreeIPA: {e}")
             return False
     
-    def disconnect(self) -> None:
-        """Отключение от FreeIPA"""
+    def disconnect(self, logout: bool = False) -> None:
+        """
+        Отключение от FreeIPA
+        
+        Args:
+            logout: Завершить сессию на сервере (по умолчанию сессия
+                остается для следующих подключений)
+        """
         if self.client:
             try:
-                self.client.logout()
+                if not logout and hasattr(self.client, 'release'):
+                    self.client.release()
+                else:
+                    self.client.logout()
                 logger.info("Отключение от FreeIPA")
             except Exception as e:
                 logger.warning(f"Ошибка при отключении: {e}")
@@ -177,6 +214,86 @@ class FreeIPAService:
             logger.error(f"Ошибка проверки подключения: {e}")
             return False
     
+    # === JSON-RPC ===
+    
+    def call(self, method: str, args: Optional[List[Any]] = None,
+             options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Вызов метода FreeIPA JSON-RPC
+        
+        Работает и с python-freeipa, и с клиентом-заглушкой (который
+        возвращает полный ответ с полями result/error).
+        
+        Returns:
+            Поле result ответа (например, {'result': [...], 'count': N})
+        """
+        if not self.client:
+            raise FreeIPAError("Нет подключения к FreeIPA")
+        
+        if hasattr(self.client, '_api_call'):
+            response = self.client._api_call(method, args or [], options or {})
+            if response.get('error'):
+                error = response['error']
+                message = error.get('message', error) if isinstance(error, dict) else error
+                raise FreeIPAError(f"{method}: {message}")
+            return response.get('result') or {}
+        return self.client._request(method, args or [], options or {})
+    
+    def batch(self, calls: List[Tuple[str, List[Any], Dict[str, Any]]],
+              chunk_size: int = BATCH_CHUNK_SIZE) -> List[Dict[str, Any]]:
+        """
+        Выполняет вызовы командой batch, по chunk_size вызовов за запрос
+        
+        Args:
+            calls: Тройки (метод, аргументы, опции)
+            chunk_size: Вызовов в одном batch запросе
+            
+        Returns:
+            Результаты в порядке вызовов: {'result': ..., 'error': None}
+            или {'error': 'сообщение', 'error_name': ..., 'error_code': ...}
+        """
+        results: List[Dict[str, Any]] = []
+        chunk_size = max(1, chunk_size)
+        for start in range(0, len(calls), chunk_size):
+            chunk = calls[start:start + chunk_size]
+            payload = [{'method': method, 'params': [args, options]} for method, args, options in chunk]
+            try:
+                response = self.call('batch', payload, {})
+                chunk_results = response.get('results', [])
+            except Exception as e:
+                # Ошибка всего запроса (сеть, сессия): отмечаем все вызовы пакета
+                logger.error(f"Ошибка batch запроса FreeIPA ({len(chunk)} вызовов): {e}")
+                chunk_results = [{'error': str(e), 'error_name': 'BatchError'} for _ in chunk]
+            results.extend(chunk_results)
+        return results
+    
+    # === Полное перечисление ===
+    
+    def list_user_uids(self) -> List[str]:
+        """Все uid пользователей без ограничения sizelimit сервера"""
+        return FreeIPAEnumerator(self).list_keys('user')
+    
+    def list_group_cns(self) -> List[str]:
+        """Все cn групп без ограничения sizelimit сервера"""
+        return FreeIPAEnumerator(self).list_keys('group')
+    
+    def iter_users(self, attributes: Optional[Iterable[str]] = None, members: bool = True,
+                   chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Все пользователи FreeIPA порциями (см. FreeIPAEnumerator)
+        
+        Args:
+            attributes: Оставляемые атрибуты (None - все)
+            members: Загружать членство в группах
+            chunk_size: Записей в одном batch запросе
+        """
+        return FreeIPAEnumerator(self, chunk_size=chunk_size).iter_entries('user', attributes, members)
+    
+    def iter_groups(self, attributes: Optional[Iterable[str]] = None, members: bool = True,
+                    chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+        """Все группы FreeIPA порциями (см. iter_users)"""
+        return FreeIPAEnumerator(self, chunk_size=chunk_size).iter_entries('group', attributes, members)
+    
     # === Управление пользователями ===
     
     def create_user(self, user: FreeIPAUser) -> bool:
@@ -249,13 +366,19 @@ class FreeIPAService:
             logger.error(f"Неожиданная ошибка при удалении пользователя {uid}: {e}")
             return False
     
-    def list_users(self, search_filter: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
-        """Получение списка пользователей"""
+    def list_users(self, search_filter: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """
+        Получение списка пользователей
+        
+        limit None или 0 - все пользователи, без ограничения sizelimit сервера
+        """
         if not self.client:
             logger.error("Нет подключения к FreeIPA")
             return []
         
         try:
+            if not limit and not search_filter:
+                return list(self.iter_users())
             if search_filter:
                 result = self.client.user_find(search_filter, sizelimit=limit)
             else:
@@ -323,13 +446,19 @@ class FreeIPAService:
             logger.error(f"Неожиданная ошибка при удалении группы {cn}: {e}")
             return False
     
-    def list_groups(self, search_filter: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
-        """Получение списка групп"""
+    def list_groups(self, search_filter: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """
+        Получение списка групп
+        
+        limit None или 0 - все группы, без ограничения sizelimit сервера
+        """
         if not self.client:
             logger.error("Нет подключения к FreeIPA")
             return []
         
         try:
+            if not limit and not search_filter:
+                return list(self.iter_groups())
             if search_filter:
                 result = self.client.group_find(search_filter, sizelimit=limit)
             else:
@@ -373,7 +502,7 @@ class FreeIPAService:
             logger.error(f"Ошибка получения списка групп: {e}")
             return []
     
-    def get_groups(self, search_filter: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    def get_groups(self, search_filter: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict[str, Any]]:
         """Алиас для list_groups - получение списка групп"""
         return self.list_groups(search_filter, limit)
     
@@ -437,22 +566,11 @@ class FreeIPAService:
             default_groups = []
         
         try:
-            # Извлекаем данные из Google user
-            uid = google_user.get('primaryEmail', '').split('@')[0]
-            if not uid:
+            freeipa_user = freeipa_user_from_google(google_user)
+            if not freeipa_user:
                 logger.error("Не удалось извлечь username из Google user")
                 return False
-            
-            # Создаем FreeIPA пользователя
-            freeipa_user = FreeIPAUser(
-                uid=uid,
-                givenname=google_user.get('name', {}).get('givenName', ''),
-                sn=google_user.get('name', {}).get('familyName', ''),
-                mail=google_user.get('primaryEmail', ''),
-                title=google_user.get('organizations', [{}])[0].get('title', '') if google_user.get('organizations') else '',
-                department=google_user.get('organizations', [{}])[0].get('department', '') if google_user.get('organizations') else '',
-                telephonenumber=google_user.get('phones', [{}])[0].get('value', '') if google_user.get('phones') else ''
-            )
+            uid = freeipa_user.uid
             
             # Создаем пользователя
             if not self.create_user(freeipa_user):
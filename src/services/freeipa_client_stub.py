@@ -10,6 +10,8 @@ import requests
 from typing import Dict, List, Optional, Any
 import urllib3
 
+from .freeipa_session import FreeIPASession, get_freeipa_session
+
 # Отключаем SSL warnings для FreeIPA (тестовая среда)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -24,108 +26,63 @@ class FreeIPAClientStub:
         self.host = server.rstrip('/')
         self.verify_ssl = verify_ssl
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.verify = verify_ssl
-        self.session.timeout = timeout
+        self._session: Optional[FreeIPASession] = None
+        self._anonymous_http = None
         self._logged_in = False
+    
+    @property
+    def session(self):
+        """HTTP сессия (общая с другими клиентами того же сервера после входа)"""
+        if self._session is not None:
+            return self._session.http
+        if self._anonymous_http is None:
+            self._anonymous_http = requests.Session()
+            self._anonymous_http.verify = self.verify_ssl
+        return self._anonymous_http
         
     def login(self, user: str, password: str) -> bool:
-        """Логин через пароль (без Kerberos)"""
-        login_url = f"{self.host}/ipa/session/login_password"
-        
-        # Попробуем несколько вариантов имени пользователя
-        usernames_to_try = [
-            user,
-            f"{user}@infra.int.sputnik8.com",
-            user.lower(),
-            f"{user.lower()}@infra.int.sputnik8.com"
-        ]
-        
-        for username in usernames_to_try:
-            print(f"🔐 Попытка логина: URL={login_url}, User={username}")
-            
-            try:
-                # Сначала получим CSRF токен если нужно
-                response = self.session.get(f"{self.host}/ipa/ui/")
-                
-                response = self.session.post(
-                    login_url,
-                    data={'user': username, 'password': password},
-                    headers={
-                        'Referer': f"{self.host}/ipa/ui/",
-                        'Content-Type': 'application/x-www-form-urlencoded',
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                    }
-                )
-                
-                print(f"📡 Ответ сервера для {username}: status={response.status_code}")
-                
-                if response.text:
-                    print(f"📄 Response text (первые 300 символов): {response.text[:300]}...")
-                
-                if response.status_code == 200:
-                    # Проверяем, есть ли в ответе признак успешного входа
-                    if ('Set-Cookie' in response.headers or 
-                        'ipa_session' in response.text or
-                        'user-menu' in response.text or
-                        'logout' in response.text.lower()):
-                        print(f"✅ Логин успешен для пользователя: {username}")
-                        self._logged_in = True
-                        return True
-                    else:
-                        print(f"⚠️ Получен 200, но нет признаков успешного логина для {username}")
-                elif response.status_code == 302:
-                    # Редирект может означать успешный логин
-                    print(f"✅ Редирект - возможно успешный логин для {username}")
-                    self._logged_in = True
-                    return True
-                else:
-                    print(f"❌ Ошибка HTTP для {username}: {response.status_code}")
-                    
-            except Exception as e:
-                print(f"❌ Ошибка при попытке логина {username}: {e}")
-                continue
+        """
+        Логин через пароль (без Kerberos)
         
-        print(f"❌ Все попытки логина неудачны")
-        return False
+        Используется общая сессия FreeIPASession: сохраненный cookie
+        ipa_session переиспользуется, вход по паролю выполняется только
+        при его отсутствии или истечении.
+        """
+        self._session = get_freeipa_session(self.host, user, password, self.verify_ssl, self.timeout)
+        try:
+            self._logged_in = self._session.login()
+        except Exception as e:
+            print(f"❌ Ошибка при попытке логина {user}: {e}")
+            self._logged_in = False
+        if not self._logged_in:
+            print(f"❌ Все попытки логина неудачны")
+        return self._logged_in
+    
+    def release(self):
+        """Отключение клиента без завершения общей сессии"""
+        self._logged_in = False
     
     def logout(self):
         """Выход из сессии"""
-        if self._logged_in:
-            try:
-                logout_url = f"{self.host}/ipa/session/logout"
-                self.session.get(logout_url)
-            except:
-                pass
-            self._logged_in = False
+        if self._logged_in and self._session is not None:
+            self._session.logout()
+        self._logged_in = False
     
     def _api_call(self, method: str, params: Optional[List] = None, options: Optional[Dict] = None) -> Dict:
         """Базовый API вызов"""
         if not self._logged_in:
             raise Exception("Not logged in")
         
-        api_url = f"{self.host}/ipa/json"
-        
-        payload = {
-            "method": method,
-            "params": [params or [], options or {}]
-        }
-        
-        response = self.session.post(
-            api_url,
-            json=payload,
-            headers={
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-                'Referer': f"{self.host}/ipa/ui/"
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"API call failed: {response.status_code}")
+        return self._session.request(method, params, options)
+    
+    def _request(self, method: str, params: Optional[List] = None, options: Optional[Dict] = None) -> Dict:
+        """API вызов в формате python-freeipa: поле result ответа, ошибка - исключение"""
+        response = self._api_call(method, params, options)
+        error = response.get('error')
+        if error:
+            message = error.get('message', error) if isinstance(error, dict) else error
+            raise FreeIPAErrorStub(f"{method}: {message}")
+        return response.get('result') or {}
     
     def ping(self) -> Dict:
         """Ping сервера"""
@@ -143,53 +100,53 @@ class FreeIPAClientStub:
     
     def group_find(self, criteria: str = "", **options) -> Dict:
         """Поиск групп"""
-        return self._api_call("group_find", [criteria], options)
+        return self._request("group_find", [criteria], options)
     
     def group_add(self, group_name: str, **options) -> Dict:
         """Создание группы"""
-        return self._api_call("group_add", [group_name], options)
+        return self._request("group_add", [group_name], options)
     
     def group_show(self, group_name: str, **options) -> Dict:
         """Получение информации о группе"""
-        return self._api_call("group_show", [group_name], options)
+        return self._request("group_show", [group_name], options)
     
     def group_add_member(self, group_name: str, user: str = None, **options) -> Dict:
         """Добавление участника в группу"""
         params = [group_name]
         if user:
-            options.setdefault('user', []).append(user)
-        return self._api_call("group_add_member", params, options)
+            options.setdefault('user', []).extend(user if isinstance(user, list) else [user])
+        return self._request("group_add_member", params, options)
     
     def group_remove_member(self, group_name: str, user: str = None, **options) -> Dict:
         """Удаление участника из группы"""
         params = [group_name]
         if user:
-            options.setdefault('user', []).append(user)
-        return self._api_call("group_remove_member", params, options)
+            options.setdefault('user', []).extend(user if isinstance(user, list) else [user])
+        return self._request("group_remove_member", params, options)
     
     def user_find(self, criteria: str = "", **options) -> Dict:
         """Поиск пользователей"""
-        return self._api_call("user_find", [criteria], options)
+        return self._request("user_find", [criteria], options)
     
     def user_show(self, user_name: str, **options) -> Dict:
         """Получение информации о пользователе"""
-        return self._api_call("user_show", [user_name], options)
+        return self._request("user_show", [user_name], options)
     
     def user_add(self, user_name: str, **options) -> Dict:
         """Создание пользователя"""
-        return self._api_call("user_add", [user_name], options)
+        return self._request("user_add", [user_name], options)
     
     def user_mod(self, user_name: str, **options) -> Dict:
         """Изменение пользователя"""
-        return self._api_call("user_mod", [user_name], options)
+        return self._request("user_mod", [user_name], options)
     
     def user_del(self, user_name: str, **options) -> Dict:
         """Удаление пользователя"""
-        return self._api_call("user_del", [user_name], options)
+        return self._request("user_del", [user_name], options)
     
     def group_del(self, group_name: str, **options) -> Dict:
         """Удаление группы"""
-        return self._api_call("group_del", [group_name], options)
+        return self._request("group_del", [group_name], options)
     
     def login_kerberos(self):
         """Заглушка для Kerberos аутентификации"""
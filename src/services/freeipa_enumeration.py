@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Полное перечисление пользователей и групп FreeIPA без ограничения sizelimit.
+
+Сначала загружаются только ключи (*_find с pkey_only). Если сервер
+обрезал и этот список, поиск разбивается на подзапросы по префиксам
+ключа: каждый ключ содержит все свои префиксы, поэтому достаточно
+уточнять обрезанный запрос на один символ справа (и проверять точное
+совпадение), пока каждый ответ не станет полным. Поиск по подстроке
+совпадает и с другими атрибутами, поэтому общие подстроки приходится
+уточнять на несколько уровней; подзапросы одного уровня отправляются
+командой batch. Затем записи читаются
+командой batch (*_show) порциями и отдаются генератором, так что в памяти
+одновременно находится только текущая порция записей с нужными атрибутами.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Символы, из которых состоят uid и cn FreeIPA
+KEY_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789._-'
+
+# Первичный ключ записей по типу объекта
+PRIMARY_KEYS = {'user': 'uid', 'group': 'cn'}
+
+# Максимальная длина подстроки при разбиении поиска (длина uid в FreeIPA по умолчанию)
+MAX_PARTITION_DEPTH = 32
+
+
+class FreeIPAEnumerator:
+    """
+    Перечисление объектов FreeIPA через call/batch сервиса FreeIPA.
+    """
+
+    def __init__(self, rpc, chunk_size: int = 100, alphabet: str = KEY_ALPHABET):
+        """
+        Args:
+            rpc: Объект с методами call(method, args, options) и batch(calls, chunk_size)
+                (FreeIPAService)
+            chunk_size: Записей в одном batch запросе *_show
+            alphabet: Символы ключей для разбиения поиска
+        """
+        self.rpc = rpc
+        self.chunk_size = chunk_size
+        self.alphabet = alphabet
+        self.rpc_calls = 0
+
+    # ----- Ключи -----
+
+    @staticmethod
+    def _find_call(kind: str, criteria: str = '', exact: bool = False) -> Tuple[str, List[Any], Dict[str, Any]]:
+        """Вызов pkey_only поиска для call/batch"""
+        options: Dict[str, Any] = {'pkey_only': True, 'sizelimit': 0}
+        if exact:
+            # Точное совпадение ключа, а не подстрока в любом атрибуте
+            options[PRIMARY_KEYS[kind]] = criteria
+            return f'{kind}_find', [], options
+        return f'{kind}_find', [criteria], options
+
+    @staticmethod
+    def _found_keys(kind: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Ответ поиска -> {'keys': [...], 'truncated': bool}"""
+        pkey = PRIMARY_KEYS[kind]
+        keys = []
+        for entry in result.get('result') or []:
+            value = entry.get(pkey)
+            if isinstance(value, (list, tuple)):
+                value = value[0] if value else None
+            if value:
+                keys.append(str(value))
+        return {'keys': keys, 'truncated': bool(result.get('truncated'))}
+
+    def _find_keys(self, kind: str, criteria: str = '', exact: bool = False) -> Dict[str, Any]:
+        """Один pkey_only поиск: {'keys': [...], 'truncated': bool}"""
+        self.rpc_calls += 1
+        return self._found_keys(kind, self.rpc.call(*self._find_call(kind, criteria, exact)))
+
+    def _find_many(self, kind: str, searches: List[Tuple[str, bool]]) -> List[Dict[str, Any]]:
+        """Поиски (criteria, exact) командой batch; поиск с ошибкой повторяется через call"""
+        calls = [self._find_call(kind, criteria, exact) for criteria, exact in searches]
+        outcomes: List[Dict[str, Any]] = []
+        for start in range(0, len(calls), self.chunk_size):
+            self.rpc_calls += 1
+            outcomes.extend(self.rpc.batch(calls[start:start + self.chunk_size], chunk_size=self.chunk_size))
+        found = []
+        for (criteria, exact), outcome in zip(searches, outcomes):
+            if outcome.get('error'):
+                # Без этого ответа перечисление было бы неполным: ошибка call не скрывается
+                logger.debug(f"{kind}_find '{criteria}' в batch: {outcome['error']}")
+                found.append(self._find_keys(kind, criteria, exact))
+            else:
+                found.append(self._found_keys(kind, outcome))
+        return found
+
+    def list_keys(self, kind: str) -> List[str]:
+        """
+        Все ключи объектов (uid или cn), даже если сервер ограничивает выдачу
+
+        Returns:
+            Отсортированный список ключей
+        """
+        first = self._find_keys(kind)
+        keys: Set[str] = set(first['keys'])
+        if first['truncated']:
+            logger.info(f"Список {kind} обрезан сервером ({len(keys)}), разбиение поиска по префиксам ключа")
+            searches = [(char, False) for char in self.alphabet]
+            while searches:
+                next_searches: List[Tuple[str, bool]] = []
+                for (criteria, exact), found in zip(searches, self._find_many(kind, searches)):
+                    keys.update(found['keys'])
+                    if exact or not found['truncated']:
+                        continue
+                    # Обрезанный ответ уточняется всегда: подстрока совпадает и с
+                    # другими атрибутами, и по уже найденным ключам нельзя судить,
+                    # какие ключи с этим префиксом остались за пределом выдачи
+                    if len(criteria) >= MAX_PARTITION_DEPTH:
+                        logger.warning(f"Поиск {kind} по '{criteria}' обрезан и на глубине {len(criteria)}")
+                        continue
+                    # Ключ, содержащий criteria как префикс, либо равен ей, либо
+                    # содержит ее продолжение на один символ
+                    next_searches.append((criteria, True))
+                    next_searches.extend((criteria + char, False) for char in self.alphabet)
+                searches = next_searches
+        return sorted(keys)
+
+    # ----- Записи -----
+
+    def iter_entries(self, kind: str, attributes: Optional[Iterable[str]] = None,
+                     members: bool = True, keys: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Записи объектов порциями через batch *_show
+
+        Args:
+            kind: 'user' или 'group'
+            attributes: Оставляемые атрибуты (None - все, что вернул сервер)
+            members: Загружать членство (member_*, memberof_*)
+            keys: Ключи объектов (по умолчанию все)
+
+        Yields:
+            Записи с выбранными атрибутами
+        """
+        pkey = PRIMARY_KEYS[kind]
+        keep = set(attributes) | {pkey} if attributes is not None else None
+        if keys is None:
+            keys = self.list_keys(kind)
+        options: Dict[str, Any] = {'all': bool(attributes) and not set(attributes) <= {pkey}}
+        if not members:
+            options['no_members'] = True
+
+        for start in range(0, len(keys), self.chunk_size):
+            chunk = keys[start:start + self.chunk_size]
+            self.rpc_calls += 1
+            outcomes = self.rpc.batch([(f'{kind}_show', [key], dict(options)) for key in chunk],
+                                      chunk_size=self.chunk_size)
+            for key, outcome in zip(chunk, outcomes):
+                if outcome.get('error'):
+                    # Объект удален между перечислением и чтением
+                    logger.debug(f"{kind}_show {key}: {outcome['error']}")
+                    continue
+                entry = (outcome.get('result') or {}).get('result') or outcome.get('result') or {}
+                if keep is not None:
+                    entry = {name: value for name, value in entry.items() if name in keep}
+                yield entry
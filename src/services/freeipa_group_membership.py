@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+Сравнение состава групп Google Workspace и FreeIPA.
+
+Обе стороны загружаются целиком: группы FreeIPA с участниками и
+пользователи FreeIPA (uid и mail) - командой batch через FreeIPAEnumerator,
+участники групп Google - из кэша участников или пакетными запросами
+members().list. Адреса Google сопоставляются с uid FreeIPA по индексу,
+построенному один раз, и для всех групп за один проход вычисляются
+множества добавления и удаления. Результат используется окнами GUI и
+командами CLI и применяется командой batch group_add_member/group_remove_member.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..api.batch_requests import DEFAULT_BATCH_SIZE, execute_batched
+from ..utils.data_cache import data_cache, group_members_cache
+from ..utils.rate_limiter import RateLimiter
+from .freeipa_enumeration import FreeIPAEnumerator
+from .freeipa_sync import MEMBERS_PER_CALL, PROTECTED_UIDS
+
+logger = logging.getLogger(__name__)
+
+# Служебные группы FreeIPA, которых нет и не должно быть в Google
+SYSTEM_GROUPS = {'admins', 'editors', 'ipausers', 'trust admins', 'default smb group',
+                 'domain admins', 'domain users'}
+
+# Поля участников Google, нужные для сравнения
+MEMBER_FIELDS = 'members(email,role,type,status),nextPageToken'
+
+
+def group_cn(group_email: str) -> str:
+    """Имя группы FreeIPA для группы Google: часть адреса до @"""
+    return group_email.split('@')[0].strip().lower()
+
+
+def _values(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(item) for item in value]
+    return [str(value)]
+
+
+class IdentityIndex:
+    """
+    Соответствие адресов Google и uid FreeIPA.
+
+    Адрес сопоставляется по атрибуту mail пользователя FreeIPA, а если у
+    пользователя нет mail - по части адреса до @, совпадающей с uid (так
+    пользователи создаются синхронизацией).
+    """
+
+    def __init__(self, freeipa_users: Iterable[Dict[str, Any]]):
+        """
+        Args:
+            freeipa_users: Записи пользователей FreeIPA с атрибутами uid и mail
+        """
+        self.uids: Set[str] = set()
+        self._uid_by_email: Dict[str, str] = {}
+        self._email_by_uid: Dict[str, str] = {}
+        for entry in freeipa_users:
+            uids = _values(entry.get('uid'))
+            if not uids:
+                continue
+            uid = uids[0].lower()
+            self.uids.add(uid)
+            for mail in _values(entry.get('mail')):
+                mail = mail.lower()
+                self._uid_by_email.setdefault(mail, uid)
+                self._email_by_uid.setdefault(uid, mail)
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def uid_for(self, email: str) -> Optional[str]:
+        """uid пользователя FreeIPA по адресу Google (None - пользователя нет)"""
+        email = email.strip().lower()
+        uid = self._uid_by_email.get(email)
+        if uid is not None:
+            return uid
+        local = email.split('@')[0]
+        if local in self.uids and local not in self._email_by_uid:
+            return local
+        return None
+
+    def email_for(self, uid: str) -> Optional[str]:
+        """Адрес пользователя FreeIPA (атрибут mail)"""
+        return self._email_by_uid.get(uid.lower())
+
+
+@dataclass
+class GroupMembershipDiff:
+    """Разница состава одной группы"""
+    cn: str
+    group_email: Optional[str] = None
+    # Группа есть в FreeIPA / в Google
+    exists: bool = True
+    in_google: bool = True
+    to_add: Set[str] = field(default_factory=set)
+    to_remove: Set[str] = field(default_factory=set)
+    unchanged: int = 0
+    # Адреса участников Google без пользователя FreeIPA
+    unresolved: Set[str] = field(default_factory=set)
+
+    @property
+    def changes(self) -> int:
+        return len(self.to_add) + len(self.to_remove)
+
+
+@dataclass
+class MembershipComparison:
+    """Результат сравнения состава групп"""
+    groups: Dict[str, GroupMembershipDiff] = field(default_factory=dict)
+    dry_run: bool = True
+    added: int = 0
+    removed: int = 0
+    created_groups: List[str] = field(default_factory=list)
+    failures: Dict[str, str] = field(default_factory=dict)
+    rpc_calls: int = 0
+    google_batches: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def only_in_google(self) -> List[str]:
+        return sorted(cn for cn, diff in self.groups.items() if not diff.exists)
+
+    @property
+    def only_in_freeipa(self) -> List[str]:
+        return sorted(cn for cn, diff in self.groups.items() if not diff.in_google)
+
+    @property
+    def in_both(self) -> List[str]:
+        return sorted(cn for cn, diff in self.groups.items() if diff.exists and diff.in_google)
+
+    @property
+    def changed(self) -> List[GroupMembershipDiff]:
+        """Группы, состав которых нужно изменить (по убыванию числа изменений)"""
+        diffs = [diff for diff in self.groups.values() if diff.in_google and diff.changes]
+        return sorted(diffs, key=lambda diff: (-diff.changes, diff.cn))
+
+    def summary(self) -> Dict[str, Any]:
+        compared = [diff for diff in self.groups.values() if diff.in_google]
+        return {
+            'google_groups': len(compared),
+            'freeipa_groups': sum(1 for diff in self.groups.values() if diff.exists),
+            'in_both': len(self.in_both),
+            'only_in_google': len(self.only_in_google),
+            'only_in_freeipa': len(self.only_in_freeipa),
+            'groups_changed': len(self.changed),
+            'planned_adds': sum(len(diff.to_add) for diff in compared),
+            'planned_removes': sum(len(diff.to_remove) for diff in compared),
+            'unchanged': sum(diff.unchanged for diff in compared),
+            'unresolved': sum(len(diff.unresolved) for diff in compared),
+            'added': self.added,
+            'removed': self.removed,
+            'created_groups': len(self.created_groups),
+            'failed': len(self.failures),
+            'rpc_calls': self.rpc_calls,
+            'google_batches': self.google_batches,
+            'dry_run': self.dry_run,
+            'timings': {name: round(seconds, 2) for name, seconds in self.timings.items()},
+        }
+
+
+class GroupMembershipComparator:
+    """
+    Загрузка, сравнение и выравнивание состава групп Google и FreeIPA.
+    """
+
+    def __init__(self, freeipa_service, google_service=None, chunk_size: int = 100,
+                 batch_size: int = DEFAULT_BATCH_SIZE, rate_per_second: float = 10.0,
+                 protected_uids: Iterable[str] = PROTECTED_UIDS):
+        """
+        Args:
+            freeipa_service: FreeIPAService (нужны методы call и batch)
+            google_service: Сервис Google Directory API (для загрузки участников Google)
+            chunk_size: Вызовов в одном batch запросе FreeIPA
+            batch_size: Запросов в одном batch запросе Google
+            rate_per_second: Ограничение частоты запросов Google
+            protected_uids: Учетные записи, которые не удаляются из групп
+        """
+        self.ipa = freeipa_service
+        self.google_service = google_service
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_per_second)
+        self.protected_uids = {uid.lower() for uid in protected_uids}
+        self.rpc_calls = 0
+        self.google_batches = 0
+        self.google_failures: Dict[str, str] = {}
+
+    # ----- Загрузка -----
+
+    def load_freeipa(self, cns: Optional[Iterable[str]] = None) -> Tuple[IdentityIndex, Dict[str, Set[str]]]:
+        """
+        Пользователи и группы FreeIPA
+
+        Args:
+            cns: Группы (по умолчанию все)
+
+        Returns:
+            (индекс пользователей, cn -> uid участников)
+        """
+        enumerator = FreeIPAEnumerator(self.ipa, chunk_size=self.chunk_size)
+        index = IdentityIndex(enumerator.iter_entries('user', attributes=['uid', 'mail'], members=False))
+        # Отсутствующие в FreeIPA группы batch group_show пропускает (NotFound)
+        keys = sorted({cn.lower() for cn in cns}) if cns is not None else None
+        groups = {}
+        for entry in enumerator.iter_entries('group', attributes=['cn', 'member_user'], keys=keys):
+            cn = _values(entry.get('cn'))
+            if cn:
+                groups[cn[0].lower()] = {uid.lower() for uid in _values(entry.get('member_user'))}
+        self.rpc_calls += enumerator.rpc_calls
+        return index, groups
+
+    def google_group_emails(self, names: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Адреса групп Google
+
+        Args:
+            names: Адреса групп или имена FreeIPA (cn); по умолчанию все группы
+        """
+        groups = data_cache.get_groups(self.google_service) if self.google_service is not None else []
+        emails = sorted({group.get('email', '').lower() for group in groups if group.get('email')})
+        if names is None:
+            return emails
+        by_cn = {group_cn(email): email for email in emails}
+        resolved = []
+        for name in names:
+            name = name.strip().lower()
+            if '@' in name:
+                resolved.append(name)
+            elif name in by_cn:
+                resolved.append(by_cn[name])
+            else:
+                logger.warning(f"Группа {name} не найдена в Google")
+        return resolved
+
+    def load_google_members(self, group_emails: Iterable[str], use_cache: bool = True) -> Dict[str, Set[str]]:
+        """
+        Участники-пользователи групп Google: из кэша участников или пакетными запросами
+
+        Пустой список из кэша не считается составом группы и загружается
+        заново: по нему сравнение удалило бы из группы FreeIPA всех участников.
+
+        Args:
+            group_emails: Адреса групп
+            use_cache: Брать участников из кэша (False - всегда загружать заново)
+
+        Returns:
+            Адрес группы -> адреса участников (группы с ошибкой загрузки
+            отсутствуют, ошибки - в google_failures)
+        """
+        members: Dict[str, List[Dict[str, Any]]] = {}
+        pending: Dict[str, Optional[str]] = {}
+        for email in group_emails:
+            email = email.lower()
+            cached = group_members_cache.get(email) if use_cache else None
+            if cached:
+                members[email] = cached
+            else:
+                members[email] = []
+                pending[email] = None
+
+        if pending and self.google_service is None:
+            raise ValueError("Нет сервиса Google Directory API для загрузки участников групп")
+
+        # Первые страницы всех групп одним набором batch запросов, затем
+        # следующие страницы тех групп, у которых они есть
+        while pending:
+            calls = [(email, self._members_factory(email, token)) for email, token in pending.items()]
+            result = execute_batched(self.google_service, calls, batch_size=self.batch_size,
+                                     limiter=self.limiter)
+            self.google_batches += result.batches
+            next_pending = {}
+            for email, response in result.responses.items():
+                members[email].extend((response or {}).get('members', []))
+                token = (response or {}).get('nextPageToken')
+                if token:
+                    next_pending[email] = token
+                else:
+                    group_members_cache.put(email, members[email])
+            for email, error in result.errors.items():
+                self.google_failures[email] = str(error)
+                members.pop(email, None)
+            pending = next_pending
+
+        return {
+            email: {m.get('email', '').lower() for m in group_members
+                    if m.get('email') and m.get('type', 'USER') == 'USER'}
+            for email, group_members in members.items()
+        }
+
+    def _members_factory(self, group_email: str, page_token: Optional[str]):
+        params = {'groupKey': group_email, 'maxResults': 200, 'fields': MEMBER_FIELDS}
+        if page_token:
+            params['pageToken'] = page_token
+        return lambda: self.google_service.members().list(**params)
+
+    # ----- Сравнение -----
+
+    def compare(self, google_members: Dict[str, Iterable[str]], index: IdentityIndex,
+                freeipa_groups: Dict[str, Set[str]], remove_extra: bool = True,
+                include_freeipa_only: bool = True) -> MembershipComparison:
+        """
+        Разница состава всех групп за один проход
+
+        Args:
+            google_members: Адрес группы Google -> адреса участников
+            index: Индекс пользователей FreeIPA
+            freeipa_groups: cn -> uid участников
+            remove_extra: Удалять из групп FreeIPA участников, которых нет в Google
+            include_freeipa_only: Учитывать группы, которых нет в Google (только для отчета)
+        """
+        comparison = MembershipComparison(rpc_calls=self.rpc_calls, google_batches=self.google_batches)
+        for key, error in self.google_failures.items():
+            comparison.failures[f"{key}: участники Google"] = error
+
+        for group_email, emails in google_members.items():
+            cn = group_cn(group_email)
+            current = freeipa_groups.get(cn)
+            diff = GroupMembershipDiff(cn=cn, group_email=group_email.lower(), exists=current is not None)
+            current = current or set()
+            wanted: Set[str] = set()
+            for email in emails:
+                uid = index.uid_for(email)
+                if uid is None:
+                    diff.unresolved.add(email.lower())
+                else:
+                    wanted.add(uid)
+            diff.to_add = wanted - current
+            diff.unchanged = len(wanted & current)
+            if remove_extra:
+                diff.to_remove = current - wanted - self.protected_uids
+            comparison.groups[cn] = diff
+
+        if include_freeipa_only:
+            for cn in freeipa_groups:
+                if cn not in comparison.groups and cn not in SYSTEM_GROUPS:
+                    comparison.groups[cn] = GroupMembershipDiff(cn=cn, in_google=False)
+        return comparison
+
+    def run(self, groups: Optional[Iterable[str]] = None, remove_extra: bool = True) -> MembershipComparison:
+        """
+        Загружает обе стороны и сравнивает состав групп
+
+        Участники Google для сравнения с удалением загружаются заново, а не
+        из кэша: устаревший кэш привел бы к удалению актуальных участников.
+
+        Args:
+            groups: Адреса групп Google или cn (по умолчанию все группы Google)
+            remove_extra: Удалять из групп FreeIPA участников, которых нет в Google
+        """
+        started = time.perf_counter()
+        group_emails = self.google_group_emails(groups)
+        google_members = self.load_google_members(group_emails, use_cache=not remove_extra)
+        loaded_google = time.perf_counter()
+
+        cns = None if groups is None else [group_cn(email) for email in group_emails]
+        index, freeipa_groups = self.load_freeipa(cns)
+        loaded_freeipa = time.perf_counter()
+
+        comparison = self.compare(google_members, index, freeipa_groups, remove_extra,
+                                  include_freeipa_only=groups is None)
+        comparison.timings['load_google'] = loaded_google - started
+        comparison.timings['load_freeipa'] = loaded_freeipa - loaded_google
+        comparison.timings['compare'] = time.perf_counter() - loaded_freeipa
+        logger.info(f"Сравнение состава групп FreeIPA: {comparison.summary()}")
+        return comparison
+
+    # ----- Применение -----
+
+    def apply(self, comparison: MembershipComparison, create_missing: bool = False) -> MembershipComparison:
+        """
+        Применяет разницу командой batch
+
+        Args:
+            comparison: Результат compare()/run()
+            create_missing: Создавать группы, которых нет в FreeIPA (иначе они пропускаются)
+        """
+        calls: List[Tuple[str, List[Any], Dict[str, Any]]] = []
+        targets: List[Tuple[str, str, List[str]]] = []
+        for diff in comparison.changed:
+            if not diff.exists:
+                if not create_missing:
+                    continue
+                calls.append(('group_add', [diff.cn], {'description': diff.group_email or diff.cn}))
+                targets.append(('create', diff.cn, []))
+            # Участники - после создания группы (batch выполняется по порядку)
+            for action, uids in (('add', sorted(diff.to_add)), ('remove', sorted(diff.to_remove))):
+                method = 'group_add_member' if action == 'add' else 'group_remove_member'
+                for start in range(0, len(uids), MEMBERS_PER_CALL):
+                    chunk = uids[start:start + MEMBERS_PER_CALL]
+                    calls.append((method, [diff.cn], {'user': chunk}))
+                    targets.append((action, diff.cn, chunk))
+
+        comparison.dry_run = False
+        if not calls:
+            return comparison
+
+        started = time.perf_counter()
+        outcomes = self.ipa.batch(calls, chunk_size=self.chunk_size)
+        comparison.rpc_calls += (len(calls) + self.chunk_size - 1) // self.chunk_size
+        comparison.timings['apply'] = time.perf_counter() - started
+
+        for (action, cn, uids), outcome in zip(targets, outcomes):
+            error = outcome.get('error')
+            if action == 'create':
+                if error and outcome.get('error_name') != 'DuplicateEntry':
+                    comparison.failures[f"{cn}: создание группы"] = str(error)
+                else:
+                    comparison.created_groups.append(cn)
+                continue
+            if error:
+                for uid in uids:
+                    comparison.failures[f"{action} {uid} → {cn}"] = str(error)
+                continue
+            result = outcome.get('result') or {}
+            failed = ((result.get('failed') or {}).get('member') or {}).get('user') or []
+            for entry in failed:
+                uid, reason = (entry[0], entry[1]) if isinstance(entry, (list, tuple)) else (entry, '')
+                # Участник уже добавлен или уже удален - состояние уже нужное
+                if 'already a member' not in str(reason) and 'not a member' not in str(reason):
+                    comparison.failures[f"{action} {uid} → {cn}"] = str(reason)
+            completed = int(result.get('completed', len(uids) - len(failed)))
+            if action == 'add':
+                comparison.added += completed
+            else:
+                comparison.removed += completed
+
+        logger.info(f"Выравнивание состава групп FreeIPA: добавлено {comparison.added}, "
+                    f"удалено {comparison.removed}, ошибок {len(comparison.failures)}")
+        return comparison
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Параллельное выполнение операций синхронизации с FreeIPA.
+
+Блокирующие вызовы FreeIPAService выполняются в отдельном пуле потоков
+через loop.run_in_executor, поэтому цикл событий (и GUI) не блокируется.
+Число одновременно выполняемых задач ограничено, а все RPC вызовы к одному
+серверу проходят через общий ограничитель частоты (RateLimiter на сервер),
+сколько бы задач и окон ни работало одновременно. О ходе выполнения
+сообщают события SyncProgressEvent.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Одновременно обрабатываемых задач по умолчанию
+DEFAULT_WORKERS = 8
+# RPC вызовов в секунду к одному серверу FreeIPA по умолчанию
+DEFAULT_RPC_RATE = 20.0
+
+# Статусы событий прогресса
+STATUS_STARTED = 'started'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+@dataclass
+class SyncProgressEvent:
+    """Событие хода параллельной синхронизации"""
+    key: Hashable
+    status: str
+    done: int
+    total: int
+    result: Any = None
+    error: str = ''
+    elapsed: float = 0.0
+
+
+_server_limiters: Dict[str, RateLimiter] = {}
+_server_limiters_lock = threading.Lock()
+
+
+def get_server_limiter(server: str, rate_per_second: float = DEFAULT_RPC_RATE) -> RateLimiter:
+    """
+    Общий ограничитель частоты RPC для сервера FreeIPA
+
+    Args:
+        server: Адрес сервера
+        rate_per_second: Частота для нового ограничителя (существующий не меняется)
+    """
+    key = server.rstrip('/').lower()
+    with _server_limiters_lock:
+        limiter = _server_limiters.get(key)
+        if limiter is None:
+            limiter = _server_limiters[key] = RateLimiter(rate_per_second)
+        return limiter
+
+
+class RateLimitedFreeIPA:
+    """
+    FreeIPAService, каждый RPC вызов которого проходит через ограничитель частоты.
+
+    call - один вызов, batch - один вызов на порцию; остальные методы
+    сервиса (create_group, add_user_to_group, ...) считаются одним вызовом.
+    """
+
+    def __init__(self, freeipa_service, limiter: RateLimiter):
+        self._service = freeipa_service
+        self.limiter = limiter
+
+    def call(self, method: str, args: Optional[List[Any]] = None,
+             options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self.limiter.acquire()
+        return self._service.call(method, args, options)
+
+    def batch(self, calls: List[Tuple[str, List[Any], Dict[str, Any]]],
+              chunk_size: int = 100) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        chunk_size = max(1, chunk_size)
+        for start in range(0, len(calls), chunk_size):
+            self.limiter.acquire()
+            results.extend(self._service.batch(calls[start:start + chunk_size], chunk_size=chunk_size))
+        return results
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._service, name)
+        if not callable(attribute):
+            return attribute
+
+        def limited(*args, **kwargs):
+            self.limiter.acquire()
+            return attribute(*args, **kwargs)
+        return limited
+
+
+class ParallelSyncExecutor:
+    """
+    Выполнение блокирующих задач с ограниченным параллелизмом из asyncio.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS,
+                 progress_callback: Optional[Callable[[SyncProgressEvent], None]] = None):
+        """
+        Args:
+            max_workers: Одновременно выполняемых задач
+            progress_callback: Вызывается в потоке цикла событий при запуске
+                и завершении каждой задачи
+        """
+        self.max_workers = max(1, max_workers)
+        self.progress_callback = progress_callback
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Останавливает запуск новых задач (выполняемые завершаются)"""
+        self._cancelled.set()
+
+    def _emit(self, event: SyncProgressEvent):
+        if self.progress_callback is None:
+            return
+        try:
+            self.progress_callback(event)
+        except Exception as e:
+            logger.debug(f"Ошибка обработчика прогресса: {e}")
+
+    async def run(self, tasks: Iterable[Tuple[Hashable, Callable[[], Any]]]) -> Dict[Hashable, Any]:
+        """
+        Выполняет задачи
+
+        Args:
+            tasks: Пары (ключ, функция без аргументов)
+
+        Returns:
+            Ключ -> результат функции или исключение, которым она завершилась
+            (задачи, не запущенные из-за cancel(), отсутствуют)
+        """
+        tasks = list(tasks)
+        total = len(tasks)
+        results: Dict[Hashable, Any] = {}
+        if not tasks:
+            return results
+
+        loop = asyncio.get_event_loop()
+        semaphore = asyncio.Semaphore(self.max_workers)
+        done = 0
+        started_all = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='freeipa-sync')
+
+        async def run_one(key: Hashable, function: Callable[[], Any]):
+            nonlocal done
+            async with semaphore:
+                if self._cancelled.is_set():
+                    return
+                self._emit(SyncProgressEvent(key, STATUS_STARTED, done, total))
+                started = time.perf_counter()
+                try:
+                    result = await loop.run_in_executor(pool, function)
+                except Exception as e:
+                    results[key] = e
+                    done += 1
+                    self._emit(SyncProgressEvent(key, STATUS_FAILED, done, total, error=str(e),
+                                                 elapsed=time.perf_counter() - started))
+                    return
+                results[key] = result
+                done += 1
+                self._emit(SyncProgressEvent(key, STATUS_DONE, done, total, result=result,
+                                             elapsed=time.perf_counter() - started))
+
+        try:
+            await asyncio.gather(*(run_one(key, function) for key, function in tasks))
+        finally:
+            pool.shutdown(wait=False)
+
+        logger.info(f"Параллельная синхронизация FreeIPA: {done}/{total} задач за "
+                    f"{time.perf_counter() - started_all:.2f} с, потоков {self.max_workers}")
+        return results
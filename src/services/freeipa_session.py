@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Долгоживущая сессия FreeIPA JSON-RPC.
+
+Вход по паролю выполняется один раз: cookie ipa_session сохраняется на диск
+в зашифрованном виде (SecurityManager) и используется следующими запусками
+и окнами с тем же паролем (в записи хранится его соленый хеш). Запросы
+идут через общий requests.Session с пулом соединений, повторный вход
+выполняется только при ответе 401.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..utils.exceptions import CredentialsError, NetworkError
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = 'ipa_session'
+# Время жизни сессии FreeIPA по умолчанию (ipa.conf session_auth_duration)
+SESSION_LIFETIME = 20 * 60
+# Соединений в пуле HTTP на один сервер
+POOL_SIZE = 10
+# Варианты имени входа после указанного пользователем
+LOGIN_REALM = 'infra.int.sputnik8.com'
+# Итераций PBKDF2 для хеша пароля в сохраненной сессии
+PASSWORD_HASH_ITERATIONS = 100_000
+
+
+class FreeIPASessionCache:
+    """
+    Зашифрованное хранилище cookie сессий FreeIPA на диске.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, cipher=None):
+        """
+        Args:
+            path: Файл хранилища (по умолчанию security/freeipa_sessions.json)
+            cipher: Объект с encrypt_data/decrypt_data (по умолчанию security_manager)
+        """
+        self._path = Path(path) if path else None
+        self._cipher = cipher
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            from ..utils.file_paths import get_security_path
+            self._path = get_security_path('freeipa_sessions.json')
+        return self._path
+
+    @property
+    def cipher(self):
+        if self._cipher is None:
+            from ..utils.security_manager import security_manager
+            self._cipher = security_manager
+        return self._cipher
+
+    @staticmethod
+    def _key(server: str, username: str) -> str:
+        return hashlib.sha256(f"{server.rstrip('/').lower()}|{username.lower()}".encode()).hexdigest()
+
+    @staticmethod
+    def _password_hash(password: str, salt: str) -> str:
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt),
+                                   PASSWORD_HASH_ITERATIONS).hex()
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, entries: Dict[str, str]):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            tmp_path.replace(self.path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить сессию FreeIPA: {e}")
+
+    def load(self, server: str, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """
+        Действующая сессия: {'cookie', 'expires', 'login_name'} или None
+
+        Сессия, сохраненная с другим паролем, не возвращается: иначе неверный
+        пароль считался бы проверенным до истечения cookie.
+        """
+        with self._lock:
+            token = self._read().get(self._key(server, username))
+        if not token:
+            return None
+        try:
+            entry = json.loads(self.cipher.decrypt_data(token))
+        except Exception as e:
+            logger.debug(f"Сохраненная сессия FreeIPA не читается: {e}")
+            return None
+        if entry.get('expires', 0) <= time.time():
+            return None
+        salt = entry.get('salt')
+        if not salt or not hmac.compare_digest(entry.get('password_hash', ''),
+                                               self._password_hash(password, salt)):
+            logger.debug("Сохраненная сессия FreeIPA получена с другим паролем")
+            return None
+        return entry
+
+    def save(self, server: str, username: str, password: str, cookie: str, expires: float,
+             login_name: str):
+        """Сохраняет cookie сессии вместе с соленым хешем пароля"""
+        salt = os.urandom(16).hex()
+        token = self.cipher.encrypt_data(json.dumps(
+            {'cookie': cookie, 'expires': expires, 'login_name': login_name,
+             'salt': salt, 'password_hash': self._password_hash(password, salt)}))
+        with self._lock:
+            entries = self._read()
+            entries[self._key(server, username)] = token
+            self._write(entries)
+
+    def invalidate(self, server: str, username: str):
+        """Удаляет сохраненную сессию"""
+        with self._lock:
+            entries = self._read()
+            if entries.pop(self._key(server, username), None) is not None:
+                self._write(entries)
+
+
+class FreeIPASession:
+    """
+    Потокобезопасная сессия JSON-RPC с входом по паролю.
+    """
+
+    def __init__(self, server: str, username: str, password: str, verify_ssl: bool = True,
+                 timeout: int = 30, cache: Optional[FreeIPASessionCache] = None, http=None):
+        """
+        Args:
+            server: Адрес сервера (схема https:// добавляется при отсутствии)
+            username: Имя пользователя
+            password: Пароль
+            verify_ssl: Проверять сертификат сервера
+            timeout: Таймаут HTTP запроса, сек
+            cache: Хранилище cookie (None - общее зашифрованное на диске)
+            http: Сессия requests (по умолчанию создается с пулом соединений)
+        """
+        if not server.startswith(('http://', 'https://')):
+            server = f"https://{server}"
+        self.host = server.rstrip('/')
+        self.username = username
+        self.password = password
+        self.verify_ssl = verify_ssl
+        self.timeout = timeout
+        self.cache = cache if cache is not None else FreeIPASessionCache()
+        self._http = http
+        self._lock = threading.RLock()
+        self._authenticated = False
+        self._login_name: Optional[str] = None
+        self.logins = 0
+        self.rpc_calls = 0
+
+    @property
+    def http(self):
+        """Общая сессия requests с пулом соединений"""
+        if self._http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            http.mount('https://', adapter)
+            http.mount('http://', adapter)
+            http.verify = self.verify_ssl
+            self._http = http
+        return self._http
+
+    @property
+    def authenticated(self) -> bool:
+        return self._authenticated
+
+    def _login_names(self) -> List[str]:
+        names = [self._login_name, self.username, f"{self.username}@{LOGIN_REALM}",
+                 self.username.lower(), f"{self.username.lower()}@{LOGIN_REALM}"]
+        return [name for name in dict.fromkeys(names) if name]
+
+    def _restore(self) -> bool:
+        entry = self.cache.load(self.host, self.username, self.password)
+        if not entry:
+            return False
+        self.http.cookies.set(SESSION_COOKIE, entry['cookie'])
+        self._login_name = entry.get('login_name')
+        self._authenticated = True
+        logger.debug(f"Сессия FreeIPA восстановлена для {self.username}")
+        return True
+
+    def _session_cookie(self) -> Tuple[Optional[str], float]:
+        expires = time.time() + SESSION_LIFETIME
+        for cookie in self.http.cookies:
+            if cookie.name == SESSION_COOKIE:
+                if cookie.expires:
+                    expires = min(expires, float(cookie.expires))
+                return cookie.value, expires
+        return None, expires
+
+    def login(self, force: bool = False) -> bool:
+        """
+        Вход: сохраненная сессия или пароль
+
+        Args:
+            force: Не использовать текущую и сохраненную сессии
+
+        Returns:
+            True если сессия получена
+        """
+        with self._lock:
+            if not force and self._authenticated:
+                return True
+            if not force and self._restore():
+                return True
+
+            self._authenticated = False
+            login_url = f"{self.host}/ipa/session/login_password"
+            for login_name in self._login_names():
+                self.logins += 1
+                try:
+                    response = self.http.post(
+                        login_url,
+                        data={'user': login_name, 'password': self.password},
+                        headers={'Referer': f"{self.host}/ipa/ui/",
+                                 'Content-Type': 'application/x-www-form-urlencoded',
+                                 'Accept': 'text/plain'},
+                        timeout=self.timeout
+                    )
+                except Exception as e:
+                    raise NetworkError(f"FreeIPA недоступен: {e}")
+
+                cookie, expires = self._session_cookie()
+                if response.status_code == 200 and cookie:
+                    self._authenticated = True
+                    self._login_name = login_name
+                    self.cache.save(self.host, self.username, self.password, cookie, expires, login_name)
+                    logger.info(f"Вход в FreeIPA выполнен ({login_name})")
+                    return True
+                # 401 - неверное имя или пароль, пробуем следующий вариант имени
+                logger.debug(f"Вход в FreeIPA как {login_name}: HTTP {response.status_code}")
+
+            self.cache.invalidate(self.host, self.username)
+            logger.error(f"Не удалось войти в FreeIPA как {self.username}")
+            return False
+
+    def _post(self, payload: Dict[str, Any]):
+        self.rpc_calls += 1
+        try:
+            return self.http.post(
+                f"{self.host}/ipa/session/json",
+                json=payload,
+                headers={'Content-Type': 'application/json', 'Accept': 'application/json',
+                         'Referer': f"{self.host}/ipa/ui/"},
+                timeout=self.timeout
+            )
+        except Exception as e:
+            raise NetworkError(f"Ошибка запроса к FreeIPA: {e}")
+
+    def request(self, method: str, args: Optional[List[Any]] = None,
+                options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Вызов JSON-RPC; при 401 выполняется повторный вход и повтор вызова
+
+        Returns:
+            Полный ответ сервера с полями result и error
+        """
+        if not self._authenticated and not self.login():
+            raise CredentialsError("Нет сессии FreeIPA: вход не выполнен")
+
+        payload = {'method': method, 'params': [args or [], options or {}]}
+        response = self._post(payload)
+        if response.status_code == 401:
+            logger.info("Сессия FreeIPA истекла, повторный вход")
+            self.cache.invalidate(self.host, self.username)
+            if not self.login(force=True):
+                raise CredentialsError("Сессия FreeIPA истекла, повторный вход не удался")
+            response = self._post(payload)
+        if response.status_code != 200:
+            raise NetworkError(f"{method}: HTTP {response.status_code}")
+        return response.json()
+
+    def logout(self):
+        """Завершает сессию на сервере и удаляет сохраненную"""
+        with self._lock:
+            if self._authenticated:
+                try:
+                    self.http.post(f"{self.host}/ipa/session/logout",
+                                   headers={'Referer': f"{self.host}/ipa/ui/"}, timeout=self.timeout)
+                except Exception as e:
+                    logger.debug(f"Ошибка выхода из FreeIPA: {e}")
+            self._authenticated = False
+            self.cache.invalidate(self.host, self.username)
+            self.http.cookies.clear()
+
+
+_sessions: Dict[Tuple[str, str, bool], FreeIPASession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_freeipa_session(server: str, username: str, password: str, verify_ssl: bool = True,
+                        timeout: int = 30, cache: Optional[FreeIPASessionCache] = None) -> FreeIPASession:
+    """
+    Общая сессия для сервера и пользователя
+
+    Все подключения (окна GUI, CLI, интеграция) с одинаковыми параметрами
+    используют одну сессию и один пул соединений.
+
+    Args:
+        cache: Хранилище cookie для новой сессии (по умолчанию общее на диске)
+    """
+    if not server.startswith(('http://', 'https://')):
+        server = f"https://{server}"
+    key = (server.rstrip('/').lower(), username.lower(), verify_ssl)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None or session.password != password:
+            session = FreeIPASession(server, username, password, verify_ssl, timeout, cache=cache)
+            _sessions[key] = session
+        return session
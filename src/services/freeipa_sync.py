@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+Синхронизация пользователей Google Workspace в FreeIPA по разнице состояний.
+
+Обе стороны загружаются целиком (список пользователей Google и полное
+перечисление пользователей FreeIPA с нужными атрибутами), по ним вычисляются создания, изменения, блокировки
+и недостающие членства в группах по умолчанию. Изменения применяются
+командой FreeIPA batch пакетами, поэтому синхронизация тысяч
+пользователей занимает несколько RPC вызовов, а неизменившиеся
+пользователи не затрагиваются. Инкрементальный режим по сохраненным
+хешам (freeipa_sync_state) не читает из FreeIPA и неизменившихся в Google.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .freeipa_enumeration import FreeIPAEnumerator
+from .freeipa_sync_state import KIND_USER, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Атрибуты FreeIPA, которые берутся из Google (FreeIPA attr -> поле google_user_attributes)
+MANAGED_ATTRIBUTES = {
+    'givenname': 'givenname',
+    'sn': 'sn',
+    'mail': 'mail',
+    'title': 'title',
+    'ou': 'department',
+    'telephonenumber': 'telephonenumber',
+}
+
+# Атрибуты записей FreeIPA, которые нужны для вычисления разницы
+LOADED_ATTRIBUTES = ['uid', 'nsaccountlock', 'memberof_group'] + list(MANAGED_ATTRIBUTES)
+
+# Учетные записи, которые синхронизация никогда не блокирует
+PROTECTED_UIDS = {'admin'}
+
+# Ошибки batch, означающие, что изменение уже применено
+ALREADY_APPLIED_ERRORS = {'DuplicateEntry', 'EmptyModlist', 'AlreadyInactive', 'AlreadyActive'}
+ALREADY_APPLIED_CODES = {4002, 4202, 4010, 4009}
+
+# Вызовов group_add_member на группу: участники передаются списком
+MEMBERS_PER_CALL = 500
+
+
+def google_user_attributes(google_user: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Атрибуты пользователя FreeIPA по профилю Google Directory API
+
+    Returns:
+        Словарь с uid, givenname, sn, mail, title, department, telephonenumber
+        или пустой словарь, если у пользователя нет primaryEmail
+    """
+    email = google_user.get('primaryEmail', '')
+    uid = email.split('@')[0].lower()
+    if not uid:
+        return {}
+
+    organization = (google_user.get('organizations') or [{}])[0]
+    phone = (google_user.get('phones') or [{}])[0]
+    return {
+        'uid': uid,
+        'givenname': google_user.get('name', {}).get('givenName', ''),
+        'sn': google_user.get('name', {}).get('familyName', ''),
+        'mail': email,
+        'title': organization.get('title', ''),
+        'department': organization.get('department', ''),
+        'telephonenumber': phone.get('value', ''),
+    }
+
+
+def _first(entry: Dict[str, Any], attribute: str) -> str:
+    """Значение атрибута FreeIPA (в ответах атрибуты - списки)"""
+    value = entry.get(attribute)
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else ''
+    return '' if value is None else str(value)
+
+
+def _is_locked(entry: Dict[str, Any]) -> bool:
+    value = entry.get('nsaccountlock', False)
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else False
+    return value is True or str(value).upper() == 'TRUE'
+
+
+def _already_applied(outcome: Dict[str, Any]) -> bool:
+    return (outcome.get('error_name') in ALREADY_APPLIED_ERRORS
+            or outcome.get('error_code') in ALREADY_APPLIED_CODES)
+
+
+@dataclass
+class FreeIPASyncDiff:
+    """Изменения, необходимые для приведения FreeIPA к состоянию Google"""
+    to_create: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    to_update: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    to_disable: List[str] = field(default_factory=list)
+    memberships: Dict[str, Set[str]] = field(default_factory=dict)
+    unchanged: int = 0
+    skipped: Dict[str, str] = field(default_factory=dict)
+    emails: Dict[str, str] = field(default_factory=dict)
+    # Не изменились с прошлой синхронизации (по сохраненному состоянию)
+    cached: int = 0
+
+    @property
+    def changes(self) -> int:
+        return (len(self.to_create) + len(self.to_update) + len(self.to_disable)
+                + sum(len(uids) for uids in self.memberships.values()))
+
+
+@dataclass
+class FreeIPASyncReport:
+    """Результат синхронизации"""
+    diff: FreeIPASyncDiff
+    dry_run: bool = False
+    created: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    disabled: List[str] = field(default_factory=list)
+    memberships_added: int = 0
+    failures: Dict[str, str] = field(default_factory=dict)
+    rpc_calls: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def user_results(self) -> Dict[str, bool]:
+        """Email -> успешна ли синхронизация пользователя"""
+        failed = {key.split(' ')[0] for key in self.failures}
+        return {email: uid not in failed for uid, email in self.diff.emails.items()}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'planned_creates': len(self.diff.to_create),
+            'planned_updates': len(self.diff.to_update),
+            'planned_disables': len(self.diff.to_disable),
+            'planned_memberships': sum(len(uids) for uids in self.diff.memberships.values()),
+            'unchanged': self.diff.unchanged,
+            'cached': self.diff.cached,
+            'skipped': len(self.diff.skipped),
+            'created': len(self.created),
+            'updated': len(self.updated),
+            'disabled': len(self.disabled),
+            'memberships_added': self.memberships_added,
+            'failed': len(self.failures),
+            'rpc_calls': self.rpc_calls,
+            'timings': {name: round(seconds, 2) for name, seconds in self.timings.items()},
+        }
+
+
+class FreeIPASyncEngine:
+    """
+    Вычисление и применение разницы между пользователями Google и FreeIPA.
+    """
+
+    def __init__(self, freeipa_service, chunk_size: int = 100,
+                 protected_uids: Iterable[str] = PROTECTED_UIDS):
+        """
+        Args:
+            freeipa_service: FreeIPAService (нужны методы call и batch)
+            chunk_size: Вызовов в одном batch запросе
+            protected_uids: Учетные записи, которые не блокируются
+        """
+        self.ipa = freeipa_service
+        self.chunk_size = chunk_size
+        self.protected_uids = {uid.lower() for uid in protected_uids}
+        self.load_rpc_calls = 0
+
+    # ----- Загрузка -----
+
+    def load_freeipa_users(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Все пользователи FreeIPA: uid -> запись
+
+        Перечисление не ограничено sizelimit сервера; из записей оставляются
+        только атрибуты, которые участвуют в сравнении.
+        """
+        enumerator = FreeIPAEnumerator(self.ipa, chunk_size=self.chunk_size)
+        users = {_first(entry, 'uid').lower(): entry
+                 for entry in enumerator.iter_entries('user', attributes=LOADED_ATTRIBUTES)}
+        self.load_rpc_calls = enumerator.rpc_calls
+        return users
+
+    # ----- Разница -----
+
+    def plan(self, google_users: Iterable[Dict[str, Any]], freeipa_users: Dict[str, Dict[str, Any]],
+             default_groups: Iterable[str] = (), disable_suspended: bool = True,
+             disable_missing_domain: Optional[str] = None) -> FreeIPASyncDiff:
+        """
+        Вычисляет изменения
+
+        Args:
+            google_users: Пользователи Google Directory API (primaryEmail, name, ...)
+            freeipa_users: Пользователи FreeIPA: uid -> запись user_find
+            default_groups: Группы FreeIPA, в которых должны состоять все активные пользователи
+            disable_suspended: Блокировать в FreeIPA заблокированных в Google
+            disable_missing_domain: Блокировать пользователей FreeIPA с почтой в
+                этом домене, которых нет в Google (None - не блокировать)
+        """
+        diff = FreeIPASyncDiff()
+        groups = [cn for cn in dict.fromkeys(default_groups) if cn]
+        for cn in groups:
+            diff.memberships[cn] = set()
+        seen: Set[str] = set()
+
+        for google_user in google_users:
+            attributes = google_user_attributes(google_user)
+            if not attributes:
+                continue
+            uid = attributes['uid']
+            email = attributes['mail'].lower()
+            if uid in seen:
+                diff.skipped[email] = f"uid {uid} уже занят другим пользователем Google"
+                continue
+            seen.add(uid)
+            diff.emails[uid] = email
+            suspended = bool(google_user.get('suspended'))
+            existing = freeipa_users.get(uid)
+
+            if existing is None:
+                if suspended:
+                    diff.skipped[email] = 'заблокирован в Google'
+                    continue
+                diff.to_create[uid] = self._create_options(attributes)
+            else:
+                changes = {
+                    ipa_attr: attributes[field_name]
+                    for ipa_attr, field_name in MANAGED_ATTRIBUTES.items()
+                    if attributes[field_name] and attributes[field_name] != _first(existing, ipa_attr)
+                }
+                if changes:
+                    diff.to_update[uid] = changes
+                if suspended and disable_suspended and not _is_locked(existing) \
+                        and uid not in self.protected_uids:
+                    diff.to_disable.append(uid)
+                if not changes and uid not in diff.to_disable:
+                    diff.unchanged += 1
+
+            if not suspended:
+                member_of = {cn.lower() for cn in (existing or {}).get('memberof_group', [])}
+                for cn in groups:
+                    if cn.lower() not in member_of:
+                        diff.memberships[cn].add(uid)
+
+        if disable_missing_domain:
+            suffix = f"@{disable_missing_domain.lower()}"
+            for uid, entry in freeipa_users.items():
+                if uid in seen or uid in self.protected_uids or _is_locked(entry):
+                    continue
+                if _first(entry, 'mail').lower().endswith(suffix):
+                    diff.to_disable.append(uid)
+
+        diff.memberships = {cn: uids for cn, uids in diff.memberships.items() if uids}
+        return diff
+
+    @staticmethod
+    def _create_options(attributes: Dict[str, str]) -> Dict[str, str]:
+        uid = attributes['uid']
+        options = {
+            'givenname': attributes['givenname'] or uid,
+            'sn': attributes['sn'] or uid,
+        }
+        options['cn'] = f"{options['givenname']} {options['sn']}".strip()
+        for ipa_attr, field_name in MANAGED_ATTRIBUTES.items():
+            if ipa_attr not in options and attributes[field_name]:
+                options[ipa_attr] = attributes[field_name]
+        return options
+
+    # ----- Применение -----
+
+    def apply(self, report: FreeIPASyncReport) -> FreeIPASyncReport:
+        """Применяет разницу отчета командой batch"""
+        diff = report.diff
+        calls: List[Tuple[str, List[Any], Dict[str, Any]]] = []
+        targets: List[Tuple[str, str]] = []
+
+        for uid, options in diff.to_create.items():
+            calls.append(('user_add', [uid], dict(options)))
+            targets.append(('create', uid))
+        for uid, changes in diff.to_update.items():
+            calls.append(('user_mod', [uid], dict(changes)))
+            targets.append(('update', uid))
+        for uid in diff.to_disable:
+            calls.append(('user_disable', [uid], {}))
+            targets.append(('disable', uid))
+        # Членство - после создания пользователей (batch выполняется по порядку)
+        for cn, uids in diff.memberships.items():
+            ordered = sorted(uids)
+            for start in range(0, len(ordered), MEMBERS_PER_CALL):
+                chunk = ordered[start:start + MEMBERS_PER_CALL]
+                calls.append(('group_add_member', [cn], {'user': chunk}))
+                targets.append(('member', cn))
+
+        if not calls:
+            return report
+
+        started = time.perf_counter()
+        outcomes = self.ipa.batch(calls, chunk_size=self.chunk_size)
+        report.rpc_calls += (len(calls) + self.chunk_size - 1) // self.chunk_size
+        report.timings['apply'] = time.perf_counter() - started
+
+        for (action, key), (method, args, options), outcome in zip(targets, calls, outcomes):
+            error = outcome.get('error')
+            if action == 'member':
+                self._collect_membership(report, key, options['user'], outcome)
+                continue
+            if error and not _already_applied(outcome):
+                report.failures[f"{key} {action}"] = str(error)
+            elif action == 'create':
+                report.created.append(key)
+            elif action == 'update':
+                report.updated.append(key)
+            else:
+                report.disabled.append(key)
+        return report
+
+    @staticmethod
+    def _collect_membership(report: FreeIPASyncReport, cn: str, uids: List[str],
+                            outcome: Dict[str, Any]):
+        if outcome.get('error'):
+            for uid in uids:
+                report.failures[f"{uid} → {cn}"] = str(outcome['error'])
+            return
+        result = outcome.get('result') or {}
+        failed = ((result.get('failed') or {}).get('member') or {}).get('user') or []
+        for entry in failed:
+            uid, reason = (entry[0], entry[1]) if isinstance(entry, (list, tuple)) else (entry, '')
+            if 'already a member' not in str(reason):
+                report.failures[f"{uid} → {cn}"] = str(reason)
+        report.memberships_added += int(result.get('completed', len(uids) - len(failed)))
+
+    def sync(self, google_users: Iterable[Dict[str, Any]], default_groups: Iterable[str] = (),
+             dry_run: bool = False, disable_suspended: bool = True,
+             disable_missing_domain: Optional[str] = None, state=None) -> FreeIPASyncReport:
+        """
+        Загружает FreeIPA, вычисляет разницу с Google и применяет ее
+
+        Args:
+            state: FreeIPASyncStateStore для сохранения хешей синхронизированных
+                пользователей (для последующих инкрементальных запусков)
+
+        Returns:
+            Отчет с разницей, результатами и временем этапов
+        """
+        started = time.perf_counter()
+        google_users = list(google_users)
+        freeipa_users = self.load_freeipa_users()
+        loaded = time.perf_counter()
+
+        diff = self.plan(google_users, freeipa_users, default_groups,
+                         disable_suspended, disable_missing_domain)
+        report = FreeIPASyncReport(diff=diff, dry_run=dry_run, rpc_calls=self.load_rpc_calls)
+        report.timings['load'] = loaded - started
+        report.timings['diff'] = time.perf_counter() - loaded
+
+        logger.info(f"FreeIPA синхронизация: создать {len(diff.to_create)}, изменить {len(diff.to_update)}, "
+                    f"заблокировать {len(diff.to_disable)}, без изменений {diff.unchanged}")
+        if not dry_run:
+            self.apply(report)
+            if state is not None:
+                self._record_state(report, state, self.user_state_hashes(google_users, default_groups))
+        report.timings['total'] = time.perf_counter() - started
+        return report
+
+    # ----- Инкрементальная синхронизация -----
+
+    @staticmethod
+    def user_state_hashes(google_users: Iterable[Dict[str, Any]],
+                          default_groups: Iterable[str] = ()) -> Dict[str, str]:
+        """
+        Хеши желаемого состояния пользователей: uid -> хеш
+
+        В хеш входят атрибуты, которые переносятся в FreeIPA, блокировка и
+        группы по умолчанию, поэтому изменение любого из них приводит к
+        повторной синхронизации пользователя.
+        """
+        groups = sorted({cn.lower() for cn in default_groups if cn})
+        hashes: Dict[str, str] = {}
+        for google_user in google_users:
+            attributes = google_user_attributes(google_user)
+            if attributes and attributes['uid'] not in hashes:
+                hashes[attributes['uid']] = content_hash({
+                    'attributes': attributes,
+                    'suspended': bool(google_user.get('suspended')),
+                    'groups': groups,
+                })
+        return hashes
+
+    def sync_incremental(self, google_users: Iterable[Dict[str, Any]], state,
+                         default_groups: Iterable[str] = (), dry_run: bool = False,
+                         disable_suspended: bool = True,
+                         disable_missing_domain: Optional[str] = None) -> FreeIPASyncReport:
+        """
+        Синхронизирует только пользователей, изменившихся в Google с прошлой синхронизации
+
+        Пользователи, хеш которых совпадает с сохраненным, не читаются из
+        FreeIPA. Изменения, сделанные в FreeIPA вручную, такой запуск не
+        обнаруживает (для этого нужна периодическая полная синхронизация),
+        а блокировка отсутствующих в Google касается только пользователей,
+        которые ранее были синхронизированы.
+
+        Args:
+            state: FreeIPASyncStateStore
+        """
+        started = time.perf_counter()
+        google_users = list(google_users)
+        hashes = self.user_state_hashes(google_users, default_groups)
+        stored = state.hashes(KIND_USER)
+
+        changed = {uid: digest for uid, digest in hashes.items() if stored.get(uid) != digest}
+        changed_users = [user for user in google_users
+                         if google_user_attributes(user).get('uid') in changed]
+        removed: List[str] = []
+        if disable_missing_domain:
+            removed = sorted(uid for uid in stored if uid not in hashes and uid not in self.protected_uids)
+
+        enumerator = FreeIPAEnumerator(self.ipa, chunk_size=self.chunk_size)
+        keys = sorted(set(changed) | set(removed))
+        freeipa_users = {
+            _first(entry, 'uid').lower(): entry
+            for entry in enumerator.iter_entries('user', attributes=LOADED_ATTRIBUTES, keys=keys)
+        } if keys else {}
+        loaded = time.perf_counter()
+
+        diff = self.plan(changed_users, freeipa_users, default_groups,
+                         disable_suspended, disable_missing_domain)
+        diff.cached = len(hashes) - len(changed)
+        report = FreeIPASyncReport(diff=diff, dry_run=dry_run, rpc_calls=enumerator.rpc_calls)
+        report.timings['load'] = loaded - started
+        report.timings['diff'] = time.perf_counter() - loaded
+
+        logger.info(f"FreeIPA инкрементальная синхронизация: изменилось {len(changed)}, "
+                    f"без изменений {diff.cached}, удалено из Google {len(removed)}")
+        if not dry_run:
+            self.apply(report)
+            self._record_state(report, state, changed, removed)
+        report.timings['total'] = time.perf_counter() - started
+        return report
+
+    @staticmethod
+    def _record_state(report: FreeIPASyncReport, state, hashes: Dict[str, str],
+                      removed: Iterable[str] = ()):
+        """Сохраняет хеши пользователей, синхронизированных без ошибок"""
+        failed = {key.split(' ')[0] for key in report.failures}
+        created, updated, disabled = set(report.created), set(report.updated), set(report.disabled)
+        entries: Dict[str, Tuple[Optional[str], str]] = {}
+        for uid, digest in hashes.items():
+            if uid in failed:
+                entries[uid] = (None, 'failed')
+            elif uid in created:
+                entries[uid] = (digest, 'created')
+            elif uid in updated:
+                entries[uid] = (digest, 'updated')
+            elif uid in disabled:
+                entries[uid] = (digest, 'disabled')
+            else:
+                entries[uid] = (digest, 'unchanged')
+        state.record(KIND_USER, entries)
+        # Заблокированные или отсутствующие в FreeIPA больше не отслеживаются
+        state.forget(KIND_USER, [uid for uid in removed if uid not in failed])
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Локальное состояние синхронизации с FreeIPA.
+
+Для каждого пользователя и группы хранится хеш желаемого состояния из
+Google, с которым запись была успешно синхронизирована, и результат
+синхронизации. Инкрементальная синхронизация обрабатывает только записи,
+хеш которых изменился, и не читает остальные из FreeIPA.
+
+Состояние относится к конкретному серверу FreeIPA: записи хранятся с
+идентификатором сервера (URL и домен), и хранилище видит только записи
+своего сервера, поэтому после переключения на другой сервер синхронизация
+снова полная.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Виды записей
+KIND_USER = 'user'
+KIND_GROUP = 'group'
+
+# Версия схемы (PRAGMA user_version); в версии 1 в ключ добавлен сервер
+SCHEMA_VERSION = 1
+
+
+def server_id(server_url: str, domain: str = '') -> str:
+    """Идентификатор сервера FreeIPA для состояния синхронизации"""
+    server = server_url.strip().lower().rstrip('/')
+    return f"{server}|{domain.strip().lower()}" if domain else server
+
+
+def content_hash(data: Any) -> str:
+    """Хеш содержимого (словари сравниваются без учета порядка ключей)"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class FreeIPASyncStateStore:
+    """
+    Потокобезопасное хранилище состояния синхронизации в SQLite.
+    """
+
+    def __init__(self, path: Union[str, Path], server: str = ''):
+        """
+        Args:
+            path: Файл базы данных (':memory:' - без сохранения на диск)
+            server: Идентификатор сервера FreeIPA (см. server_id)
+        """
+        self.path = str(path)
+        self.server = server
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._migrate()
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                server TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                content_hash TEXT,
+                result TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (server, kind, key)
+            )
+        ''')
+        self._conn.commit()
+
+    def _migrate(self):
+        """Состояние без сервера нельзя отнести ни к одному серверу - оно удаляется"""
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            self._conn.execute('DROP TABLE IF EXISTS sync_state')
+        self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def hashes(self, kind: str) -> Dict[str, str]:
+        """Хеши успешно синхронизированных записей: ключ -> хеш"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT key, content_hash FROM sync_state '
+                'WHERE server = ? AND kind = ? AND content_hash IS NOT NULL',
+                (self.server, kind)
+            ).fetchall()
+        return dict(rows)
+
+    def results(self, kind: str) -> Dict[str, str]:
+        """Результаты последней синхронизации: ключ -> результат"""
+        with self._lock:
+            rows = self._conn.execute('SELECT key, result FROM sync_state WHERE server = ? AND kind = ?',
+                                      (self.server, kind)).fetchall()
+        return dict(rows)
+
+    def record(self, kind: str, entries: Dict[str, Tuple[Optional[str], str]]):
+        """
+        Сохраняет результаты синхронизации
+
+        Args:
+            kind: KIND_USER или KIND_GROUP
+            entries: Ключ -> (хеш, результат); хеш None - запись не
+                синхронизирована и будет обработана в следующий раз
+        """
+        if not entries:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO sync_state (server, kind, key, content_hash, result, synced_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(self.server, kind, key, digest, result, now) for key, (digest, result) in entries.items()]
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка сохранения состояния синхронизации ({kind}): {e}")
+
+    def forget(self, kind: str, keys: Iterable[str]):
+        """Удаляет записи из состояния"""
+        with self._lock:
+            self._conn.executemany('DELETE FROM sync_state WHERE server = ? AND kind = ? AND key = ?',
+                                   [(self.server, kind, key) for key in keys])
+            self._conn.commit()
+
+    def clear(self, kind: Optional[str] = None):
+        """Удаляет состояние сервера (вида записей или все); следующая синхронизация будет полной"""
+        with self._lock:
+            if kind is None:
+                self._conn.execute('DELETE FROM sync_state WHERE server = ?', (self.server,))
+            else:
+                self._conn.execute('DELETE FROM sync_state WHERE server = ? AND kind = ?', (self.server, kind))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_sync_state_stores: Dict[str, FreeIPASyncStateStore] = {}
+_sync_state_store_lock = threading.Lock()
+
+
+def get_sync_state_store(server: str) -> FreeIPASyncStateStore:
+    """
+    Хранилище состояния синхронизации сервера (data/freeipa_sync_state.db)
+
+    Args:
+        server: Идентификатор сервера FreeIPA (см. server_id)
+    """
+    with _sync_state_store_lock:
+        if server not in _sync_state_stores:
+            from ..utils.file_paths import file_path_manager
+            _sync_state_stores[server] = FreeIPASyncStateStore(
+                file_path_manager.get_data_path('freeipa_sync_state.db'), server=server
+            )
+        return _sync_state_stores[server]
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Декларативная синхронизация состава групп.
+
+Желаемый состав групп задается файлом или правилом "все активные сотрудники
+подразделения". Для каждой группы вычисляется минимальная разница с текущим
+составом, и изменения применяются пакетными запросами вместо тысяч отдельных
+операций add_member/remove_member. Кэш участников используется только для
+предпросмотра и добавления: перед удалением состав всегда загружается
+заново, иначе устаревший кэш удалил бы лишних или пропустил бы нужных.
+"""
+
+import csv
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..api.batch_requests import DEFAULT_BATCH_SIZE, execute_batched
+from ..utils.data_cache import group_members_cache
+from ..utils.rate_limiter import RateLimiter, execute_with_backoff, get_http_status
+from ..utils.statistics_engine import statistics_engine
+
+logger = logging.getLogger(__name__)
+
+# Роли, которые не удаляются, даже если их нет в желаемом составе
+PROTECTED_ROLES = {'OWNER', 'MANAGER'}
+
+
+@dataclass
+class GroupDiff:
+    """Разница между желаемым и текущим составом группы"""
+    group_email: str
+    to_add: Set[str] = field(default_factory=set)
+    to_remove: Set[str] = field(default_factory=set)
+    unchanged: int = 0
+    protected: Set[str] = field(default_factory=set)
+    # Желаемый состав и источник текущего: по ним разница пересчитывается перед удалением
+    wanted: Set[str] = field(default_factory=set, repr=False)
+    from_cache: bool = False
+
+    @property
+    def changes(self) -> int:
+        return len(self.to_add) + len(self.to_remove)
+
+
+@dataclass
+class ReconcileReport:
+    """Итог синхронизации"""
+    diffs: List[GroupDiff] = field(default_factory=list)
+    dry_run: bool = True
+    added: int = 0
+    removed: int = 0
+    failures: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    batches: int = 0
+    cache_hits: int = 0
+
+    @property
+    def planned_adds(self) -> int:
+        return sum(len(d.to_add) for d in self.diffs)
+
+    @property
+    def planned_removes(self) -> int:
+        return sum(len(d.to_remove) for d in self.diffs)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'groups': len(self.diffs),
+            'groups_changed': sum(1 for d in self.diffs if d.changes),
+            'planned_adds': self.planned_adds,
+            'planned_removes': self.planned_removes,
+            'added': self.added,
+            'removed': self.removed,
+            'failed': len(self.failures),
+            'batches': self.batches,
+            'cache_hits': self.cache_hits,
+            'dry_run': self.dry_run,
+            'timings': {k: round(v, 3) for k, v in self.timings.items()},
+        }
+
+
+def load_desired_membership(path: str) -> Dict[str, Set[str]]:
+    """
+    Загружает желаемый состав групп из файла.
+
+    Форматы:
+        CSV с колонками group_email, member_email (строка на участника;
+        группа с пустым member_email означает "оставить пустой")
+        JSON вида {"group@domain": ["user@domain", ...]}
+
+    Returns:
+        Словарь email группы -> множество email участников
+    """
+    source = Path(path)
+    desired: Dict[str, Set[str]] = {}
+
+    if source.suffix.lower() == '.json':
+        data = json.loads(source.read_text(encoding='utf-8'))
+        for group_email, members in data.items():
+            desired[group_email.strip().lower()] = {m.strip().lower() for m in members if m.strip()}
+        return desired
+
+    with open(source, newline='', encoding='utf-8-sig') as f:
+        for record in csv.DictReader(f):
+            record = {(k or '').strip().lower(): (v or '').strip().lower() for k, v in record.items()}
+            group_email = record.get('group_email') or record.get('group')
+            if not group_email:
+                continue
+            members = desired.setdefault(group_email, set())
+            member_email = record.get('member_email') or record.get('member')
+            if member_email:
+                members.add(member_email)
+    return desired
+
+
+def desired_from_org_unit(users: Iterable[Any], org_unit_path: str,
+                          include_children: bool = True) -> Set[str]:
+    """
+    Правило "все активные сотрудники подразделения".
+
+    Args:
+        users: Пользователи (словари API или User)
+        org_unit_path: Путь подразделения
+        include_children: Включать вложенные подразделения
+
+    Returns:
+        Множество email участников
+    """
+    prefix = org_unit_path.rstrip('/') + '/'
+    members = set()
+    for user in users:
+        if isinstance(user, dict):
+            email = user.get('primaryEmail', '')
+            path = user.get('orgUnitPath', '/')
+            suspended = user.get('suspended', False)
+        else:
+            email, path, suspended = user.primary_email, user.org_unit_path, user.suspended
+        if suspended or not email:
+            continue
+        if path == org_unit_path or (include_children and path.startswith(prefix)):
+            members.add(email.lower())
+    return members
+
+
+class MembershipReconciler:
+    """
+    Вычисление и применение минимальной разницы состава групп.
+    """
+
+    def __init__(self, service: Any,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 rate_per_second: float = 10.0,
+                 protected_roles: Optional[Set[str]] = None):
+        """
+        Инициализация.
+
+        Args:
+            service: Сервис Google Directory API
+            batch_size: Запросов в одном batch
+            rate_per_second: Ограничение частоты запросов
+            protected_roles: Роли, которые не удаляются (по умолчанию OWNER и MANAGER)
+        """
+        self.service = service
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_per_second)
+        self.protected_roles = PROTECTED_ROLES if protected_roles is None else protected_roles
+
+    def get_current_members(self, group_email: str,
+                            use_cache: bool = True) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Текущий состав группы: из кэша участников или из API.
+
+        Args:
+            group_email: Email группы
+            use_cache: Брать состав из кэша (False - загрузить и обновить кэш)
+
+        Returns:
+            Кортеж (участники, взяты ли из кэша)
+        """
+        cached = group_members_cache.get(group_email) if use_cache else None
+        if cached is not None:
+            return cached, True
+
+        members = []
+        page_token = None
+        while True:
+            params = {
+                'groupKey': group_email,
+                'maxResults': 200,
+                'fields': 'members(email,role,type,status),nextPageToken'
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            result = execute_with_backoff(
+                lambda: self.service.members().list(**params).execute(), limiter=self.limiter
+            )
+            members.extend(result.get('members', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+
+        group_members_cache.put(group_email, members)
+        return members, False
+
+    def plan(self, desired: Dict[str, Set[str]], remove_extra: bool = True,
+             use_cache: bool = True) -> ReconcileReport:
+        """
+        Вычисляет изменения без их применения.
+
+        Args:
+            desired: Email группы -> желаемые участники
+            remove_extra: Удалять участников, которых нет в желаемом составе
+            use_cache: Брать текущий состав из кэша участников (для предпросмотра)
+
+        Returns:
+            Отчет с разницей по группам (dry-run)
+        """
+        report = ReconcileReport(dry_run=True)
+        started = time.perf_counter()
+        load_time = 0.0
+
+        for group_email, wanted in desired.items():
+            load_started = time.perf_counter()
+            try:
+                members, from_cache = self.get_current_members(group_email, use_cache=use_cache)
+            except Exception as e:
+                report.failures[group_email] = f'не удалось получить состав: {e}'
+                continue
+            finally:
+                load_time += time.perf_counter() - load_started
+            report.cache_hits += from_cache
+            report.diffs.append(self._diff(group_email, wanted, members, remove_extra, from_cache))
+
+        report.timings['load_members'] = load_time
+        report.timings['plan'] = time.perf_counter() - started - load_time
+        return report
+
+    def _diff(self, group_email: str, wanted: Iterable[str], members: List[Dict[str, Any]],
+              remove_extra: bool, from_cache: bool) -> GroupDiff:
+        current = {m.get('email', '').lower(): m for m in members if m.get('email')}
+        wanted = {email.lower() for email in wanted}
+        diff = GroupDiff(group_email=group_email, wanted=wanted, from_cache=from_cache)
+        diff.to_add = wanted - set(current)
+        diff.unchanged = len(wanted & set(current))
+        if remove_extra:
+            for email in set(current) - wanted:
+                if current[email].get('role', 'MEMBER') in self.protected_roles:
+                    diff.protected.add(email)
+                else:
+                    diff.to_remove.add(email)
+        return diff
+
+    def _refresh_removals(self, report: ReconcileReport):
+        """Пересчитывает по свежему составу разницу групп, удаления в которых взяты из кэша."""
+        for index, diff in enumerate(report.diffs):
+            if not (diff.to_remove and diff.from_cache):
+                continue
+            try:
+                members, _ = self.get_current_members(diff.group_email, use_cache=False)
+            except Exception as e:
+                report.failures[diff.group_email] = f'не удалось получить состав: {e}'
+                report.diffs[index] = GroupDiff(group_email=diff.group_email, wanted=diff.wanted)
+                continue
+            report.diffs[index] = self._diff(diff.group_email, diff.wanted, members, True, False)
+
+    def apply(self, report: ReconcileReport) -> ReconcileReport:
+        """
+        Применяет вычисленные изменения пакетными запросами.
+
+        Args:
+            report: Результат plan()
+
+        Returns:
+            Тот же отчет с результатами применения
+        """
+        started = time.perf_counter()
+        report.dry_run = False
+        self._refresh_removals(report)
+
+        calls = []
+        for diff in report.diffs:
+            for email in sorted(diff.to_add):
+                calls.append((('add', diff.group_email, email), self._insert_factory(diff.group_email, email)))
+            for email in sorted(diff.to_remove):
+                calls.append((('remove', diff.group_email, email), self._delete_factory(diff.group_email, email)))
+
+        if calls:
+            result = execute_batched(
+                self.service, calls, batch_size=self.batch_size,
+                limiter=self.limiter, is_success=self._is_already_applied
+            )
+            report.batches = result.batches
+            self._update_cache(report, result.responses, result.errors)
+
+        report.timings['apply'] = time.perf_counter() - started
+        logger.info(f"Синхронизация состава групп: {report.summary()}")
+        return report
+
+    def reconcile(self, desired: Dict[str, Set[str]], dry_run: bool = False,
+                  remove_extra: bool = True) -> ReconcileReport:
+        """Вычисляет разницу и, если это не dry-run, применяет её."""
+        # Удаления вычисляются только по свежему составу; кэш - для предпросмотра
+        report = self.plan(desired, remove_extra=remove_extra, use_cache=dry_run or not remove_extra)
+        if not dry_run:
+            self.apply(report)
+        return report
+
+    def _insert_factory(self, group_email: str, email: str):
+        return lambda: self.service.members().insert(
+            groupKey=group_email, body={'email': email, 'role': 'MEMBER'}
+        )
+
+    def _delete_factory(self, group_email: str, email: str):
+        return lambda: self.service.members().delete(groupKey=group_email, memberKey=email)
+
+    @staticmethod
+    def _is_already_applied(error: Exception) -> bool:
+        """409 при добавлении и 404 при удалении означают, что состояние уже нужное."""
+        status = get_http_status(error)
+        return status == 409 or (status == 404 and 'Resource Not Found: memberKey' in str(error))
+
+    def _update_cache(self, report: ReconcileReport, responses: Dict, errors: Dict):
+        """Обновляет кэш участников на месте вместо его сброса."""
+        changes: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        for (operation, group_email, email) in responses:
+            added, removed = changes.setdefault(group_email, (set(), set()))
+            (added if operation == 'add' else removed).add(email)
+        for (operation, group_email, email), error in errors.items():
+            report.failures[f'{operation} {email} → {group_email}'] = str(error)
+
+        for group_email, (added, removed) in changes.items():
+            report.added += len(added)
+            report.removed += len(removed)
+            statistics_engine.group_members_changed(group_email, len(added) - len(removed))
+
+            cached = group_members_cache.get(group_email)
+            if cached is None:
+                continue
+            members = [m for m in cached if m.get('email', '').lower() not in removed]
+            members.extend({'email': email, 'role': 'MEMBER', 'type': 'USER'} for email in sorted(added))
+            group_members_cache.put(group_email, members)
@@ -4,12 +4,17 @@
 Бизнес-логика для работы с группами.
 """
 
-from typing import List, Optional, Dict, Any
+import asyncio
+import time
+from typing import Callable, List, Optional, Dict, Any, Set
 from ..core.domain import Group, GroupType
 from ..repositories.interfaces import IGroupRepository, ICacheRepository, IAuditRepository
 from ..core.di_container import inject, service
 from ..utils.exceptions import GroupNotFoundError, ValidationError
 from ..utils.validators import validate_email, validate_group_data
+from .group_reconcile import MembershipReconciler, ReconcileReport
+from ..utils.group_verification import GroupChangeVerifier, PropagationEstimator, VerificationResult
+from ..utils.timing_store import KIND_API, OperationTimingStore, get_timing_store
 import logging
 
 
@@ -28,6 +33,8 @@ class GroupService:
         
         # Кэшированные данные для GUI
         self._cached_groups: List[Group] = []
+        self._verifier: Optional[GroupChangeVerifier] = None
+        self._timing_store: Optional[OperationTimingStore] = None
     
     @property
     def groups(self) -> List[Group]:
@@ -42,6 +49,45 @@ class GroupService:
         except Exception as e:
             self.logger.error(f"Ошибка обновления кэша групп: {e}")
     
+    @property
+    def verifier(self) -> Optional[GroupChangeVerifier]:
+        """Верификатор изменений (None, если Google API недоступен)"""
+        if self._verifier is None:
+            client = getattr(self.group_repo, 'client', None)
+            google_service = getattr(client, 'service', None)
+            if google_service is None or isinstance(google_service, str):
+                return None
+            self._verifier = GroupChangeVerifier(
+                client, estimator=PropagationEstimator(store=self.timing_store)
+            )
+        return self._verifier
+    
+    @property
+    def timing_store(self) -> Optional[OperationTimingStore]:
+        """Хранилище замеров времени операций (None, если недоступно)"""
+        if self._timing_store is None:
+            try:
+                self._timing_store = get_timing_store()
+            except Exception as e:
+                self.logger.warning(f"Хранилище замеров времени недоступно: {e}")
+        return self._timing_store
+    
+    def _record_api_timing(self, operation: str, group_email: str, member_email: str,
+                           started: float, success: bool):
+        store = self.timing_store
+        if store is not None:
+            store.record(KIND_API, operation, time.monotonic() - started, group_email, member_email, success)
+    
+    def _start_verification(self, group_email: str, member_email: str, expect_member: bool,
+                            on_verified: Optional[Callable[[VerificationResult], None]]) -> bool:
+        """Запускает фоновую проверку изменения, не дожидаясь ее результата"""
+        verifier = self.verifier
+        if verifier is None:
+            self.logger.warning("Google API недоступен, проверка изменения пропущена")
+            return False
+        verifier.submit(group_email, member_email, expect_member, callback=on_verified)
+        return True
+    
     async def get_all_groups(self, use_cache: bool = True) -> List[Group]:
         """
         Получить все группы
@@ -133,7 +179,8 @@ class GroupService:
         self.logger.info(f"Создана группа: {created_group.email}")
         return created_group
     
-    async def add_member(self, group_email: str, member_email: str, added_by: str = "system", verify: bool = True) -> bool:
+    async def add_member(self, group_email: str, member_email: str, added_by: str = "system", verify: bool = True,
+                         on_verified: Optional[Callable[[VerificationResult], None]] = None) -> bool:
         """
         Добавить участника в группу
         
@@ -141,18 +188,20 @@ class GroupService:
             group_email: Email группы
             member_email: Email участника
             added_by: Кто добавил участника
-            verify: Проверить ли применение изменений
+            verify: Проверить применение изменения в фоне
+            on_verified: Вызывается с результатом проверки (VerificationResult)
             
         Returns:
-            True если добавлен успешно
+            True если добавлен успешно (проверка применения не ожидается)
         """
         # Проверка существования группы
         group = await self.get_group_by_email(group_email)
         if not group:
             raise GroupNotFoundError(f"Группа {group_email} не найдена")
         
-        # Добавление участника с верификацией
-        result = await self.group_repo.add_member(group_email, member_email, verify=verify)
+        started = time.monotonic()
+        result = await self.group_repo.add_member(group_email, member_email)
+        self._record_api_timing("add_member", group_email, member_email, started, bool(result))
         
         if result:
             # Очистка кэша
@@ -165,16 +214,19 @@ class GroupService:
                 resource=f"group:{group_email}",
                 details={
                     "member_email": member_email,
-                    "verified": verify
+                    "verify": verify
                 }
             )
             
-            verification_status = "с верификацией" if verify else "без верификации"
+            if verify:
+                verify = self._start_verification(group_email, member_email, True, on_verified)
+            verification_status = "проверка применения запущена" if verify else "без верификации"
             self.logger.info(f"Добавлен участник {member_email} в группу {group_email} {verification_status}")
         
         return result
     
-    async def remove_member(self, group_email: str, member_email: str, removed_by: str = "system", verify: bool = True) -> bool:
+    async def remove_member(self, group_email: str, member_email: str, removed_by: str = "system", verify: bool = True,
+                            on_verified: Optional[Callable[[VerificationResult], None]] = None) -> bool:
         """
         Удалить участника из группы
         
@@ -182,18 +234,20 @@ class GroupService:
             group_email: Email группы
             member_email: Email участника
             removed_by: Кто удалил участника
-            verify: Проверить ли применение изменений
+            verify: Проверить применение изменения в фоне
+            on_verified: Вызывается с результатом проверки (VerificationResult)
             
         Returns:
-            True если удален успешно
+            True если удален успешно (проверка применения не ожидается)
         """
         # Проверка существования группы
         group = await self.get_group_by_email(group_email)
         if not group:
             raise GroupNotFoundError(f"Группа {group_email} не найдена")
         
-        # Удаление участника с верификацией
-        result = await self.group_repo.remove_member(group_email, member_email, verify=verify)
+        started = time.monotonic()
+        result = await self.group_repo.remove_member(group_email, member_email)
+        self._record_api_timing("remove_member", group_email, member_email, started, bool(result))
         
         if result:
             # Очистка кэша
@@ -206,15 +260,67 @@ class GroupService:
                 resource=f"group:{group_email}",
                 details={
                     "member_email": member_email,
-                    "verified": verify
+                    "verify": verify
                 }
             )
             
-            verification_status = "с верификацией" if verify else "без верификации"
+            if verify:
+                verify = self._start_verification(group_email, member_email, False, on_verified)
+            verification_status = "проверка применения запущена" if verify else "без верификации"
             self.logger.info(f"Удален участник {member_email} из группы {group_email} {verification_status}")
         
         return result
     
+    async def reconcile_members(self, desired: Dict[str, Set[str]], dry_run: bool = False,
+                                remove_extra: bool = True,
+                                reconciled_by: str = "system") -> ReconcileReport:
+        """
+        Привести состав групп к желаемому минимальным набором изменений
+        
+        В отличие от add_member/remove_member изменения применяются пакетными
+        запросами, кэш групп сбрасывается один раз, а в аудит пишется одна
+        запись на группу.
+        
+        Args:
+            desired: Email группы -> желаемые участники
+            dry_run: Только вычислить изменения
+            remove_extra: Удалять участников, которых нет в желаемом составе
+            reconciled_by: Кто выполнил синхронизацию
+            
+        Returns:
+            Отчет с разницей по группам, результатами и временем этапов
+        """
+        google_service = getattr(getattr(self.group_repo, 'client', None), 'service', None)
+        if google_service is None or isinstance(google_service, str):
+            raise ValidationError("Google API недоступен, синхронизация состава групп невозможна")
+        
+        reconciler = MembershipReconciler(google_service)
+        loop = asyncio.get_event_loop()
+        report = await loop.run_in_executor(
+            None, reconciler.reconcile, desired, dry_run, remove_extra
+        )
+        
+        if not dry_run and (report.added or report.removed):
+            await self._clear_group_cache()
+            
+            # Аудит: одна запись на измененную группу
+            for diff in report.diffs:
+                if not diff.changes:
+                    continue
+                await self.audit_repo.log_action(
+                    user=reconciled_by,
+                    action="reconcile_group_members",
+                    resource=f"group:{diff.group_email}",
+                    details={
+                        "added": sorted(diff.to_add),
+                        "removed": sorted(diff.to_remove),
+                        "failures": [k for k in report.failures if k.endswith(f"→ {diff.group_email}")]
+                    }
+                )
+        
+        self.logger.info(f"Синхронизация состава групп: {report.summary()}")
+        return report
+    
     async def get_group_statistics(self) -> Dict[str, Any]:
         """
         Получить статистику групп
@@ -253,12 +359,36 @@ class GroupService:
         Получить статистику операций с группами
         
         Returns:
-            Словарь со статистикой времени выполнения операций
+            Словарь со статистикой времени выполнения операций: перцентили
+            задержки API и времени распространения по типам операций и группам
         """
+        store = self.timing_store
+        if store is not None:
+            return {
+                'by_operation': store.get_statistics(),
+                'by_group': store.get_statistics(by_group=True)
+            }
         if hasattr(self.group_repo, 'get_operation_statistics'):
             return self.group_repo.get_operation_statistics()
         return {}
     
+    def get_propagation_trend_report(self, operation: Optional[str] = None,
+                                     group_email: Optional[str] = None,
+                                     bucket: str = 'day', periods: int = 14) -> str:
+        """
+        Отчет о динамике времени распространения изменений в группах
+        
+        Args:
+            operation: Тип операции (add_member/remove_member), по умолчанию все
+            group_email: Группа, по умолчанию все
+            bucket: Период агрегации: hour, day или week
+            periods: Сколько последних периодов показать
+        """
+        store = self.timing_store
+        if store is None:
+            return "Хранилище замеров времени недоступно"
+        return store.trend_report(operation, group_email, bucket, periods)
+    
     def get_recent_operations(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Получить последние операции с группами
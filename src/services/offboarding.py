@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Массовое отключение уволенных сотрудников.
+
+Для списка пользователей одновременно выполняются три независимых потока
+работ, каждый со своим API и пакетными запросами:
+
+- Directory API: блокировка (users().update) и удаление из всех групп.
+  Группы находятся обратным поиском groups().list(userKey=...) - одним
+  пакетом на всех пользователей вместо перебора всех групп домена;
+- Calendar API: удаление из календаря SPUTNIK по снимку ACL;
+- Drive API: отзыв доступа к известным документам по индексу разрешений.
+
+По каждому пользователю формируется отчет со временем завершения этапов,
+который записывается в аудит одной записью. Сбой одного потока не прерывает
+остальные: ошибка записывается незавершенным пользователям, а отчет
+формируется всегда.
+"""
+
+import csv
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..api.batch_requests import DEFAULT_BATCH_SIZE, execute_batched
+from ..api.drive_permissions import DRIVE_BATCH_SIZE, PermissionIndex, permission_index
+from ..utils.data_cache import data_cache, group_members_cache
+from ..utils.rate_limiter import RateLimiter, execute_with_backoff, get_http_status
+from ..utils.statistics_engine import statistics_engine
+
+logger = logging.getLogger(__name__)
+
+STEPS = ('suspend', 'groups', 'calendar', 'drive')
+
+
+@dataclass
+class UserOffboardingReport:
+    """Результат отключения одного пользователя"""
+    email: str
+    suspended: bool = False
+    groups: List[str] = field(default_factory=list)
+    groups_removed: List[str] = field(default_factory=list)
+    calendar_role: Optional[str] = None
+    calendar_revoked: bool = False
+    files: List[str] = field(default_factory=list)
+    files_revoked: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    # Секунды от начала отключения до завершения этапа
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def completed(self) -> bool:
+        return not self.errors
+
+    def audit_details(self) -> Dict[str, Any]:
+        return {
+            'suspended': self.suspended,
+            'groups_removed': self.groups_removed,
+            'calendar_revoked': self.calendar_revoked,
+            'files_revoked': self.files_revoked,
+            'errors': self.errors,
+            'timings': {k: round(v, 3) for k, v in self.timings.items()},
+        }
+
+
+@dataclass
+class OffboardingReport:
+    """Итог массового отключения"""
+    users: Dict[str, UserOffboardingReport] = field(default_factory=dict)
+    dry_run: bool = True
+    batches: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        users = self.users.values()
+        return {
+            'users': len(self.users),
+            'completed': sum(1 for u in users if u.completed),
+            'suspended': sum(1 for u in users if u.suspended),
+            'groups_removed': sum(len(u.groups_removed) for u in users),
+            'calendar_revoked': sum(1 for u in users if u.calendar_revoked),
+            'files_revoked': sum(len(u.files_revoked) for u in users),
+            'failed': sum(1 for u in users if u.errors),
+            'batches': self.batches,
+            'dry_run': self.dry_run,
+            'elapsed_seconds': round(self.elapsed, 3),
+        }
+
+    def save(self, path: str):
+        """Сохраняет отчет по пользователям в CSV или JSON (по расширению)."""
+        target = Path(path)
+        rows = [asdict(u) for u in self.users.values()]
+        if target.suffix.lower() == '.json':
+            target.write_text(json.dumps({'summary': self.summary(), 'users': rows},
+                                         ensure_ascii=False, indent=2), encoding='utf-8')
+            return
+        with open(target, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(['email', 'suspended', 'groups_removed', 'calendar_revoked',
+                             'files_revoked', 'errors'] + [f'{step}_s' for step in STEPS])
+            for u in self.users.values():
+                writer.writerow([
+                    u.email, u.suspended, len(u.groups_removed), u.calendar_revoked,
+                    len(u.files_revoked), '; '.join(f'{k}: {v}' for k, v in u.errors.items())
+                ] + [round(u.timings[step], 3) if step in u.timings else '' for step in STEPS])
+
+
+class OffboardingEngine:
+    """
+    Блокировка пользователей и отзыв их доступа пакетными запросами.
+    """
+
+    def __init__(self, directory_service: Any,
+                 calendar_sync: Any = None,
+                 drive_service: Any = None,
+                 file_ids: Iterable[str] = (),
+                 index: Optional[PermissionIndex] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 rate_per_second: float = 10.0,
+                 audit_callback: Optional[Callable[[UserOffboardingReport], None]] = None):
+        """
+        Инициализация.
+
+        Args:
+            directory_service: Сервис Google Directory API
+            calendar_sync: CalendarAclSync календаря SPUTNIK (None - не трогать календарь)
+            drive_service: Сервис Google Drive API (None - не трогать документы)
+            file_ids: Известные документы, доступ к которым нужно отозвать;
+                кроме них проверяются все файлы, уже загруженные в индекс
+            index: Индекс разрешений Drive (по умолчанию общий permission_index)
+            batch_size: Запросов в одном batch
+            rate_per_second: Ограничение частоты запросов для каждого API
+            audit_callback: Вызывается для каждого пользователя после отключения
+        """
+        self.directory = directory_service
+        self.calendar_sync = calendar_sync
+        self.drive = drive_service
+        self.file_ids = list(file_ids)
+        self.index = permission_index if index is None else index
+        self.batch_size = batch_size
+        self.rate_per_second = rate_per_second
+        self.audit_callback = audit_callback
+        self._lock = threading.Lock()
+
+    def run(self, emails: Iterable[str], dry_run: bool = False,
+            suspend: bool = True) -> OffboardingReport:
+        """
+        Отключает пользователей.
+
+        Args:
+            emails: Email уходящих сотрудников
+            dry_run: Только найти группы, календарь и документы
+            suspend: Блокировать учетные записи
+
+        Returns:
+            Отчет с результатами по каждому пользователю
+        """
+        report = OffboardingReport(dry_run=dry_run)
+        for email in emails:
+            email = email.strip().lower()
+            if email:
+                report.users.setdefault(email, UserOffboardingReport(email=email))
+
+        started = time.perf_counter()
+        streams = [('groups', lambda: self._directory_stream(report, started, dry_run, suspend))]
+        if self.calendar_sync is not None:
+            streams.append(('calendar', lambda: self._calendar_stream(report, started, dry_run)))
+        if self.drive is not None:
+            streams.append(('drive', lambda: self._drive_stream(report, started, dry_run)))
+
+        # Каждый поток работает со своим API: клиенты googleapiclient не
+        # потокобезопасны, поэтому сервис одного API используется одним потоком
+        with ThreadPoolExecutor(max_workers=len(streams), thread_name_prefix='offboarding') as executor:
+            futures = [executor.submit(self._run_stream, report, step, stream) for step, stream in streams]
+            for future in futures:
+                future.result()
+        report.elapsed = time.perf_counter() - started
+
+        if not dry_run and self.audit_callback is not None:
+            for user in report.users.values():
+                try:
+                    self.audit_callback(user)
+                except Exception as e:
+                    logger.error(f"Не удалось записать аудит отключения {user.email}: {e}")
+
+        logger.info(f"Отключение пользователей: {report.summary()}")
+        return report
+
+    def _execute(self, report: OffboardingReport, calls, limiter: RateLimiter,
+                 already_applied=(404,)):
+        """Пакетные запросы Directory API; 404 при удалении означает, что доступа уже нет."""
+        result = execute_batched(
+            self.directory, calls, batch_size=self.batch_size, limiter=limiter,
+            is_success=lambda e: get_http_status(e) in already_applied
+        )
+        with self._lock:
+            report.batches += result.batches
+        return result
+
+    def _fail(self, user: UserOffboardingReport, step: str, error: Any):
+        with self._lock:
+            user.errors[step] = str(error)
+
+    def _run_stream(self, report: OffboardingReport, step: str, stream: Callable[[], None]):
+        """Выполняет поток работ; сбой записывается пользователям, не завершившим этап."""
+        try:
+            stream()
+        except Exception as e:
+            logger.error(f"Этап {step} отключения прерван: {e}")
+            for user in report.users.values():
+                if step not in user.timings and step not in user.errors:
+                    self._fail(user, step, f'этап прерван: {e}')
+
+    # Directory API -----------------------------------------------------
+
+    def _directory_stream(self, report: OffboardingReport, started: float,
+                          dry_run: bool, suspend: bool):
+        limiter = RateLimiter(self.rate_per_second)
+        users = report.users
+
+        # Обратный поиск групп пользователя
+        lookups = [(email, self._groups_of_factory(email)) for email in users]
+        result = self._execute(report, lookups, limiter, already_applied=())
+        for email, response in result.responses.items():
+            groups = [g['email'].lower() for g in response.get('groups', []) if g.get('email')]
+            page_token = response.get('nextPageToken')
+            while page_token:
+                try:
+                    page = execute_with_backoff(self._groups_page_factory(email, page_token), limiter)
+                except Exception as e:
+                    # Из найденных групп пользователь все равно удаляется
+                    self._fail(users[email], 'groups', f'список групп получен не полностью: {e}')
+                    break
+                groups.extend(g['email'].lower() for g in page.get('groups', []) if g.get('email'))
+                page_token = page.get('nextPageToken')
+            users[email].groups = groups
+        for email, error in result.errors.items():
+            self._fail(users[email], 'groups', f'не удалось получить группы: {error}')
+        if dry_run:
+            return
+
+        if suspend:
+            calls = [(email, self._suspend_factory(email)) for email in users]
+            result = self._execute(report, calls, limiter, already_applied=())
+            elapsed = time.perf_counter() - started
+            for email, response in result.responses.items():
+                users[email].suspended = True
+                users[email].timings['suspend'] = elapsed
+                self._update_user_cache(email)
+            for email, error in result.errors.items():
+                self._fail(users[email], 'suspend', error)
+
+        calls = [((email, group), self._remove_member_factory(group, email))
+                 for email, user in users.items() for group in user.groups]
+        if calls:
+            result = self._execute(report, calls, limiter)
+            for (email, group) in result.responses:
+                users[email].groups_removed.append(group)
+                group_members_cache.invalidate(group)
+                statistics_engine.group_members_changed(group, -1)
+            for (email, group), error in result.errors.items():
+                self._fail(users[email], f'group:{group}', error)
+        elapsed = time.perf_counter() - started
+        for user in users.values():
+            user.timings['groups'] = elapsed
+
+    def _groups_of_factory(self, email: str):
+        return lambda: self.directory.groups().list(
+            userKey=email, maxResults=200, fields='groups(email),nextPageToken'
+        )
+
+    def _groups_page_factory(self, email: str, page_token: str):
+        return lambda: self.directory.groups().list(
+            userKey=email, maxResults=200, pageToken=page_token,
+            fields='groups(email),nextPageToken'
+        ).execute()
+
+    def _suspend_factory(self, email: str):
+        return lambda: self.directory.users().update(
+            userKey=email, body={'suspended': True}, fields='primaryEmail,suspended'
+        )
+
+    def _remove_member_factory(self, group: str, email: str):
+        return lambda: self.directory.members().delete(groupKey=group, memberKey=email)
+
+    @staticmethod
+    def _update_user_cache(email: str):
+        """Отмечает пользователя заблокированным в кэше без перезагрузки списка."""
+        for record in data_cache.users_cache:
+            if record.get('primaryEmail', '').lower() == email:
+                record['suspended'] = True
+                statistics_engine.user_upserted(record)
+                break
+
+    # Calendar API ------------------------------------------------------
+
+    def _calendar_stream(self, report: OffboardingReport, started: float, dry_run: bool):
+        users = report.users
+        try:
+            snapshot = self.calendar_sync.get_snapshot()
+        except Exception as e:
+            for user in users.values():
+                self._fail(user, 'calendar', f'не удалось получить ACL календаря: {e}')
+            return
+
+        members = [email for email in users if email in snapshot]
+        for email in members:
+            users[email].calendar_role = snapshot[email]
+        if dry_run or not members:
+            return
+
+        try:
+            result = self.calendar_sync.remove_members(members)
+        except Exception as e:
+            for email in members:
+                self._fail(users[email], 'calendar', f'не удалось удалить из календаря: {e}')
+            return
+        with self._lock:
+            report.batches += result.batches
+        elapsed = time.perf_counter() - started
+        for email in members:
+            if email in result.deleted:
+                users[email].calendar_revoked = True
+                users[email].timings['calendar'] = elapsed
+            else:
+                self._fail(users[email], 'calendar', result.failures.get(email, 'не удалено'))
+
+    # Drive API ---------------------------------------------------------
+
+    def _drive_stream(self, report: OffboardingReport, started: float, dry_run: bool):
+        users = report.users
+        limiter = RateLimiter(self.rate_per_second)
+        for file_id, error in self.index.load(self.drive, self.file_ids, limiter).items():
+            logger.warning(f"Не удалось загрузить разрешения файла {file_id}: {error}")
+
+        calls = []
+        for email, user in users.items():
+            for file_id in self.index.files_for(email):
+                if self.index.get_role(file_id, email) == 'owner':
+                    # Владельца нельзя удалить из разрешений; файл нужно передать вручную
+                    self._fail(user, f'drive:{file_id}', 'пользователь - владелец файла')
+                    continue
+                permission_id = self.index.get_permission_id(file_id, email)
+                if permission_id:
+                    user.files.append(file_id)
+                    calls.append(((email, file_id), self._delete_permission_factory(file_id, permission_id)))
+        if dry_run or not calls:
+            return
+
+        result = execute_batched(
+            self.drive, calls, batch_size=min(self.batch_size, DRIVE_BATCH_SIZE), limiter=limiter,
+            is_success=lambda e: get_http_status(e) == 404
+        )
+        with self._lock:
+            report.batches += result.batches
+        elapsed = time.perf_counter() - started
+        for (email, file_id) in result.responses:
+            users[email].files_revoked.append(file_id)
+            users[email].timings['drive'] = elapsed
+            self.index.remove(file_id, email)
+        for (email, file_id), error in result.errors.items():
+            self._fail(users[email], f'drive:{file_id}', error)
+
+    def _delete_permission_factory(self, file_id: str, permission_id: str):
+        return lambda: self.drive.permissions().delete(
+            fileId=file_id, permissionId=permission_id, supportsAllDrives=True
+        )
@@ -10,6 +10,9 @@ from ..repositories.interfaces import IUserRepository, ICacheRepository, IAuditR
 from ..core.di_container import inject, service
 from ..utils.exceptions import UserNotFoundError, ValidationError
 from ..utils.validators import validate_email, validate_user_data
+from ..utils.statistics_engine import StatisticsEngine
+from .offboarding import OffboardingEngine, OffboardingReport
+import asyncio
 import logging
 
 
@@ -29,6 +32,9 @@ class UserService:
         # Кэшированные данные для GUI
         self._cached_users: List[User] = []
         self._cached_groups: List[Dict[str, Any]] = []
+        
+        # Счетчики статистики, обновляемые при изменении пользователей
+        self.statistics = StatisticsEngine()
     
     @property
     def users(self) -> List[User]:
@@ -44,6 +50,7 @@ class UserService:
         """Обновить кэшированные данные"""
         try:
             self._cached_users = await self.get_all_users()
+            self.statistics.load_users(self._cached_users)
             # TODO: Когда будет GroupService, получать группы оттуда
             self._cached_groups = []
             self.logger.info(f"Кэш обновлен: {len(self._cached_users)} пользователей")
@@ -129,6 +136,7 @@ class UserService:
         
         # Очистка кэша
         await self._clear_user_cache()
+        self.statistics.user_upserted(created_user)
         
         # Аудит
         await self.audit_repo.log_action(
@@ -163,6 +171,7 @@ class UserService:
         # Очистка кэша
         await self._clear_user_cache()
         await self.cache_repo.delete(f"user:email:{user.primary_email}")
+        self.statistics.user_upserted(updated_user)
         
         # Аудит
         await self.audit_repo.log_action(
@@ -259,6 +268,7 @@ class UserService:
             # Очистка кэша
             await self._clear_user_cache()
             await self.cache_repo.delete(f"user:email:{email}")
+            self.statistics.user_removed(email)
             
             # Аудит
             await self.audit_repo.log_action(
@@ -272,6 +282,54 @@ class UserService:
         
         return result
     
+    async def offboard_users(self, emails: List[str], offboarded_by: str = "system",
+                             calendar_sync: Any = None, drive_service: Any = None,
+                             file_ids: Optional[List[str]] = None, dry_run: bool = False,
+                             suspend: bool = True) -> OffboardingReport:
+        """
+        Отключить уходящих сотрудников
+        
+        Блокировка, удаление из групп, календаря и документов выполняются
+        одновременно пакетными запросами; в аудит пишется одна запись на
+        пользователя со всеми отозванными доступами и временем этапов.
+        
+        Args:
+            emails: Email пользователей
+            offboarded_by: Кто выполнил отключение
+            calendar_sync: CalendarAclSync календаря SPUTNIK (опционально)
+            drive_service: Сервис Google Drive API (опционально)
+            file_ids: Документы, доступ к которым нужно отозвать
+            dry_run: Только найти доступы без изменений
+            suspend: Блокировать учетные записи
+            
+        Returns:
+            Отчет по каждому пользователю
+        """
+        google_service = getattr(getattr(self.user_repo, 'client', None), 'service', None)
+        if google_service is None or isinstance(google_service, str):
+            raise ValidationError("Google API недоступен, отключение пользователей невозможно")
+        
+        engine = OffboardingEngine(
+            google_service, calendar_sync=calendar_sync,
+            drive_service=drive_service, file_ids=file_ids or []
+        )
+        loop = asyncio.get_event_loop()
+        report = await loop.run_in_executor(None, engine.run, emails, dry_run, suspend)
+        
+        if not dry_run:
+            await self._clear_user_cache()
+            for user in report.users.values():
+                await self.cache_repo.delete(f"user:email:{user.email}")
+                await self.audit_repo.log_action(
+                    user=offboarded_by,
+                    action="offboard_user",
+                    resource=f"user:{user.email}",
+                    details=user.audit_details()
+                )
+        
+        self.logger.warning(f"Отключение пользователей: {report.summary()}")
+        return report
+    
     async def search_users(self, query: str) -> List[User]:
         """
         Поиск пользователей
@@ -327,43 +385,24 @@ class UserService:
         """
         Получить статистику пользователей
         
+        Полный список загружается только при первом вызове, дальше счетчики
+        обновляются операциями создания, изменения и удаления.
+        
         Returns:
             Словарь со статистикой
         """
-        cache_key = "users:statistics"
-        cached_stats = await self.cache_repo.get(cache_key)
-        
-        if cached_stats:
-            return cached_stats
-        
-        all_users = await self.get_all_users()
-        
-        stats = {
-            'total_users': len(all_users),
-            'active_users': len([u for u in all_users if u.is_active]),
-            'suspended_users': len([u for u in all_users if u.suspended]),
-            'users_by_org_unit': {},
-            'users_by_status': {}
+        if not self.statistics.users_loaded:
+            all_users = await self.get_all_users()
+            self.statistics.load_users(all_users)
+        
+        stats = self.statistics.snapshot()
+        return {
+            'total_users': stats['total_users'],
+            'active_users': stats['active_users'],
+            'suspended_users': stats['suspended_users'],
+            'users_by_org_unit': stats['users_by_org_unit'],
+            'users_by_status': stats['users_by_status']
         }
-        
-        # Группировка по подразделениям
-        for user in all_users:
-            org_unit = user.org_unit_path
-            if org_unit not in stats['users_by_org_unit']:
-                stats['users_by_org_unit'][org_unit] = 0
-            stats['users_by_org_unit'][org_unit] += 1
-        
-        # Группировка по статусам
-        for user in all_users:
-            status = user.status.value
-            if status not in stats['users_by_status']:
-                stats['users_by_status'][status] = 0
-            stats['users_by_status'][status] += 1
-        
-        # Кэшируем на 15 минут
-        await self.cache_repo.set(cache_key, stats, ttl=900)
-        
-        return stats
     
     async def _clear_user_cache(self):
         """Очистить кэш пользователей"""
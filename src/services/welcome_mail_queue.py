@@ -0,0 +1,487 @@
+# -*- coding: utf-8 -*-
+"""
+Очередь отправки приветственных писем.
+
+Создание пользователя только ставит письмо в очередь и сразу возвращает
+управление. Письма сохраняются в журнал (outbox) на диске и отправляются
+пулом рабочих потоков с учетом квот Gmail API: не чаще заданной частоты и
+не больше дневного лимита. Письма сверх дневного лимита откладываются до
+следующих суток: они остаются в журнале, а wait() их не ждет. Повторы
+после временных ошибок планируются на время, а не ожидаются рабочим
+потоком. После перезапуска неотправленные письма загружаются из журнала и
+отправляются снова.
+
+Временные пароли в журнале хранятся только в зашифрованном виде
+(SecurityManager); без шифрования пароль держится в памяти, и после
+перезапуска такое письмо отмечается неотправленным.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.exceptions import CredentialsError
+from ..utils.rate_limiter import RateLimiter, is_retryable_error
+
+logger = logging.getLogger(__name__)
+
+# messages.send стоит 100 единиц квоты при лимите 250 единиц/с на пользователя
+GMAIL_SEND_RATE = 2.0
+# Дневной лимит отправки для аккаунта Google Workspace
+GMAIL_DAILY_LIMIT = 2000
+
+
+@dataclass
+class OutboxEntry:
+    """Письмо в очереди"""
+    id: str
+    to_email: str
+    user_name: str
+    admin_email: str
+    password: Optional[str] = field(default=None, repr=False)
+    queued_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    attempts: int = 0
+
+
+class MailOutbox:
+    """
+    Журнал очереди писем: JSONL файл с событиями queued/sent/failed/deferred.
+
+    Незавершенные письма - те, для которых есть queued, но нет sent/failed;
+    отложенные из-за дневного лимита (deferred) тоже остаются незавершенными.
+    """
+
+    def __init__(self, path: str, cipher: Any = None):
+        """
+        Args:
+            path: Путь к файлу журнала
+            cipher: Объект с encrypt_data/decrypt_data (SecurityManager);
+                без него пароли в журнал не записываются
+        """
+        self.path = Path(path)
+        self.cipher = cipher
+        self._lock = threading.Lock()
+
+    def _append(self, record: Dict[str, Any]):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read(self) -> List[Dict[str, Any]]:
+        records = []
+        if not self.path.exists():
+            return records
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Последняя строка могла быть записана не полностью при сбое
+                    continue
+        return records
+
+    def add(self, entry: OutboxEntry):
+        record = {
+            'op': 'queued', 'id': entry.id, 'to_email': entry.to_email,
+            'user_name': entry.user_name, 'admin_email': entry.admin_email,
+            'queued_at': entry.queued_at,
+        }
+        if self.cipher is not None and entry.password:
+            record['password'] = self.cipher.encrypt_data(entry.password)
+        self._append(record)
+
+    def mark_sent(self, entry_id: str):
+        self._append({'op': 'sent', 'id': entry_id, 'at': datetime.now().isoformat()})
+
+    def mark_failed(self, entry_id: str, error: str):
+        self._append({'op': 'failed', 'id': entry_id, 'error': error, 'at': datetime.now().isoformat()})
+
+    def mark_deferred(self, entry_id: str, until: str):
+        self._append({'op': 'deferred', 'id': entry_id, 'until': until, 'at': datetime.now().isoformat()})
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Восстанавливает состояние журнала.
+
+        Returns:
+            {'pending': [OutboxEntry], 'sent_today': int}
+        """
+        queued: Dict[str, Dict[str, Any]] = {}
+        done = set()
+        sent_today = 0
+        today = date.today().isoformat()
+
+        for record in self._read():
+            op = record.get('op')
+            if op == 'queued':
+                queued[record['id']] = record
+            elif op in ('sent', 'failed'):
+                done.add(record.get('id'))
+                if op == 'sent' and str(record.get('at', '')).startswith(today):
+                    sent_today += 1
+
+        pending = []
+        for entry_id, record in queued.items():
+            if entry_id in done:
+                continue
+            password = None
+            if record.get('password') and self.cipher is not None:
+                try:
+                    password = self.cipher.decrypt_data(record['password'])
+                except Exception as e:
+                    logger.warning(f"Не удалось расшифровать пароль письма для {record['to_email']}: {e}")
+            pending.append(OutboxEntry(
+                id=entry_id, to_email=record['to_email'], user_name=record.get('user_name', ''),
+                admin_email=record.get('admin_email', ''), password=password,
+                queued_at=record.get('queued_at', '')
+            ))
+        return {'pending': pending, 'sent_today': sent_today}
+
+    def compact(self):
+        """
+        Переписывает журнал, оставляя незавершенные письма и отметки об
+        отправке за сегодня (по ним восстанавливается суточный лимит).
+        """
+        with self._lock:
+            if not self.path.exists():
+                return
+            records = self._read()
+            today = date.today().isoformat()
+            done = {r.get('id') for r in records if r.get('op') in ('sent', 'failed')}
+            keep = [r for r in records
+                    if (r.get('op') == 'queued' and r['id'] not in done)
+                    or (r.get('op') == 'sent' and str(r.get('at', '')).startswith(today))]
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in keep:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+
+
+class WelcomeMailQueue:
+    """
+    Фоновая отправка приветственных писем пулом потоков.
+    """
+
+    def __init__(self, sender_factory: Callable[[], Any],
+                 outbox: Optional[MailOutbox] = None,
+                 workers: int = 2,
+                 rate_per_second: float = GMAIL_SEND_RATE,
+                 daily_limit: int = GMAIL_DAILY_LIMIT,
+                 max_attempts: int = 5,
+                 base_delay: float = 2.0,
+                 on_result: Optional[Callable[[OutboxEntry, bool, str], None]] = None):
+        """
+        Инициализация.
+
+        Args:
+            sender_factory: Создает отправителя с методом deliver_welcome_email
+                (GmailService). Вызывается один раз на рабочий поток
+            outbox: Журнал очереди (без него очередь живет только в памяти)
+            workers: Количество рабочих потоков
+            rate_per_second: Ограничение частоты отправки
+            daily_limit: Максимум писем в сутки
+            max_attempts: Попыток для писем с временными ошибками
+            base_delay: Начальная задержка перед повтором в секундах
+            on_result: Вызывается из рабочего потока после отправки или отказа
+        """
+        self.sender_factory = sender_factory
+        self.outbox = outbox
+        self.workers = max(1, workers)
+        self.limiter = RateLimiter(rate_per_second)
+        self.daily_limit = daily_limit
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.on_result = on_result
+
+        self._queue: "queue.Queue[OutboxEntry]" = queue.Queue()
+        # Повторы: (время по monotonic, порядковый номер, письмо)
+        self._retries: List[Any] = []
+        self._retry_seq = itertools.count()
+        # Письма, отложенные до следующих суток из-за дневного лимита
+        self._parked: List[OutboxEntry] = []
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Condition()
+        self._unfinished = 0
+        self._sent_day = date.today()
+        self._sent_today = 0
+        self.stats = {'queued': 0, 'sent': 0, 'failed': 0, 'retried': 0, 'deferred': 0}
+
+        if self.outbox is not None:
+            state = self.outbox.load()
+            self._sent_today = state['sent_today']
+            for entry in state['pending']:
+                self._put(entry)
+            if state['pending']:
+                logger.info(f"Из журнала восстановлено неотправленных писем: {len(state['pending'])}")
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._unfinished
+
+    @property
+    def deferred(self) -> int:
+        """Письма, отложенные до следующих суток из-за дневного лимита"""
+        with self._lock:
+            return len(self._parked)
+
+    def enqueue(self, to_email: str, user_name: str, temporary_password: str,
+                admin_email: str) -> str:
+        """
+        Ставит приветственное письмо в очередь.
+
+        Returns:
+            ID письма в очереди
+        """
+        entry = OutboxEntry(
+            id=uuid.uuid4().hex, to_email=to_email, user_name=user_name,
+            admin_email=admin_email, password=temporary_password
+        )
+        if self.outbox is not None:
+            self.outbox.add(entry)
+        self._put(entry)
+        self.start()
+        return entry.id
+
+    def _put(self, entry: OutboxEntry, new: bool = True):
+        with self._lock:
+            self._unfinished += 1
+            if new:
+                self.stats['queued'] += 1
+        self._queue.put(entry)
+
+    def _resume_parked(self):
+        """Возвращает в очередь отложенные письма, если наступили новые сутки"""
+        with self._lock:
+            if not self._parked or (self._sent_day == date.today() and self._sent_today >= self.daily_limit):
+                return
+            parked, self._parked = self._parked, []
+        for entry in parked:
+            self._put(entry, new=False)
+
+    def start(self):
+        """Запускает рабочие потоки (повторный вызов ничего не делает)."""
+        self._resume_parked()
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'welcome-mail-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Останавливает рабочие потоки; неотправленные письма остаются в журнале."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждет, пока очередь опустеет.
+
+        Письма, отложенные из-за дневного лимита, не ожидаются: они остаются
+        в журнале, их количество - в deferred.
+
+        Returns:
+            True если все письма обработаны или отложены
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._unfinished:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def _worker(self):
+        sender = None
+        while not self._stop.is_set():
+            entry = self._next_entry()
+            if entry is None:
+                continue
+
+            if not self._reserve_daily_quota():
+                # Дневной лимит исчерпан: письмо откладывается до следующих суток
+                self._park(entry)
+                continue
+
+            if sender is None:
+                try:
+                    sender = self.sender_factory()
+                except Exception as e:
+                    logger.error(f"Не удалось создать отправителя писем: {e}")
+                    self._finish(entry, False, str(e))
+                    continue
+            self._send(sender, entry)
+
+    def _next_entry(self) -> Optional[OutboxEntry]:
+        """Повтор, время которого наступило, иначе следующее письмо очереди"""
+        timeout = 0.5
+        with self._lock:
+            if self._retries:
+                due = self._retries[0][0] - time.monotonic()
+                if due <= 0:
+                    return heapq.heappop(self._retries)[2]
+                timeout = min(timeout, due)
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _park(self, entry: OutboxEntry):
+        with self._lock:
+            until = (self._sent_day + timedelta(days=1)).isoformat()
+        if self.outbox is not None:
+            try:
+                self.outbox.mark_deferred(entry.id, until)
+            except OSError as e:
+                logger.error(f"Не удалось записать журнал писем: {e}")
+        logger.warning(f"Дневной лимит писем исчерпан, письмо для {entry.to_email} отложено до {until}")
+        with self._lock:
+            self._parked.append(entry)
+            self.stats['deferred'] += 1
+            self._unfinished -= 1
+            self._lock.notify_all()
+
+    def _reserve_daily_quota(self) -> bool:
+        with self._lock:
+            today = date.today()
+            if today != self._sent_day:
+                self._sent_day, self._sent_today = today, 0
+            if self._sent_today >= self.daily_limit:
+                return False
+            self._sent_today += 1
+            return True
+
+    def _release_daily_quota(self):
+        with self._lock:
+            self._sent_today = max(0, self._sent_today - 1)
+
+    def _send(self, sender: Any, entry: OutboxEntry):
+        if not entry.password:
+            self._release_daily_quota()
+            self._finish(entry, False, 'временный пароль недоступен после перезапуска')
+            return
+
+        entry.attempts += 1
+        self.limiter.acquire()
+        try:
+            sender.deliver_welcome_email(
+                to_email=entry.to_email, user_name=entry.user_name,
+                temporary_password=entry.password, admin_email=entry.admin_email
+            )
+        except Exception as e:
+            self._release_daily_quota()
+            if is_retryable_error(e) and entry.attempts < self.max_attempts:
+                delay = self.base_delay * (2 ** (entry.attempts - 1))
+                logger.info(f"Повтор письма для {entry.to_email} через {delay:.1f} с: {e}")
+                with self._lock:
+                    self.stats['retried'] += 1
+                    heapq.heappush(self._retries, (time.monotonic() + delay, next(self._retry_seq), entry))
+                return
+            self._finish(entry, False, str(e))
+            return
+        self._finish(entry, True, '')
+
+    def _finish(self, entry: OutboxEntry, success: bool, error: str):
+        if self.outbox is not None:
+            try:
+                if success:
+                    self.outbox.mark_sent(entry.id)
+                else:
+                    self.outbox.mark_failed(entry.id, error)
+            except OSError as e:
+                logger.error(f"Не удалось записать журнал писем: {e}")
+
+        if success:
+            logger.info(f"✅ Приветственное письмо отправлено: {entry.to_email}")
+        else:
+            logger.error(f"❌ Приветственное письмо для {entry.to_email} не отправлено: {error}")
+        entry.password = None
+
+        if self.on_result is not None:
+            try:
+                self.on_result(entry, success, error)
+            except Exception as e:
+                logger.warning(f"Ошибка обработчика результата письма: {e}")
+
+        with self._lock:
+            self.stats['sent' if success else 'failed'] += 1
+            self._unfinished -= 1
+            self._lock.notify_all()
+
+
+def _default_cipher() -> Any:
+    """Шифрование паролей в журнале; без cryptography пароли не сохраняются."""
+    try:
+        from ..utils.security_manager import SecurityManager
+        return SecurityManager()
+    except ImportError as e:
+        logger.warning(f"Шифрование недоступно, пароли в журнал писем не записываются: {e}")
+        return None
+
+
+def _credentials_key(credentials: Any) -> Any:
+    """Учетная запись, от имени которой отправляются письма"""
+    identity = tuple(getattr(credentials, name, None)
+                     for name in ('service_account_email', '_subject', 'client_id', 'refresh_token'))
+    return identity if any(identity) else id(credentials)
+
+
+_default_queue: Optional[WelcomeMailQueue] = None
+_default_queue_key: Any = None
+_default_queue_lock = threading.Lock()
+
+
+def get_welcome_mail_queue(gmail_credentials: Any) -> WelcomeMailQueue:
+    """
+    Общая очередь приветственных писем приложения.
+
+    Очередь создается при первом вызове с журналом в data/welcome_outbox.jsonl;
+    последующие вызовы с той же учетной записью возвращают ее же. Для другой
+    учетной записи простаивающая очередь создается заново.
+
+    Raises:
+        CredentialsError: Очередь еще отправляет письма от другой учетной записи
+    """
+    global _default_queue, _default_queue_key
+    key = _credentials_key(gmail_credentials)
+    with _default_queue_lock:
+        if _default_queue is not None and key != _default_queue_key:
+            if _default_queue.pending:
+                raise CredentialsError(
+                    f"Очередь приветственных писем еще отправляет {_default_queue.pending} писем "
+                    f"от другой учетной записи"
+                )
+            _default_queue.stop(timeout=1)
+            _default_queue = None
+        if _default_queue is None:
+            from ..api.gmail_api import GmailService
+            from ..utils.file_paths import file_path_manager
+
+            outbox = MailOutbox(str(file_path_manager.get_data_path('welcome_outbox.jsonl')), cipher=_default_cipher())
+            outbox.compact()
+            _default_queue = WelcomeMailQueue(lambda: GmailService(gmail_credentials), outbox=outbox)
+            _default_queue_key = key
+            if _default_queue.pending:
+                _default_queue.start()
+        return _default_queue
@@ -3,6 +3,8 @@
 Окна для работы с группами и дополнительные диалоги.
 """
 
+import asyncio
+import threading
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, ttk
 import requests
@@ -12,7 +14,9 @@ import json
 from .ui_components import ModernColors, ModernButton, center_window
 from ..api.groups_api import list_groups, add_user_to_group
 from ..config.enhanced_config import config
+from ..core.domain import AuditQuery, AuditPage
 from ..utils.file_paths import get_log_path
+from ..utils.log_reader import read_page_backward
 
 
 class AsanaInviteWindow(tk.Toplevel):
@@ -267,8 +271,13 @@ class AddToGroupWindow(tk.Toplevel):
 class ErrorLogWindow(tk.Toplevel):
     """
     Окно для просмотра логов ошибок.
+
+    Журнал читается с конца страницами по PAGE_SIZE строк в фоновом потоке;
+    более ранние строки подгружаются по кнопке и добавляются сверху.
     """
     
+    PAGE_SIZE = 200
+    
     def __init__(self, master=None):
         super().__init__(master)
         self.title('Журнал ошибок')
@@ -277,6 +286,10 @@ class ErrorLogWindow(tk.Toplevel):
         self.transient(master)
         if master:
             center_window(self, master)
+        
+        self.log_path = get_log_path('errors.log')
+        self.next_offset: Optional[int] = None
+        self._loading = False
             
         self.setup_ui()
         self.load_logs()
@@ -310,6 +323,12 @@ class ErrorLogWindow(tk.Toplevel):
             command=self.load_logs, style='primary'
         ).pack(side='left', padx=(0, 10))
         
+        self.earlier_button = ModernButton(
+            button_frame, text='⬆️ Ранее',
+            command=self.load_earlier, style='secondary'
+        )
+        self.earlier_button.pack(side='left', padx=(0, 10))
+        
         ModernButton(
             button_frame, text='🧹 Очистить',
             command=self.clear_logs, style='secondary'
@@ -321,41 +340,228 @@ class ErrorLogWindow(tk.Toplevel):
         ).pack(side='right')
 
     def load_logs(self):
-        """Загрузка логов из файла"""
+        """Загрузка последних строк журнала"""
+        self.text_logs.delete(1.0, tk.END)
+        self.next_offset = None
+        self._load_page(None)
+
+    def load_earlier(self):
+        """Загрузка предыдущей страницы журнала"""
+        if self.next_offset is not None:
+            self._load_page(self.next_offset)
+
+    def _load_page(self, offset: Optional[int]):
+        if self._loading:
+            return
+        self._loading = True
+        self.earlier_button.config(state='disabled')
+
+        def worker():
+            try:
+                lines, next_offset = read_page_backward(self.log_path, offset, self.PAGE_SIZE)
+                self._safe_after(lambda: self._show_page(lines, next_offset, first=offset is None))
+            except Exception as e:
+                error = e
+                self._safe_after(lambda: self._show_error(error))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_page(self, lines, next_offset, first: bool):
+        self._loading = False
+        self.next_offset = next_offset
+        if first and not lines:
+            self.text_logs.insert(tk.END, "Ошибок в журнале нет.\n")
+        # Страница прочитана от новых строк к старым; выводим по порядку над уже показанными
+        self.text_logs.insert('1.0', ''.join(line + '\n' for line in reversed(lines)))
+        if first:
+            self.text_logs.see(tk.END)
+        self.earlier_button.config(state='normal' if next_offset is not None else 'disabled')
+
+    def _show_error(self, error: Exception):
+        self._loading = False
+        self.text_logs.insert(tk.END, f"Ошибка чтения логов: {str(error)}\n")
+        self.earlier_button.config(state='normal' if self.next_offset is not None else 'disabled')
+
+    def _safe_after(self, callback):
         try:
-            admin_log_path = get_log_path('admin_log.json')
-            if admin_log_path.exists():
-                with open(admin_log_path, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-            else:
-                # Попробуем найти в старом месте для совместимости
-                with open('admin_log.json', 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-                
-            self.text_logs.delete(1.0, tk.END)
-            
-            for log_entry in logs:
-                timestamp = log_entry.get('timestamp', 'Неизвестно')
-                level = log_entry.get('level', 'INFO')
-                message = log_entry.get('message', '')
-                
-                log_line = f"[{timestamp}] {level}: {message}\n"
-                self.text_logs.insert(tk.END, log_line)
-                
-        except FileNotFoundError:
-            self.text_logs.delete(1.0, tk.END)
-            self.text_logs.insert(tk.END, "Файл логов не найден.\n")
-        except Exception as e:
-            self.text_logs.delete(1.0, tk.END)
-            self.text_logs.insert(tk.END, f"Ошибка чтения логов: {str(e)}\n")
+            self.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            # Окно закрыто
+            pass
 
     def clear_logs(self):
         """Очистка логов"""
         try:
-            with open('admin_log.json', 'w', encoding='utf-8') as f:
-                import json
-                json.dump([], f)
+            if self.log_path.exists():
+                # Обработчик журнала пишет в режиме дозаписи, усечение безопасно
+                with open(self.log_path, 'w', encoding='utf-8'):
+                    pass
             self.load_logs()
             messagebox.showinfo('Успех', 'Логи очищены')
         except Exception as e:
             messagebox.showerror('Ошибка', f'Не удалось очистить логи: {str(e)}')
+
+
+class AuditLogWindow(tk.Toplevel):
+    """
+    Окно просмотра журнала аудита с фильтрами и полнотекстовым поиском.
+
+    Записи запрашиваются у репозитория аудита страницами (ключевая
+    пагинация) в фоновом потоке; следующая страница подгружается по кнопке
+    или при прокрутке до конца списка.
+    """
+    
+    PAGE_SIZE = 200
+    
+    def __init__(self, master=None, audit_repository=None):
+        super().__init__(master)
+        self.title('Журнал аудита')
+        self.geometry('900x520')
+        self.configure(bg=ModernColors.BACKGROUND)
+        self.transient(master)
+        if master:
+            center_window(self, master)
+        
+        self.audit_repository = audit_repository or self._default_repository(master)
+        self.query = AuditQuery(page_size=self.PAGE_SIZE)
+        self.next_cursor: Optional[str] = None
+        self.loaded = 0
+        self._loading = False
+        # Номер выборки: страницы устаревшего запроса не показываются
+        self._generation = 0
+        
+        self.setup_ui()
+        self.search()
+
+    @staticmethod
+    def _default_repository(master):
+        """Репозиторий аудита сервиса групп главного окна или SQLite по умолчанию"""
+        group_service = getattr(getattr(master, 'service', None), 'group_service', None)
+        repository = getattr(group_service, 'audit_repo', None)
+        if repository is None:
+            from ..repositories.audit_repository import SQLiteAuditRepository
+            repository = SQLiteAuditRepository()
+        return repository
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        filter_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        filter_frame.pack(fill='x', padx=20, pady=(15, 10))
+        
+        self.filter_vars = {}
+        for column, (key, title) in enumerate((('text', 'Поиск:'), ('user', 'Пользователь:'),
+                                               ('action', 'Действие:'), ('resource', 'Ресурс:'))):
+            tk.Label(filter_frame, text=title, bg=ModernColors.BACKGROUND,
+                     fg=ModernColors.TEXT_PRIMARY).grid(row=0, column=column * 2, sticky='w', padx=(0, 4))
+            var = tk.StringVar()
+            entry = tk.Entry(filter_frame, textvariable=var, width=18)
+            entry.grid(row=0, column=column * 2 + 1, sticky='we', padx=(0, 10))
+            entry.bind('<Return>', lambda _event: self.search())
+            self.filter_vars[key] = var
+        
+        ModernButton(
+            filter_frame, text='🔍 Найти',
+            command=self.search, style='primary'
+        ).grid(row=0, column=8)
+        
+        tree_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        tree_frame.pack(fill='both', expand=True, padx=20)
+        self.logs_tree = ttk.Treeview(
+            tree_frame, columns=('timestamp', 'user', 'action', 'resource', 'details'), show='headings'
+        )
+        for column, title, width in (('timestamp', 'Время', 150), ('user', 'Пользователь', 160),
+                                     ('action', 'Действие', 140), ('resource', 'Ресурс', 200),
+                                     ('details', 'Детали', 250)):
+            self.logs_tree.heading(column, text=title)
+            self.logs_tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.logs_tree.yview)
+        self.logs_tree.configure(yscrollcommand=lambda first, last: self._on_scroll(scrollbar, first, last))
+        self.logs_tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        
+        button_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        button_frame.pack(fill='x', padx=20, pady=15)
+        
+        self.more_button = ModernButton(
+            button_frame, text='⬇️ Загрузить еще',
+            command=self.load_more, style='secondary'
+        )
+        self.more_button.pack(side='left', padx=(0, 10))
+        
+        self.status_label = tk.Label(button_frame, text='', bg=ModernColors.BACKGROUND,
+                                     fg=ModernColors.TEXT_SECONDARY)
+        self.status_label.pack(side='left')
+        
+        ModernButton(
+            button_frame, text='❌ Закрыть',
+            command=self.destroy, style='secondary'
+        ).pack(side='right')
+
+    def search(self):
+        """Новая выборка по текущим фильтрам"""
+        values = {key: var.get().strip() or None for key, var in self.filter_vars.items()}
+        self.query = AuditQuery(page_size=self.PAGE_SIZE, **values)
+        self._generation += 1
+        self._loading = False
+        self.next_cursor = None
+        self.loaded = 0
+        self.logs_tree.delete(*self.logs_tree.get_children())
+        self._load_page(None)
+
+    def load_more(self):
+        """Загрузка следующей страницы"""
+        if self.next_cursor is not None:
+            self._load_page(self.next_cursor)
+
+    def _on_scroll(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+        if float(last) >= 1.0 and self.next_cursor is not None:
+            self.load_more()
+
+    def _load_page(self, cursor: Optional[str]):
+        if self._loading:
+            return
+        self._loading = True
+        self.more_button.config(state='disabled')
+        self.status_label.config(text=f'Загружено: {self.loaded}, загрузка...')
+        query, generation = self.query, self._generation
+
+        def worker():
+            try:
+                page = asyncio.run(self.audit_repository.query_logs(query, cursor))
+                self._safe_after(lambda: self._show_page(page, generation))
+            except Exception as e:
+                error = e
+                self._safe_after(lambda: self._show_error(error, generation))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_page(self, page: AuditPage, generation: int):
+        if generation != self._generation:
+            return
+        self._loading = False
+        for entry in page.entries:
+            details = json.dumps(entry.get('details') or {}, ensure_ascii=False)
+            self.logs_tree.insert('', tk.END, values=(
+                entry.get('timestamp', ''), entry.get('user', ''), entry.get('action', ''),
+                entry.get('resource', ''), details
+            ))
+        self.loaded += len(page.entries)
+        self.next_cursor = page.next_cursor
+        more = ', есть еще' if page.has_more else ''
+        self.status_label.config(text=f'Загружено: {self.loaded}{more}')
+        self.more_button.config(state='normal' if page.has_more else 'disabled')
+
+    def _show_error(self, error: Exception, generation: int):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self.status_label.config(text=f'Ошибка загрузки аудита: {error}')
+        self.more_button.config(state='normal' if self.next_cursor is not None else 'disabled')
+
+    def _safe_after(self, callback):
+        try:
+            self.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            # Окно закрыто
+            pass
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Окно массового создания пользователей из CSV/JSONL.
+"""
+
+import threading
+import tkinter as tk
+from pathlib import Path
+from tkinter import ttk, filedialog, messagebox
+from typing import Any, Optional
+
+from .ui_components import ModernColors, ModernButton, center_window
+from ..services.bulk_provisioning import (
+    BulkUserProvisioner, ProvisioningCheckpoint, default_checkpoint_path,
+    make_welcome_sender, read_rows, resolve_allowed_domains, validate_rows
+)
+
+
+class BulkProvisioningWindow(tk.Toplevel):
+    """
+    Импорт сотрудников: проверка файла, параллельное создание и отчет по строкам.
+    """
+
+    STATUS_LABELS = {
+        'created': '✅ создан',
+        'exists': 'ℹ️ существует',
+        'failed': '❌ ошибка',
+        'invalid': '⚠️ некорректна',
+        'skipped': '⏭️ пропущена',
+    }
+
+    def __init__(self, master=None, service: Any = None, on_finished: Optional[callable] = None):
+        super().__init__(master)
+        self.title('Массовое создание пользователей')
+        self.geometry('860x620')
+        self.configure(bg=ModernColors.BACKGROUND)
+        self.transient(master)
+        if master:
+            center_window(self, master)
+
+        self.service = service
+        self.on_finished = on_finished
+        self.file_path: Optional[str] = None
+        self.rows = []
+        self.invalid = []
+        self.provisioner: Optional[BulkUserProvisioner] = None
+        self.report = None
+
+        self.workers_var = tk.IntVar(value=4)
+        self.rate_var = tk.DoubleVar(value=5.0)
+        self.welcome_var = tk.BooleanVar(value=False)
+
+        self.setup_ui()
+        self.protocol('WM_DELETE_WINDOW', self.on_close)
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        tk.Label(
+            self, text='Массовое создание пользователей',
+            font=('Arial', 14, 'bold'), bg=ModernColors.BACKGROUND,
+            fg=ModernColors.TEXT_PRIMARY
+        ).pack(pady=(15, 5))
+
+        tk.Label(
+            self, text='Колонки: email, first_name, last_name, password '
+                       '[, secondary_email, phone, org_unit_path]',
+            font=('Arial', 9), bg=ModernColors.BACKGROUND, fg=ModernColors.TEXT_SECONDARY
+        ).pack(pady=(0, 10))
+
+        file_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        file_frame.pack(fill='x', padx=20)
+        ModernButton(file_frame, text='📂 Выбрать файл', command=self.choose_file,
+                     style='secondary').pack(side='left')
+        self.file_label = tk.Label(file_frame, text='Файл не выбран', font=('Arial', 10),
+                                   bg=ModernColors.BACKGROUND, fg=ModernColors.TEXT_PRIMARY)
+        self.file_label.pack(side='left', padx=10)
+
+        options_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        options_frame.pack(fill='x', padx=20, pady=10)
+        tk.Label(options_frame, text='Потоков:', bg=ModernColors.BACKGROUND).pack(side='left')
+        tk.Spinbox(options_frame, from_=1, to=16, width=4,
+                   textvariable=self.workers_var).pack(side='left', padx=(5, 15))
+        tk.Label(options_frame, text='Запросов/с:', bg=ModernColors.BACKGROUND).pack(side='left')
+        tk.Spinbox(options_frame, from_=1, to=50, width=5,
+                   textvariable=self.rate_var).pack(side='left', padx=(5, 15))
+        tk.Checkbutton(options_frame, text='Отправить приветственные письма',
+                       variable=self.welcome_var, bg=ModernColors.BACKGROUND).pack(side='left')
+
+        self.progress = ttk.Progressbar(self, mode='determinate')
+        self.progress.pack(fill='x', padx=20)
+        self.summary_label = tk.Label(self, text='', font=('Consolas', 10),
+                                      bg=ModernColors.BACKGROUND, fg=ModernColors.TEXT_PRIMARY)
+        self.summary_label.pack(anchor='w', padx=20, pady=5)
+
+        tree_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        tree_frame.pack(fill='both', expand=True, padx=20)
+        self.results_tree = ttk.Treeview(
+            tree_frame, columns=('line', 'email', 'status', 'message', 'time'), show='headings'
+        )
+        for column, title, width in (('line', 'Строка', 60), ('email', 'Email', 220),
+                                     ('status', 'Статус', 110), ('message', 'Сообщение', 300),
+                                     ('time', 'мс', 60)):
+            self.results_tree.heading(column, text=title)
+            self.results_tree.column(column, width=width)
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.results_tree.yview)
+        self.results_tree.configure(yscrollcommand=scrollbar.set)
+        self.results_tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        button_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        button_frame.pack(fill='x', padx=20, pady=15)
+        self.start_button = ModernButton(button_frame, text='🚀 Создать', command=self.start,
+                                         style='primary')
+        self.start_button.pack(side='left')
+        self.cancel_button = ModernButton(button_frame, text='⏹️ Остановить', command=self.cancel,
+                                          style='secondary')
+        self.cancel_button.pack(side='left', padx=10)
+        ModernButton(button_frame, text='💾 Сохранить отчет', command=self.save_report,
+                     style='secondary').pack(side='left')
+        ModernButton(button_frame, text='❌ Закрыть', command=self.on_close,
+                     style='secondary').pack(side='right')
+
+    def choose_file(self):
+        """Выбор и предварительная проверка файла"""
+        path = filedialog.askopenfilename(
+            parent=self, title='Файл с сотрудниками',
+            filetypes=[('CSV или JSONL', '*.csv *.jsonl *.ndjson'), ('Все файлы', '*.*')]
+        )
+        if not path:
+            return
+
+        self.file_path = path
+        self.file_label.config(text=Path(path).name)
+        self.summary_label.config(text='Проверка файла...')
+        self.results_tree.delete(*self.results_tree.get_children())
+
+        def validate():
+            try:
+                domains = resolve_allowed_domains(self._google_service())
+                rows, invalid = validate_rows(read_rows(path), domains)
+                self._safe_after(lambda: self._on_validated(rows, invalid))
+            except Exception as e:
+                error = str(e)
+                self._safe_after(lambda: self.summary_label.config(text=f'Ошибка чтения файла: {error}'))
+
+        threading.Thread(target=validate, daemon=True).start()
+
+    def _on_validated(self, rows, invalid):
+        self.rows, self.invalid = rows, invalid
+        for result in invalid:
+            self._insert_result(result)
+        self.summary_label.config(text=f'К созданию: {len(rows)}, с ошибками: {len(invalid)}')
+
+    def start(self):
+        """Запуск создания пользователей"""
+        if not self.rows:
+            messagebox.showwarning('Импорт', 'Нет корректных строк для создания', parent=self)
+            return
+        if self.provisioner is not None:
+            return
+
+        from ..auth import get_service
+
+        welcome_sender = None
+        if self.welcome_var.get():
+            from ..config.enhanced_config import config
+            credentials = getattr(getattr(self._google_service(), '_http', None), 'credentials', None)
+            welcome_sender = make_welcome_sender(credentials, config.settings.google_workspace_admin)
+
+        self.provisioner = BulkUserProvisioner(
+            service_factory=get_service,
+            max_workers=self.workers_var.get(),
+            rate_per_second=self.rate_var.get(),
+            checkpoint=ProvisioningCheckpoint(default_checkpoint_path(self.file_path)),
+            welcome_sender=welcome_sender
+        )
+        self.progress.config(maximum=len(self.rows), value=0)
+        rows, invalid = self.rows, self.invalid
+
+        def work():
+            try:
+                report = self.provisioner.run(rows, invalid, progress_callback=self._on_progress)
+                self._safe_after(lambda: self._on_finished(report))
+            except Exception as e:
+                error = e
+                self._safe_after(lambda: self._on_failed(error))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def _on_progress(self, result, done, total):
+        """Вызывается из рабочих потоков"""
+        def update():
+            self._insert_result(result)
+            self.progress.config(value=done)
+            self.summary_label.config(text=f'Обработано {done} из {total}')
+        self._safe_after(update)
+
+    def _on_finished(self, report):
+        self.report = report
+        self.provisioner = None
+        summary = report.summary()
+        self.progress.config(value=self.progress['maximum'])
+        self.summary_label.config(text=(
+            f"Создано: {summary['created']} · существовали: {summary['exists']} · "
+            f"ошибок: {summary['failed']} · пропущено: {summary['skipped']} · "
+            f"{summary['rows_per_second']} строк/с"
+        ))
+        for result in report.results:
+            if result.status == 'skipped':
+                self._insert_result(result)
+        if self.on_finished:
+            self.on_finished()
+
+    def _on_failed(self, error):
+        self.provisioner = None
+        messagebox.showerror('Импорт', f'Ошибка массового создания: {error}', parent=self)
+
+    def _insert_result(self, result):
+        self.results_tree.insert('', 'end', values=(
+            result.line, result.email, self.STATUS_LABELS.get(result.status, result.status),
+            result.message, f'{result.duration_ms:.0f}' if result.duration_ms else ''
+        ))
+
+    def cancel(self):
+        """Остановка после текущих запросов"""
+        if self.provisioner is not None:
+            self.provisioner.cancel()
+            self.summary_label.config(text='Остановка... повторный запуск продолжит с контрольной точки')
+
+    def save_report(self):
+        """Сохранение отчета по строкам"""
+        if self.report is None:
+            messagebox.showinfo('Импорт', 'Отчет появится после завершения импорта', parent=self)
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self, defaultextension='.csv',
+            filetypes=[('CSV', '*.csv'), ('JSON', '*.json')]
+        )
+        if path:
+            self.report.save(path)
+
+    def _google_service(self) -> Any:
+        """Прямой сервис Directory API (ServiceAdapter не дает доступа к domains())"""
+        if self.service is not None and callable(getattr(self.service, 'users', None)):
+            return self.service
+        from ..auth import get_service
+        return get_service()
+
+    def _safe_after(self, callback):
+        try:
+            self.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            # Окно закрыто
+            pass
+
+    def on_close(self):
+        """Закрытие окна с остановкой импорта"""
+        self.cancel()
+        self.destroy()
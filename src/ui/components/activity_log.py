@@ -3,29 +3,106 @@
 Журнал активности для главного окна приложения.
 """
 
+import threading
 import tkinter as tk
+from collections import deque
 from tkinter import scrolledtext
 from datetime import datetime
-from typing import Optional
+from typing import Deque, List, Optional, Tuple
 
 from ..ui_components import ModernColors, ModernButton
 from ...themes.theme_manager import theme_manager
 
 
+# Цвета уровней журнала
+LEVEL_COLORS = {
+    'INFO': 'black',
+    'WARNING': 'orange',
+    'ERROR': 'red',
+    'SUCCESS': 'green'
+}
+
+# Запись журнала: (время, уровень, сообщение)
+LogEntry = Tuple[str, str, str]
+
+
+class LogBuffer:
+    """
+    Потокобезопасный буфер журнала.
+    
+    Хранит кольцевой буфер последних записей и очередь записей,
+    еще не выведенных в виджет. Производители (включая рабочие потоки)
+    только добавляют запись; виджет забирает накопленное пачкой.
+    """
+    
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._history: Deque[LogEntry] = deque(maxlen=max_entries)
+        self._pending: Deque[LogEntry] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+    
+    def append(self, message: str, level: str = 'INFO') -> LogEntry:
+        """Добавляет запись (можно вызывать из любого потока)."""
+        entry = (datetime.now().strftime('%H:%M:%S'), level, message)
+        with self._lock:
+            self._history.append(entry)
+            self._pending.append(entry)
+        return entry
+    
+    def drain(self) -> List[LogEntry]:
+        """
+        Забирает записи, накопленные с прошлого вызова.
+        
+        Если записей больше, чем помещается в буфер, старые уже вытеснены:
+        выводить их все равно не имеет смысла.
+        """
+        with self._lock:
+            entries = list(self._pending)
+            self._pending.clear()
+        return entries
+    
+    def entries(self) -> List[LogEntry]:
+        """Возвращает последние записи (не более max_entries)."""
+        with self._lock:
+            return list(self._history)
+    
+    def clear(self):
+        """Очищает буфер."""
+        with self._lock:
+            self._history.clear()
+            self._pending.clear()
+    
+    @staticmethod
+    def format_entry(entry: LogEntry) -> str:
+        timestamp, level, message = entry
+        return f'[{timestamp}] {level}: {message}\n'
+
+
 class ActivityLog(tk.Frame):
     """
     Панель журнала активности.
+    
+    Записи копятся в LogBuffer и выводятся в виджет одной пачкой за кадр,
+    виджет хранит не более MAX_ENTRIES строк.
     """
     
+    MAX_ENTRIES = 1000
+    FLUSH_INTERVAL = 50  # мс, один вывод в виджет за кадр
+    
     def __init__(self, parent: tk.Widget):
         super().__init__(parent, relief='solid', bd=1)
         
+        self.buffer = LogBuffer(self.MAX_ENTRIES)
+        self._flush_job: Optional[str] = None
+        
         self._setup_ui()
         self.apply_theme()
         
         # Подписываемся на изменения темы
         theme_manager.add_theme_change_callback(self.on_theme_changed)
         
+        self._flush_job = self.after(self.FLUSH_INTERVAL, self._flush_loop)
+        
     def _setup_ui(self):
         """Настройка пользовательского интерфейса журнала"""
         self.pack(side='right', fill='both', expand=True, padx=0, pady=0)
@@ -69,43 +146,73 @@ class ActivityLog(tk.Frame):
             bd=1
         )
         self.log_text.pack(fill='both', expand=True)
+        self._configured_tags = set()
         
     def add_entry(self, message: str, level: str = 'INFO'):
-        """Добавляет запись в журнал активности"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
+        """
+        Добавляет запись в журнал активности.
         
-        # Определяем цвет для разных уровней
-        color_map = {
-            'INFO': 'black',
-            'WARNING': 'orange',
-            'ERROR': 'red',
-            'SUCCESS': 'green'
-        }
+        Потокобезопасно: запись попадает в буфер и выводится в виджет
+        при ближайшем кадре.
+        """
+        self.buffer.append(message, level)
         
-        log_entry = f'[{timestamp}] {level}: {message}\n'
+    def _flush_loop(self):
+        """Периодический вывод накопленных записей в виджет"""
+        try:
+            self.flush()
+        finally:
+            self._flush_job = self.after(self.FLUSH_INTERVAL, self._flush_loop)
         
-        # Вставляем текст
-        self.log_text.insert(tk.END, log_entry)
+    def flush(self):
+        """Выводит накопленные записи в виджет одной вставкой"""
+        entries = self.buffer.drain()
+        if not entries:
+            return
         
-        # Применяем цвет к последней строке
-        start_line = self.log_text.index(tk.END + "-2l linestart")
-        end_line = self.log_text.index(tk.END + "-1l lineend")
+        # Прокручиваем к концу, только если пользователь не листает журнал вверх
+        at_bottom = self.log_text.yview()[1] >= 0.999
         
-        tag_name = f"level_{level}"
-        self.log_text.tag_add(tag_name, start_line, end_line)
-        self.log_text.tag_config(tag_name, foreground=color_map.get(level, 'black'))
+        # Одна вставка: пары (текст, тег) для всех новых строк
+        chunks = []
+        for entry in entries:
+            tag_name = self._level_tag(entry[1])
+            chunks.extend((LogBuffer.format_entry(entry), tag_name))
+        self.log_text.insert(tk.END, *chunks)
+        
+        # Удаляем строки сверх лимита
+        line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        excess = line_count - self.MAX_ENTRIES
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
         
-        # Прокручиваем к концу
-        self.log_text.see(tk.END)
+        if at_bottom:
+            self.log_text.see(tk.END)
+        
+    def _level_tag(self, level: str) -> str:
+        """Возвращает тег уровня, настраивая его при первом использовании"""
+        tag_name = f"level_{level}"
+        if tag_name not in self._configured_tags:
+            self.log_text.tag_config(tag_name, foreground=LEVEL_COLORS.get(level, 'black'))
+            self._configured_tags.add(tag_name)
+        return tag_name
         
     def clear_log(self):
         """Очистка журнала активности"""
+        self.buffer.clear()
         self.log_text.delete(1.0, tk.END)
         self.add_entry('Журнал активности очищен')
         
     def get_log_content(self) -> str:
-        """Получение содержимого журнала"""
-        return self.log_text.get(1.0, tk.END)
+        """Получение содержимого журнала (последние MAX_ENTRIES записей)"""
+        return ''.join(LogBuffer.format_entry(entry) for entry in self.buffer.entries())
+        
+    def destroy(self):
+        """Уничтожение панели с остановкой вывода"""
+        if self._flush_job is not None:
+            self.after_cancel(self._flush_job)
+            self._flush_job = None
+        super().destroy()
         
     def save_log_to_file(self, filename: str):
         """Сохранение журнала в файл"""
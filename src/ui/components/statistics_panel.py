@@ -4,12 +4,11 @@
 """
 
 import tkinter as tk
-from typing import Optional, Any, Callable
+from typing import Optional, Any, Callable, Dict
 
 from ..ui_components import ModernColors, ModernButton
-from ...api.users_api import get_user_list
-from ...api.groups_api import list_groups
 from ...themes.theme_manager import theme_manager
+from ...utils.statistics_engine import statistics_engine
 
 
 class StatisticsPanel(tk.Frame):
@@ -30,6 +29,9 @@ class StatisticsPanel(tk.Frame):
         # Подписываемся на изменения темы
         theme_manager.add_theme_change_callback(self.on_theme_changed)
         
+        # Подписываемся на инкрементальные изменения статистики
+        statistics_engine.add_listener(self._on_statistics_changed)
+        
     def _setup_ui(self):
         """Настройка пользовательского интерфейса панели"""
         self.pack(side='left', fill='y', padx=(0, 8), pady=0, ipadx=10, ipady=10)
@@ -69,6 +71,16 @@ class StatisticsPanel(tk.Frame):
         )
         self.total_groups_label.pack(anchor='w', pady=1)
         
+        self.details_label = tk.Label(
+            self.stats_frame,
+            text='',
+            font=('Arial', 9),
+            bg=ModernColors.CARD_BG,
+            fg=ModernColors.TEXT_SECONDARY,
+            justify='left'
+        )
+        self.details_label.pack(anchor='w', pady=(4, 1))
+        
     def _create_quick_actions_section(self):
         """Создание секции быстрых действий"""
         # Быстрые действия
@@ -99,27 +111,47 @@ class StatisticsPanel(tk.Frame):
             font=('Arial', 9)
         ).pack(fill='x', pady=1)
         
+        ModernButton(
+            quick_actions_frame,
+            text='🛡️ Аудит',
+            command=self.callbacks.get('audit_log', self._no_callback),
+            style='secondary',
+            font=('Arial', 9)
+        ).pack(fill='x', pady=1)
+        
     def _no_callback(self):
         """Заглушка для отсутствующих callback'ов"""
         pass
         
-    def load_statistics(self):
-        """Загрузка статистики пользователей и групп"""
+    def load_statistics(self, force_refresh: bool = False):
+        """
+        Загрузка статистики пользователей и групп
+        
+        Полные списки загружаются только при первом вызове или при
+        принудительном обновлении; дальше статистика берется из счетчиков.
+        """
         if not self.service:
             return
+        
+        if statistics_engine.loaded and not force_refresh:
+            snapshot = statistics_engine.snapshot()
+            self.show_snapshot(snapshot)
+            return snapshot['total_users'], snapshot['total_groups']
             
+        # API модули импортируются при первой загрузке, а не при отрисовке панели
+        from ...api.users_api import get_user_list
+        from ...api.groups_api import list_groups
+        
         try:
             # Загружаем пользователей
-            users = get_user_list(self.service)
-            users_count = len(users)
-            self.total_users_label.config(text=f'Пользователи: {users_count}')
+            statistics_engine.load_users(get_user_list(self.service))
             
             # Загружаем группы
-            groups = list_groups(self.service)
-            groups_count = len(groups)
-            self.total_groups_label.config(text=f'Группы: {groups_count}')
+            statistics_engine.load_groups(list_groups(self.service))
             
-            return users_count, groups_count
+            snapshot = statistics_engine.snapshot()
+            self.show_snapshot(snapshot)
+            return snapshot['total_users'], snapshot['total_groups']
             
         except Exception as e:
             self.total_users_label.config(text='Пользователи: ошибка')
@@ -130,10 +162,32 @@ class StatisticsPanel(tk.Frame):
         """Обновление отображаемой статистики"""
         self.total_users_label.config(text=f'Пользователи: {users_count}')
         self.total_groups_label.config(text=f'Группы: {groups_count}')
+    
+    def show_snapshot(self, snapshot: Dict[str, Any]):
+        """Отображение статистики из StatisticsEngine.snapshot()"""
+        self.update_statistics(snapshot['total_users'], snapshot['total_groups'])
+        self.details_label.config(
+            text=f"Активные: {snapshot['active_users']}\n"
+                 f"Заблокированные: {snapshot['suspended_users']}\n"
+                 f"Подразделений: {len(snapshot['users_by_org_unit'])}"
+        )
+    
+    def _on_statistics_changed(self, snapshot: Dict[str, Any]):
+        """Обработчик изменения статистики (может вызываться из фонового потока)"""
+        try:
+            self.after(0, lambda: self.show_snapshot(snapshot))
+        except (RuntimeError, tk.TclError):
+            # Панель уничтожена или главный цикл не запущен
+            pass
         
     def refresh(self):
         """Принудительное обновление статистики"""
-        return self.load_statistics()
+        return self.load_statistics(force_refresh=True)
+    
+    def destroy(self):
+        """Уничтожение панели с отпиской от статистики"""
+        statistics_engine.remove_listener(self._on_statistics_changed)
+        super().destroy()
     
     def apply_theme(self):
         """Применение текущей темы"""
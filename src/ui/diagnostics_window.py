@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Окно диагностики отзывчивости интерфейса.
+"""
+
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+
+from .ui_components import ModernColors, ModernButton, center_window
+from ..utils.event_loop_monitor import ui_monitor
+
+
+class UIDiagnosticsWindow(tk.Toplevel):
+    """
+    Окно с задержками кадров, зависаниями главного потока и временем обработчиков.
+    """
+
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, master=None):
+        super().__init__(master)
+        self.title('Диагностика UI')
+        self.geometry('760x560')
+        self.configure(bg=ModernColors.BACKGROUND)
+        self.transient(master)
+        if master:
+            center_window(self, master)
+
+        self._stalls = []
+        self._refresh_job = None
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        """Настройка пользовательского интерфейса"""
+        title_label = tk.Label(
+            self, text='Диагностика отзывчивости интерфейса',
+            font=('Arial', 14, 'bold'), bg=ModernColors.BACKGROUND,
+            fg=ModernColors.TEXT_PRIMARY
+        )
+        title_label.pack(pady=(15, 5))
+
+        self.summary_label = tk.Label(
+            self, text='', font=('Consolas', 10),
+            bg=ModernColors.BACKGROUND, fg=ModernColors.TEXT_PRIMARY, justify='left'
+        )
+        self.summary_label.pack(anchor='w', padx=20, pady=(0, 10))
+
+        # Зависания главного потока
+        tk.Label(self, text='Зависания главного потока:', font=('Arial', 11, 'bold'),
+                 bg=ModernColors.BACKGROUND, fg=ModernColors.TEXT_PRIMARY).pack(anchor='w', padx=20)
+
+        stalls_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        stalls_frame.pack(fill='x', padx=20, pady=(5, 5))
+
+        self.stalls_tree = ttk.Treeview(
+            stalls_frame, columns=('time', 'duration', 'handler'), show='headings', height=6
+        )
+        self.stalls_tree.heading('time', text='Время')
+        self.stalls_tree.heading('duration', text='Длительность, мс')
+        self.stalls_tree.heading('handler', text='Обработчик')
+        self.stalls_tree.column('time', width=90)
+        self.stalls_tree.column('duration', width=120)
+        self.stalls_tree.column('handler', width=480)
+        self.stalls_tree.pack(side='left', fill='x', expand=True)
+        self.stalls_tree.bind('<<TreeviewSelect>>', self.on_stall_select)
+
+        self.stack_text = scrolledtext.ScrolledText(
+            self, height=8, wrap=tk.NONE, font=('Consolas', 9),
+            bg='white', fg=ModernColors.TEXT_PRIMARY
+        )
+        self.stack_text.pack(fill='both', expand=True, padx=20, pady=(0, 10))
+
+        # Время обработчиков (@measure_performance)
+        tk.Label(self, text='Время обработчиков:', font=('Arial', 11, 'bold'),
+                 bg=ModernColors.BACKGROUND, fg=ModernColors.TEXT_PRIMARY).pack(anchor='w', padx=20)
+
+        self.handlers_tree = ttk.Treeview(
+            self, columns=('count', 'p50', 'max'), show='tree headings', height=4
+        )
+        self.handlers_tree.heading('#0', text='Обработчик')
+        self.handlers_tree.heading('count', text='Вызовов')
+        self.handlers_tree.heading('p50', text='p50, мс')
+        self.handlers_tree.heading('max', text='Макс, мс')
+        self.handlers_tree.column('#0', width=360)
+        self.handlers_tree.column('count', width=80)
+        self.handlers_tree.column('p50', width=100)
+        self.handlers_tree.column('max', width=100)
+        self.handlers_tree.pack(fill='x', padx=20, pady=(5, 10))
+
+        button_frame = tk.Frame(self, bg=ModernColors.BACKGROUND)
+        button_frame.pack(fill='x', padx=20, pady=(0, 15))
+
+        ModernButton(
+            button_frame, text='🧹 Сбросить',
+            command=self.reset_stats, style='secondary'
+        ).pack(side='left')
+
+        ModernButton(
+            button_frame, text='❌ Закрыть',
+            command=self.destroy, style='secondary'
+        ).pack(side='right')
+
+    def refresh(self):
+        """Обновление данных (повторяется каждую секунду)"""
+        stats = ui_monitor.get_stats()
+        state = 'активен' if ui_monitor.running else 'остановлен'
+        self.summary_label.config(text=(
+            f"Монитор: {state}, тик каждые {ui_monitor.interval_ms} мс, "
+            f"порог зависания {ui_monitor.stall_threshold_ms} мс\n"
+            f"Задержка кадра: p50 {stats['p50']:.0f} мс · p90 {stats['p90']:.0f} мс · "
+            f"p99 {stats['p99']:.0f} мс · макс {stats['max']:.0f} мс "
+            f"({stats['samples']} замеров, зависаний: {stats['stalls']})"
+        ))
+
+        stalls = ui_monitor.get_stalls()
+        if len(stalls) != len(self._stalls) or stalls[-1:] != self._stalls[-1:]:
+            self._stalls = stalls
+            self.stalls_tree.delete(*self.stalls_tree.get_children())
+            for index, stall in reversed(list(enumerate(stalls))):
+                self.stalls_tree.insert('', 'end', iid=str(index), values=(
+                    stall.started_at.strftime('%H:%M:%S'),
+                    f'{stall.duration_ms:.0f}',
+                    stall.handler
+                ))
+
+        self.handlers_tree.delete(*self.handlers_tree.get_children())
+        handler_stats = sorted(ui_monitor.get_handler_stats().items(),
+                               key=lambda kv: kv[1]['max'], reverse=True)
+        for name, values in handler_stats:
+            self.handlers_tree.insert('', 'end', text=name, values=(
+                values['count'], f"{values['p50']:.0f}", f"{values['max']:.0f}"
+            ))
+
+        self._refresh_job = self.after(self.REFRESH_INTERVAL, self.refresh)
+
+    def on_stall_select(self, event=None):
+        """Показ стека выбранного зависания"""
+        selection = self.stalls_tree.selection()
+        if not selection:
+            return
+
+        stall = self._stalls[int(selection[0])]
+        self.stack_text.delete(1.0, tk.END)
+        if stall.stack:
+            self.stack_text.insert(tk.END, ''.join(stall.stack))
+        else:
+            self.stack_text.insert(tk.END, 'Стек не снят: тик пришел раньше сторожевого потока.\n')
+
+    def reset_stats(self):
+        """Сброс накопленной статистики"""
+        ui_monitor.reset()
+        self._stalls = []
+        self.stalls_tree.delete(*self.stalls_tree.get_children())
+        self.stack_text.delete(1.0, tk.END)
+
+    def destroy(self):
+        """Закрытие окна с отменой обновления"""
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
@@ -7,6 +7,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import logging
+import re
+import threading
 from typing import Optional, List
 
 from .ui_components import ModernColors, ModernButton, center_window
@@ -336,6 +338,17 @@ class DocumentManagementWindow:
         )
         notify_check.pack(side='left')
         
+        self.all_docs_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            notify_frame,
+            text="Ко всем предустановленным документам",
+            variable=self.all_docs_var,
+            font=('Segoe UI', 9),
+            bg=ModernColors.BACKGROUND,
+            fg=ModernColors.TEXT_PRIMARY,
+            selectcolor='white'
+        ).pack(side='left', padx=(12, 0))
+        
         # Список разрешений
         permissions_frame = tk.LabelFrame(
             self.window,
@@ -609,24 +622,34 @@ class DocumentManagementWindow:
     def _add_access(self):
         """Добавление доступа к документу"""
         try:
-            email = self.email_entry.get().strip()
+            # Можно ввести несколько адресов через запятую, точку с запятой или пробел
+            emails = [e for e in re.split(r'[,;\s]+', self.email_entry.get().strip()) if e]
             display_role = self.role_var.get()
             api_role = self._convert_role_to_api(display_role)
             notify = self.notify_var.get()
             
-            if not email:
+            if not emails:
                 messagebox.showwarning("Предупреждение", "Введите email пользователя")
                 return
             
             # Простая проверка валидности email
-            import re
             email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, email):
+            invalid = [e for e in emails if not re.match(email_pattern, e)]
+            if invalid:
                 messagebox.showwarning("Неверный email", 
-                                     f"Введите корректный email адрес.\n"
+                                     f"Введите корректный email адрес: {invalid[0]}\n"
                                      f"Пример: user@example.com")
                 return
             
+            if len(emails) > 1 or self.all_docs_var.get():
+                urls = list(self.predefined_docs.values()) if self.all_docs_var.get() else []
+                if self.current_document_url and self.current_document_url not in urls:
+                    urls.append(self.current_document_url)
+                self._add_access_bulk(urls, emails, api_role, display_role, notify)
+                return
+            
+            email = emails[0]
+            
             # Автоматически включаем уведомления для корпоративных email
             if email.endswith('@sputnik8.com'):
                 notify = True  # Принудительно включаем уведомления для корпоративного домена
@@ -671,6 +694,43 @@ class DocumentManagementWindow:
             logger.error(f"Ошибка при добавлении доступа: {e}")
             messagebox.showerror("Ошибка", f"Ошибка при добавлении доступа: {str(e)}")
     
+    def _add_access_bulk(self, urls, emails, api_role, display_role, notify):
+        """Выдача доступа нескольким пользователям к нескольким документам в фоне"""
+        message = f"Предоставлен доступ к документу с ролью '{display_role}'"
+        
+        def worker():
+            try:
+                result = self.document_service.grant_access_bulk(urls, emails, api_role, notify, message)
+                self._safe_after(lambda: self._on_bulk_access_done(result, display_role))
+            except Exception as e:
+                logger.error(f"Ошибка массового предоставления доступа: {e}")
+                error = str(e)
+                self._safe_after(lambda: messagebox.showerror("Ошибка", f"Ошибка при добавлении доступа: {error}"))
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def _on_bulk_access_done(self, result, display_role):
+        """Итог массовой выдачи доступа"""
+        text = (f"Роль: {display_role}\n"
+                f"Выдано: {len(result.granted)}\n"
+                f"Уже был доступ: {len(result.skipped)}\n"
+                f"Ошибок: {len(result.failed)}")
+        if result.failed:
+            details = '\n'.join(f"• {email} ({file_id}): {error[:80]}"
+                                for (file_id, email), error in list(result.failed.items())[:5])
+            messagebox.showwarning("Доступ предоставлен частично", f"{text}\n\n{details}")
+        else:
+            messagebox.showinfo("Успех", text)
+            self.email_entry.delete(0, tk.END)
+        self._refresh_permissions()
+    
+    def _safe_after(self, callback):
+        """Передает вызов в поток интерфейса, если окно еще открыто"""
+        try:
+            self.window.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            pass
+    
     def _remove_access(self):
         """Удаление доступа к документу"""
         try:
@@ -675,7 +675,8 @@ class FreeIPAManagementWindow(tk.Toplevel):
         async def test_async():
             try:
                 service = FreeIPAService(self.config)
-                if service.connect():
+                # Сохраненная сессия переиспользуется: проверка стоит один RPC вызов
+                if service.connect() and service.test_connection():
                     self._log_result("✅ Подключение к FreeIPA успешно")
                     self.connection_status.config(text="✅ Подключен", fg=ModernColors.SUCCESS)
                     service.disconnect()
@@ -949,7 +950,7 @@ class FreeIPAManagementWindow(tk.Toplevel):
         async_manager.run_async(refresh_async)
     
     def _compare_groups(self):
-        """Сравнение групп между Google Workspace и FreeIPA"""
+        """Сравнение групп и их состава между Google Workspace и FreeIPA"""
         if not self.freeipa_integration:
             messagebox.showerror("Ошибка", "Сначала подключитесь к FreeIPA")
             return
@@ -958,61 +959,60 @@ class FreeIPAManagementWindow(tk.Toplevel):
             try:
                 self._log_result("🔍 Сравнение групп между Google Workspace и FreeIPA...")
                 
-                # Получаем группы из Google Workspace
-                google_groups = []
-                if self.group_service and hasattr(self.group_service, 'get_all_groups'):
-                    google_groups = await self.group_service.get_all_groups()
-                
-                # Получаем группы из FreeIPA
-                freeipa_groups = await self.freeipa_integration.freeipa_client.get_groups()
-                
-                # Создаем списки имен групп для сравнения
-                google_group_names = set()
-                for group in google_groups:
-                    if isinstance(group, dict):
-                        name = group.get('name', group.get('email', ''))
-                        if name:
-                            google_group_names.add(name.lower())
-                
-                freeipa_group_names = set()
-                for group in freeipa_groups:
-                    if isinstance(group, dict):
-                        name = group.get('cn', [group.get('group_name', '')])[0]
-                        if name:
-                            freeipa_group_names.add(name.lower())
-                    else:
-                        freeipa_group_names.add(str(group).lower())
-                
-                # Анализ различий
-                in_both = google_group_names & freeipa_group_names
-                only_in_google = google_group_names - freeipa_group_names
-                only_in_freeipa = freeipa_group_names - google_group_names
+                # Обе стороны загружаются целиком, состав всех групп сравнивается за один проход
+                comparison = await self.freeipa_integration.compare_group_memberships()
+                if comparison is None:
+                    self.stats_text.insert(tk.END, "❌ Ошибка сравнения: подробности в журнале\n")
+                    return
+                summary = comparison.summary()
+                only_in_google = comparison.only_in_google
+                only_in_freeipa = comparison.only_in_freeipa
                 
                 self.stats_text.delete(1.0, tk.END)
                 self.stats_text.insert(tk.END, "🔍 Сравнение групп:\n")
                 self.stats_text.insert(tk.END, "=" * 40 + "\n\n")
                 
-                self.stats_text.insert(tk.END, f"📊 Google Workspace: {len(google_group_names)} групп\n")
-                self.stats_text.insert(tk.END, f"📊 FreeIPA: {len(freeipa_group_names)} групп\n")
-                self.stats_text.insert(tk.END, f"🔗 В обеих системах: {len(in_both)}\n")
-                self.stats_text.insert(tk.END, f"🟢 Только в Google: {len(only_in_google)}\n")
-                self.stats_text.insert(tk.END, f"🟡 Только в FreeIPA: {len(only_in_freeipa)}\n\n")
+                self.stats_text.insert(tk.END, f"📊 Google Workspace: {summary['google_groups']} групп\n")
+                self.stats_text.insert(tk.END, f"📊 FreeIPA: {summary['freeipa_groups']} групп\n")
+                self.stats_text.insert(tk.END, f"🔗 В обеих системах: {summary['in_both']}\n")
+                self.stats_text.insert(tk.END, f"🟢 Только в Google: {summary['only_in_google']}\n")
+                self.stats_text.insert(tk.END, f"🟡 Только в FreeIPA: {summary['only_in_freeipa']}\n\n")
+                
+                self.stats_text.insert(tk.END, "👥 Состав групп:\n")
+                self.stats_text.insert(tk.END, f"  🔄 Групп с различиями: {summary['groups_changed']}\n")
+                self.stats_text.insert(tk.END, f"  ➕ Добавить в FreeIPA: {summary['planned_adds']}\n")
+                self.stats_text.insert(tk.END, f"  ➖ Удалить из FreeIPA: {summary['planned_removes']}\n")
+                self.stats_text.insert(tk.END, f"  ❔ Нет пользователя FreeIPA: {summary['unresolved']}\n\n")
+                
+                changed = comparison.changed
+                if changed:
+                    self.stats_text.insert(tk.END, "🔄 Группы с различиями состава:\n")
+                    for diff in changed[:15]:
+                        self.stats_text.insert(
+                            tk.END, f"  📁 {diff.cn}: +{len(diff.to_add)} / -{len(diff.to_remove)}"
+                                    f"{'' if diff.exists else ' (нет в FreeIPA)'}\n")
+                    if len(changed) > 15:
+                        self.stats_text.insert(tk.END, f"  ... и еще {len(changed) - 15}\n")
                 
                 if only_in_google:
-                    self.stats_text.insert(tk.END, "� Группы только в Google (можно создать в FreeIPA):\n")
-                    for group_name in sorted(list(only_in_google))[:15]:
+                    self.stats_text.insert(tk.END, "\n📝 Группы только в Google (можно создать в FreeIPA):\n")
+                    for group_name in only_in_google[:15]:
                         self.stats_text.insert(tk.END, f"  📁 {group_name}\n")
                     if len(only_in_google) > 15:
                         self.stats_text.insert(tk.END, f"  ... и еще {len(only_in_google) - 15}\n")
                 
                 if only_in_freeipa:
-                    self.stats_text.insert(tk.END, "\n� Группы только в FreeIPA:\n")
-                    for group_name in sorted(list(only_in_freeipa))[:10]:
+                    self.stats_text.insert(tk.END, "\n📝 Группы только в FreeIPA:\n")
+                    for group_name in only_in_freeipa[:10]:
                         self.stats_text.insert(tk.END, f"  🔗 {group_name}\n")
                     if len(only_in_freeipa) > 10:
                         self.stats_text.insert(tk.END, f"  ... и еще {len(only_in_freeipa) - 10}\n")
-                        
+                
+                for key, error in list(comparison.failures.items())[:5]:
+                    self.stats_text.insert(tk.END, f"\n⚠️ {key}: {error}")
+                
                 self.stats_text.insert(tk.END, f"\n🕐 Обновлено: {datetime.now().strftime('%H:%M:%S')}\n")
+                self._log_result(f"✅ Сравнение групп: {summary['groups_changed']} групп с различиями состава")
                 
             except Exception as e:
                 self.stats_text.insert(tk.END, f"❌ Ошибка сравнения: {e}\n")
@@ -3,9 +3,11 @@
 Продвинутое управление группами - создание, редактирование, удаление и управление членством.
 """
 
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox, ttk, simpledialog
-from typing import Any, Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict
 
 from .ui_components import ModernColors, ModernButton, center_window
 from ..api.groups_api import (
@@ -14,7 +16,11 @@ from ..api.groups_api import (
 )
 from ..api.users_api import get_user_list
 from ..api.service_adapter import ServiceAdapter
-from ..utils.data_cache import data_cache
+from ..utils.data_cache import data_cache, group_members_cache
+
+
+# Сколько соседних групп (выше и ниже выбранной) загружать заранее
+PREFETCH_RADIUS = 2
 
 
 class GroupManagementWindow(tk.Toplevel):
@@ -37,9 +43,53 @@ class GroupManagementWindow(tk.Toplevel):
             center_window(self, master)
             
         self.selected_group = None
+        # Один фоновый поток: запросы к API выполняются последовательно,
+        # т.к. клиент Google API (httplib2) не потокобезопасен
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='group-loader')
+        self._members_generation = 0
+        self._prefetch_pending = set()
+        self._closed = False
+        
         self.setup_ui()
         self.load_groups()
 
+    def destroy(self):
+        """Закрытие окна с остановкой фоновой загрузки"""
+        self._closed = True
+        self._loader.shutdown(wait=False)
+        super().destroy()
+
+    def _run_in_background(self, func: Callable, on_success: Callable,
+                           on_error: Optional[Callable] = None):
+        """
+        Выполняет func в фоновом потоке и передает результат в главный поток Tk.
+        
+        Args:
+            func: Функция для выполнения
+            on_success: Вызывается в главном потоке с результатом func
+            on_error: Вызывается в главном потоке с исключением
+        """
+        def worker():
+            try:
+                result = func()
+                callback, arg = on_success, result
+            except Exception as e:
+                callback, arg = on_error, e
+            
+            if callback is None or self._closed:
+                return
+            try:
+                self.after(0, callback, arg)
+            except (RuntimeError, tk.TclError):
+                # Окно закрыто, пока шла загрузка
+                pass
+        
+        try:
+            self._loader.submit(worker)
+        except RuntimeError:
+            # Executor уже остановлен (окно закрывается)
+            pass
+
     def setup_ui(self):
         """Настройка пользовательского интерфейса"""
         # Заголовок (более компактный)
@@ -79,7 +129,7 @@ class GroupManagementWindow(tk.Toplevel):
         
         ModernButton(
             group_buttons_frame, text='Обновить',
-            command=self.load_groups, style='secondary'
+            command=self.refresh_groups, style='secondary'
         ).pack(side='right')
         
         # Список групп
@@ -156,29 +206,46 @@ class GroupManagementWindow(tk.Toplevel):
             self, text='Закрыть', command=self.destroy, style='secondary'
         ).pack(pady=(10, 0))
 
+    def refresh_groups(self):
+        """Принудительное обновление групп и сброс кэша участников"""
+        group_members_cache.clear()
+        self.load_groups()
+
     def load_groups(self):
-        """Загрузка списка групп"""
+        """Фоновая загрузка списка групп"""
         if not self.service:
             messagebox.showerror('Ошибка', 'Сервис Google API недоступен')
             return
             
-        try:
-            # Очищаем список
-            for item in self.groups_tree.get_children():
-                self.groups_tree.delete(item)
-            
-            groups = list_groups(self.service)
+        # Очищаем список
+        for item in self.groups_tree.get_children():
+            self.groups_tree.delete(item)
+        self.groups_tree.insert('', 'end', text='Загрузка групп...', values=('', ''))
+        
+        self._run_in_background(
+            lambda: list_groups(self.service),
+            self._display_groups,
+            lambda e: self._show_load_error('Ошибка загрузки групп', e)
+        )
+
+    def _display_groups(self, groups: List[Dict[str, Any]]):
+        """Отображение загруженных групп"""
+        for item in self.groups_tree.get_children():
+            self.groups_tree.delete(item)
+        
+        for group in groups:
+            name = group.get('name', 'Без названия')
+            email = group.get('email', '')
+            members_count = group.get('directMembersCount', 0)
             
-            for group in groups:
-                name = group.get('name', 'Без названия')
-                email = group.get('email', '')
-                members_count = group.get('directMembersCount', 0)
-                
-                self.groups_tree.insert('', 'end', text=name, 
-                                      values=(email, members_count))
-                
-        except Exception as e:
-            messagebox.showerror('Ошибка', f'Ошибка загрузки групп: {str(e)}')
+            self.groups_tree.insert('', 'end', text=name, 
+                                  values=(email, members_count))
+
+    def _show_load_error(self, title: str, error: Exception):
+        """Показ ошибки фоновой загрузки"""
+        if self._closed:
+            return
+        messagebox.showerror('Ошибка', f'{title}: {str(error)}', parent=self)
 
     def on_group_select(self, event):
         """Обработка выбора группы"""
@@ -192,22 +259,96 @@ class GroupManagementWindow(tk.Toplevel):
         if group_email:
             self.selected_group = group_email
             self.load_group_members(group_email)
+            self._prefetch_neighbours(selection[0])
 
-    def load_group_members(self, group_email: str):
-        """Загрузка участников группы"""
-        try:
-            self.members_listbox.delete(0, tk.END)
-            
-            members = get_group_members(self.service, group_email)
-            
-            for member in members:
-                member_email = member.get('email', '')
-                member_name = member.get('name', member_email)
-                display_text = f"{member_name} ({member_email})"
-                self.members_listbox.insert(tk.END, display_text)
+    def load_group_members(self, group_email: str, force_refresh: bool = False):
+        """
+        Загрузка участников группы: из кэша сразу, иначе в фоновом потоке.
+        
+        Args:
+            group_email: Email группы
+            force_refresh: Игнорировать кэш и загрузить состав заново
+        """
+        # Новое поколение запроса: отменяет ожидающую предзагрузку
+        # и отбрасывает ответы для ранее выбранных групп
+        self._members_generation += 1
+        generation = self._members_generation
+        
+        if force_refresh:
+            group_members_cache.invalidate(group_email)
+        else:
+            cached = group_members_cache.get(group_email)
+            if cached is not None:
+                self._display_members(cached)
+                return
+        
+        self.members_listbox.delete(0, tk.END)
+        self.members_listbox.insert(tk.END, 'Загрузка участников...')
+        
+        def fetch():
+            # Ошибка API не должна попасть в кэш как пустой состав группы
+            members = get_group_members(self.service, group_email, raise_errors=True)
+            group_members_cache.put(group_email, members)
+            return members
+        
+        def on_loaded(members):
+            # Пользователь успел выбрать другую группу
+            if generation != self._members_generation or self.selected_group != group_email:
+                return
+            self._display_members(members)
+        
+        self._run_in_background(
+            fetch, on_loaded,
+            lambda e: self._show_load_error('Ошибка загрузки участников', e)
+        )
+
+    def _display_members(self, members: List[Dict[str, Any]]):
+        """Отображение участников группы"""
+        self.members_listbox.delete(0, tk.END)
+        
+        for member in members:
+            member_email = member.get('email', '')
+            member_name = member.get('name', member_email)
+            display_text = f"{member_name} ({member_email})"
+            self.members_listbox.insert(tk.END, display_text)
+
+    def _prefetch_neighbours(self, item_id: str):
+        """Предзагрузка участников групп, соседних с выбранной"""
+        items = self.groups_tree.get_children()
+        if item_id not in items:
+            return
+        
+        index = items.index(item_id)
+        generation = self._members_generation
+        
+        for offset in range(1, PREFETCH_RADIUS + 1):
+            for neighbour_index in (index + offset, index - offset):
+                if not 0 <= neighbour_index < len(items):
+                    continue
                 
-        except Exception as e:
-            messagebox.showerror('Ошибка', f'Ошибка загрузки участников: {str(e)}')
+                values = self.groups_tree.item(items[neighbour_index])['values']
+                group_email = values[0] if values else ''
+                if not group_email or group_email in self._prefetch_pending:
+                    continue
+                if group_members_cache.contains(group_email):
+                    continue
+                
+                self._prefetch_pending.add(group_email)
+                self._run_in_background(
+                    lambda email=group_email: self._prefetch_members(email, generation),
+                    self._prefetch_pending.discard,
+                    lambda e, email=group_email: self._prefetch_pending.discard(email)
+                )
+
+    def _prefetch_members(self, group_email: str, generation: int) -> str:
+        """Фоновая загрузка участников группы в кэш (выполняется в потоке загрузчика)"""
+        # Выбор сместился — соседи этой группы больше не нужны
+        if generation != self._members_generation:
+            return group_email
+        if not group_members_cache.contains(group_email):
+            members = get_group_members(self.service, group_email, raise_errors=True)
+            group_members_cache.put(group_email, members)
+        return group_email
 
     def create_group(self):
         """Создание новой группы"""
@@ -263,6 +404,7 @@ class GroupManagementWindow(tk.Toplevel):
             try:
                 success = delete_group(self.service, self.selected_group)
                 if success:
+                    group_members_cache.invalidate(self.selected_group)
                     messagebox.showinfo('Успех', 'Группа успешно удалена')
                     self.selected_group = None
                     self.members_listbox.delete(0, tk.END)
@@ -293,7 +435,7 @@ class GroupManagementWindow(tk.Toplevel):
                 # Проверяем результат операции
                 if result.startswith('✅') or result.startswith('ℹ️'):
                     messagebox.showinfo('Успех', result)
-                    self.load_group_members(self.selected_group)
+                    self.load_group_members(self.selected_group, force_refresh=True)
                     # Callback об успешном обновлении
                     if getattr(self, 'on_updated', None):
                         self.on_updated()
@@ -327,7 +469,7 @@ class GroupManagementWindow(tk.Toplevel):
                 success = remove_user_from_group(self.service, member_email, self.selected_group)
                 if success:
                     messagebox.showinfo('Успех', f'Пользователь {member_email} удален из группы')
-                    self.load_group_members(self.selected_group)
+                    self.load_group_members(self.selected_group, force_refresh=True)
                     # Callback об успешном обновлении
                     if getattr(self, 'on_updated', None):
                         self.on_updated()
@@ -452,6 +594,7 @@ class UserSelectionDialog(tk.Toplevel):
         super().__init__(master)
         self.service = service
         self.result = None
+        self.all_users: List[Dict[str, Any]] = []
         
         self.title('Выбор пользователя')
         self.geometry('500x400')
@@ -518,12 +661,32 @@ class UserSelectionDialog(tk.Toplevel):
         ).pack(side='right')
 
     def load_users(self):
-        """Загрузка списка пользователей"""
-        try:
-            self.all_users = get_user_list(self.service)
-            self.filter_users()
-        except Exception as e:
-            messagebox.showerror('Ошибка', f'Ошибка загрузки пользователей: {str(e)}')
+        """Фоновая загрузка списка пользователей"""
+        self.users_listbox.insert(tk.END, 'Загрузка пользователей...')
+        
+        def load_worker():
+            try:
+                users = get_user_list(self.service)
+                callback = lambda: self._on_users_loaded(users)
+            except Exception as e:
+                error_text = str(e)
+                callback = lambda: messagebox.showerror(
+                    'Ошибка', f'Ошибка загрузки пользователей: {error_text}', parent=self
+                )
+            try:
+                self.after(0, callback)
+            except (RuntimeError, tk.TclError):
+                # Диалог закрыт до окончания загрузки
+                pass
+        
+        threading.Thread(target=load_worker, daemon=True).start()
+
+    def _on_users_loaded(self, users: List[Dict[str, Any]]):
+        """Отображение загруженных пользователей"""
+        if not self.winfo_exists():
+            return
+        self.all_users = users
+        self.filter_users()
 
     def filter_users(self, event=None):
         """Фильтрация пользователей по поисковому запросу"""
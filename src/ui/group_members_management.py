@@ -3,6 +3,7 @@
 Улучшенное управление участниками групп с интеграцией FreeIPA.
 """
 
+import threading
 import tkinter as tk
 from tkinter import messagebox, ttk, simpledialog
 from typing import Any, Optional, List, Dict
@@ -46,6 +47,7 @@ class GroupMembersManagementWindow(tk.Toplevel):
         self.google_members = []
         self.freeipa_members = []
         self.freeipa_users = []
+        self.sync_button = None
         
         self.setup_ui()
         self.load_data()
@@ -273,12 +275,13 @@ class GroupMembersManagementWindow(tk.Toplevel):
         
         # Кнопка синхронизации (если доступен FreeIPA)
         if FREEIPA_AVAILABLE and self.freeipa_service:
-            ModernButton(
+            self.sync_button = ModernButton(
                 buttons_frame,
                 text='🔄 Синхронизировать с FreeIPA',
                 command=self.sync_with_freeipa,
                 style='info'
-            ).pack(side='left')
+            )
+            self.sync_button.pack(side='left')
         
         # Кнопка закрытия
         ModernButton(
@@ -556,19 +559,105 @@ class GroupMembersManagementWindow(tk.Toplevel):
         if errors:
             messagebox.showerror("Ошибки", "\\n".join(errors[:5]))
 
+    def _run_coroutine(self, coroutine):
+        """Выполнение корутины FreeIPAIntegration в отдельном цикле событий"""
+        import asyncio
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def _safe_after(self, callback):
+        try:
+            self.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            # Окно закрыто
+            pass
+
+    def _set_sync_running(self, running: bool):
+        if self.sync_button is not None:
+            self.sync_button.config(state='disabled' if running else 'normal')
+
     def sync_with_freeipa(self):
-        """Синхронизация участников между Google Workspace и FreeIPA"""
+        """Выравнивание состава группы FreeIPA по участникам группы Google Workspace"""
         if not self.freeipa_service:
             messagebox.showerror("Ошибка", "FreeIPA сервис недоступен")
             return
         
-        # Здесь можно добавить логику синхронизации
-        # Например, добавить всех участников Google в FreeIPA
+        # Сравнение требует FreeIPAIntegration: у нее есть доступ и к Google API
+        if not hasattr(self.freeipa_service, 'compare_group_memberships'):
+            messagebox.showerror("Ошибка", "Синхронизация доступна только при подключении через интеграцию FreeIPA")
+            return
+        
+        self._set_sync_running(True)
+        
+        # Сравнение загружает пользователей FreeIPA и участников Google - в рабочем потоке
+        def worker():
+            try:
+                comparison = self._run_coroutine(
+                    self.freeipa_service.compare_group_memberships([self.group_name]))
+            except Exception as e:
+                logger.error(f"Ошибка сравнения состава группы {self.group_name}: {e}")
+                comparison = None
+            self._safe_after(lambda: self._confirm_sync(comparison))
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _confirm_sync(self, comparison):
+        """Подтверждение и запуск изменений по результату сравнения (поток интерфейса)"""
+        if comparison is None:
+            self._set_sync_running(False)
+            messagebox.showerror("Ошибка", "Не удалось сравнить состав группы")
+            return
+        
+        diff = next((d for d in comparison.groups.values() if d.in_google), None)
+        if diff is None:
+            self._set_sync_running(False)
+            messagebox.showwarning("Синхронизация", f"Группа '{self.group_name}' не найдена в Google Workspace")
+            return
+        
+        unresolved = f"\nБез пользователя FreeIPA (пропущены): {len(diff.unresolved)}" if diff.unresolved else ""
+        if not diff.changes:
+            self._set_sync_running(False)
+            messagebox.showinfo("Синхронизация", f"Состав группы совпадает с Google Workspace{unresolved}")
+            return
+        
+        if not messagebox.askyesno(
+            "Подтверждение",
+            f"Группа '{diff.cn}':\n"
+            f"Добавить в FreeIPA: {len(diff.to_add)}\n"
+            f"Удалить из FreeIPA: {len(diff.to_remove)}{unresolved}\n\n"
+            f"Продолжить?"
+        ):
+            self._set_sync_running(False)
+            return
+        
+        def worker():
+            try:
+                result = self._run_coroutine(self.freeipa_service.sync_group_memberships(comparison=comparison))
+            except Exception as e:
+                logger.error(f"Ошибка синхронизации группы {self.group_name}: {e}")
+                result = None
+            self._safe_after(lambda: self._show_sync_result(result))
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_sync_result(self, result):
+        self._set_sync_running(False)
+        if result is None:
+            messagebox.showerror("Ошибка", "Не удалось синхронизировать состав группы")
+            return
         
         messagebox.showinfo(
             "Синхронизация",
-            "Функция синхронизации будет реализована в следующих версиях"
+            f"Добавлено: {result.added}, удалено: {result.removed}, ошибок: {len(result.failures)}"
         )
+        if result.failures:
+            messagebox.showerror("Ошибки", "\n".join(f"{k}: {v}" for k, v in list(result.failures.items())[:5]))
+        self.load_freeipa_members()
+        self.update_users_display()
 
 
 def show_group_members_management(master, group_id=None, group_name=None, 
@@ -13,19 +13,11 @@ from typing import Any, Optional, List, Dict
 
 from .ui_components import ModernColors, ModernButton, StatusIndicator, center_window
 from .components import StatisticsPanel, ActivityLog, MainToolbar, ThemeSwitcher
-from .user_windows import CreateUserWindow, EditUserWindow
-from .employee_list_window import EmployeeListWindow
-from .additional_windows import AsanaInviteWindow, ErrorLogWindow
-from .group_management import GroupManagementWindow
-from .orgunit_management import OrgUnitManagementWindow
-from .calendar_management import open_calendar_management
-from .sputnik_calendar_ui import open_sputnik_calendar_window
-from .freeipa_management import open_freeipa_management
-from .myteam_user_window import open_myteam_user_window
-from ..api.users_api import get_user_list
-from ..api.service_adapter import ServiceAdapter
-from ..api.groups_api import list_groups
+from .window_registry import window_registry
 from ..utils.data_cache import data_cache
+from ..utils.event_loop_monitor import ui_monitor
+from ..utils.statistics_engine import statistics_engine
+from ..config.main_window_config import MainWindowConfig
 from ..utils.file_paths import get_export_path
 from ..utils.simple_utils import async_manager, error_handler, SimpleProgressDialog, show_api_error
 from ..utils.ui_decorators import handle_service_errors, handle_ui_errors, log_operation, validate_email, measure_performance
@@ -60,6 +52,7 @@ class AdminToolsMainWindow(tk.Tk):
         self.header_frame = None
         self.title_label = None
         self.status_frame = None
+        self.latency_label = None
         
         # Инициализация менеджеров
         self.hotkey_manager = HotkeyManager(self)
@@ -183,6 +176,10 @@ class AdminToolsMainWindow(tk.Tk):
             command=self.open_edit_user,
             accelerator="Ctrl+Enter"
         )
+        users_menu.add_command(
+            label="📥 Массовое создание из файла",
+            command=self.open_bulk_provisioning
+        )
         users_menu.add_separator()
         users_menu.add_command(
             label="📁 Управление подразделениями",
@@ -267,6 +264,10 @@ class AdminToolsMainWindow(tk.Tk):
             command=self.hotkey_manager.show_help_dialog,
             accelerator="F1"
         )
+        help_menu.add_command(
+            label="🩺 Диагностика UI",
+            command=self.open_ui_diagnostics
+        )
         help_menu.add_command(
             label="ℹ️ О программе",
             command=self.show_about,
@@ -297,7 +298,8 @@ class AdminToolsMainWindow(tk.Tk):
         # Левая панель - статистика и быстрые действия
         quick_actions_callbacks = {
             'export': self.export_users,
-            'error_log': self.open_error_log
+            'error_log': self.open_error_log,
+            'audit_log': self.open_audit_log
         }
         
         self.statistics_panel = StatisticsPanel(
@@ -329,6 +331,45 @@ class AdminToolsMainWindow(tk.Tk):
             fg=ModernColors.TEXT_PRIMARY
         )
         self.status_label.pack(side='left', pady=3)
+        
+        # Задержка цикла событий (клик открывает окно диагностики)
+        self.latency_label = tk.Label(
+            self.status_frame,
+            text='UI: —',
+            font=('Consolas', 8),
+            bg=ModernColors.SECONDARY,
+            fg=ModernColors.TEXT_PRIMARY,
+            cursor='hand2'
+        )
+        self.latency_label.pack(side='right', padx=8, pady=3)
+        self.latency_label.bind('<Button-1>', lambda event: self.open_ui_diagnostics())
+
+    def start_ui_monitor(self):
+        """Запуск монитора задержек цикла событий"""
+        ui_monitor.interval_ms = MainWindowConfig.UI_HEARTBEAT_INTERVAL
+        ui_monitor.stall_threshold_ms = MainWindowConfig.UI_STALL_THRESHOLD
+        ui_monitor.start(self)
+        self.after(MainWindowConfig.UI_LATENCY_REFRESH, self._update_latency_label)
+
+    def _update_latency_label(self):
+        """Обновление задержки кадра в статусной строке"""
+        if not self.latency_label:
+            return
+            
+        stats = ui_monitor.get_stats()
+        if stats['samples']:
+            p99 = stats['p99']
+            if p99 >= MainWindowConfig.UI_STALL_THRESHOLD:
+                color = ModernColors.DANGER
+            elif p99 >= MainWindowConfig.UI_HEARTBEAT_INTERVAL / 2:
+                color = ModernColors.WARNING
+            else:
+                color = ModernColors.TEXT_PRIMARY
+            self.latency_label.config(
+                text=f"UI p50 {stats['p50']:.0f} мс · p99 {p99:.0f} мс",
+                fg=color
+            )
+        self.after(MainWindowConfig.UI_LATENCY_REFRESH, self._update_latency_label)
 
     def check_service_status(self):
         """Проверка статуса подключения к Google API"""
@@ -350,12 +391,26 @@ class AdminToolsMainWindow(tk.Tk):
         if not self._ui_initialized or not self.service or not self.statistics_panel:
             return
             
+        # Первая полная загрузка выполняется в фоне, чтобы не блокировать UI
+        if not statistics_engine.loaded:
+            self.load_statistics_async()
+            return
+            
         try:
             users_count, groups_count = self.statistics_panel.load_statistics()
             self.log_activity(f'Статистика обновлена: {users_count} пользователей, {groups_count} групп')
         except Exception as e:
             self.log_activity(f'Ошибка загрузки статистики: {str(e)}', 'ERROR')
 
+    def refresh_statistics(self):
+        """Обновление панели статистики из инкрементальных счетчиков (без загрузки списков)"""
+        if not self.statistics_panel:
+            return
+        if statistics_engine.loaded:
+            self.statistics_panel.show_snapshot(statistics_engine.snapshot())
+        else:
+            self.load_statistics_async()
+
     def log_activity(self, message: str, level: str = 'INFO'):
         """Добавляет запись в журнал активности"""
         if self._ui_initialized and self.activity_log:
@@ -429,6 +484,7 @@ class AdminToolsMainWindow(tk.Tk):
             """Callback после успешного создания пользователя"""
             self.log_activity("✅ Пользователь успешно создан в \"Моей Команде\"")
         
+        open_myteam_user_window = window_registry.get('myteam_user')
         window = open_myteam_user_window(self, api_token, on_user_created)
         if window:
             self.log_activity("🏢 Открыто окно создания пользователя в \"Моей Команде\"")
@@ -437,7 +493,7 @@ class AdminToolsMainWindow(tk.Tk):
     @handle_service_errors("открытие списка сотрудников")
     def open_employee_list(self):
         """Открытие окна списка сотрудников"""
-        window = EmployeeListWindow(self, self.service)
+        window = window_registry.get('employee_list')(self, self.service)
         if window:
             self.log_activity("👥 Открыто окно списка сотрудников")
 
@@ -451,7 +507,7 @@ class AdminToolsMainWindow(tk.Tk):
             if hasattr(self, 'refresh_statistics'):
                 self.refresh_statistics()
         
-        window = CreateUserWindow(self, self.service, on_user_created)
+        window = window_registry.get('create_user')(self, self.service, on_user_created)
         if window:
             self.log_activity("🏢 Открыто окно создания пользователя Google Workspace")
 
@@ -466,15 +522,28 @@ class AdminToolsMainWindow(tk.Tk):
                 self.refresh_statistics()
         
         # Открываем окно со списком всех пользователей для выбора
-        window = EditUserWindow(self, self.service, on_user_updated)
+        window = window_registry.get('edit_user')(self, self.service, on_user_updated)
         if window:
             self.log_activity("✏️ Открыто окно редактирования пользователя Google Workspace")
         return "Открыто окно редактирования пользователя"
 
+    @handle_service_errors("открытие окна массового создания пользователей")
+    def open_bulk_provisioning(self):
+        """Открытие окна массового создания пользователей из CSV/JSONL"""
+        def on_finished():
+            """Callback после завершения импорта"""
+            self.log_activity("✅ Массовое создание пользователей завершено")
+            self.refresh_statistics()
+        
+        window = window_registry.get('bulk_provisioning')(self, self.service, on_finished)
+        if window:
+            self.log_activity("📥 Открыто окно массового создания пользователей")
+        return "Открыто окно массового создания пользователей"
+
     @handle_service_errors("открытие окна управления подразделениями")
     def open_orgunit_management(self):
         """Открытие окна управления организационными подразделениями"""
-        window = OrgUnitManagementWindow(self, self.service)
+        window = window_registry.get('orgunit_management')(self, self.service)
         if window:
             self.log_activity("🏢 Открыто окно управления организационными подразделениями")
         return "Открыто окно управления подразделениями"
@@ -489,13 +558,14 @@ class AdminToolsMainWindow(tk.Tk):
             if hasattr(self, 'refresh_statistics'):
                 self.refresh_statistics()
         
-        window = GroupManagementWindow(self, self.service, on_group_updated)
+        window = window_registry.get('group_management')(self, self.service, on_group_updated)
         if window:
             self.log_activity("👥 Открыто окно управления группами")
 
     @handle_ui_errors("открытие окна управления календарями")
     def open_calendar_management(self):
         """Открытие окна управления календарями"""
+        open_calendar_management = window_registry.get('calendar_management')
         window = open_calendar_management(self, self.service)
         if window:
             self.log_activity("📅 Открыто окно управления календарями")
@@ -503,6 +573,7 @@ class AdminToolsMainWindow(tk.Tk):
     @handle_ui_errors("открытие окна календаря SPUTНIK")
     def open_sputnik_calendar(self):
         """Открытие окна управления календарем SPUTНIK (общий)"""
+        open_sputnik_calendar_window = window_registry.get('sputnik_calendar')
         window = open_sputnik_calendar_window(self)
         if window:
             self.activity_log.add_entry("🎯 Открыт календарь SPUTНIK (общий)")
@@ -696,6 +767,13 @@ class AdminToolsMainWindow(tk.Tk):
                         self.logger.error(f"Ошибка при предоставлении доступа: {e}")
                         return False
                 
+                def grant_access_bulk(self, document_urls, user_emails, role, notify=False, message=None):
+                    """Предоставляет доступ нескольким пользователям к нескольким документам"""
+                    file_ids = [self.drive_api.extract_file_id_from_url(url) for url in document_urls]
+                    return self.drive_api.add_permissions_bulk(
+                        [file_id for file_id in file_ids if file_id], user_emails, role, notify, message
+                    )
+                
                 def revoke_access(self, document_url, email):
                     """Отзывает доступ к документу"""
                     try:
@@ -797,7 +875,7 @@ class AdminToolsMainWindow(tk.Tk):
     @handle_ui_errors("открытие окна приглашения в Asana")
     def open_asana_invite(self):
         """Открытие окна приглашения в Asana"""
-        window = AsanaInviteWindow(self)
+        window = window_registry.get('asana_invite')(self)
         if window:
             self.log_activity("📝 Открыто окно приглашения в Asana")
 
@@ -808,17 +886,32 @@ class AdminToolsMainWindow(tk.Tk):
         from ..api.groups_api import GroupsAPI
         groups_service = GroupsAPI(self.service) if self.service else None
         
+        open_freeipa_management = window_registry.get('freeipa_management')
         window = open_freeipa_management(self, self.service, groups_service)
         if window:
             self.log_activity("🔗 Открыто окно управления FreeIPA")
 
+    @handle_ui_errors("открытие окна диагностики UI")
+    def open_ui_diagnostics(self):
+        """Открытие окна диагностики отзывчивости интерфейса"""
+        window = window_registry.get('ui_diagnostics')(self)
+        if window:
+            self.log_activity("🩺 Открыто окно диагностики UI")
+
     @handle_ui_errors("открытие окна журнала ошибок")
     def open_error_log(self):
         """Открытие окна журнала ошибок"""
-        window = ErrorLogWindow(self)
+        window = window_registry.get('error_log')(self)
         if window:
             self.log_activity("📄 Открыто окно журнала ошибок")
 
+    @handle_ui_errors("открытие окна журнала аудита")
+    def open_audit_log(self):
+        """Открытие окна журнала аудита"""
+        window = window_registry.get('audit_log')(self)
+        if window:
+            self.log_activity("🛡️ Открыто окно журнала аудита")
+
     @handle_service_errors("экспорт списка пользователей", True)
     @measure_performance
     def export_users(self):
@@ -836,6 +929,7 @@ class AdminToolsMainWindow(tk.Tk):
         )
         
         if filename:
+            from ..api.users_api import get_user_list
             users = get_user_list(self.service)
             
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
@@ -867,22 +961,27 @@ class AdminToolsMainWindow(tk.Tk):
             
         def load_data():
             if not self.service:
-                return None, None
+                return None
             
-            users = get_user_list(self.service)
-            groups = list_groups(self.service)
-            return users, groups
+            # Полные списки загружаются один раз, дальше счетчики
+            # обновляются событиями создания, изменения и удаления
+            if not statistics_engine.users_loaded:
+                from ..api.users_api import get_user_list
+                statistics_engine.load_users(get_user_list(self.service))
+            if not statistics_engine.groups_loaded:
+                from ..api.groups_api import list_groups
+                statistics_engine.load_groups(list_groups(self.service))
+            return statistics_engine.snapshot()
         
-        def on_success(result):
-            if not self.statistics_panel:
+        def on_success(snapshot):
+            if not self.statistics_panel or snapshot is None:
                 return
                 
-            users, groups = result
-            if users is not None and groups is not None:
-                users_count = len(users)
-                groups_count = len(groups)
-                self.statistics_panel.update_statistics(users_count, groups_count)
-                self.log_activity(f'Статистика обновлена: {users_count} пользователей, {groups_count} групп')
+            self.statistics_panel.show_snapshot(snapshot)
+            if hasattr(self, 'status_label'):
+                self.status_label.config(text='Готов к работе')
+            self.log_activity(f"Статистика обновлена: {snapshot['total_users']} пользователей, "
+                              f"{snapshot['total_groups']} групп")
         
         def on_error(error):
             if hasattr(self, 'log_activity'):
@@ -918,6 +1017,9 @@ class AdminToolsMainWindow(tk.Tk):
         # Добавляем запись о запуске приложения
         self.log_activity("🚀 Google Workspace Admin Tools запущен")
         
+        # Мониторинг задержек UI
+        self.start_ui_monitor()
+        
         # Теперь, когда UI создан, можем проверить статус сервиса
         try:
             self.check_service_status()
@@ -959,6 +1061,9 @@ class AdminToolsMainWindow(tk.Tk):
                 fg=theme.get_color('text_primary')
             )
             
+        if getattr(self, 'latency_label', None):
+            self.latency_label.config(bg=theme.get_color('secondary'))
+            
         # Обновляем компоненты
         if hasattr(self, 'statistics_panel') and self.statistics_panel:
             self.statistics_panel.apply_theme()
@@ -990,6 +1095,8 @@ class AdminToolsMainWindow(tk.Tk):
 
     def refresh_data(self):
         """Обновление всех данных"""
+        # Сбрасываем счетчики, чтобы статистика была пересчитана по свежим спискам
+        statistics_engine.reset()
         self.load_statistics()
         self.log_activity('Данные обновлены', 'INFO')
 
@@ -1026,10 +1133,11 @@ class AdminToolsMainWindow(tk.Tk):
 
     def quit_application(self):
         """Корректный выход из приложения"""
+        ui_monitor.stop()
         self._save_theme_preferences()
         self.destroy()
 
 def open_document_management(parent, document_service, default_url=None):
     """Функция для открытия окна управления документами (избегаем циклических импортов)"""
-    from src.ui.document_management import DocumentManagementWindow
+    DocumentManagementWindow = window_registry.get('document_management')
     return DocumentManagementWindow(parent, document_service, default_url)
@@ -3,6 +3,7 @@
 Окно для управления организационными подразделениями и перемещения пользователей.
 """
 
+import threading
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, ttk
 from typing import Any, Optional, List, Dict
@@ -13,9 +14,8 @@ from ..api.orgunits_api import (
     list_orgunits, 
     format_orgunits_for_combobox, 
     get_orgunit_path_from_display_name,
-    get_user_orgunit,
     get_display_name_for_orgunit_path,
-    move_user_to_orgunit,
+    bulk_move_users_to_orgunits,
     create_orgunit
 )
 
@@ -52,6 +52,9 @@ class OrgUnitManagementWindow(tk.Toplevel):
         self.orgunit_display_names = []
         self.users = []
         self.filtered_users = []
+        # Прежние OU последнего перемещения (для отката)
+        self.last_rollback = []
+        self._move_in_progress = False
         
         self._load_data()
         self._create_widgets()
@@ -175,6 +178,10 @@ class OrgUnitManagementWindow(tk.Toplevel):
                  command=self._move_all_visible_users, font=('Segoe UI', 9), 
                  width=22, bg=ModernColors.SECONDARY, fg='white', relief='flat', cursor='hand2').pack(padx=10, pady=5)
 
+        tk.Button(ops_frame, text='↩️ Откатить перемещение', 
+                 command=self._rollback_last_move, font=('Segoe UI', 9), 
+                 width=22, bg=ModernColors.SECONDARY, fg='white', relief='flat', cursor='hand2').pack(padx=10, pady=5)
+
         # Разделитель
         tk.Frame(ops_frame, height=2, bg=ModernColors.BORDER).pack(fill='x', padx=10, pady=10)
 
@@ -216,17 +223,11 @@ class OrgUnitManagementWindow(tk.Toplevel):
             self.users_tree.delete(item)
 
         # Заполняем отфильтрованными пользователями
+        # (OU берется из записи пользователя, без запроса к API на каждую строку)
         for user in self.filtered_users:
             email = user.get('primaryEmail', '')
             name = f"{user.get('name', {}).get('givenName', '')} {user.get('name', {}).get('familyName', '')}"
-            
-            # Получаем OU пользователя
-            try:
-                user_ou_path = get_user_orgunit(self.service, email)
-                user_ou_display = get_display_name_for_orgunit_path(user_ou_path, self.orgunits)
-            except:
-                user_ou_display = "🏠 Корневое подразделение"
-            
+            user_ou_display = get_display_name_for_orgunit_path(user.get('orgUnitPath', '/'), self.orgunits)
             self.users_tree.insert('', 'end', values=(email, name, user_ou_display))
 
     def _filter_users(self, event=None):
@@ -238,16 +239,10 @@ class OrgUnitManagementWindow(tk.Toplevel):
         else:
             # Получаем путь к выбранному OU
             filter_ou_path = get_orgunit_path_from_display_name(selected_filter, self.orgunits)
-            
-            # Фильтруем пользователей
-            self.filtered_users = []
-            for user in self.users:
-                try:
-                    user_ou_path = get_user_orgunit(self.service, user.get('primaryEmail', ''))
-                    if user_ou_path == filter_ou_path:
-                        self.filtered_users.append(user)
-                except:
-                    continue
+            self.filtered_users = [
+                user for user in self.users
+                if user.get('orgUnitPath', '/') == filter_ou_path
+            ]
         
         # Обновляем список
         self._populate_users_list()
@@ -277,37 +272,18 @@ class OrgUnitManagementWindow(tk.Toplevel):
             self.info_label.config(text=info_text)
 
     def _move_selected_user(self):
-        """Перемещает выбранного пользователя"""
+        """Перемещает выбранных пользователей"""
         selection = self.users_tree.selection()
         if not selection:
             messagebox.showwarning("Предупреждение", "Выберите пользователя для перемещения")
             return
         
-        item = self.users_tree.item(selection[0])
-        values = item['values']
-        
-        if not values:
-            return
-        
-        email = values[0]
+        emails = [self.users_tree.item(item)['values'][0] for item in selection
+                  if self.users_tree.item(item)['values']]
         target_ou_display = self.target_combo.get()
         target_ou_path = get_orgunit_path_from_display_name(target_ou_display, self.orgunits)
         
-        # Проверяем, что пользователь не находится уже в целевом OU
-        current_ou_path = get_user_orgunit(self.service, email)
-        if current_ou_path == target_ou_path:
-            self._add_result(f"❌ {email} уже находится в {target_ou_display}")
-            return
-        
-        # Перемещаем пользователя
-        result = move_user_to_orgunit(self.service, email, target_ou_path)
-        
-        if result['success']:
-            self._add_result(f"✅ {email} перемещен в {target_ou_display}")
-            # Обновляем список
-            self._refresh_data()
-        else:
-            self._add_result(f"❌ {email}: {result['message']}")
+        self._run_bulk_move([(email, target_ou_path) for email in emails], target_ou_display)
 
     def _move_all_visible_users(self):
         """Перемещает всех видимых пользователей"""
@@ -324,33 +300,67 @@ class OrgUnitManagementWindow(tk.Toplevel):
                                   f"Переместить {count} пользователей в {target_ou_display}?"):
             return
         
-        success_count = 0
-        error_count = 0
-        
-        for user in self.filtered_users:
-            email = user.get('primaryEmail', '')
-            
-            # Проверяем, что пользователь не находится уже в целевом OU
-            current_ou_path = get_user_orgunit(self.service, email)
-            if current_ou_path == target_ou_path:
-                self._add_result(f"⏭️ {email} уже в целевом OU")
-                continue
-            
-            # Перемещаем пользователя
-            result = move_user_to_orgunit(self.service, email, target_ou_path)
-            
-            if result['success']:
-                success_count += 1
-                self._add_result(f"✅ {email}")
-            else:
-                error_count += 1
-                self._add_result(f"❌ {email}: {result['message']}")
-        
-        # Итоговая статистика
-        self._add_result(f"\n📊 Успешно: {success_count}, Ошибок: {error_count}")
+        moves = [(user.get('primaryEmail', ''), target_ou_path) for user in self.filtered_users]
+        self._run_bulk_move(moves, target_ou_display)
+
+    def _rollback_last_move(self):
+        """Возвращает пользователей последнего перемещения в прежние OU"""
+        if not self.last_rollback:
+            messagebox.showinfo("Откат", "Нет перемещения для отката")
+            return
+        if not messagebox.askyesno("Подтверждение",
+                                  f"Вернуть {len(self.last_rollback)} пользователей в прежние подразделения?"):
+            return
+        self._run_bulk_move(self.last_rollback, "прежние подразделения")
+
+    def _run_bulk_move(self, moves, target_display: str):
+        """Запускает пакетное перемещение в фоновом потоке"""
+        if self._move_in_progress:
+            self._add_result("⏳ Предыдущее перемещение еще выполняется")
+            return
         
-        # Обновляем список
-        self._refresh_data()
+        self._move_in_progress = True
+        self._add_result(f"📁 Перемещение {len(moves)} пользователей в {target_display}...")
+        current_paths = {user.get('primaryEmail', ''): user.get('orgUnitPath', '/') for user in self.users}
+
+        def work():
+            try:
+                result = bulk_move_users_to_orgunits(self.service, moves, current_paths=current_paths)
+                self._safe_after(lambda: self._on_bulk_move_done(result, target_display))
+            except Exception as e:
+                error = e
+                self._safe_after(lambda: self._on_bulk_move_failed(error))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def _on_bulk_move_done(self, result, target_display: str):
+        self._move_in_progress = False
+        for email in sorted(result.skipped):
+            self._add_result(f"⏭️ {email} уже в {target_display}")
+        for email in sorted(result.moved):
+            self._add_result(f"✅ {email}")
+        for email, error in sorted(result.failed.items()):
+            self._add_result(f"❌ {email}: {error}")
+        self._add_result(
+            f"\n📊 Перемещено: {len(result.moved)}, без изменений: {len(result.skipped)}, "
+            f"ошибок: {len(result.failed)} ({result.elapsed:.1f} с)"
+        )
+        if result.moved:
+            self.last_rollback = result.rollback_moves()
+        
+        # Записи пользователей уже обновлены на месте - перезагрузка не нужна
+        self._filter_users()
+
+    def _on_bulk_move_failed(self, error: Exception):
+        self._move_in_progress = False
+        self._add_result(f"❌ Ошибка перемещения: {error}")
+
+    def _safe_after(self, callback):
+        try:
+            self.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            # Окно закрыто
+            pass
 
     def _add_result(self, message: str):
         """Добавляет сообщение в область результатов"""
@@ -496,10 +496,9 @@ class SputnikCalendarWindow(tk.Toplevel):
             try:
                 self.safe_update_ui(lambda: self.status_label.config(text='Удаление участников...'))
                 
-                successful = 0
-                for email in emails:
-                    if self.calendar_manager.remove_member(email):
-                        successful += 1
+                # Все выбранные участники удаляются пакетными запросами
+                results = self.calendar_manager.remove_members(emails)
+                successful = sum(1 for success in results.values() if success)
                 
                 self.safe_update_ui(lambda: self.status_label.config(
                     text=f'✅ Удалено участников: {successful}/{len(emails)}'
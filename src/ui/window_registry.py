@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Реестр окон приложения с отложенной загрузкой модулей.
+
+Модули окон (календари, SPUTNIK, документы, FreeIPA, группы и т.д.) вместе
+занимают несколько тысяч строк и тянут за собой API клиенты. Реестр
+импортирует модуль окна только при первом открытии, чтобы главное окно
+отрисовывалось без них.
+"""
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Имя окна -> (модуль относительно пакета src.ui, атрибут модуля)
+WINDOW_MODULES: Dict[str, Tuple[str, str]] = {
+    'employee_list': ('.employee_list_window', 'EmployeeListWindow'),
+    'create_user': ('.user_windows', 'CreateUserWindow'),
+    'edit_user': ('.user_windows', 'EditUserWindow'),
+    'bulk_provisioning': ('.bulk_provisioning_window', 'BulkProvisioningWindow'),
+    'asana_invite': ('.additional_windows', 'AsanaInviteWindow'),
+    'error_log': ('.additional_windows', 'ErrorLogWindow'),
+    'audit_log': ('.additional_windows', 'AuditLogWindow'),
+    'ui_diagnostics': ('.diagnostics_window', 'UIDiagnosticsWindow'),
+    'group_management': ('.group_management', 'GroupManagementWindow'),
+    'orgunit_management': ('.orgunit_management', 'OrgUnitManagementWindow'),
+    'calendar_management': ('.calendar_management', 'open_calendar_management'),
+    'sputnik_calendar': ('.sputnik_calendar_ui', 'open_sputnik_calendar_window'),
+    'document_management': ('.document_management', 'DocumentManagementWindow'),
+    'freeipa_management': ('.freeipa_management', 'open_freeipa_management'),
+    'myteam_user': ('.myteam_user_window', 'open_myteam_user_window'),
+}
+
+
+class LazyWindowRegistry:
+    """
+    Реестр окон, импортирующий модуль окна при первом обращении.
+    """
+
+    def __init__(self, package: str, entries: Dict[str, Tuple[str, str]]):
+        """
+        Инициализация реестра.
+
+        Args:
+            package: Пакет, относительно которого указаны модули
+            entries: Словарь имя окна -> (модуль, атрибут)
+        """
+        self.package = package
+        self._entries = dict(entries)
+        self._loaded: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        # Время импорта модулей окон в секундах (для профилирования запуска)
+        self.load_times: Dict[str, float] = {}
+
+    def register(self, name: str, module: str, attribute: str):
+        """
+        Регистрирует окно в реестре.
+
+        Args:
+            name: Имя окна
+            module: Модуль относительно пакета реестра
+            attribute: Класс окна или функция его открытия
+        """
+        with self._lock:
+            self._entries[name] = (module, attribute)
+            self._loaded.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """
+        Возвращает класс или фабрику окна, импортируя модуль при первом обращении.
+
+        Args:
+            name: Имя окна
+
+        Returns:
+            Класс окна или функция его открытия
+
+        Raises:
+            KeyError: Если окно не зарегистрировано
+        """
+        target = self._loaded.get(name)
+        if target is not None:
+            return target
+
+        with self._lock:
+            if name in self._loaded:
+                return self._loaded[name]
+
+            module_name, attribute = self._entries[name]
+            start_time = time.perf_counter()
+            module = importlib.import_module(module_name, self.package)
+            target = getattr(module, attribute)
+            elapsed = time.perf_counter() - start_time
+
+            self._loaded[name] = target
+            self.load_times[name] = elapsed
+            logger.debug(f"Модуль окна '{name}' загружен за {elapsed * 1000:.1f} мс")
+            return target
+
+    def is_loaded(self, name: str) -> bool:
+        """Проверяет, был ли модуль окна уже импортирован."""
+        return name in self._loaded
+
+    def names(self):
+        """Возвращает имена зарегистрированных окон."""
+        return list(self._entries)
+
+
+# Глобальный реестр окон главного окна
+window_registry = LazyWindowRegistry(__package__ or 'src.ui', WINDOW_MODULES)
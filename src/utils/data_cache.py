@@ -3,6 +3,8 @@
 Кэширование данных для оптимизации работы с Google API.
 """
 
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -64,7 +66,7 @@ class DataCache:
                     customer='my_customer',
                     maxResults=500,
                     pageToken=page_token,
-                    fields='users(primaryEmail,name,suspended,orgUnitPath,creationTime),nextPageToken'
+                    fields='users(primaryEmail,name,suspended,orgUnitPath,creationTime,organizations,phones),nextPageToken'
                 ).execute()
                 
                 users.extend(result.get('users', []))
@@ -129,5 +131,88 @@ class DataCache:
         self.last_groups_update = None
 
 
+class GroupMembersCache:
+    """
+    LRU кэш списков участников групп.
+    
+    Хранит участников для ограниченного числа групп, вытесняя давно
+    не использовавшиеся. Потокобезопасен: наполняется из фоновых потоков
+    предзагрузки и читается из главного потока Tk.
+    """
+    
+    def __init__(self, max_groups: int = 64, cache_duration: int = 300):
+        """
+        Инициализация кэша.
+        
+        Args:
+            max_groups: Максимальное количество групп в кэше
+            cache_duration: Время жизни записи в секундах (по умолчанию 5 минут)
+        """
+        self.max_groups = max_groups
+        self.cache_duration = cache_duration
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, group_email: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Возвращает участников группы из кэша.
+        
+        Args:
+            group_email: Email группы
+            
+        Returns:
+            Список участников или None, если записи нет или она устарела
+        """
+        key = group_email.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            members, updated_at = entry
+            if (datetime.now() - updated_at).total_seconds() >= self.cache_duration:
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return members
+    
+    def put(self, group_email: str, members: List[Dict[str, Any]]):
+        """
+        Сохраняет участников группы, вытесняя самую старую запись при переполнении.
+        
+        Args:
+            group_email: Email группы
+            members: Список участников
+        """
+        key = group_email.lower()
+        with self._lock:
+            self._entries[key] = (members, datetime.now())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_groups:
+                self._entries.popitem(last=False)
+    
+    def contains(self, group_email: str) -> bool:
+        """Проверяет наличие актуальной записи для группы."""
+        return self.get(group_email) is not None
+    
+    def invalidate(self, group_email: str):
+        """Удаляет запись группы (после изменения состава)."""
+        with self._lock:
+            self._entries.pop(group_email.lower(), None)
+    
+    def clear(self):
+        """Очищает весь кэш участников."""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
 # Глобальный экземпляр кэша
 data_cache = DataCache()
+
+# Глобальный кэш участников групп
+group_members_cache = GroupMembersCache()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Мониторинг задержек цикла событий Tk.
+
+Планирует периодические heartbeat-тики через after() и измеряет, насколько
+позже запланированного они срабатывают. Задержка тика — это время, на которое
+главный поток был занят обработчиком и не перерисовывал окно. Сторожевой поток
+снимает стек главного потока, если тик задерживается дольше порога, чтобы было
+видно, какой обработчик блокирует UI.
+"""
+
+import math
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+# Корень пакета src: по нему в стеке ищется код приложения
+_SRC_ROOT = str(Path(__file__).resolve().parents[1])
+_THIS_FILE = str(Path(__file__).resolve())
+
+
+@dataclass
+class StallRecord:
+    """Зависание главного потока дольше порога"""
+    started_at: datetime
+    duration_ms: float
+    handler: str
+    stack: List[str] = field(default_factory=list)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Вычисляет перцентиль методом ближайшего ранга.
+
+    Args:
+        values: Значения (не обязательно отсортированные)
+        pct: Перцентиль от 0 до 100
+
+    Returns:
+        Значение перцентиля или 0.0 для пустого списка
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+class EventLoopMonitor:
+    """
+    Сторож цикла событий Tk: задержки кадров, зависания и время обработчиков.
+    """
+
+    def __init__(self, interval_ms: int = 100, stall_threshold_ms: int = 250,
+                 max_samples: int = 1000, max_stalls: int = 50):
+        """
+        Инициализация монитора.
+
+        Args:
+            interval_ms: Интервал heartbeat-тиков в миллисекундах
+            stall_threshold_ms: Задержка, после которой снимается стек главного потока
+            max_samples: Количество последних задержек для расчета перцентилей
+            max_stalls: Количество хранимых записей о зависаниях
+        """
+        self.interval_ms = interval_ms
+        self.stall_threshold_ms = stall_threshold_ms
+        self._lags: Deque[float] = deque(maxlen=max_samples)
+        self._stalls: Deque[StallRecord] = deque(maxlen=max_stalls)
+        self._handlers: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+        self._root: Optional[Any] = None
+        self._after_id: Optional[str] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._running = False
+        self._main_thread_id: Optional[int] = None
+        self._expected_tick: Optional[float] = None
+        self._pending_stall: Optional[StallRecord] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self, root: Any):
+        """
+        Запускает мониторинг. Вызывать из главного потока Tk.
+
+        Args:
+            root: Корневое окно Tk
+        """
+        if self._running:
+            return
+
+        self._root = root
+        self._main_thread_id = threading.get_ident()
+        self._running = True
+        self._schedule_tick(time.perf_counter())
+
+        self._watchdog = threading.Thread(
+            target=self._watchdog_loop, name='ui-watchdog', daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self):
+        """Останавливает мониторинг."""
+        self._running = False
+        if self._root is not None and self._after_id is not None:
+            try:
+                self._root.after_cancel(self._after_id)
+            except Exception:
+                pass
+        self._after_id = None
+        self._root = None
+
+    def reset(self):
+        """Сбрасывает накопленную статистику."""
+        with self._lock:
+            self._lags.clear()
+            self._stalls.clear()
+            self._handlers.clear()
+
+    def _schedule_tick(self, now: float):
+        with self._lock:
+            self._expected_tick = now + self.interval_ms / 1000
+        self._after_id = self._root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        """Heartbeat: измеряет, насколько позже запланированного сработал тик."""
+        if not self._running or self._root is None:
+            return
+
+        now = time.perf_counter()
+        with self._lock:
+            lag_ms = max(0.0, (now - self._expected_tick) * 1000)
+            self._lags.append(lag_ms)
+
+            if lag_ms >= self.stall_threshold_ms:
+                stall = self._pending_stall or StallRecord(
+                    started_at=datetime.now(), duration_ms=0.0,
+                    handler='неизвестно (стек не снят)'
+                )
+                stall.duration_ms = lag_ms
+                self._stalls.append(stall)
+            self._pending_stall = None
+
+        try:
+            self._schedule_tick(now)
+        except Exception:
+            # Окно уничтожено
+            self._running = False
+
+    def _watchdog_loop(self):
+        """Фоновый поток: снимает стек главного потока при зависании."""
+        poll_interval = max(self.interval_ms, 20) / 2000
+
+        while self._running:
+            time.sleep(poll_interval)
+
+            with self._lock:
+                expected = self._expected_tick
+                already_captured = self._pending_stall is not None
+            if expected is None or already_captured:
+                continue
+
+            overdue_ms = (time.perf_counter() - expected) * 1000
+            if overdue_ms < self.stall_threshold_ms:
+                continue
+
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is None:
+                continue
+
+            summary = traceback.extract_stack(frame)
+            stall = StallRecord(
+                started_at=datetime.now(),
+                duration_ms=overdue_ms,
+                handler=self._find_handler(summary),
+                stack=traceback.format_list(summary)
+            )
+            with self._lock:
+                # Тик мог успеть сработать, пока снимался стек
+                if self._expected_tick == expected:
+                    self._pending_stall = stall
+
+    @staticmethod
+    def _find_handler(summary: traceback.StackSummary) -> str:
+        """Находит самый глубокий кадр кода приложения в стеке."""
+        for frame in reversed(summary):
+            filename = str(Path(frame.filename).resolve()) if frame.filename else ''
+            if filename.startswith(_SRC_ROOT) and filename != _THIS_FILE:
+                relative = Path(filename).relative_to(_SRC_ROOT)
+                return f"{relative.as_posix()}:{frame.lineno} ({frame.name})"
+
+        if summary:
+            frame = summary[-1]
+            return f"{Path(frame.filename).name}:{frame.lineno} ({frame.name})"
+        return 'неизвестно'
+
+    def record_handler(self, name: str, seconds: float):
+        """
+        Записывает время выполнения обработчика UI.
+
+        Args:
+            name: Имя обработчика
+            seconds: Время выполнения в секундах
+        """
+        with self._lock:
+            samples = self._handlers.get(name)
+            if samples is None:
+                samples = self._handlers[name] = deque(maxlen=200)
+            samples.append(seconds * 1000)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        Возвращает статистику задержек кадров.
+
+        Returns:
+            Словарь с p50, p90, p99, max (в мс) и количеством замеров
+        """
+        with self._lock:
+            lags = list(self._lags)
+            stalls = len(self._stalls)
+
+        return {
+            'p50': percentile(lags, 50),
+            'p90': percentile(lags, 90),
+            'p99': percentile(lags, 99),
+            'max': max(lags) if lags else 0.0,
+            'samples': len(lags),
+            'stalls': stalls
+        }
+
+    def get_stalls(self) -> List[StallRecord]:
+        """Возвращает зарегистрированные зависания (новые в конце)."""
+        with self._lock:
+            return list(self._stalls)
+
+    def get_handler_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Возвращает статистику времени обработчиков.
+
+        Returns:
+            Словарь имя -> {count, p50, max} (время в мс)
+        """
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._handlers.items()}
+
+        return {
+            name: {'count': len(samples), 'p50': percentile(samples, 50), 'max': max(samples)}
+            for name, samples in snapshot.items() if samples
+        }
+
+
+# Глобальный монитор главного окна
+ui_monitor = EventLoopMonitor()
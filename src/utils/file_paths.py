@@ -255,3 +255,8 @@ def get_config_path(filename: str) -> Path:
 def get_temp_path(filename: str) -> Path:
     """Получить путь для временного файла"""
     return file_path_manager.get_temp_path(filename)
+
+
+def get_security_path(filename: str) -> Path:
+    """Получить путь для файла безопасности"""
+    return file_path_manager.get_security_path(filename)
@@ -2,13 +2,28 @@
 # -*- coding: utf-8 -*-
 """
 Утилиты для проверки применения изменений в группах Google Workspace
+
+Изменения состава групп в Google применяются не мгновенно. Верификатор
+проверяет членство точечно (members.hasMember, для внешних адресов -
+members.get) вместо загрузки всего списка участников, опрашивает с
+адаптивной задержкой по наблюдаемому времени распространения и работает
+асинхронно: сотни проверок выполняются параллельно, а проверки одного
+интервала объединяются в batch запрос.
 """
 
+import asyncio
+import threading
 import time
 import logging
-from typing import Optional, List, Dict, Any
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Callable, Iterable, Tuple
 from dataclasses import dataclass
 
+from ..api.batch_requests import execute_batched
+from .rate_limiter import RateLimiter, get_http_status
+from .timing_store import KIND_PROPAGATION
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,103 +43,364 @@ class OperationTiming:
         return self.end_time - self.start_time
 
 
+@dataclass
+class VerificationResult:
+    """Результат проверки применения изменения в группе"""
+    group_email: str
+    user_email: str
+    expect_member: bool
+    verified: bool
+    attempts: int
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def operation(self) -> str:
+        return 'add_member' if self.expect_member else 'remove_member'
+
+
+class PropagationEstimator:
+    """
+    Оценка времени распространения изменений по последним наблюдениям.
+
+    Первый опрос выполняется примерно тогда, когда изменение обычно уже
+    применено (медиана наблюдений), а не через фиксированные 5 секунд.
+    С хранилищем замеров оценка учитывает прошлые запуски и ведется
+    отдельно по типу операции и группе.
+    """
+
+    def __init__(self, initial_delay: float = 1.0, min_delay: float = 0.25,
+                 max_delay: float = 15.0, window: int = 200, store=None):
+        """
+        Args:
+            initial_delay: Задержка, пока нет наблюдений
+            min_delay: Минимальная задержка первой проверки
+            max_delay: Максимальная задержка между проверками
+            window: Сколько последних наблюдений хранить в памяти
+            store: OperationTimingStore для сохранения и чтения замеров
+        """
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.store = store
+        self._observed: deque = deque(maxlen=window)
+
+    @staticmethod
+    def censored_sample(last_negative: float, first_positive: float) -> float:
+        """
+        Оценка времени распространения по опросам
+
+        Изменение применилось между последним отрицательным и первым
+        положительным опросом; без отрицательного опроса - между изменением
+        (0) и первым опросом. Время первого положительного опроса не меньше
+        текущей задержки и завышало бы оценку при каждом замере, а середина
+        интервала позволяет задержке уменьшаться.
+        """
+        return (last_negative + first_positive) / 2
+
+    def record(self, delay: float, operation: Optional[str] = None, group_email: Optional[str] = None,
+               user_email: Optional[str] = None, success: bool = True):
+        """Запоминает наблюдаемое время распространения (см. censored_sample)"""
+        if success:
+            self._observed.append(delay)
+        if self.store is not None:
+            self.store.record(KIND_PROPAGATION, operation or 'unknown', delay,
+                              group_email, user_email, success)
+
+    def first_delay(self, operation: Optional[str] = None, group_email: Optional[str] = None) -> float:
+        """Задержка перед первой проверкой"""
+        suggested = None
+        if self.store is not None:
+            suggested = self.store.suggest_delay(operation, group_email)
+        if suggested is None and self._observed:
+            ordered = sorted(self._observed)
+            suggested = ordered[len(ordered) // 2]
+        if suggested is None:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, suggested))
+
+    @property
+    def samples(self) -> int:
+        return len(self._observed)
+
+
 class GroupChangeVerifier:
     """Утилита для проверки применения изменений в группах Google"""
     
-    def __init__(self, google_client):
+    def __init__(self, google_client, timeout: float = 60.0, backoff_factor: float = 1.6,
+                 estimator: Optional[PropagationEstimator] = None, batch_window: float = 0.05,
+                 batch_size: int = 50, rate_per_second: float = 10.0):
         """
         Инициализация верификатора
         
         Args:
-            google_client: Экземпляр GoogleAPIClient
+            google_client: Экземпляр GoogleAPIClient (нужен атрибут service)
+            timeout: Сколько секунд ждать применения изменения
+            backoff_factor: Во сколько раз увеличивается задержка между проверками
+            estimator: Оценка времени распространения (общая для всех проверок)
+            batch_window: Интервал, за который проверки собираются в один batch
+            batch_size: Запросов в одном batch
+            rate_per_second: Ограничение частоты запросов (0 - без ограничения)
         """
         self.google_client = google_client
+        self.timeout = timeout
+        self.backoff_factor = backoff_factor
+        self.estimator = estimator or PropagationEstimator()
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.limiter = RateLimiter(rate_per_second)
         self.logger = logging.getLogger(__name__)
+        
+        # Сервис googleapiclient не потокобезопасен: все запросы идут из одного потока
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='group-verify')
+        # Накапливаемые проверки отдельно для каждого цикла событий
+        self._batches: Dict[asyncio.AbstractEventLoop, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Собственный цикл событий для submit: живет, пока жив верификатор
+        self._background: Optional[asyncio.AbstractEventLoop] = None
+    
+    @property
+    def service(self):
+        return getattr(self.google_client, 'service', None)
+    
+    # ----- Асинхронный интерфейс -----
     
-    def verify_member_removal(self, group_email: str, user_email: str, 
-                            max_retries: int = 3, retry_delay: int = 5) -> bool:
+    async def verify(self, group_email: str, user_email: str, expect_member: bool = True,
+                     callback: Optional[Callable[[VerificationResult], None]] = None) -> VerificationResult:
         """
-        Проверяет, что пользователь действительно удален из группы
+        Ждет, пока членство пользователя в группе станет ожидаемым
         
         Args:
             group_email: Email группы
             user_email: Email пользователя
-            max_retries: Максимальное количество попыток проверки
-            retry_delay: Задержка между попытками в секундах
+            expect_member: True - проверяется добавление, False - удаление
+            callback: Вызывается с результатом по завершении проверки
             
         Returns:
-            True если пользователь удален, False если все еще в группе
+            Результат проверки
         """
-        for attempt in range(max_retries):
+        operation = 'add_member' if expect_member else 'remove_member'
+        started = time.monotonic()
+        delay = self.estimator.first_delay(operation, group_email)
+        attempts = 0
+        error = None
+        verified = False
+        # Время последнего опроса, на котором изменение еще не было видно
+        last_negative = 0.0
+        
+        while True:
+            await asyncio.sleep(delay)
+            attempts += 1
             try:
-                self.logger.info(f"Проверка удаления пользователя {user_email} из группы {group_email}, попытка {attempt + 1}")
-                
-                members = self.google_client.get_group_members(group_email)
-                
-                # Проверяем, есть ли пользователь в списке участников
-                user_found = any(
-                    member.get('email', '').lower() == user_email.lower() 
-                    for member in members
-                )
-                
-                if not user_found:
-                    self.logger.info(f"✅ Пользователь {user_email} успешно удален из группы {group_email}")
-                    return True
-                    
-                if attempt < max_retries - 1:
-                    self.logger.warning(f"⏳ Пользователь {user_email} все еще в группе {group_email}, ожидание {retry_delay} сек...")
-                    time.sleep(retry_delay)
-                else:
-                    self.logger.error(f"❌ Пользователь {user_email} не был удален из группы {group_email} после {max_retries} попыток")
-                    
+                is_member = await self._check(group_email, user_email)
+                error = None
             except Exception as e:
-                self.logger.error(f"Ошибка при проверке группы {group_email}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    
-        return False
+                is_member = None
+                error = str(e)
+            elapsed = time.monotonic() - started
+            
+            if is_member is expect_member:
+                verified = True
+                break
+            if is_member is not None:
+                last_negative = elapsed
+            if elapsed + delay >= self.timeout:
+                break
+            delay = min(delay * self.backoff_factor, self.estimator.max_delay,
+                        max(0.0, self.timeout - elapsed))
+        
+        result = VerificationResult(group_email, user_email, expect_member, verified,
+                                    attempts, time.monotonic() - started, error)
+        sample = self.estimator.censored_sample(last_negative, elapsed) if verified else self.timeout
+        self.estimator.record(sample, operation, group_email, user_email, success=verified)
+        if verified:
+            self.logger.info(f"✅ Изменение {result.operation} {user_email} → {group_email} "
+                             f"применено за {result.elapsed:.1f} сек")
+        else:
+            self.logger.error(f"❌ Изменение {result.operation} {user_email} → {group_email} "
+                              f"не применено за {result.elapsed:.1f} сек ({attempts} проверок)")
+        
+        if callback is not None:
+            try:
+                callback(result)
+            except Exception as e:
+                self.logger.error(f"Ошибка в обработчике результата проверки: {e}")
+        return result
+    
+    def submit(self, group_email: str, user_email: str, expect_member: bool = True,
+               callback: Optional[Callable[[VerificationResult], None]] = None) -> Future:
+        """
+        Запускает проверку в фоне и сразу возвращает управление
+        
+        Проверка выполняется в собственном цикле событий верификатора, а не в
+        цикле вызывающего кода: asyncio.run и временные циклы CLI/GUI отменяют
+        незавершенные задачи при выходе. Результат передается в callback и
+        доступен через возвращаемый Future (в asyncio - через asyncio.wrap_future).
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self.verify(group_email, user_email, expect_member, callback), self._background_loop()
+        )
+    
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._background is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='group-verify-loop', daemon=True).start()
+                self._background = loop
+            return self._background
+    
+    async def verify_many(self, changes: Iterable[Tuple[str, str, bool]],
+                          callback: Optional[Callable[[VerificationResult], None]] = None
+                          ) -> List[VerificationResult]:
+        """
+        Параллельно проверяет набор изменений (группа, пользователь, ожидаемое членство)
+        """
+        return list(await asyncio.gather(*(
+            self.verify(group_email, user_email, expect_member, callback)
+            for group_email, user_email, expect_member in changes
+        )))
+    
+    async def _check(self, group_email: str, user_email: str) -> bool:
+        """Ставит проверку членства в ближайший batch цикла событий"""
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            batch = self._batches.get(loop)
+            if batch is None:
+                # Новый цикл событий (каждая CLI команда запускает свой); закрытые забываем
+                for closed in [other for other in self._batches if other.is_closed()]:
+                    del self._batches[closed]
+                batch = self._batches[loop] = {'pending': [], 'scheduled': False}
+        
+        future = loop.create_future()
+        batch['pending'].append((group_email, user_email, future))
+        if not batch['scheduled']:
+            batch['scheduled'] = True
+            loop.call_later(self.batch_window, lambda: asyncio.ensure_future(self._flush(batch)))
+        return await future
+    
+    async def _flush(self, batch: Dict[str, Any]):
+        """Выполняет накопленные проверки одним batch запросом"""
+        pending, batch['pending'] = batch['pending'], []
+        batch['scheduled'] = False
+        if not pending:
+            return
+        
+        pairs = list({(g.lower(), u.lower()) for g, u, _ in pending})
+        loop = asyncio.get_event_loop()
+        try:
+            answers = await loop.run_in_executor(self._executor, self.check_memberships, pairs)
+        except Exception as e:
+            answers = {pair: e for pair in pairs}
+        
+        for group_email, user_email, future in pending:
+            if future.done():
+                continue
+            answer = answers.get((group_email.lower(), user_email.lower()))
+            if isinstance(answer, Exception):
+                future.set_exception(answer)
+            else:
+                future.set_result(answer)
+    
+    # ----- Проверка членства -----
+    
+    def check_memberships(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        """
+        Проверяет членство пар (группа, пользователь) пакетными запросами
+        
+        Returns:
+            Пара -> True/False или исключение, если проверить не удалось
+        """
+        service = self.service
+        if not service:
+            error = RuntimeError('Google API сервис не инициализирован')
+            return {pair: error for pair in pairs}
+        
+        answers: Dict[Tuple[str, str], Any] = {}
+        result = execute_batched(
+            service,
+            [(pair, lambda g=pair[0], u=pair[1]: service.members().hasMember(groupKey=g, memberKey=u))
+             for pair in pairs],
+            batch_size=self.batch_size, limiter=self.limiter
+        )
+        for pair, response in result.responses.items():
+            answers[pair] = bool((response or {}).get('isMember'))
+        
+        # hasMember не работает для адресов вне домена (400): для них members.get,
+        # где 404 означает, что участника нет
+        external = [pair for pair, error in result.errors.items() if get_http_status(error) == 400]
+        for pair, error in result.errors.items():
+            if pair not in external:
+                answers[pair] = error
+        if external:
+            fallback = execute_batched(
+                service,
+                [(pair, lambda g=pair[0], u=pair[1]: service.members().get(groupKey=g, memberKey=u))
+                 for pair in external],
+                batch_size=self.batch_size, limiter=self.limiter,
+                is_success=lambda e: get_http_status(e) == 404
+            )
+            for pair, response in fallback.responses.items():
+                answers[pair] = response is not None
+            answers.update(fallback.errors)
+        return answers
+    
+    def is_member(self, group_email: str, user_email: str) -> bool:
+        """Точечная проверка членства одного пользователя"""
+        answer = self.check_memberships([(group_email.lower(), user_email.lower())])
+        value = next(iter(answer.values()))
+        if isinstance(value, Exception):
+            raise value
+        return value
+    
+    # ----- Синхронный интерфейс для скриптов -----
+    
+    def verify_member_removal(self, group_email: str, user_email: str,
+                              timeout: Optional[float] = None) -> bool:
+        """
+        Проверяет, что пользователь действительно удален из группы
+        
+        Блокирует вызывающий поток; в асинхронном коде используйте verify/submit.
+        
+        Returns:
+            True если пользователь удален, False если все еще в группе
+        """
+        return self._wait_sync(group_email, user_email, False, timeout)
     
     def verify_member_addition(self, group_email: str, user_email: str,
-                             max_retries: int = 3, retry_delay: int = 5) -> bool:
+                               timeout: Optional[float] = None) -> bool:
         """
         Проверяет, что пользователь действительно добавлен в группу
         
-        Args:
-            group_email: Email группы
-            user_email: Email пользователя
-            max_retries: Максимальное количество попыток проверки
-            retry_delay: Задержка между попытками в секундах
-            
+        Блокирует вызывающий поток; в асинхронном коде используйте verify/submit.
+        
         Returns:
             True если пользователь добавлен, False если все еще не в группе
         """
-        for attempt in range(max_retries):
+        return self._wait_sync(group_email, user_email, True, timeout)
+    
+    def _wait_sync(self, group_email: str, user_email: str, expect_member: bool,
+                   timeout: Optional[float]) -> bool:
+        timeout = self.timeout if timeout is None else timeout
+        operation = 'add_member' if expect_member else 'remove_member'
+        started = time.monotonic()
+        delay = self.estimator.first_delay(operation, group_email)
+        last_negative = 0.0
+        while True:
+            time.sleep(delay)
             try:
-                self.logger.info(f"Проверка добавления пользователя {user_email} в группу {group_email}, попытка {attempt + 1}")
-                
-                members = self.google_client.get_group_members(group_email)
-                
-                user_found = any(
-                    member.get('email', '').lower() == user_email.lower() 
-                    for member in members
-                )
-                
-                if user_found:
-                    self.logger.info(f"✅ Пользователь {user_email} успешно добавлен в группу {group_email}")
+                is_member = self.is_member(group_email, user_email)
+                if is_member is expect_member:
+                    sample = self.estimator.censored_sample(last_negative, time.monotonic() - started)
+                    self.estimator.record(sample, operation, group_email, user_email)
                     return True
-                    
-                if attempt < max_retries - 1:
-                    self.logger.warning(f"⏳ Пользователь {user_email} еще не появился в группе {group_email}, ожидание {retry_delay} сек...")
-                    time.sleep(retry_delay)
-                else:
-                    self.logger.error(f"❌ Пользователь {user_email} не был добавлен в группу {group_email} после {max_retries} попыток")
-                    
+                last_negative = time.monotonic() - started
             except Exception as e:
                 self.logger.error(f"Ошибка при проверке группы {group_email}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    
-        return False
+            elapsed = time.monotonic() - started
+            if elapsed + delay >= timeout:
+                self.estimator.record(timeout, operation, group_email, user_email, success=False)
+                return False
+            delay = min(delay * self.backoff_factor, self.estimator.max_delay, timeout - elapsed)
     
     def get_propagation_status(self, group_email: str) -> Dict[str, Any]:
         """
@@ -163,8 +439,13 @@ class GroupChangeVerifier:
 class GroupOperationMonitor:
     """Мониторинг производительности операций с группами"""
     
-    def __init__(self):
+    def __init__(self, store=None):
+        """
+        Args:
+            store: OperationTimingStore, куда дополнительно сохраняются замеры
+        """
         self.timings: List[OperationTiming] = []
+        self.store = store
         self.logger = logging.getLogger(__name__)
     
     def time_operation(self, operation: str, group_email: str, user_email: str = None):
@@ -207,6 +488,8 @@ class GroupOperationMonitor:
                 )
                 
                 self.monitor.timings.append(timing)
+                if self.monitor.store is not None:
+                    self.monitor.store.record_timing(timing)
                 
                 status = "✅ успешно" if self.success else "❌ с ошибкой"
                 self.monitor.logger.info(f"⏱️ Операция {self.operation} завершена {status} за {timing.duration:.2f} сек")
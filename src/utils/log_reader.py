@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Постраничное чтение журналов с конца файла.
+
+Журналы дописываются в конец, поэтому новые записи находятся в конце
+файла. Строки читаются блоками от конца к началу, и страница последних
+записей не требует чтения всего файла. Курсор следующей страницы - смещение
+начала последней прочитанной строки.
+"""
+
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+T = TypeVar('T')
+
+# Размер блока чтения, байты
+BLOCK_SIZE = 64 * 1024
+
+
+def read_lines_backward(path: Union[str, Path], offset: Optional[int] = None,
+                        block_size: int = BLOCK_SIZE) -> Iterator[Tuple[int, str]]:
+    """
+    Строки файла от конца к началу
+
+    Args:
+        path: Файл
+        offset: Читать только строки, начинающиеся до этого смещения
+            (None - с конца файла)
+        block_size: Размер блока чтения
+
+    Yields:
+        (смещение начала строки, строка без перевода строки); пустые строки пропускаются
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        position = f.tell() if offset is None else min(offset, f.tell())
+        tail = b''
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + tail).split(b'\n')
+            tail = lines[0]
+            end = position + len(tail)
+            for line in lines[1:]:
+                end += 1 + len(line)
+            for line in reversed(lines[1:]):
+                start = end - len(line)
+                end = start - 1
+                if line.strip():
+                    yield start, line.decode('utf-8', errors='replace').rstrip('\r')
+        if tail.strip():
+            yield 0, tail.decode('utf-8', errors='replace').rstrip('\r')
+
+
+def read_page_backward(path: Union[str, Path], offset: Optional[int] = None, limit: int = 200,
+                       parse: Optional[Callable[[str], Optional[T]]] = None) -> Tuple[List[T], Optional[int]]:
+    """
+    Страница записей от конца к началу
+
+    Args:
+        path: Файл
+        offset: Курсор предыдущей страницы (None - последние записи)
+        limit: Записей на странице
+        parse: Строка -> запись или None, если строку нужно пропустить
+
+    Returns:
+        (записи, новые первыми; курсор следующей страницы или None)
+    """
+    items: List[T] = []
+    last_start = None
+    if not Path(path).exists():
+        return items, None
+    for start, line in read_lines_backward(path, offset):
+        item = parse(line) if parse else line
+        if item is None:
+            continue
+        if len(items) >= limit:
+            # Есть еще хотя бы одна запись - страница не последняя
+            return items, last_start
+        items.append(item)
+        last_start = start
+    return items, None
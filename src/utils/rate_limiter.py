@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Ограничение частоты запросов к Google API и повтор при превышении квот.
+
+Массовые операции выполняются несколькими потоками; общий RateLimiter
+не дает им вместе превысить квоту API, а execute_with_backoff повторяет
+запросы, отклоненные с 429/5xx, с экспоненциальной задержкой.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# HTTP статусы, при которых запрос имеет смысл повторить
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Потокобезопасный ограничитель частоты (token bucket).
+    """
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        """
+        Инициализация ограничителя.
+
+        Args:
+            rate_per_second: Средняя допустимая частота запросов (0 - без ограничения)
+            burst: Сколько запросов можно выполнить подряд без ожидания
+        """
+        self.rate = rate_per_second
+        self.capacity = burst if burst is not None else max(1, int(rate_per_second))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Ждет, пока запрос можно будет выполнить.
+
+        Returns:
+            Время ожидания в секундах
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def get_http_status(error: Exception) -> Optional[int]:
+    """Возвращает HTTP статус из HttpError (или None для прочих исключений)."""
+    resp = getattr(error, 'resp', None)
+    status = getattr(resp, 'status', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Проверяет, стоит ли повторить запрос после ошибки."""
+    status = get_http_status(error)
+    if status in RETRYABLE_STATUSES:
+        return True
+    # Превышение квоты Directory API иногда приходит как 403
+    return status == 403 and ('rateLimitExceeded' in str(error) or 'userRateLimitExceeded' in str(error))
+
+
+def execute_with_backoff(request: Callable[[], Any],
+                         limiter: Optional[RateLimiter] = None,
+                         max_attempts: int = 5,
+                         base_delay: float = 1.0,
+                         max_delay: float = 32.0) -> Any:
+    """
+    Выполняет запрос с ограничением частоты и повтором при временных ошибках.
+
+    Args:
+        request: Функция, выполняющая запрос (обычно lambda: ...execute())
+        limiter: Общий ограничитель частоты
+        max_attempts: Максимальное количество попыток
+        base_delay: Начальная задержка перед повтором в секундах
+        max_delay: Максимальная задержка перед повтором в секундах
+
+    Returns:
+        Результат запроса
+
+    Raises:
+        Exception: Последняя ошибка, если запрос не удался
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return request()
+        except Exception as e:
+            if attempt >= max_attempts or not is_retryable_error(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+            time.sleep(delay + random.uniform(0, delay / 2))
@@ -13,6 +13,9 @@ from cryptography.fernet import Fernet
 from pathlib import Path
 
 from .file_paths import get_security_path, get_log_path
+from .segmented_log import (
+    DEFAULT_MAX_SEGMENTS, DEFAULT_SEGMENT_AGE, DEFAULT_SEGMENT_BYTES, SegmentedLog
+)
 
 
 class SecurityManager:
@@ -20,14 +23,47 @@ class SecurityManager:
     Менеджер безопасности для защиты учетных данных и аудита.
     """
     
-    def __init__(self):
+    def __init__(self, encrypt_audit: bool = False,
+                 audit_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 audit_segment_age: float = DEFAULT_SEGMENT_AGE,
+                 audit_max_segments: int = DEFAULT_MAX_SEGMENTS):
+        """
+        Args:
+            encrypt_audit: Шифровать новые сегменты аудит лога ключом Fernet
+            audit_segment_bytes: Размер сегмента аудит лога
+            audit_segment_age: Возраст сегмента аудит лога, секунды
+            audit_max_segments: Сколько сегментов аудит лога хранить
+        """
         self.key_file = get_security_path(".security_key")
+        # Прежний формат: JSON массив, переписывавшийся целиком
         self.audit_file = get_log_path("security_audit.json")
         self.session_timeout = timedelta(hours=1)
         self.last_activity = datetime.now()
         
         # Инициализация ключа шифрования
         self._init_encryption()
+        
+        self.audit_log = SegmentedLog(
+            get_log_path("security_audit"), prefix="security_audit",
+            cipher=self if encrypt_audit else None,
+            segment_bytes=audit_segment_bytes, segment_age=audit_segment_age,
+            max_segments=audit_max_segments
+        )
+        self._migrate_audit_file()
+    
+    def _migrate_audit_file(self):
+        """Переносит записи из прежнего JSON файла в сегментированный лог"""
+        if not self.audit_file.exists():
+            return
+        try:
+            with open(self.audit_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if not self.audit_log.segments():
+                for entry in entries:
+                    self.audit_log.append(entry)
+            self.audit_file.rename(self.audit_file.with_name(self.audit_file.name + '.migrated'))
+        except Exception as e:
+            print(f"Ошибка переноса аудит лога: {e}")
     
     def _init_encryption(self):
         """Инициализирует ключ шифрования"""
@@ -82,26 +118,9 @@ class SecurityManager:
             "session_id": self._get_session_id()
         }
         
-        # Загружаем существующий аудит лог
-        audit_log = []
-        if self.audit_file.exists():
-            try:
-                with open(self.audit_file, 'r', encoding='utf-8') as f:
-                    audit_log = json.load(f)
-            except:
-                audit_log = []
-        
-        # Добавляем новую запись
-        audit_log.append(audit_entry)
-        
-        # Ограничиваем размер лога (последние 1000 записей)
-        if len(audit_log) > 1000:
-            audit_log = audit_log[-1000:]
-        
-        # Сохраняем лог
+        # Запись дописывается в конец текущего сегмента
         try:
-            with open(self.audit_file, 'w', encoding='utf-8') as f:
-                json.dump(audit_log, f, indent=2, ensure_ascii=False)
+            self.audit_log.append(audit_entry)
         except Exception as e:
             print(f"Ошибка записи в аудит лог: {e}")
     
@@ -110,15 +129,10 @@ class SecurityManager:
         return hashlib.md5(f"{os.getpid()}{self.last_activity}".encode()).hexdigest()[:8]
     
     def get_audit_log(self, limit: int = 100) -> List[Dict]:
-        """Получает записи из аудит лога"""
-        if not self.audit_file.exists():
-            return []
-        
+        """Получает последние записи из аудит лога (читаются с конца)"""
         try:
-            with open(self.audit_file, 'r', encoding='utf-8') as f:
-                audit_log = json.load(f)
-            return audit_log[-limit:]
-        except:
+            return self.audit_log.tail(limit)
+        except Exception:
             return []
     
     def secure_delete_file(self, file_path: Path):
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Журнал событий из сегментов, в которые записи только дописываются.
+
+Каждое событие - одна строка JSON в конце текущего сегмента, поэтому
+запись не зависит от размера журнала. Сегмент закрывается и начинается
+новый, когда он превышает заданный размер или возраст; самые старые
+сегменты сверх заданного числа удаляются. С шифрованием каждая строка
+сегмента - отдельно зашифрованная запись (cipher.encrypt_data), и такой
+сегмент тоже читается с конца построчно.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from .log_reader import read_lines_backward
+
+logger = logging.getLogger(__name__)
+
+# Размер сегмента, после которого начинается новый, байты
+DEFAULT_SEGMENT_BYTES = 5 * 1024 * 1024
+# Возраст сегмента, после которого начинается новый, секунды
+DEFAULT_SEGMENT_AGE = 24 * 3600
+# Хранимых сегментов
+DEFAULT_MAX_SEGMENTS = 30
+
+PLAIN_SUFFIX = '.jsonl'
+ENCRYPTED_SUFFIX = '.enc'
+
+_SEGMENT_NAME = re.compile(r'^(?P<prefix>.+)-(?P<seq>\d{6,})-(?P<started>\d+)(?P<suffix>\.jsonl|\.enc)$')
+
+
+class SegmentedLog:
+    """
+    Потокобезопасный сегментированный журнал JSON записей.
+    """
+
+    def __init__(self, directory: Union[str, Path], prefix: str = 'audit', cipher: Any = None,
+                 segment_bytes: int = DEFAULT_SEGMENT_BYTES, segment_age: float = DEFAULT_SEGMENT_AGE,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS):
+        """
+        Args:
+            directory: Каталог сегментов
+            prefix: Префикс имен файлов сегментов
+            cipher: Объект с encrypt_data/decrypt_data (SecurityManager);
+                с ним новые сегменты шифруются
+            segment_bytes: Максимальный размер сегмента
+            segment_age: Максимальный возраст сегмента, секунды
+            max_segments: Сколько сегментов хранить (0 - без ограничения)
+        """
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.cipher = cipher
+        self.segment_bytes = segment_bytes
+        self.segment_age = segment_age
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        self._file = None
+        self._path: Optional[Path] = None
+        self._size = 0
+        self._started = 0.0
+        self._seq = 0
+
+    @property
+    def encrypted(self) -> bool:
+        return self.cipher is not None
+
+    def segments(self) -> List[Path]:
+        """Файлы сегментов от старых к новым"""
+        if not self.directory.exists():
+            return []
+        found = []
+        for path in self.directory.iterdir():
+            match = _SEGMENT_NAME.match(path.name)
+            if match and match.group('prefix') == self.prefix:
+                found.append((int(match.group('seq')), path))
+        return [path for _, path in sorted(found)]
+
+    def _open_segment(self):
+        """Открывает последний сегмент для дозаписи или начинает новый"""
+        segments = self.segments()
+        suffix = ENCRYPTED_SUFFIX if self.encrypted else PLAIN_SUFFIX
+        if segments:
+            last = _SEGMENT_NAME.match(segments[-1].name)
+            self._seq = int(last.group('seq'))
+            if last.group('suffix') == suffix:
+                self._path = segments[-1]
+                self._started = float(last.group('started'))
+                self._size = self._path.stat().st_size
+                if not self._needs_rotation(0):
+                    self._file = open(self._path, 'ab')
+                    return
+        self._start_segment()
+
+    def _start_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        self._started = time.time()
+        suffix = ENCRYPTED_SUFFIX if self.encrypted else PLAIN_SUFFIX
+        self._path = self.directory / f'{self.prefix}-{self._seq:06d}-{int(self._started)}{suffix}'
+        self._file = open(self._path, 'ab')
+        self._size = 0
+        self._remove_old_segments()
+
+    def _needs_rotation(self, incoming: int) -> bool:
+        if self._size and self._size + incoming > self.segment_bytes:
+            return True
+        return time.time() - self._started >= self.segment_age
+
+    def _remove_old_segments(self):
+        if not self.max_segments:
+            return
+        segments = self.segments()
+        for path in segments[:max(0, len(segments) - self.max_segments)]:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Не удалось удалить старый сегмент журнала {path}: {e}")
+
+    def _encode(self, record: Dict[str, Any]) -> bytes:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        if self.encrypted:
+            line = self.cipher.encrypt_data(line)
+        return (line + '\n').encode('utf-8')
+
+    def append(self, record: Dict[str, Any]):
+        """Дописывает запись в текущий сегмент"""
+        data = self._encode(record)
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            elif self._needs_rotation(len(data)):
+                self._start_segment()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+
+    def _decode(self, line: str, encrypted: bool) -> Optional[Dict[str, Any]]:
+        try:
+            if encrypted:
+                if not self.cipher:
+                    return None
+                line = self.cipher.decrypt_data(line)
+            return json.loads(line)
+        except Exception:
+            return None
+
+    def iter_backward(self) -> Iterator[Dict[str, Any]]:
+        """Записи от новых к старым (зашифрованные сегменты без cipher пропускаются)"""
+        with self._lock:
+            segments = self.segments()
+            # Граница текущего сегмента: строки, дописанные во время чтения, не читаются
+            bounds = {self._path: self._size} if self._path is not None else {}
+        for path in reversed(segments):
+            encrypted = path.suffix == ENCRYPTED_SUFFIX
+            if encrypted and not self.cipher:
+                logger.warning(f"Сегмент журнала {path.name} зашифрован, ключ не задан")
+                continue
+            try:
+                for _, line in read_lines_backward(path, bounds.get(path)):
+                    record = self._decode(line, encrypted)
+                    if record is not None:
+                        yield record
+            except FileNotFoundError:
+                # Сегмент удален ротацией во время чтения
+                continue
+
+    def tail(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Последние limit записей в хронологическом порядке"""
+        records: List[Dict[str, Any]] = []
+        if limit <= 0:
+            return records
+        for record in self.iter_backward():
+            records.append(record)
+            if len(records) >= limit:
+                break
+        records.reverse()
+        return records
+
+    def close(self):
+        """Закрывает текущий сегмент"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
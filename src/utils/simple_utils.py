@@ -8,13 +8,16 @@ import asyncio
 import threading
 import time
 import functools
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Optional, TYPE_CHECKING
 from datetime import datetime
-from googleapiclient.errors import HttpError
 from tkinter import messagebox
 import tkinter as tk
 import logging
 
+if TYPE_CHECKING:
+    # googleapiclient импортируется лениво, чтобы не замедлять первую отрисовку окна
+    from googleapiclient.errors import HttpError
+
 logger = logging.getLogger(__name__)
 
 
@@ -85,7 +88,7 @@ class SimpleErrorHandler:
     """Простая обработка ошибок Google API с автоповтором"""
     
     @staticmethod
-    def handle_api_error(error: HttpError, context: str = "") -> str:
+    def handle_api_error(error: 'HttpError', context: str = "") -> str:
         """Возвращает понятное сообщение об ошибке API"""
         if hasattr(error, 'resp') and error.resp:
             status_code = error.resp.status
@@ -171,6 +174,8 @@ class SimpleProgressDialog:
 
 def show_api_error(parent, error: Exception, context: str = ""):
     """Показывает пользователю понятное сообщение об ошибке"""
+    from googleapiclient.errors import HttpError
+    
     if isinstance(error, HttpError):
         message = SimpleErrorHandler.handle_api_error(error, context)
     else:
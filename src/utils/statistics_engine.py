@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+Инкрементальная статистика пользователей и групп.
+
+Полная загрузка списков выполняется один раз: счетчики (всего, активные,
+заблокированные, по подразделениям, по статусам, по типам групп) считаются за
+один проход. Дальше операции создания, изменения и удаления сообщают движку об
+изменившейся записи, и он корректирует только её вклад в счетчики, поэтому
+обновление панели статистики не требует повторной загрузки всего домена.
+
+Принимает как доменные модели (User, Group), так и словари формата
+Google Directory API, с которыми работает старый GUI. Directory API не
+сообщает тип группы, поэтому группы-словари учитываются в разбивке по типам,
+только если тип виден по меткам Cloud Identity.
+"""
+
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Вклад пользователя в счетчики: (подразделение, статус, активен, заблокирован)
+UserFacts = Tuple[str, str, bool, bool]
+# Вклад группы в счетчики: (тип группы или None, если он неизвестен; количество участников)
+GroupFacts = Tuple[Optional[str], int]
+
+# Метки групп Cloud Identity, по которым определяется тип группы-словаря
+GROUP_TYPE_LABELS = (
+    ('cloudidentity.googleapis.com/groups.security', 'security'),
+    ('cloudidentity.googleapis.com/groups.discussion_forum', 'distribution'),
+)
+
+
+def _user_facts(user: Any) -> Tuple[str, UserFacts]:
+    """Извлекает ключ и вклад пользователя (User или словарь API)."""
+    if isinstance(user, dict):
+        email = user.get('primaryEmail') or user.get('primary_email') or user.get('email', '')
+        suspended = bool(user.get('suspended', False))
+        if user.get('archived'):
+            status = 'archived'
+        else:
+            status = 'suspended' if suspended else 'active'
+        org_unit = user.get('orgUnitPath') or user.get('org_unit_path') or '/'
+        active = status == 'active'
+    else:
+        email = user.primary_email
+        suspended = bool(user.suspended)
+        status = getattr(user.status, 'value', str(user.status))
+        org_unit = user.org_unit_path or '/'
+        active = user.is_active
+    return email.lower(), (org_unit, status, active, suspended)
+
+
+def _api_group_type(group: Dict[str, Any]) -> Optional[str]:
+    """Тип группы-словаря по данным Cloud Identity; в ответе Directory API его нет."""
+    if group.get('dynamicGroupMetadata'):
+        return 'dynamic'
+    labels = group.get('labels') or {}
+    for label, group_type in GROUP_TYPE_LABELS:
+        if label in labels:
+            return group_type
+    return None
+
+
+def _group_facts(group: Any) -> Tuple[str, GroupFacts]:
+    """Извлекает ключ и вклад группы (Group или словарь API)."""
+    if isinstance(group, dict):
+        email = group.get('email', '')
+        group_type = _api_group_type(group)
+        members = group.get('directMembersCount') or group.get('members_count') or 0
+    else:
+        email = group.email
+        group_type = getattr(group.group_type, 'value', str(group.group_type))
+        members = group.direct_members_count or group.members_count
+    try:
+        members = int(members)
+    except (TypeError, ValueError):
+        members = 0
+    return email.lower(), (group_type, members)
+
+
+class StatisticsEngine:
+    """
+    Счетчики статистики домена с инкрементальным обновлением.
+
+    Потокобезопасен: заполняется из фоновых потоков загрузки и операций,
+    читается из главного потока Tk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users: Dict[str, UserFacts] = {}
+        self._groups: Dict[str, GroupFacts] = {}
+        self._active = 0
+        self._suspended = 0
+        self._group_members = 0
+        self._by_org_unit: Counter = Counter()
+        self._by_status: Counter = Counter()
+        self._by_group_type: Counter = Counter()
+        self._users_loaded = False
+        self._groups_loaded = False
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    @property
+    def users_loaded(self) -> bool:
+        return self._users_loaded
+
+    @property
+    def groups_loaded(self) -> bool:
+        return self._groups_loaded
+
+    @property
+    def loaded(self) -> bool:
+        """Обе полные загрузки выполнены, счетчики можно обновлять инкрементально."""
+        return self._users_loaded and self._groups_loaded
+
+    # --- Полная загрузка -------------------------------------------------
+
+    def load_users(self, users: Iterable[Any]):
+        """
+        Пересчитывает статистику пользователей за один проход.
+
+        Args:
+            users: Пользователи (User или словари API)
+        """
+        facts: Dict[str, UserFacts] = {}
+        for user in users:
+            email, user_facts = _user_facts(user)
+            facts[email] = user_facts
+
+        by_org_unit: Counter = Counter()
+        by_status: Counter = Counter()
+        active = suspended = 0
+        for org_unit, status, is_active, is_suspended in facts.values():
+            by_org_unit[org_unit] += 1
+            by_status[status] += 1
+            active += is_active
+            suspended += is_suspended
+
+        with self._lock:
+            self._users = facts
+            self._by_org_unit = by_org_unit
+            self._by_status = by_status
+            self._active = active
+            self._suspended = suspended
+            self._users_loaded = True
+        self._notify()
+
+    def load_groups(self, groups: Iterable[Any]):
+        """
+        Пересчитывает статистику групп за один проход.
+
+        Args:
+            groups: Группы (Group или словари API)
+        """
+        facts: Dict[str, GroupFacts] = {}
+        for group in groups:
+            email, group_facts = _group_facts(group)
+            facts[email] = group_facts
+
+        by_group_type: Counter = Counter()
+        group_members = 0
+        for group_type, members in facts.values():
+            if group_type is not None:
+                by_group_type[group_type] += 1
+            group_members += members
+
+        with self._lock:
+            self._groups = facts
+            self._by_group_type = by_group_type
+            self._group_members = group_members
+            self._groups_loaded = True
+        self._notify()
+
+    def reset(self):
+        """Сбрасывает статистику; следующая загрузка будет полной."""
+        with self._lock:
+            self._users = {}
+            self._groups = {}
+            self._active = self._suspended = self._group_members = 0
+            self._by_org_unit = Counter()
+            self._by_status = Counter()
+            self._by_group_type = Counter()
+            self._users_loaded = self._groups_loaded = False
+
+    # --- События изменения -----------------------------------------------
+
+    def user_upserted(self, user: Any):
+        """Пользователь создан или изменен."""
+        email, facts = _user_facts(user)
+        with self._lock:
+            if not self._users_loaded:
+                return
+            self._remove_user_facts(self._users.pop(email, None))
+            self._users[email] = facts
+            org_unit, status, is_active, is_suspended = facts
+            self._by_org_unit[org_unit] += 1
+            self._by_status[status] += 1
+            self._active += is_active
+            self._suspended += is_suspended
+        self._notify()
+
+    def user_removed(self, email: str):
+        """Пользователь удален."""
+        with self._lock:
+            if not self._users_loaded:
+                return
+            facts = self._users.pop(email.lower(), None)
+            if facts is None:
+                return
+            self._remove_user_facts(facts)
+        self._notify()
+
+    def group_upserted(self, group: Any):
+        """Группа создана или изменена."""
+        email, facts = _group_facts(group)
+        with self._lock:
+            if not self._groups_loaded:
+                return
+            self._remove_group_facts(self._groups.pop(email, None))
+            self._groups[email] = facts
+            group_type, members = facts
+            if group_type is not None:
+                self._by_group_type[group_type] += 1
+            self._group_members += members
+        self._notify()
+
+    def group_removed(self, email: str):
+        """Группа удалена."""
+        with self._lock:
+            if not self._groups_loaded:
+                return
+            facts = self._groups.pop(email.lower(), None)
+            if facts is None:
+                return
+            self._remove_group_facts(facts)
+        self._notify()
+
+    def group_members_changed(self, email: str, delta: int):
+        """Количество участников группы изменилось на delta."""
+        with self._lock:
+            facts = self._groups.get(email.lower())
+            if facts is None:
+                return
+            group_type, members = facts
+            new_members = max(0, members + delta)
+            self._groups[email.lower()] = (group_type, new_members)
+            self._group_members += new_members - members
+        self._notify()
+
+    def _remove_user_facts(self, facts: Optional[UserFacts]):
+        if facts is None:
+            return
+        org_unit, status, is_active, is_suspended = facts
+        self._decrement(self._by_org_unit, org_unit)
+        self._decrement(self._by_status, status)
+        self._active -= is_active
+        self._suspended -= is_suspended
+
+    def _remove_group_facts(self, facts: Optional[GroupFacts]):
+        if facts is None:
+            return
+        group_type, members = facts
+        if group_type is not None:
+            self._decrement(self._by_group_type, group_type)
+        self._group_members -= members
+
+    @staticmethod
+    def _decrement(counter: Counter, key: str):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    # --- Чтение ----------------------------------------------------------
+
+    def get_counts(self) -> Tuple[int, int]:
+        """Возвращает (количество пользователей, количество групп)."""
+        with self._lock:
+            return len(self._users), len(self._groups)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Возвращает текущую статистику.
+
+        Returns:
+            Словарь в формате UserService.get_user_statistics, дополненный
+            статистикой групп
+        """
+        with self._lock:
+            return {
+                'total_users': len(self._users),
+                'active_users': self._active,
+                'suspended_users': self._suspended,
+                'users_by_org_unit': dict(self._by_org_unit),
+                'users_by_status': dict(self._by_status),
+                'total_groups': len(self._groups),
+                'groups_by_type': dict(self._by_group_type),
+                'group_members': self._group_members,
+            }
+
+    # --- Подписчики ------------------------------------------------------
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        Подписывает на изменения статистики.
+
+        Callback вызывается в потоке, выполнившем изменение; UI должен
+        передавать обновление в главный поток через after().
+        """
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Отписывает от изменений статистики."""
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify(self):
+        with self._lock:
+            listeners = list(self._listeners)
+        if not listeners:
+            return
+        snapshot = self.snapshot()
+        for callback in listeners:
+            try:
+                callback(snapshot)
+            except Exception:
+                # Ошибка подписчика не должна ломать операцию, вызвавшую событие
+                pass
+
+
+# Глобальная статистика домена для главного окна
+statistics_engine = StatisticsEngine()
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Хранилище времени операций с группами.
+
+Сохраняет в SQLite задержки вызовов API и время распространения изменений
+(сколько прошло до того, как изменение стало видно при проверке). По ним
+считаются перцентили p50/p90/p99 для каждого типа операции и группы,
+выбирается задержка первой проверки изменений и строится отчет о том,
+как меняется время распространения.
+
+record только ставит замер в очередь: замеры пишет фоновый поток пачками,
+поэтому запись не блокирует цикл событий асинхронных операций с группами.
+"""
+
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .event_loop_monitor import percentile
+
+logger = logging.getLogger(__name__)
+
+# Виды замеров
+KIND_API = 'api'
+KIND_PROPAGATION = 'propagation'
+
+# Сколько последних замеров учитывается при расчете перцентилей
+HISTOGRAM_WINDOW = 1000
+# Минимум замеров по группе, чтобы использовать ее собственную статистику
+MIN_GROUP_SAMPLES = 5
+
+_BUCKETS = {'hour': '%Y-%m-%d %H:00', 'day': '%Y-%m-%d', 'week': '%Y-%W'}
+
+# Сколько дней хранятся замеры (старые удаляются при открытии хранилища)
+RETENTION_DAYS = 90
+# Замеров в одной транзакции фонового писателя
+WRITE_BATCH_SIZE = 200
+# Версия схемы (PRAGMA user_version). 1: время распространения - середина
+# интервала между опросами, а не время первого успешного опроса
+SCHEMA_VERSION = 1
+
+_STOP = object()
+
+
+class OperationTimingStore:
+    """
+    Потокобезопасное хранилище замеров времени в SQLite.
+    """
+
+    def __init__(self, path: Union[str, Path], retention_days: Optional[int] = RETENTION_DAYS):
+        """
+        Args:
+            path: Файл базы данных (':memory:' - без сохранения на диск)
+            retention_days: Удалить при открытии замеры старше (None - не удалять)
+        """
+        self.path = str(path)
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS operation_timings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp REAL NOT NULL,
+                kind TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                group_email TEXT,
+                user_email TEXT,
+                duration REAL NOT NULL,
+                success INTEGER NOT NULL DEFAULT 1
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_timing_operation '
+                           'ON operation_timings(kind, operation, timestamp)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_timing_group '
+                           'ON operation_timings(kind, group_email, timestamp)')
+        self._migrate()
+        self._conn.commit()
+        if retention_days is not None:
+            self.prune(retention_days)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._writer_loop, name='timing-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _migrate(self):
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            # Прежние замеры распространения - время первого успешного опроса:
+            # оно не меньше задержки опроса, и задержка по ним могла только расти
+            deleted = self._conn.execute('DELETE FROM operation_timings WHERE kind = ?',
+                                         (KIND_PROPAGATION,)).rowcount
+            if deleted:
+                logger.info(f"Удалено {deleted} замеров распространения в прежнем формате")
+        self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def _writer_loop(self):
+        """Фоновая запись замеров пачками"""
+        while True:
+            item = self._queue.get()
+            batch = [] if item is _STOP else [item]
+            stop = item is _STOP
+            while not stop and len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write_batch(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[tuple]):
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.executemany(
+                        'INSERT INTO operation_timings '
+                        '(timestamp, kind, operation, group_email, user_email, duration, success) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка сохранения {len(batch)} замеров времени: {e}")
+
+    def flush(self):
+        """Ждет записи всех поставленных в очередь замеров (блокирующий вызов)"""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def record(self, kind: str, operation: str, duration: float, group_email: Optional[str] = None,
+               user_email: Optional[str] = None, success: bool = True,
+               timestamp: Optional[float] = None):
+        """
+        Ставит замер в очередь записи
+
+        Args:
+            kind: KIND_API (задержка вызова) или KIND_PROPAGATION (распространение)
+            operation: Тип операции (add_member, remove_member, ...)
+            duration: Длительность в секундах
+            group_email: Группа
+            user_email: Пользователь
+            success: Успешна ли операция
+            timestamp: Время замера (по умолчанию текущее)
+        """
+        if self._closed:
+            logger.debug(f"Хранилище замеров закрыто, замер {kind}/{operation} не сохранен")
+            return
+        self._queue.put((timestamp if timestamp is not None else time.time(), kind, operation,
+                         group_email.lower() if group_email else None, user_email, duration, int(success)))
+
+    def record_timing(self, timing, kind: str = KIND_API):
+        """Сохраняет OperationTiming из GroupOperationMonitor"""
+        self.record(kind, timing.operation, timing.duration, timing.group_email,
+                    timing.user_email, timing.success, timing.start_time)
+
+    def _durations(self, kind: str, operation: Optional[str] = None,
+                   group_email: Optional[str] = None, since: Optional[float] = None,
+                   limit: int = HISTOGRAM_WINDOW) -> List[float]:
+        query = 'SELECT duration FROM operation_timings WHERE kind = ? AND success = 1'
+        params: List[Any] = [kind]
+        if operation:
+            query += ' AND operation = ?'
+            params.append(operation)
+        if group_email:
+            query += ' AND group_email = ?'
+            params.append(group_email.lower())
+        if since is not None:
+            query += ' AND timestamp >= ?'
+            params.append(since)
+        query += ' ORDER BY timestamp DESC LIMIT ?'
+        params.append(limit)
+        self.flush()
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    @staticmethod
+    def _summarize(durations: List[float]) -> Dict[str, float]:
+        return {
+            'count': len(durations),
+            'p50': percentile(durations, 50),
+            'p90': percentile(durations, 90),
+            'p99': percentile(durations, 99),
+            'max': max(durations) if durations else 0.0,
+        }
+
+    def histogram(self, kind: str, operation: Optional[str] = None,
+                  group_email: Optional[str] = None, since: Optional[float] = None) -> Dict[str, float]:
+        """
+        Перцентили по последним замерам
+
+        Returns:
+            Словарь с count, p50, p90, p99, max (в секундах)
+        """
+        return self._summarize(self._durations(kind, operation, group_email, since))
+
+    def get_statistics(self, by_group: bool = False,
+                       since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Перцентили по всем видам замеров и операциям
+
+        Returns:
+            {вид: {операция: гистограмма}}; с by_group ключ операции -
+            'операция group_email'
+        """
+        columns = 'kind, operation, group_email' if by_group else 'kind, operation'
+        query = f'SELECT DISTINCT {columns} FROM operation_timings'
+        params: List[Any] = []
+        if since is not None:
+            query += ' WHERE timestamp >= ?'
+            params.append(since)
+        self.flush()
+        with self._lock:
+            keys = self._conn.execute(query, params).fetchall()
+
+        statistics: Dict[str, Dict[str, Any]] = {}
+        for key in keys:
+            kind, operation = key[0], key[1]
+            group_email = key[2] if by_group else None
+            if by_group and not group_email:
+                continue
+            name = f"{operation} {group_email}" if group_email else operation
+            statistics.setdefault(kind, {})[name] = self.histogram(kind, operation, group_email, since)
+        return statistics
+
+    def suggest_delay(self, operation: Optional[str] = None, group_email: Optional[str] = None,
+                      pct: float = 50, min_samples: int = MIN_GROUP_SAMPLES) -> Optional[float]:
+        """
+        Задержка первой проверки по наблюдаемому распространению
+
+        Используется статистика группы, если по ней достаточно замеров,
+        иначе статистика типа операции.
+
+        Returns:
+            Перцентиль времени распространения или None, если замеров мало
+        """
+        if group_email:
+            durations = self._durations(KIND_PROPAGATION, operation, group_email)
+            if len(durations) >= min_samples:
+                return percentile(durations, pct)
+        durations = self._durations(KIND_PROPAGATION, operation)
+        if len(durations) >= min_samples:
+            return percentile(durations, pct)
+        return None
+
+    def trend(self, kind: str = KIND_PROPAGATION, operation: Optional[str] = None,
+              group_email: Optional[str] = None, bucket: str = 'day',
+              periods: int = 14) -> List[Dict[str, Any]]:
+        """
+        Перцентили по периодам (час, день или неделя)
+
+        Returns:
+            Список {'period', 'count', 'p50', 'p90', 'p99', 'max'} от старых к новым
+        """
+        if bucket not in _BUCKETS:
+            raise ValueError(f"Неизвестный период: {bucket}")
+        query = 'SELECT timestamp, duration FROM operation_timings WHERE kind = ? AND success = 1'
+        params: List[Any] = [kind]
+        if operation:
+            query += ' AND operation = ?'
+            params.append(operation)
+        if group_email:
+            query += ' AND group_email = ?'
+            params.append(group_email.lower())
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY timestamp', params).fetchall()
+
+        buckets: Dict[str, List[float]] = {}
+        for timestamp, duration in rows:
+            period = datetime.fromtimestamp(timestamp).strftime(_BUCKETS[bucket])
+            buckets.setdefault(period, []).append(duration)
+        return [dict(period=period, **self._summarize(durations))
+                for period, durations in sorted(buckets.items())[-periods:]]
+
+    def trend_report(self, operation: Optional[str] = None, group_email: Optional[str] = None,
+                     bucket: str = 'day', periods: int = 14) -> str:
+        """Текстовый отчет о динамике времени распространения изменений"""
+        rows = self.trend(KIND_PROPAGATION, operation, group_email, bucket, periods)
+        scope = ' '.join(filter(None, [operation, group_email])) or 'все операции'
+        if not rows:
+            return f"Нет замеров времени распространения ({scope})"
+
+        lines = [f"Время распространения изменений ({scope}), сек",
+                 f"{'Период':<17} {'Замеров':>8} {'p50':>7} {'p90':>7} {'p99':>7}"]
+        for row in rows:
+            lines.append(f"{row['period']:<17} {row['count']:>8} {row['p50']:>7.2f} "
+                         f"{row['p90']:>7.2f} {row['p99']:>7.2f}")
+        if len(rows) > 1 and rows[0]['p50'] > 0:
+            change = (rows[-1]['p50'] - rows[0]['p50']) / rows[0]['p50'] * 100
+            lines.append(f"Изменение p50 за период: {change:+.0f}%")
+        return '\n'.join(lines)
+
+    def prune(self, older_than_days: int = 90) -> int:
+        """Удаляет старые замеры; возвращает количество удаленных"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            cursor = self._conn.execute('DELETE FROM operation_timings WHERE timestamp < ?', (cutoff,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """Удаляет все замеры"""
+        self.flush()
+        with self._lock:
+            self._conn.execute('DELETE FROM operation_timings')
+            self._conn.commit()
+
+    def close(self):
+        """Записывает очередь и закрывает базу"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+
+_timing_store: Optional[OperationTimingStore] = None
+_timing_store_lock = threading.Lock()
+
+
+def get_timing_store() -> OperationTimingStore:
+    """Общее хранилище замеров (data/group_timings.db)"""
+    global _timing_store
+    with _timing_store_lock:
+        if _timing_store is None:
+            from .file_paths import file_path_manager
+            _timing_store = OperationTimingStore(file_path_manager.get_data_path('group_timings.db'))
+        return _timing_store
@@ -8,6 +8,8 @@ import re
 import time
 from functools import lru_cache
 
+from .event_loop_monitor import ui_monitor
+
 
 def handle_service_errors(operation_name: str, require_service: bool = True):
     """
@@ -164,15 +166,17 @@ def require_confirmation(message: str = "Вы уверены, что хотит
 
 def measure_performance(func: Callable) -> Callable:
     """
-    Декоратор для измерения времени выполнения операции
+    Декоратор для измерения времени выполнения операции.
+    Время также передается в монитор цикла событий (окно диагностики UI).
     """
     @wraps(func)
     def wrapper(self, *args, **kwargs) -> Any:
-        start_time = time.time()
+        start_time = time.perf_counter()
         result = func(self, *args, **kwargs)
-        end_time = time.time()
+        end_time = time.perf_counter()
         
         execution_time = end_time - start_time
+        ui_monitor.record_handler(func.__qualname__, execution_time)
         self.log_activity(
             f'Операция {func.__name__} выполнена за {execution_time:.2f} сек', 
             'PERFORMANCE'
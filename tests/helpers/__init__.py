@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Общие тестовые двойники.
+
+Тесты импортируют их как обычный модуль (from helpers import ...):
+conftest.py не предназначен для импорта.
+"""
+
+from .google_fakes import FakeBatch, FakeHttpError
+
+__all__ = ['FakeBatch', 'FakeHttpError']
@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+"""
+Локальный сервер FreeIPA JSON-RPC для тестов и замеров производительности.
+
+Тестовый двойник: в пакет приложения не входит. Тесты импортируют его как
+helpers.freeipa_fake_server, скрипт замера - как tests.helpers.freeipa_fake_server.
+
+Хранит пользователей и группы в памяти и поддерживает команды, которые
+использует приложение: user/group find/show/add/mod/del, user_disable,
+group_add_member/group_remove_member, ping и batch. Ответы повторяют
+формат FreeIPA: списки значений атрибутов, truncated при превышении
+ограничения поиска, коды ошибок NotFound/DuplicateEntry/EmptyModlist.
+
+Сервер работает в двух режимах:
+- в процессе: методы call/batch совпадают с FreeIPAService, поэтому сервер
+  можно передать прямо в FreeIPASyncEngine или FreeIPAEnumerator;
+- по HTTP на localhost (start/stop): вход по паролю с cookie ipa_session,
+  /ipa/session/json и 401 для истекших сессий - для проверки клиента целиком.
+
+Задержка сети (latency, на каждый HTTP запрос или вызов call/batch) и
+время выполнения команды на сервере (command_latency) настраиваются.
+"""
+
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from src.services.freeipa_enumeration import FreeIPAEnumerator
+
+logger = logging.getLogger(__name__)
+
+# Ограничение поиска сервера (ipasearchrecordslimit / nsslapd-sizelimit)
+DEFAULT_SIZE_LIMIT = 2000
+
+# Атрибуты, по которым ищет *_find без опций
+USER_SEARCH_FIELDS = ('uid', 'givenname', 'sn', 'telephonenumber', 'ou', 'title')
+GROUP_SEARCH_FIELDS = ('cn', 'description')
+
+# Атрибуты, которые *_find/*_show возвращают без all=True
+USER_DEFAULT_ATTRIBUTES = ('uid', 'givenname', 'sn', 'mail', 'telephonenumber', 'title',
+                           'nsaccountlock', 'uidnumber', 'gidnumber', 'homedirectory', 'loginshell')
+
+
+class FakeFreeIPAError(Exception):
+    """Ошибка команды в терминах FreeIPA"""
+
+    def __init__(self, name: str, code: int, message: str):
+        super().__init__(message)
+        self.name = name
+        self.code = code
+        self.message = message
+
+
+def _values(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+class FakeFreeIPAServer:
+    """
+    Потокобезопасный сервер FreeIPA в памяти.
+    """
+
+    def __init__(self, latency: float = 0.0, command_latency: float = 0.0,
+                 size_limit: int = DEFAULT_SIZE_LIMIT, username: str = 'admin',
+                 password: str = 'password'):
+        """
+        Args:
+            latency: Задержка на запрос (сеть и обработка HTTP), сек
+            command_latency: Время выполнения одной команды, сек
+            size_limit: Максимум записей в ответе *_find (0 - без ограничения)
+            username: Имя для входа по паролю
+            password: Пароль
+        """
+        self.latency = latency
+        self.command_latency = command_latency
+        self.size_limit = size_limit
+        self.username = username
+        self.password = password
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'requests': 0, 'commands': 0, 'logins': 0}
+        self._lock = threading.RLock()
+        self._sessions: set = set()
+        self._search_cache: Dict[Tuple[str, str], str] = {}
+        self._next_id = 100000
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ----- Данные -----
+
+    def populate(self, users: int = 1000, groups: int = 50, members_per_group: int = 20,
+                 domain: str = 'example.com', seed: int = 0):
+        """
+        Заполняет сервер сгенерированными пользователями и группами
+
+        Пользователи: user00000..., почта uid@domain; группы group000...
+        со случайными участниками.
+        """
+        rng = random.Random(seed)
+        with self._lock:
+            for i in range(users):
+                uid = f"user{i:05d}"
+                self._add_user(uid, {'givenname': f"Name{i}", 'sn': f"Surname{i}",
+                                     'mail': f"{uid}@{domain}", 'title': rng.choice(['Dev', 'QA', 'Ops'])})
+            uids = sorted(self.users)
+            for i in range(groups):
+                cn = f"group{i:03d}"
+                self._add_group(cn, {'description': f"Group {i}"})
+                count = min(members_per_group, len(uids))
+                self.groups[cn]['member_user'].update(rng.sample(uids, count))
+
+    def _add_user(self, uid: str, options: Dict[str, Any]):
+        if uid in self.users:
+            raise FakeFreeIPAError('DuplicateEntry', 4002, f'user with name "{uid}" already exists')
+        self._next_id += 1
+        givenname = _values(options.get('givenname')) or [uid]
+        sn = _values(options.get('sn')) or [uid]
+        entry = {
+            'uid': [uid], 'givenname': givenname, 'sn': sn,
+            'cn': _values(options.get('cn')) or [f"{givenname[0]} {sn[0]}"],
+            'uidnumber': [str(self._next_id)], 'gidnumber': [str(self._next_id)],
+            'homedirectory': [f"/home/{uid}"], 'loginshell': ['/bin/bash'],
+            'nsaccountlock': False,
+        }
+        for name, value in options.items():
+            if name not in entry and value not in (None, ''):
+                entry[name] = _values(value)
+        self.users[uid] = entry
+
+    def _add_group(self, cn: str, options: Dict[str, Any]):
+        if cn in self.groups:
+            raise FakeFreeIPAError('DuplicateEntry', 4002, f'group with name "{cn}" already exists')
+        self._next_id += 1
+        self.groups[cn] = {'cn': [cn], 'description': _values(options.get('description')),
+                           'gidnumber': [str(self._next_id)], 'member_user': set()}
+
+    # ----- Команды -----
+
+    def _user_entry(self, uid: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        stored = self.users[uid]
+        if options.get('pkey_only'):
+            return {'uid': list(stored['uid'])}
+        names = stored.keys() if options.get('all') else USER_DEFAULT_ATTRIBUTES
+        entry = {name: (list(stored[name]) if isinstance(stored[name], list) else stored[name])
+                 for name in names if name in stored}
+        if not options.get('no_members'):
+            entry['memberof_group'] = sorted(cn for cn, group in self.groups.items()
+                                             if uid in group['member_user'])
+        return entry
+
+    def _group_entry(self, cn: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        stored = self.groups[cn]
+        if options.get('pkey_only'):
+            return {'cn': [cn]}
+        entry = {name: list(value) for name, value in stored.items() if name != 'member_user'}
+        if not options.get('no_members'):
+            entry['member_user'] = sorted(stored['member_user'])
+        return entry
+
+    def _find(self, kind: str, args: List[Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        store, pkey = (self.users, 'uid') if kind == 'user' else (self.groups, 'cn')
+        fields = USER_SEARCH_FIELDS if kind == 'user' else GROUP_SEARCH_FIELDS
+        criteria = str(args[0]).lower() if args and args[0] else ''
+        if pkey in options:
+            keys = [options[pkey]] if options[pkey] in store else []
+        else:
+            keys = sorted(store)
+        if criteria:
+            keys = [key for key in keys if criteria in self._search_text(kind, key, fields)]
+        limits = [limit for limit in (options.get('sizelimit'), self.size_limit) if limit]
+        limit = min(limits) if limits else len(keys)
+        entry = self._user_entry if kind == 'user' else self._group_entry
+        result = [entry(key, options) for key in keys[:limit]]
+        return {'result': result, 'count': len(result), 'truncated': len(keys) > limit,
+                'summary': f"{len(result)} {kind}s matched"}
+
+    def _search_text(self, kind: str, key: str, fields: Tuple[str, ...]) -> str:
+        """Значения атрибутов поиска одной строкой (кэшируется до изменения записи)"""
+        text = self._search_cache.get((kind, key))
+        if text is None:
+            store = self.users if kind == 'user' else self.groups
+            text = '\x00'.join(str(value).lower() for name in fields
+                               for value in _values(store[key].get(name)))
+            self._search_cache[(kind, key)] = text
+        return text
+
+    def _get(self, kind: str, key: str) -> Dict[str, Any]:
+        store = self.users if kind == 'user' else self.groups
+        if key not in store:
+            raise FakeFreeIPAError('NotFound', 4001, f"{key}: {kind} not found")
+        return store[key]
+
+    def execute(self, method: str, args: Optional[List[Any]] = None,
+                options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Выполняет команду
+
+        Returns:
+            Поле result ответа FreeIPA
+
+        Raises:
+            FakeFreeIPAError: ошибка команды (NotFound, DuplicateEntry, ...)
+        """
+        args = list(args or [])
+        options = dict(options or {})
+        if method == 'batch':
+            # Команды пакета выполняются по очереди, как на сервере FreeIPA
+            return {'count': len(args), 'results': [self._batch_item(call) for call in args]}
+        if self.command_latency:
+            time.sleep(self.command_latency)
+        with self._lock:
+            self.stats['commands'] += 1
+            if method == 'ping':
+                return {'summary': 'IPA server version 4.9.fake. API version 2.245'}
+            if method in ('user_find', 'group_find'):
+                return self._find(method.split('_')[0], args, options)
+
+            key = str(args[0]) if args else ''
+            if method == 'user_show':
+                self._get('user', key)
+                return {'result': self._user_entry(key, options), 'value': key, 'summary': None}
+            if method == 'group_show':
+                self._get('group', key)
+                return {'result': self._group_entry(key, options), 'value': key, 'summary': None}
+            if method == 'user_add':
+                self._add_user(key, options)
+                return {'result': self._user_entry(key, {}), 'value': key,
+                        'summary': f'Added user "{key}"'}
+            if method == 'group_add':
+                self._add_group(key, options)
+                return {'result': self._group_entry(key, {}), 'value': key,
+                        'summary': f'Added group "{key}"'}
+            if method in ('user_mod', 'group_mod'):
+                kind = method.split('_')[0]
+                stored = self._get(kind, key)
+                changes = {name: _values(value) for name, value in options.items()
+                           if name not in ('all', 'no_members', 'rights')}
+                if all(stored.get(name) == value for name, value in changes.items()):
+                    raise FakeFreeIPAError('EmptyModlist', 4202, 'no modifications to be performed')
+                stored.update(changes)
+                self._search_cache.pop((kind, key), None)
+                return {'result': self._user_entry(key, {}) if kind == 'user' else self._group_entry(key, {}),
+                        'value': key, 'summary': f'Modified {kind} "{key}"'}
+            if method in ('user_del', 'group_del'):
+                kind = method.split('_')[0]
+                self._get(kind, key)
+                (self.users if kind == 'user' else self.groups).pop(key)
+                self._search_cache.pop((kind, key), None)
+                if kind == 'user':
+                    for group in self.groups.values():
+                        group['member_user'].discard(key)
+                return {'result': {'failed': []}, 'value': [key], 'summary': f'Deleted {kind} "{key}"'}
+            if method in ('user_disable', 'user_enable'):
+                stored = self._get('user', key)
+                locked = method == 'user_disable'
+                if stored['nsaccountlock'] == locked:
+                    name, code = ('AlreadyInactive', 4010) if locked else ('AlreadyActive', 4009)
+                    raise FakeFreeIPAError(name, code, f'{key}: user is already {"disabled" if locked else "enabled"}')
+                stored['nsaccountlock'] = locked
+                return {'result': True, 'value': key, 'summary': f'{method} "{key}"'}
+            if method in ('group_add_member', 'group_remove_member'):
+                return self._change_members(method == 'group_add_member', key, options)
+        raise FakeFreeIPAError('CommandError', 905, f"unknown command '{method}'")
+
+    def _change_members(self, add: bool, cn: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        group = self._get('group', cn)
+        completed = 0
+        failed = []
+        for uid in _values(options.get('user')):
+            if uid not in self.users:
+                failed.append([uid, 'no such entry'])
+            elif add and uid in group['member_user']:
+                failed.append([uid, 'This entry is already a member'])
+            elif not add and uid not in group['member_user']:
+                failed.append([uid, 'This entry is not a member'])
+            else:
+                (group['member_user'].add if add else group['member_user'].discard)(uid)
+                completed += 1
+        return {'result': self._group_entry(cn, {}), 'completed': completed,
+                'failed': {'member': {'user': failed, 'group': []}}}
+
+    def _batch_item(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        params = call.get('params') or [[], {}]
+        try:
+            result = self.execute(call.get('method', ''), params[0], params[1] if len(params) > 1 else {})
+        except FakeFreeIPAError as e:
+            return {'error': e.message, 'error_name': e.name, 'error_code': e.code,
+                    'error_kw': {'reason': e.message}}
+        item = dict(result)
+        item['error'] = None
+        return item
+
+    # ----- Интерфейс FreeIPAService (в процессе) -----
+
+    def call(self, method: str, args: Optional[List[Any]] = None,
+             options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Вызов команды как FreeIPAService.call (с задержкой сети)"""
+        with self._lock:
+            self.stats['requests'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.execute(method, args, options)
+
+    def batch(self, calls: List[Tuple[str, List[Any], Dict[str, Any]]],
+              chunk_size: int = 100) -> List[Dict[str, Any]]:
+        """Пакет вызовов как FreeIPAService.batch"""
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(calls), max(1, chunk_size)):
+            chunk = calls[start:start + chunk_size]
+            payload = [{'method': method, 'params': [args, options]} for method, args, options in chunk]
+            results.extend(self.call('batch', payload, {})['results'])
+        return results
+
+    def list_user_uids(self) -> List[str]:
+        """Как FreeIPAService.list_user_uids"""
+        return FreeIPAEnumerator(self).list_keys('user')
+
+    def list_group_cns(self) -> List[str]:
+        """Как FreeIPAService.list_group_cns"""
+        return FreeIPAEnumerator(self).list_keys('group')
+
+    def iter_users(self, attributes=None, members: bool = True, chunk_size: int = 100):
+        """Как FreeIPAService.iter_users"""
+        return FreeIPAEnumerator(self, chunk_size=chunk_size).iter_entries('user', attributes, members)
+
+    def iter_groups(self, attributes=None, members: bool = True, chunk_size: int = 100):
+        """Как FreeIPAService.iter_groups"""
+        return FreeIPAEnumerator(self, chunk_size=chunk_size).iter_entries('group', attributes, members)
+
+    # ----- HTTP -----
+
+    @property
+    def url(self) -> str:
+        if self._httpd is None:
+            raise RuntimeError("Сервер не запущен")
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, port: int = 0) -> str:
+        """Запускает HTTP сервер на localhost; возвращает адрес"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _reply(self, status: int, body: bytes = b'', content_type: str = 'application/json',
+                       headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, payload, headers = server.handle_http(self.path, body, self.headers.get('Cookie', ''))
+                self._reply(status, payload, headers=headers)
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-freeipa', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        """Останавливает HTTP сервер"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            self._thread = None
+
+    def expire_sessions(self):
+        """Завершает все сессии (следующий запрос получит 401)"""
+        with self._lock:
+            self._sessions.clear()
+
+    def handle_http(self, path: str, body: bytes, cookie_header: str) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        Обработка HTTP запроса
+
+        Returns:
+            (статус, тело ответа, заголовки)
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if path == '/ipa/session/login_password':
+            form = parse_qs(body.decode('utf-8'))
+            user = (form.get('user') or [''])[0]
+            password = (form.get('password') or [''])[0]
+            if user.split('@')[0] != self.username or password != self.password:
+                return 401, b'', {'X-IPA-Rejection-Reason': 'invalid-password'}
+            token = secrets.token_hex(16)
+            with self._lock:
+                self.stats['logins'] += 1
+                self._sessions.add(token)
+            return 200, b'', {'Set-Cookie': f"ipa_session=MagBearerToken={token}; Path=/ipa; HttpOnly"}
+
+        token = None
+        for part in cookie_header.split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == 'ipa_session':
+                token = value.split('MagBearerToken=')[-1]
+        with self._lock:
+            authenticated = token in self._sessions
+
+        if path == '/ipa/session/logout':
+            with self._lock:
+                self._sessions.discard(token)
+            return 200, b'', {}
+        if path != '/ipa/session/json':
+            return 404, b'', {}
+        if not authenticated:
+            return 401, b'', {}
+
+        try:
+            request = json.loads(body.decode('utf-8'))
+            params = request.get('params') or [[], {}]
+            result = self.execute(request.get('method', ''), params[0], params[1] if len(params) > 1 else {})
+            response = {'result': result, 'error': None, 'id': request.get('id'),
+                        'principal': f"{self.username}@FAKE", 'version': '4.9.fake'}
+        except FakeFreeIPAError as e:
+            response = {'result': None, 'id': None,
+                        'error': {'code': e.code, 'name': e.name, 'message': e.message, 'data': {}}}
+        except ValueError as e:
+            return 400, str(e).encode('utf-8'), {}
+        return 200, json.dumps(response, default=sorted).encode('utf-8'), {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Тестовые двойники Google API: HttpError и BatchHttpRequest.
+"""
+
+from types import SimpleNamespace
+
+
+class FakeHttpError(Exception):
+    """HttpError Google API: статус доступен как resp.status"""
+
+    def __init__(self, status, reason=''):
+        super().__init__(f'HTTP {status} {reason}'.rstrip())
+        self.resp = SimpleNamespace(status=status)
+
+
+class FakeBatch:
+    """
+    BatchHttpRequest Google API: выполняет добавленные запросы по очереди
+    и передает результат или исключение в callback.
+
+    Запрос - объект с execute() или функция без аргументов. Выполненные
+    пакеты учитываются в owner.batches: список размеров пакетов или счетчик.
+    """
+
+    def __init__(self, owner, callback):
+        self.owner = owner
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        if isinstance(self.owner.batches, list):
+            self.owner.batches.append(len(self.requests))
+        else:
+            self.owner.batches += 1
+        for request_id, request in self.requests:
+            try:
+                response = request.execute() if hasattr(request, 'execute') else request()
+            except Exception as e:
+                self.callback(request_id, None, e)
+            else:
+                self.callback(request_id, response, None)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест буфера журнала активности.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ui.components.activity_log import LogBuffer
+
+
+def test_ring_buffer_keeps_recent_entries():
+    """Буфер хранит только последние записи"""
+    buffer = LogBuffer(max_entries=3)
+    for i in range(5):
+        buffer.append(f'сообщение {i}')
+
+    messages = [entry[2] for entry in buffer.entries()]
+    assert messages == ['сообщение 2', 'сообщение 3', 'сообщение 4']
+
+    # Невыведенные записи тоже ограничены размером буфера
+    assert [entry[2] for entry in buffer.drain()] == messages
+    assert buffer.drain() == []
+
+
+def test_concurrent_producers():
+    """Записи из нескольких потоков не теряются"""
+    buffer = LogBuffer(max_entries=10000)
+
+    def produce(worker):
+        for i in range(500):
+            buffer.append(f'{worker}-{i}', 'INFO')
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(buffer.drain()) == 2000
+    assert LogBuffer.format_entry(('12:00:00', 'ERROR', 'сбой')) == '[12:00:00] ERROR: сбой\n'
+
+
+if __name__ == "__main__":
+    test_ring_buffer_keeps_recent_entries()
+    test_concurrent_producers()
+    print("✅ Все тесты буфера журнала пройдены")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест репозиториев аудита: фоновая пакетная запись SQLite, постраничные
+выборки с фильтрами и полнотекстовым поиском.
+"""
+
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.domain import AuditQuery
+from src.repositories.audit_repository import FileAuditRepository, SQLiteAuditRepository
+from src.utils.log_reader import read_page_backward
+
+
+def test_log_action_is_batched_and_readable(tmp_path):
+    db_path = tmp_path / 'audit.db'
+
+    async def scenario():
+        repo = SQLiteAuditRepository(db_path, batch_size=100, flush_interval=0.05)
+        started = time.perf_counter()
+        for i in range(250):
+            assert await repo.log_action('admin@test.com', 'add_group_member',
+                                         f'group:team{i % 5}@test.com', {'member': f'u{i}@test.com'})
+        queued = time.perf_counter() - started
+
+        logs = await repo.get_logs(user='admin@test.com')
+        by_action = await repo.get_logs(action='remove_group_member')
+        await repo.close()
+        return repo, queued, logs, by_action
+
+    repo, queued, logs, by_action = asyncio.run(scenario())
+    assert queued < 0.5 and repo.dropped == 0
+    assert len(logs) == 250 and by_action == []
+    # Новые первыми, порядок записи сохранен
+    assert logs[0]['details'] == {'member': 'u249@test.com'}
+    assert logs[-1]['details'] == {'member': 'u0@test.com'}
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list('audit_logs')")}
+    assert {'idx_timestamp', 'idx_user_timestamp', 'idx_action_timestamp',
+            'idx_resource_timestamp'} <= indexes
+    plan = ' '.join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM audit_logs WHERE resource = ? ORDER BY timestamp DESC",
+        ('group:team1@test.com',)))
+    assert 'idx_resource_timestamp' in plan
+    conn.close()
+
+
+def test_close_flushes_pending_events(tmp_path):
+    db_path = tmp_path / 'audit.db'
+
+    async def scenario():
+        repo = SQLiteAuditRepository(db_path, flush_interval=10)
+        await repo.log_action('admin@test.com', 'create_group', 'group:dev@test.com')
+        await repo.close()
+        return await repo.log_action('admin@test.com', 'create_group', 'group:ops@test.com')
+
+    assert asyncio.run(scenario()) is False
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('SELECT resource FROM audit_logs').fetchall() == [('group:dev@test.com',)]
+    # Время UTC в формате CURRENT_TIMESTAMP, как у записей, созданных до пакетной записи
+    timestamp, age = conn.execute(
+        "SELECT timestamp, julianday(CURRENT_TIMESTAMP) - julianday(timestamp) FROM audit_logs").fetchone()
+    assert len(timestamp) == len('2024-01-01 00:00:00') and abs(age) * 86400 < 5
+    conn.close()
+
+
+async def _collect_pages(repo, query):
+    pages = []
+    async for page in repo.iter_log_pages(query):
+        pages.append(page)
+    return pages
+
+
+def test_sqlite_query_pages_filters_and_search(tmp_path):
+    async def scenario():
+        repo = SQLiteAuditRepository(tmp_path / 'audit.db', flush_interval=0.01)
+        for i in range(95):
+            await repo.log_action(f'admin{i % 2}@test.com', 'add_group_member', f'group:team{i % 3}@test.com',
+                                  {'member': f'участник{i}@test.com'})
+        await repo.log_action('admin0@test.com', 'remove_group_member', 'group:finance@test.com',
+                              {'member': 'Бухгалтер@test.com', 'reason': 'увольнение'})
+
+        pages = await _collect_pages(repo, AuditQuery(page_size=20))
+        team = await _collect_pages(repo, AuditQuery(resource='group:team1@test.com', page_size=10))
+        found = await repo.query_logs(AuditQuery(text='увольнен'))
+        exact = await repo.query_logs(AuditQuery(text='участник7@test.com'))
+        by_member = await repo.query_logs(AuditQuery(text='участник7', user='admin1@test.com'))
+        invalid = await repo.query_logs(AuditQuery(), cursor='garbage')
+        await repo.close()
+        return repo, pages, team, found, exact, by_member, invalid
+
+    repo, pages, team, found, exact, by_member, invalid = asyncio.run(scenario())
+    assert repo.fts_enabled
+    ids = [entry['id'] for page in pages for entry in page.entries]
+    assert [len(page.entries) for page in pages] == [20, 20, 20, 20, 16]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 96
+    assert pages[0].entries[0]['action'] == 'remove_group_member' and not pages[-1].has_more
+
+    assert sum(len(page.entries) for page in team) == 32
+    assert all(e['resource'] == 'group:team1@test.com' for page in team for e in page.entries)
+    assert [e['resource'] for e in found.entries] == ['group:finance@test.com']
+    assert [e['details']['member'] for e in exact.entries] == ['участник7@test.com']
+    # Префиксный поиск: участник7, участник71, участник73, ... у admin1
+    assert {e['details']['member'] for e in by_member.entries} == {
+        'участник7@test.com', 'участник71@test.com', 'участник73@test.com',
+        'участник75@test.com', 'участник77@test.com', 'участник79@test.com'}
+    assert invalid.entries == [] and not invalid.has_more
+
+
+def test_file_repository_reads_pages_from_the_end(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def scenario():
+        repo = FileAuditRepository()
+        for i in range(25):
+            await repo.log_action('admin@test.com', 'create_group' if i % 5 else 'delete_group',
+                                  f'group:g{i}@test.com', {'note': f'заметка {i}'})
+        with open(repo.audit_file, 'a', encoding='utf-8') as f:
+            f.write('не json\n')
+        pages = await _collect_pages(repo, AuditQuery(page_size=10))
+        deleted = await _collect_pages(repo, AuditQuery(action='delete_group', page_size=2))
+        found = await repo.query_logs(AuditQuery(text='ЗАМЕТКА 13'))
+        return pages, deleted, found, await repo.get_logs(action='create_group')
+
+    pages, deleted, found, created = asyncio.run(scenario())
+    resources = [entry['resource'] for page in pages for entry in page.entries]
+    assert resources == [f'group:g{i}@test.com' for i in range(24, -1, -1)]
+    assert [len(page.entries) for page in pages] == [10, 10, 5]
+    assert [e['resource'] for page in deleted for e in page.entries] == [
+        'group:g20@test.com', 'group:g15@test.com', 'group:g10@test.com', 'group:g5@test.com', 'group:g0@test.com']
+    assert [e['resource'] for e in found.entries] == ['group:g13@test.com']
+    assert len(created) == 20 and created[0]['resource'] == 'group:g24@test.com'
+
+
+def test_read_page_backward_across_blocks(tmp_path):
+    path = tmp_path / 'errors.log'
+    path.write_text(''.join(f'строка {i}\n' for i in range(1000)), encoding='utf-8')
+    lines, offset = read_page_backward(path, None, 300)
+    assert lines[0] == 'строка 999' and lines[-1] == 'строка 700'
+    rest = []
+    while offset is not None:
+        page, offset = read_page_backward(path, offset, 300)
+        rest.extend(page)
+    assert rest == [f'строка {i}' for i in range(699, -1, -1)]
+    assert read_page_backward(tmp_path / 'missing.log') == ([], None)
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        test_log_action_is_batched_and_readable(Path(directory) / 'first')
+        test_close_flushes_pending_events(Path(directory) / 'second')
+        test_sqlite_query_pages_filters_and_search(Path(directory) / 'third')
+        (Path(directory) / 'fourth').mkdir()
+        test_read_page_backward_across_blocks(Path(directory) / 'fourth')
+    print("✅ Все тесты репозитория аудита пройдены")
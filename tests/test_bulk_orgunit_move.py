@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест массового перемещения пользователей между OU.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch
+
+pytest.importorskip('googleapiclient')
+
+from src.api.orgunits_api import bulk_move_users_to_orgunits
+from src.utils.data_cache import data_cache
+
+
+class FakeDirectory:
+    """Directory API: users().get/update и batch запросы"""
+
+    def __init__(self, paths):
+        self.paths = dict(paths)
+        self.batches = 0
+
+    def users(self):
+        return self
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def get(self, userKey, fields=None):
+        return lambda: {'primaryEmail': userKey, 'orgUnitPath': self.paths[userKey]}
+
+    def update(self, userKey, body, fields=None):
+        def run():
+            self.paths[userKey] = body['orgUnitPath']
+            return {'primaryEmail': userKey, 'orgUnitPath': body['orgUnitPath']}
+        return run
+
+
+def test_bulk_move_batches_skips_and_rolls_back():
+    """Пакетное перемещение обновляет кэш на месте и возвращает данные для отката"""
+    directory = FakeDirectory({f'u{i}@test.com': '/Old' for i in range(120)})
+    directory.paths['u0@test.com'] = '/New'
+    directory.paths['u2@test.com'] = '/Moved'
+    # Кэш устарел: u0 уже в целевом OU, а u2 перемещен в обход приложения
+    data_cache.users_cache = [{'primaryEmail': 'u1@test.com', 'orgUnitPath': '/Old'},
+                              {'primaryEmail': 'u0@test.com', 'orgUnitPath': '/Old'},
+                              {'primaryEmail': 'u2@test.com', 'orgUnitPath': '/Old'}]
+
+    moves = [(f'u{i}@test.com', '/New') for i in range(120)]
+    result = bulk_move_users_to_orgunits(directory, moves, batch_size=50, rate_per_second=0,
+                                         current_paths={'u3@test.com': '/New'})
+
+    assert len(result.moved) == 119
+    assert result.skipped == {'u0@test.com': '/New'}
+    assert not result.failed
+    # Текущий OU запрашивается для всех 120 (3 пакета get), 119 перемещений - 3 пакета update
+    assert result.batches == 6
+    assert 'u3@test.com' in result.moved
+    assert result.rollback['u2@test.com'] == '/Moved'
+    assert [u['orgUnitPath'] for u in data_cache.users_cache] == ['/New', '/New', '/New']
+
+    rollback = bulk_move_users_to_orgunits(directory, result.rollback_moves(), rate_per_second=0)
+    assert len(rollback.moved) == 119
+    assert directory.paths['u5@test.com'] == '/Old'
+    assert directory.paths['u0@test.com'] == '/New'
+    assert directory.paths['u2@test.com'] == '/Moved'
+    data_cache.clear_cache()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест массового создания пользователей: валидация, параллельность и возобновление.
+"""
+
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeHttpError
+
+from src.services.bulk_provisioning import (
+    BulkUserProvisioner, ProvisioningCheckpoint, read_rows, validate_rows
+)
+
+
+class FakeDirectory:
+    """Directory API: users().insert(body=...).execute()"""
+
+    def __init__(self, existing=(), broken=()):
+        self.created = []
+        self.existing = set(existing)
+        self.broken = set(broken)
+        self.lock = threading.Lock()
+
+    def users(self):
+        return self
+
+    def insert(self, body):
+        email = body['primaryEmail']
+
+        def execute():
+            if email in self.broken:
+                raise FakeHttpError(400)
+            if email in self.existing:
+                raise FakeHttpError(409)
+            with self.lock:
+                self.created.append(email)
+            return body
+        return SimpleNamespace(execute=execute)
+
+
+def _write_csv(path, lines):
+    header = 'email,first_name,last_name,password,org_unit_path\n'
+    path.write_text(header + '\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def test_validation_reports_all_rows_up_front(tmp_path):
+    """Все ошибки находятся до начала создания"""
+    source = tmp_path / 'hires.csv'
+    _write_csv(source, [
+        'a@test.com,Анна,Иванова,Secret123!,/Sales',
+        'bad-email,Б,Б,Secret123!,/',
+        'c@other.com,В,В,Secret123!,/',
+        'a@test.com,Анна,Дубль,Secret123!,/',
+        'd@test.com,Г,Г,short,/',
+    ])
+
+    rows, invalid = validate_rows(read_rows(str(source)), {'test.com'})
+
+    assert [r.email for r in rows] == ['a@test.com']
+    assert [r.line for r in invalid] == [3, 4, 5, 6]
+    assert 'повторяется' in invalid[2].message
+
+
+def test_concurrent_run_and_resume_from_checkpoint(tmp_path):
+    """Повторный запуск пропускает созданных и повторяет только неудачные строки"""
+    source = tmp_path / 'hires.jsonl'
+    source.write_text('\n'.join(
+        f'{{"email": "user{i}@test.com", "first_name": "U", "last_name": "{i}", "password": "Secret123!"}}'
+        for i in range(20)
+    ), encoding='utf-8')
+    rows, invalid = validate_rows(read_rows(str(source)))
+    assert not invalid
+
+    checkpoint = ProvisioningCheckpoint(str(tmp_path / 'hires.checkpoint.jsonl'))
+    directory = FakeDirectory(existing={'user0@test.com'}, broken={'user5@test.com'})
+    progress = []
+    report = BulkUserProvisioner(lambda: directory, max_workers=4, rate_per_second=0,
+                                 checkpoint=checkpoint).run(
+        rows, progress_callback=lambda r, done, total: progress.append(done))
+
+    assert report.count('created') == 18
+    assert report.count('exists') == 1
+    assert report.count('failed') == 1
+    assert sorted(progress) == list(range(1, 21))
+
+    # Повторный запуск: ошибка исправлена, остальные строки уже обработаны
+    directory.broken.clear()
+    report = BulkUserProvisioner(lambda: directory, max_workers=4, rate_per_second=0,
+                                 checkpoint=checkpoint).run(rows)
+
+    assert report.count('created') == 1
+    assert report.count('skipped') == 19
+    assert len(directory.created) == 19
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_validation_reports_all_rows_up_front(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_concurrent_run_and_resume_from_checkpoint(Path(tmp))
+    print("✅ Все тесты массового создания пройдены")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест синхронизации участников календаря: один снимок ACL и пакетные изменения.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch, FakeHttpError
+
+from src.api.calendar_acl_sync import CalendarAclSync
+
+
+class FakeCalendar:
+    """Calendar API: acl().list/insert/patch/delete и batch запросы"""
+
+    def __init__(self, rules):
+        self.rules = {f'user:{email}': role for email, role in rules.items()}
+        self.rules['default'] = 'freeBusyReader'
+        self.list_calls = 0
+        self.batches = []
+
+    def acl(self):
+        return self
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def list(self, calendarId, maxResults=None, pageToken=None):
+        self.list_calls += 1
+        ids = sorted(self.rules)
+        start = int(pageToken or 0)
+        page = ids[start:start + maxResults]
+        items = [{
+            'id': rule_id, 'role': self.rules[rule_id],
+            'scope': {'type': 'user', 'value': rule_id[5:]} if rule_id.startswith('user:') else {'type': 'default'}
+        } for rule_id in page]
+        result = {'items': items}
+        if start + maxResults < len(ids):
+            result['nextPageToken'] = str(start + maxResults)
+        return SimpleNamespace(execute=lambda: result)
+
+    def insert(self, calendarId, body, sendNotifications=True):
+        def run():
+            rule_id = f"user:{body['scope']['value']}"
+            if rule_id in self.rules:
+                raise FakeHttpError(409)
+            self.rules[rule_id] = body['role']
+            return body
+        return run
+
+    def patch(self, calendarId, ruleId, body, sendNotifications=True):
+        def run():
+            if ruleId not in self.rules:
+                raise FakeHttpError(404)
+            self.rules[ruleId] = body['role']
+            return body
+        return run
+
+    def delete(self, calendarId, ruleId):
+        def run():
+            if ruleId not in self.rules:
+                raise FakeHttpError(404)
+            del self.rules[ruleId]
+        return run
+
+
+def test_sync_applies_minimal_diff_in_batches():
+    """Разница применяется пакетами, владельцы не удаляются, снимок обновляется на месте"""
+    existing = {f'u{i}@test.com': 'reader' for i in range(600)}
+    existing['boss@test.com'] = 'owner'
+    calendar = FakeCalendar(existing)
+    sync = CalendarAclSync(calendar, 'cal@test.com', batch_size=100, rate_per_second=0)
+
+    desired = {f'u{i}@test.com': 'reader' for i in range(100, 1000)}
+    desired['u100@test.com'] = 'writer'
+    report = sync.sync(desired)
+
+    assert len(report.inserted) == 400
+    assert report.patched == {'u100@test.com'}
+    assert len(report.deleted) == 100
+    assert report.diff.protected == {'boss@test.com'}
+    assert not report.failures
+    assert calendar.list_calls == 3
+    # 401 добавление/изменение и 100 удалений
+    assert calendar.batches == [100, 100, 100, 100, 1, 100]
+    assert calendar.rules['user:u100@test.com'] == 'writer'
+    assert 'user:u0@test.com' not in calendar.rules
+
+    # Повторная синхронизация не загружает ACL и ничего не меняет
+    report = sync.sync(desired)
+    assert calendar.list_calls == 3
+    assert report.diff.changes == 0
+
+
+def test_stale_snapshot_treats_existing_state_as_applied():
+    """409 при добавлении и 404 при удалении не считаются ошибками, 404 при изменении роли - ошибка"""
+    calendar = FakeCalendar({'a@test.com': 'reader', 'b@test.com': 'reader'})
+    sync = CalendarAclSync(calendar, 'cal@test.com', rate_per_second=0)
+    sync.get_snapshot()
+
+    # Изменения, сделанные в обход снимка
+    calendar.rules['user:new@test.com'] = 'reader'
+    del calendar.rules['user:a@test.com']
+    del calendar.rules['user:b@test.com']
+
+    report = sync.sync({'new@test.com': 'reader', 'b@test.com': 'writer'})
+
+    assert report.inserted == {'new@test.com'}
+    assert report.deleted == {'a@test.com'}
+    assert set(report.failures) == {'b@test.com'}
+    assert sync.get_snapshot() == {'new@test.com': 'reader', 'b@test.com': 'reader'}
+
+
+def test_snapshot_expires_and_is_refreshed_before_writes():
+    """Снимок живет snapshot_ttl; изменения вычисляются по снимку не старше write_max_age"""
+    calendar = FakeCalendar({'a@test.com': 'reader'})
+    sync = CalendarAclSync(calendar, 'cal@test.com', rate_per_second=0,
+                           snapshot_ttl=0.2, write_max_age=0.05)
+    assert sync.get_snapshot() == {'a@test.com': 'reader'}
+
+    # Участник удален в обход снимка: предпросмотр еще видит его, удаление - уже нет
+    del calendar.rules['user:a@test.com']
+    time.sleep(0.06)
+    assert sync.sync({}, dry_run=True).diff.to_delete == {'a@test.com'}
+    assert calendar.list_calls == 1
+    report = sync.remove_members(['a@test.com'])
+    assert calendar.list_calls == 2
+    assert report.diff.to_delete == set() and not report.failures
+
+    calendar.rules['user:b@test.com'] = 'writer'
+    time.sleep(0.21)
+    assert not sync.loaded
+    assert sync.get_snapshot() == {'b@test.com': 'writer'}
+    assert calendar.list_calls == 3
+
+
+if __name__ == "__main__":
+    test_sync_applies_minimal_diff_in_batches()
+    test_stale_snapshot_treats_existing_state_as_applied()
+    test_snapshot_expires_and_is_refreshed_before_writes()
+    print("✅ Все тесты синхронизации участников календаря пройдены")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест массового определения адресов: индекс кэша справочника и пакетные запросы.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch, FakeHttpError
+
+from src.api.directory_resolver import (
+    KIND_EXTERNAL, KIND_GROUP, KIND_MISSING, KIND_UNKNOWN, KIND_USER, DirectoryResolver
+)
+from src.utils.data_cache import DataCache
+
+
+class FakeDirectory:
+    """Directory API: users().get / groups().get и batch запросы"""
+
+    def __init__(self, users, groups, denied=()):
+        self.users_data = users
+        self.groups_data = groups
+        self.denied = set(denied)
+        self.batches = []
+        self.requested = []
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def _get(self, data, key):
+        def run():
+            self.requested.append(key)
+            if key in self.denied or not key.endswith('@test.com'):
+                raise FakeHttpError(403)
+            if key not in data:
+                raise FakeHttpError(404)
+            return data[key]
+        return run
+
+    def users(self):
+        return SimpleNamespace(get=lambda userKey, **kw: self._get(self.users_data, userKey))
+
+    def groups(self):
+        return SimpleNamespace(get=lambda groupKey, **kw: self._get(self.groups_data, groupKey))
+
+
+def make_cache():
+    cache = DataCache()
+    cache.users_cache = [{'primaryEmail': 'Cached@test.com', 'name': {'fullName': 'Cached'}}]
+    cache.groups_cache = [{'email': 'team@test.com', 'aliases': ['crew@test.com'], 'name': 'Team'}]
+    cache.last_users_update = cache.last_groups_update = datetime.now()
+    return cache
+
+
+def test_resolve_uses_index_then_batched_lookups():
+    directory = FakeDirectory(
+        users={'api@test.com': {'primaryEmail': 'api@test.com', 'name': {'fullName': 'Api'}}},
+        groups={'ops@test.com': {'email': 'ops@test.com', 'name': 'Ops'}},
+        denied={'locked@test.com'},
+    )
+    resolver = DirectoryResolver(cache=make_cache(), rate_per_second=0, domain='test.com')
+    emails = ['cached@test.com', 'CREW@test.com', 'api@test.com', 'ops@test.com',
+              'ghost@test.com', 'guest@gmail.com', 'locked@test.com', 'api@test.com']
+
+    result = resolver.resolve(directory, emails)
+
+    kinds = {email: entry.kind for email, entry in result.items()}
+    assert kinds == {
+        'cached@test.com': KIND_USER, 'crew@test.com': KIND_GROUP, 'api@test.com': KIND_USER,
+        'ops@test.com': KIND_GROUP, 'ghost@test.com': KIND_MISSING,
+        'guest@gmail.com': KIND_EXTERNAL, 'locked@test.com': KIND_UNKNOWN,
+    }
+    assert result['cached@test.com'].source == 'cache'
+    assert result['api@test.com'].profile['name']['fullName'] == 'Api'
+    # Один batch users().get на 5 промахов, один batch groups().get на 4 оставшихся
+    assert directory.batches == [5, 4]
+
+    # Повторное определение обходится без запросов, кроме неопределенного адреса
+    directory.batches.clear()
+    again = resolver.resolve(directory, emails)
+    assert {e: entry.kind for e, entry in again.items()} == kinds
+    assert directory.batches == [1, 1]
+
+
+def test_user_only_lookup_does_not_cache_group_as_missing():
+    directory = FakeDirectory(users={}, groups={'ops@test.com': {'email': 'ops@test.com'}})
+    resolver = DirectoryResolver(cache=DataCache(), rate_per_second=0, domain='test.com')
+
+    assert resolver.resolve(directory, ['ops@test.com'], kinds=(KIND_USER,))['ops@test.com'].kind == KIND_MISSING
+    assert resolver.resolve(directory, ['ops@test.com'])['ops@test.com'].kind == KIND_GROUP
+
+
+if __name__ == "__main__":
+    test_resolve_uses_index_then_batched_lookups()
+    test_user_only_lookup_does_not_cache_group_as_missing()
+    print("✅ Все тесты определения адресов пройдены")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест массовой выдачи доступа к файлам Drive: пакеты, индекс разрешений и уведомления.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch, FakeHttpError
+
+from src.api.drive_permissions import DrivePermissionFanOut, PermissionIndex
+from src.utils.rate_limiter import RateLimiter
+
+
+class FakeDrive:
+    """Drive API: permissions().list/create и batch запросы"""
+
+    def __init__(self, files, external=()):
+        self.files = {f: dict(p) for f, p in files.items()}
+        self.external = set(external)
+        self.batches = []
+        self.notified = []
+
+    def permissions(self):
+        return self
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def list(self, fileId, **kwargs):
+        def run():
+            if fileId not in self.files:
+                raise FakeHttpError(404)
+            return {'permissions': [{'emailAddress': e, 'role': r, 'type': 'user'}
+                                    for e, r in self.files[fileId].items()]}
+        return run
+
+    def create(self, fileId, body, sendNotificationEmail, **kwargs):
+        def run():
+            email = body['emailAddress']
+            if email in self.external and not sendNotificationEmail:
+                raise FakeHttpError(400, 'invalidSharingRequest: Notify people is required')
+            if sendNotificationEmail:
+                self.notified.append(email)
+            self.files[fileId][email] = body['role']
+            return {'id': email}
+        return run
+
+
+def test_fan_out_skips_existing_and_batches_creates():
+    """Пары с имеющимся доступом пропускаются, остальные выдаются пакетами"""
+    drive = FakeDrive({
+        'doc': {'boss@test.com': 'owner', 'old@test.com': 'writer'},
+        'sheet': {},
+        'slides': {'old@test.com': 'reader'},
+    }, external={'guest@gmail.com'})
+    index = PermissionIndex()
+    fan_out = DrivePermissionFanOut(drive, index=index, batch_size=4, rate_per_second=0)
+    emails = ['old@test.com', 'new@test.com', 'guest@gmail.com']
+
+    result = fan_out.grant(['doc', 'sheet', 'slides', 'missing'], emails, role='writer')
+
+    assert set(result.skipped) == {('doc', 'old@test.com')}
+    assert len(result.granted) == 8
+    assert result.notified == {('doc', 'guest@gmail.com'), ('sheet', 'guest@gmail.com'),
+                               ('slides', 'guest@gmail.com')}
+    assert set(result.failed) == {('missing', e) for e in emails}
+    assert drive.files['slides']['old@test.com'] == 'writer'
+    # 1 пакет загрузки разрешений, 2 пакета выдачи, 1 пакет повтора с уведомлением
+    assert drive.batches == [4, 4, 4, 3]
+
+    # Индекс обновлен на месте: повторная выдача не делает запросов
+    drive.batches.clear()
+    result = fan_out.grant(['doc', 'sheet', 'slides'], emails, role='reader')
+    assert len(result.skipped) == 9
+    assert drive.batches == []
+
+
+class PagedDrive(FakeDrive):
+    """Разрешения по одному на страницу; страница продолжения один раз отвечает 503"""
+
+    def __init__(self, files):
+        super().__init__(files)
+        self.page_failures = 1
+        self.list_calls = 0
+
+    def list(self, fileId, pageToken=None, **kwargs):
+        def run():
+            self.list_calls += 1
+            if pageToken and self.page_failures:
+                self.page_failures -= 1
+                raise FakeHttpError(503)
+            permissions = sorted(self.files[fileId].items())
+            index = int(pageToken or 0)
+            email, role = permissions[index]
+            page = {'permissions': [{'emailAddress': email, 'role': role, 'type': 'user'}]}
+            if index + 1 < len(permissions):
+                page['nextPageToken'] = str(index + 1)
+            return page
+        return SimpleNamespace(execute=run)
+
+
+def test_index_pages_with_backoff_and_expires():
+    """Продолжение списка разрешений повторяется при 503; устаревший индекс загружается заново"""
+    drive = PagedDrive({'doc': {'a@test.com': 'reader', 'b@test.com': 'writer'}})
+    index = PermissionIndex(ttl=0.1)
+
+    assert index.load(drive, ['doc'], RateLimiter(0)) == {}
+    assert index.get_role('doc', 'b@test.com') == 'writer'
+    assert drive.page_failures == 0
+    assert index.files_for('a@test.com') == ['doc']
+
+    # Доступ отозван в самом Drive: после ttl индекс его больше не показывает
+    del drive.files['doc']['a@test.com']
+    time.sleep(0.11)
+    assert 'doc' not in index and index.files_for('a@test.com') == []
+    calls = drive.list_calls
+    assert index.load(drive, ['doc'], RateLimiter(0)) == {}
+    assert drive.list_calls == calls + 1
+    assert index.get_role('doc', 'a@test.com') is None
+
+
+if __name__ == "__main__":
+    test_fan_out_skips_existing_and_batches_creates()
+    test_index_pages_with_backoff_and_expires()
+    print("✅ Все тесты массовой выдачи доступа пройдены")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест монитора задержек цикла событий Tk.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.event_loop_monitor import EventLoopMonitor, percentile
+
+
+class FakeRoot:
+    """Заглушка корневого окна: after() только запоминает callback"""
+
+    def __init__(self):
+        self.callback = None
+
+    def after(self, delay_ms, callback):
+        self.callback = callback
+        return 'after#1'
+
+    def after_cancel(self, after_id):
+        self.callback = None
+
+
+def test_percentile():
+    """Перцентили методом ближайшего ранга"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([], 50) == 0.0
+
+
+def test_stall_is_captured_with_stack():
+    """Блокировка главного потока фиксируется вместе со стеком"""
+    root = FakeRoot()
+    monitor = EventLoopMonitor(interval_ms=20, stall_threshold_ms=100)
+    monitor.start(root)
+    try:
+        # Главный поток "занят обработчиком" дольше порога
+        time.sleep(0.3)
+        root.callback()
+
+        stats = monitor.get_stats()
+        assert stats['samples'] == 1
+        assert stats['p99'] >= 100
+
+        stalls = monitor.get_stalls()
+        assert len(stalls) == 1
+        assert stalls[0].duration_ms >= 100
+        assert stalls[0].stack, 'стек главного потока должен быть снят'
+        assert 'test_stall_is_captured_with_stack' in stalls[0].handler
+    finally:
+        monitor.stop()
+
+
+if __name__ == "__main__":
+    test_percentile()
+    test_stall_is_captured_with_stack()
+    print("✅ Все тесты монитора цикла событий пройдены")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест полного перечисления пользователей FreeIPA при ограничении sizelimit сервера.
+"""
+
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers.freeipa_fake_server import FakeFreeIPAServer
+
+from src.services.freeipa_enumeration import FreeIPAEnumerator
+
+
+class LimitedFreeIPA:
+    """Сервер, который отдает не больше size_limit записей на поиск"""
+
+    def __init__(self, uids, size_limit):
+        self.uids = list(uids)
+        self.size_limit = size_limit
+        self.finds = 0
+        self.batches = 0
+
+    def call(self, method, args=None, options=None):
+        assert method == 'user_find' and options['pkey_only']
+        self.finds += 1
+        if 'uid' in options:
+            found = [uid for uid in self.uids if uid == options['uid']]
+        else:
+            criteria = args[0] if args else ''
+            found = [uid for uid in self.uids if criteria in uid]
+        return {'result': [{'uid': [uid]} for uid in found[:self.size_limit]],
+                'truncated': len(found) > self.size_limit}
+
+    def batch(self, calls, chunk_size=100):
+        assert len(calls) <= chunk_size
+        self.batches += 1
+        results = []
+        for method, args, options in calls:
+            if method == 'user_find':
+                results.append(dict(self.call(method, args, options), error=None))
+                continue
+            uid = args[0]
+            if uid not in self.uids:
+                results.append({'error': f'{uid}: user not found', 'error_name': 'NotFound'})
+                continue
+            entry = {'uid': [uid], 'mail': [f'{uid}@test.com'], 'cn': [uid.upper()],
+                     'jpegphoto': ['...']}
+            if not options.get('no_members'):
+                entry['memberof_group'] = ['ipausers']
+            results.append({'error': None, 'result': entry, 'value': uid})
+        return results
+
+
+def test_keys_are_complete_despite_sizelimit():
+    uids = [f'user{i}' for i in range(300)] + ['a', 'ab', 'b.c', 'x-1']
+    ipa = LimitedFreeIPA(uids, size_limit=50)
+    enumerator = FreeIPAEnumerator(ipa)
+
+    keys = enumerator.list_keys('user')
+    assert keys == sorted(uids)
+    # Первый поиск - call, подзапросы по префиксам - batch по уровням
+    assert 1 + ipa.batches == enumerator.rpc_calls < ipa.finds
+
+
+def test_shared_substrings_are_searched_in_batches():
+    """Подзапросы по общим подстрокам uid, имен и фамилий уходят командой batch"""
+    server = FakeFreeIPAServer(size_limit=100)
+    server.populate(users=300, groups=0)
+    enumerator = FreeIPAEnumerator(server)
+
+    assert enumerator.list_keys('user') == sorted(server.users)
+    # Тысячи поисков по уровням префиксов - несколько десятков HTTP запросов
+    assert server.stats['requests'] == enumerator.rpc_calls < 40
+    assert server.stats['commands'] > 1000
+
+
+def test_key_hidden_by_matches_in_other_attributes():
+    """Ключ не теряется, если обрезанный ответ заполнен совпадениями в именах"""
+    server = FakeFreeIPAServer(size_limit=5)
+    for i in range(10):
+        server.execute('user_add', [f'p{i}'], {'givenname': 'Zz', 'sn': 'Zz'})
+    server.execute('user_add', ['zz'], {})
+
+    keys = FreeIPAEnumerator(server).list_keys('user')
+    assert keys == sorted(server.users) and 'zz' in keys
+
+
+def test_entries_are_streamed_in_chunks_with_selected_attributes():
+    uids = [f'u{i:03d}' for i in range(250)]
+    ipa = LimitedFreeIPA(uids, size_limit=1000)
+    enumerator = FreeIPAEnumerator(ipa, chunk_size=100)
+
+    entries = enumerator.iter_entries('user', attributes=['mail'], members=False)
+    first = next(entries)
+    # Загружена только первая порция
+    assert ipa.batches == 1
+    assert first == {'uid': ['u000'], 'mail': ['u000@test.com']}
+
+    rest = list(entries)
+    assert len(rest) == 249 and ipa.batches == 3
+
+    # Удаленный между поиском и чтением пользователь пропускается
+    entries = list(enumerator.iter_entries('user', keys=['u001', 'gone']))
+    assert [e['uid'] for e in entries] == [['u001']]
+    assert entries[0]['memberof_group'] == ['ipausers']
+
+
+if __name__ == "__main__":
+    test_keys_are_complete_despite_sizelimit()
+    test_shared_substrings_are_searched_in_batches()
+    test_key_hidden_by_matches_in_other_attributes()
+    test_entries_are_streamed_in_chunks_with_selected_attributes()
+    print("✅ Все тесты перечисления FreeIPA пройдены")
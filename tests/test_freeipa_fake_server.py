@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест локального сервера FreeIPA: команды, ограничение поиска, batch и HTTP.
+"""
+
+import json
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers.freeipa_fake_server import FakeFreeIPAError, FakeFreeIPAServer
+
+from src.services.freeipa_enumeration import FreeIPAEnumerator
+from src.services.freeipa_sync import FreeIPASyncEngine
+
+
+def google_user(email, given, family, title=''):
+    user = {'primaryEmail': email, 'name': {'givenName': given, 'familyName': family}}
+    if title:
+        user['organizations'] = [{'title': title}]
+    return user
+
+
+def test_find_is_truncated_and_enumerator_gets_everything():
+    server = FakeFreeIPAServer(size_limit=40)
+    server.populate(users=150, groups=5, members_per_group=10)
+
+    found = server.call('user_find', [''], {'pkey_only': True, 'sizelimit': 0})
+    assert found['count'] == 40 and found['truncated'] is True
+
+    enumerator = FreeIPAEnumerator(server)
+    assert enumerator.list_keys('user') == sorted(server.users)
+    groups = list(enumerator.iter_entries('group', attributes=['cn', 'member_user']))
+    assert len(groups) == 5 and all(len(g['member_user']) == 10 for g in groups)
+
+
+def test_batch_reports_freeipa_errors():
+    server = FakeFreeIPAServer()
+    server.populate(users=2, groups=1, members_per_group=1)
+
+    results = server.batch([
+        ('user_show', ['user00000'], {}),
+        ('user_show', ['missing'], {}),
+        ('user_add', ['user00001'], {'givenname': 'X', 'sn': 'Y'}),
+        ('user_mod', ['user00000'], {'givenname': 'Name0'}),
+    ])
+    assert results[0]['error'] is None and results[0]['result']['uid'] == ['user00000']
+    assert [r.get('error_name') for r in results[1:]] == ['NotFound', 'DuplicateEntry', 'EmptyModlist']
+    assert server.stats['requests'] == 1 and server.stats['commands'] == 4
+
+    try:
+        server.call('group_show', ['missing'])
+        assert False, "ожидалась ошибка NotFound"
+    except FakeFreeIPAError as e:
+        assert e.code == 4001
+
+
+def test_sync_engine_against_fake_server():
+    server = FakeFreeIPAServer(size_limit=50)
+    server.populate(users=120, groups=1, members_per_group=0, domain='test.com')
+    google = [google_user(f'user{i:05d}@test.com', f'Name{i}', f'Surname{i}') for i in range(120)]
+    google[3] = google_user('user00003@test.com', 'Name3', 'Surname3', title='Lead')
+    google.append(google_user('new@test.com', 'New', 'User'))
+
+    engine = FreeIPASyncEngine(server)
+    report = engine.sync(google, default_groups=['group000'])
+    assert report.created == ['new'] and 'user00003' in report.updated
+    assert report.failures == {}
+    assert server.users['user00003']['title'] == ['Lead']
+    assert len(server.groups['group000']['member_user']) == 121
+
+    again = engine.sync(google, default_groups=['group000'])
+    assert again.diff.changes == 0
+
+
+def _post(url, data, cookie=None, content_type='application/json'):
+    request = urllib.request.Request(url, data=data, method='POST',
+                                     headers={'Content-Type': content_type})
+    if cookie:
+        request.add_header('Cookie', cookie)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, b''
+
+
+def test_http_login_json_and_expired_session():
+    with FakeFreeIPAServer(size_limit=0) as server:
+        server.populate(users=3, groups=0)
+        rpc = json.dumps({'method': 'user_find', 'params': [[''], {'pkey_only': True}]}).encode()
+
+        assert _post(f"{server.url}/ipa/session/json", rpc)[0] == 401
+        status, _, _ = _post(f"{server.url}/ipa/session/login_password", b'user=admin&password=bad',
+                             content_type='application/x-www-form-urlencoded')
+        assert status == 401
+
+        status, headers, _ = _post(f"{server.url}/ipa/session/login_password",
+                                   b'user=admin&password=password',
+                                   content_type='application/x-www-form-urlencoded')
+        assert status == 200
+        cookie = headers['Set-Cookie'].split(';')[0]
+
+        status, _, body = _post(f"{server.url}/ipa/session/json", rpc, cookie)
+        response = json.loads(body)
+        assert status == 200 and response['error'] is None and response['result']['count'] == 3
+
+        server.expire_sessions()
+        assert _post(f"{server.url}/ipa/session/json", rpc, cookie)[0] == 401
+
+
+def test_session_client_relogins_against_http_server(tmp_path):
+    import pytest
+    pytest.importorskip('requests')
+    import base64
+    from src.services.freeipa_session import FreeIPASession, FreeIPASessionCache
+
+    class Cipher:
+        def encrypt_data(self, data):
+            return base64.b64encode(data.encode()).decode()
+
+        def decrypt_data(self, data):
+            return base64.b64decode(data.encode()).decode()
+
+    with FakeFreeIPAServer() as server:
+        server.populate(users=5, groups=0)
+        cache = FreeIPASessionCache(tmp_path / 'sessions.json', cipher=Cipher())
+        session = FreeIPASession(server.url, 'admin', 'password', cache=cache)
+        assert session.request('user_show', ['user00001'])['result']['result']['uid'] == ['user00001']
+        server.expire_sessions()
+        assert session.request('ping')['error'] is None
+        assert server.stats['logins'] == 2
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_find_is_truncated_and_enumerator_gets_everything()
+    test_batch_reports_freeipa_errors()
+    test_sync_engine_against_fake_server()
+    test_http_login_json_and_expired_session()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_session_client_relogins_against_http_server(Path(tmp))
+    print("✅ Все тесты локального сервера FreeIPA пройдены")
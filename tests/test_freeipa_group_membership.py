@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест сравнения состава групп Google и FreeIPA по индексу адресов.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch
+from helpers.freeipa_fake_server import FakeFreeIPAServer
+
+from src.services.freeipa_group_membership import GroupMembershipComparator, IdentityIndex
+from src.utils.data_cache import data_cache, group_members_cache
+
+
+class FakeDirectory:
+    """Google Directory API: groups().list, members().list постранично и batch"""
+
+    def __init__(self, groups, page_size=2):
+        self.groups_data = groups
+        self.page_size = page_size
+        self.batches = 0
+        self.member_requests = 0
+
+    def groups(self):
+        emails = [{'email': email} for email in self.groups_data]
+        return SimpleNamespace(list=lambda **kw: SimpleNamespace(execute=lambda: {'groups': emails}))
+
+    def members(self):
+        return self
+
+    def list(self, groupKey, maxResults=200, pageToken=None, fields=None):
+        def execute():
+            self.member_requests += 1
+            members = self.groups_data[groupKey]
+            start = int(pageToken or 0)
+            page = {'members': members[start:start + self.page_size]}
+            if start + self.page_size < len(members):
+                page['nextPageToken'] = str(start + self.page_size)
+            return page
+        return SimpleNamespace(execute=execute)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def member(email, member_type='USER'):
+    return {'email': email, 'role': 'MEMBER', 'type': member_type}
+
+
+def test_identity_index_maps_by_mail_then_uid():
+    index = IdentityIndex([
+        {'uid': ['ivanov'], 'mail': ['Ivan.Ivanov@test.com']},
+        {'uid': ['petrov']},
+        {'uid': ['john'], 'mail': ['john@other.com']},
+    ])
+    assert index.uid_for('ivan.ivanov@test.com') == 'ivanov'
+    assert index.uid_for('petrov@test.com') == 'petrov'
+    # uid совпадает, но у пользователя FreeIPA другой адрес - это другой человек
+    assert index.uid_for('john@test.com') is None
+    assert index.email_for('IVANOV') == 'ivan.ivanov@test.com'
+
+
+def test_compare_and_apply_all_groups_in_bulk():
+    data_cache.clear_cache()
+    group_members_cache.clear()
+    server = FakeFreeIPAServer()
+    for uid in ('anna', 'boris', 'vera', 'admin'):
+        server.execute('user_add', [uid], {'givenname': uid, 'sn': 'Test', 'mail': f'{uid}@test.com'})
+    server.execute('user_add', ['gleb'], {'givenname': 'Gleb', 'sn': 'Test', 'mail': 'g.gleb@test.com'})
+    for cn, uids in (('dev', ['anna', 'vera', 'admin']), ('ops', []), ('legacy', ['boris'])):
+        server.execute('group_add', [cn], {})
+        if uids:
+            server.execute('group_add_member', [cn], {'user': uids})
+
+    google = FakeDirectory({
+        'dev@test.com': [member('anna@test.com'), member('boris@test.com'), member('nobody@test.com'),
+                         member('team@test.com', 'GROUP')],
+        'ops@test.com': [member('G.Gleb@test.com'), member('vera@test.com'), member('anna@test.com')],
+        'qa@test.com': [member('boris@test.com')],
+    })
+    comparator = GroupMembershipComparator(server, google, rate_per_second=1000)
+    comparison = comparator.run()
+
+    dev, ops, qa = comparison.groups['dev'], comparison.groups['ops'], comparison.groups['qa']
+    assert dev.to_add == {'boris'} and dev.to_remove == {'vera'} and dev.unchanged == 1
+    assert dev.unresolved == {'nobody@test.com'}
+    assert ops.to_add == {'gleb', 'vera', 'anna'} and not ops.to_remove
+    assert not qa.exists and qa.to_add == {'boris'}
+    assert comparison.only_in_google == ['qa'] and comparison.only_in_freeipa == ['legacy']
+    # Первые страницы всех групп - один batch, вторые страницы - еще один
+    assert google.batches == 2 and google.member_requests == 5
+    assert comparison.summary()['groups_changed'] == 3
+
+    comparator.apply(comparison, create_missing=True)
+    assert comparison.added == 5 and comparison.removed == 1 and comparison.failures == {}
+    assert comparison.created_groups == ['qa']
+    assert server.groups['dev']['member_user'] == {'anna', 'boris', 'admin'}
+    assert server.groups['qa']['member_user'] == {'boris'}
+
+    # Сравнение без удаления берет участников Google из кэша, разницы больше нет
+    again = GroupMembershipComparator(server, google, rate_per_second=1000).run(remove_extra=False)
+    assert not again.changed and google.batches == 2
+    # Сравнение с удалением загружает участников заново
+    again = GroupMembershipComparator(server, google, rate_per_second=1000).run()
+    assert not again.changed and google.batches == 4
+
+
+def test_cached_empty_membership_does_not_empty_freeipa_group():
+    data_cache.clear_cache()
+    group_members_cache.clear()
+    server = FakeFreeIPAServer()
+    server.execute('user_add', ['anna'], {'mail': 'anna@test.com'})
+    server.execute('group_add', ['dev'], {})
+    server.execute('group_add_member', ['dev'], {'user': ['anna']})
+    google = FakeDirectory({'dev@test.com': [member('anna@test.com')]})
+    group_members_cache.put('dev@test.com', [])
+
+    comparator = GroupMembershipComparator(server, google, rate_per_second=1000)
+    for remove_extra in (False, True):
+        comparison = comparator.run(['dev'], remove_extra=remove_extra)
+        assert not comparison.groups['dev'].to_remove and comparison.groups['dev'].unchanged == 1
+    assert google.member_requests == 2
+
+
+def test_single_group_by_freeipa_name():
+    data_cache.clear_cache()
+    group_members_cache.clear()
+    server = FakeFreeIPAServer()
+    server.execute('user_add', ['anna'], {'mail': 'anna@test.com'})
+    server.execute('group_add', ['dev'], {})
+    server.execute('group_add', ['other'], {})
+    google = FakeDirectory({'dev@test.com': [member('anna@test.com')],
+                            'other@test.com': [member('anna@test.com')]})
+
+    comparison = GroupMembershipComparator(server, google, rate_per_second=1000).run(['dev'])
+    assert list(comparison.groups) == ['dev'] and comparison.groups['dev'].to_add == {'anna'}
+    assert google.member_requests == 1
+
+
+if __name__ == "__main__":
+    test_identity_index_maps_by_mail_then_uid()
+    test_compare_and_apply_all_groups_in_bulk()
+    test_cached_empty_membership_does_not_empty_freeipa_group()
+    test_single_group_by_freeipa_name()
+    print("✅ Все тесты сравнения состава групп пройдены")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест параллельной синхронизации групп FreeIPA: ограничение параллелизма,
+частоты RPC и события прогресса.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers.freeipa_fake_server import FakeFreeIPAServer
+
+from src.services.freeipa_parallel import (
+    ParallelSyncExecutor, RateLimitedFreeIPA, get_server_limiter
+)
+from src.utils.rate_limiter import RateLimiter
+
+
+def test_executor_bounds_concurrency_and_reports_progress():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+    loop_thread = threading.current_thread()
+
+    def task(index):
+        nonlocal running, peak
+        assert threading.current_thread() is not loop_thread
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        if index == 3:
+            raise RuntimeError('NotFound')
+        return index * 2
+
+    events = []
+    executor = ParallelSyncExecutor(max_workers=4, progress_callback=events.append)
+    started = time.perf_counter()
+    results = asyncio.run(executor.run([(i, lambda i=i: task(i)) for i in range(20)]))
+    elapsed = time.perf_counter() - started
+
+    assert peak == 4 and elapsed < 20 * 0.02
+    assert results[5] == 10 and isinstance(results[3], RuntimeError)
+    finished = [e for e in events if e.status != 'started']
+    assert len(finished) == 20 and [e.done for e in finished] == list(range(1, 21))
+    assert {e.key for e in finished if e.status == 'failed'} == {3}
+    assert all(e.total == 20 for e in events)
+
+
+def test_event_loop_is_not_blocked():
+    ticks = []
+
+    async def scenario():
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        executor = ParallelSyncExecutor(max_workers=2)
+        await asyncio.gather(executor.run([(i, lambda: time.sleep(0.05)) for i in range(2)]), ticker())
+
+    asyncio.run(scenario())
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.1
+
+
+def test_rpc_rate_is_limited_per_server():
+    assert get_server_limiter('https://ipa.test/') is get_server_limiter('HTTPS://IPA.TEST')
+
+    server = FakeFreeIPAServer()
+    server.populate(users=5, groups=0)
+    freeipa = RateLimitedFreeIPA(server, RateLimiter(50, burst=1))
+    started = time.perf_counter()
+    for _ in range(6):
+        freeipa.call('ping')
+    freeipa.batch([('user_show', [f'user{i:05d}'], {}) for i in range(5)], chunk_size=2)
+    # 6 вызовов call и 3 порции batch при 50 в секунду без запаса
+    assert time.perf_counter() - started >= 8 / 50
+    assert freeipa.list_user_uids() == sorted(server.users)
+
+
+def test_group_members_sync_runs_groups_in_parallel():
+    import pytest
+    pytest.importorskip('requests')
+    from src.integrations.freeipa_integration import FreeIPAIntegration
+    from src.services.freeipa_sync_state import FreeIPASyncStateStore
+
+    server = FakeFreeIPAServer(command_latency=0.02)
+    for uid in ('anna', 'boris'):
+        server.execute('user_add', [uid], {'mail': f'{uid}@test.com'})
+    google_members = {}
+    for i in range(12):
+        server.execute('group_add', [f'team{i}'], {})
+        google_members[f'team{i}@test.com'] = [SimpleNamespace(email='anna@test.com'),
+                                               SimpleNamespace(email='boris@test.com'),
+                                               SimpleNamespace(email='ghost@test.com')]
+    server.execute('group_add_member', ['team0'], {'user': ['anna']})
+
+    async def get_group_members(group_email):
+        await asyncio.sleep(0.01)
+        return google_members[group_email]
+
+    group_service = SimpleNamespace(get_group_members=get_group_members)
+    integration = FreeIPAIntegration(user_service=None, group_service=group_service)
+    integration.freeipa_service = server
+    integration.sync_state = FreeIPASyncStateStore(':memory:')
+    integration._connected = True
+
+    events = []
+    started = time.perf_counter()
+    results = asyncio.run(integration.sync_google_groups_members_to_freeipa(
+        list(google_members), max_workers=6, progress_callback=events.append))
+    elapsed = time.perf_counter() - started
+
+    assert results['team0@test.com'] == {'anna@test.com': True, 'boris@test.com': True,
+                                         'ghost@test.com': False}
+    assert all(server.groups[f'team{i}']['member_user'] == {'anna', 'boris'} for i in range(12))
+    assert len([e for e in events if e.status == 'done']) == 12
+    # 12 групп по 20 мс при 6 потоках - около двух волн, а не 12 последовательных вызовов
+    assert elapsed < 12 * 0.02
+
+
+def test_existing_groups_are_synced_and_described():
+    import pytest
+    pytest.importorskip('requests')
+    from src.integrations.freeipa_integration import FreeIPAIntegration
+    from src.services.freeipa_sync_state import FreeIPASyncStateStore
+
+    server = FakeFreeIPAServer()
+    server.execute('group_add', ['dev'], {'description': 'Старое описание'})
+    server.execute('group_add', ['qa'], {'description': 'QA'})
+    google_groups = [SimpleNamespace(name='dev', description='Разработка'),
+                     SimpleNamespace(name='qa', description='QA'),
+                     SimpleNamespace(name='ops', description='')]
+
+    async def list_groups(domain=None):
+        return google_groups
+
+    integration = FreeIPAIntegration(user_service=None,
+                                     group_service=SimpleNamespace(list_groups=list_groups))
+    integration.freeipa_service = server
+    integration.sync_state = FreeIPASyncStateStore(':memory:')
+    integration._connected = True
+
+    results = asyncio.run(integration.sync_google_groups_to_freeipa(incremental=True))
+    # Существующие группы (DuplicateEntry) считаются синхронизированными
+    assert results == {'dev': True, 'qa': True, 'ops': True}
+    assert server.groups['dev']['description'] == ['Разработка']
+    assert server.groups['ops']['description'] == ['Группа ops']
+
+    # Повторный запуск ничего не отправляет: состояние записано как synced
+    requests = server.stats['requests']
+    assert asyncio.run(integration.sync_google_groups_to_freeipa(incremental=True)) == {}
+    assert server.stats['requests'] == requests
+
+
+if __name__ == "__main__":
+    test_executor_bounds_concurrency_and_reports_progress()
+    test_event_loop_is_not_blocked()
+    test_rpc_rate_is_limited_per_server()
+    test_group_members_sync_runs_groups_in_parallel()
+    test_existing_groups_are_synced_and_described()
+    print("✅ Все тесты параллельной синхронизации FreeIPA пройдены")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест повторного использования сессии FreeIPA и повторного входа при 401.
+"""
+
+import base64
+import json
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.freeipa_session import FreeIPASession, FreeIPASessionCache
+
+
+class FakeCipher:
+    def encrypt_data(self, data):
+        return base64.b64encode(data.encode()).decode()
+
+    def decrypt_data(self, data):
+        return base64.b64decode(data.encode()).decode()
+
+
+class FakeCookies:
+    def __init__(self):
+        self.values = {}
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def clear(self):
+        self.values.clear()
+
+    def __iter__(self):
+        return iter([SimpleNamespace(name=n, value=v, expires=None) for n, v in self.values.items()])
+
+
+class FakeServer:
+    """HTTP сессия requests поверх сервера с одним паролем и выдачей cookie"""
+
+    def __init__(self, password):
+        self.password = password
+        self.cookies = FakeCookies()
+        self.valid_sessions = set()
+        self.posts = []
+
+    def post(self, url, data=None, json=None, headers=None, timeout=None):
+        path = url.split('/ipa/', 1)[1]
+        self.posts.append(path)
+        if path == 'session/login_password':
+            if data['user'] != 'admin' or data['password'] != self.password:
+                return SimpleNamespace(status_code=401)
+            cookie = f"s{len(self.valid_sessions)}"
+            self.valid_sessions.add(cookie)
+            self.cookies.set('ipa_session', cookie)
+            return SimpleNamespace(status_code=200)
+        if self.cookies.values.get('ipa_session') not in self.valid_sessions:
+            return SimpleNamespace(status_code=401)
+        return SimpleNamespace(status_code=200, json=lambda: {'result': {'summary': json['method']},
+                                                             'error': None})
+
+
+def test_cookie_is_reused_across_sessions_and_refreshed_on_401():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FreeIPASessionCache(Path(tmp) / 'sessions.json', cipher=FakeCipher())
+        server = FakeServer('secret')
+
+        first = FreeIPASession('ipa.test', 'admin', 'secret', cache=cache, http=server)
+        assert first.request('ping')['result']['summary'] == 'ping'
+        assert server.posts == ['session/login_password', 'session/json']
+        assert 'ipa_session' not in (Path(tmp) / 'sessions.json').read_text()
+
+        # Новое окно/процесс: cookie берется из хранилища, вход не нужен
+        server.posts.clear()
+        restored_http = FakeServer('secret')
+        restored_http.valid_sessions = server.valid_sessions
+        second = FreeIPASession('https://ipa.test/', 'admin', 'secret', cache=cache, http=restored_http)
+        second.request('user_find')
+        assert restored_http.posts == ['session/json'] and second.logins == 0
+
+        # Сессия истекла на сервере: один повторный вход и повтор вызова
+        server.valid_sessions.clear()
+        second.request('group_find')
+        assert restored_http.posts == ['session/json', 'session/json',
+                                       'session/login_password', 'session/json']
+        assert cache.load('https://ipa.test', 'admin', 'secret')['cookie'] in server.valid_sessions
+
+
+def test_wrong_password_is_not_cached():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FreeIPASessionCache(Path(tmp) / 'sessions.json', cipher=FakeCipher())
+        session = FreeIPASession('ipa.test', 'Admin', 'wrong', cache=cache, http=FakeServer('secret'))
+        assert not session.login()
+        # Варианты имени: как указано, с доменом, в нижнем регистре
+        assert session.logins == 4
+        assert cache.load('https://ipa.test', 'Admin', 'wrong') is None
+
+
+def test_cached_session_requires_the_same_password():
+    """Сохраненная сессия не подтверждает другой пароль ("Проверить подключение")"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = FreeIPASessionCache(Path(tmp) / 'sessions.json', cipher=FakeCipher())
+        server = FakeServer('secret')
+        assert FreeIPASession('ipa.test', 'admin', 'secret', cache=cache, http=server).login()
+        assert 'secret' not in FakeCipher().decrypt_data(
+            next(iter(json.loads((Path(tmp) / 'sessions.json').read_text()).values())))
+
+        wrong_http = FakeServer('secret')
+        wrong_http.valid_sessions = server.valid_sessions
+        wrong = FreeIPASession('ipa.test', 'admin', 'wrong', cache=cache, http=wrong_http)
+        assert not wrong.login()
+        assert wrong.logins > 0 and 'session/json' not in wrong_http.posts
+        # Неудачный вход удаляет сохраненную сессию
+        assert cache.load('https://ipa.test', 'admin', 'secret') is None
+
+
+if __name__ == "__main__":
+    test_cookie_is_reused_across_sessions_and_refreshed_on_401()
+    test_wrong_password_is_not_cached()
+    test_cached_session_requires_the_same_password()
+    print("✅ Все тесты сессии FreeIPA пройдены")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест синхронизации пользователей в FreeIPA по разнице состояний через batch.
+"""
+
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.services.freeipa_sync import FreeIPASyncEngine
+from src.services.freeipa_sync_state import FreeIPASyncStateStore
+
+
+class FakeFreeIPA:
+    """FreeIPAService с методами call/batch поверх словаря пользователей"""
+
+    def __init__(self, users, groups):
+        self.users = users
+        self.groups = {cn: set(m) for cn, m in groups.items()}
+        self.requests = []
+        self.failing = set()
+
+    def _user_entry(self, uid):
+        entry = {k: [v] for k, v in self.users[uid].items() if k != 'nsaccountlock'}
+        entry['uid'] = [uid]
+        entry['nsaccountlock'] = self.users[uid].get('nsaccountlock', False)
+        entry['memberof_group'] = sorted(cn for cn, m in self.groups.items() if uid in m)
+        return entry
+
+    def _execute(self, method, args, options):
+        if method == 'user_find':
+            return {'result': [{'uid': [uid]} for uid in self.users], 'truncated': False}
+        uid = args[0]
+        if method == 'user_show':
+            return self._user_entry(uid)
+        if method == 'user_add':
+            if uid in self.users:
+                raise KeyError('DuplicateEntry')
+            self.users[uid] = dict(options)
+            return {'value': uid}
+        if method == 'user_mod':
+            if uid in self.failing:
+                raise RuntimeError('Insufficient access')
+            self.users[uid].update(options)
+            return {'value': uid}
+        if method == 'user_disable':
+            self.users[uid]['nsaccountlock'] = True
+            return {'result': True}
+        if method == 'group_add_member':
+            added = [u for u in options['user'] if u not in self.groups[uid]]
+            self.groups[uid].update(options['user'])
+            failed = [[u, 'This entry is already a member'] for u in options['user'] if u not in added]
+            return {'completed': len(added), 'failed': {'member': {'user': failed, 'group': []}}}
+        raise ValueError(method)
+
+    def call(self, method, args=None, options=None):
+        self.requests.append(method)
+        return self._execute(method, args or [], options or {})
+
+    def batch(self, calls, chunk_size=100):
+        results = []
+        for start in range(0, len(calls), chunk_size):
+            self.requests.append('batch')
+            for method, args, options in calls[start:start + chunk_size]:
+                try:
+                    results.append({'error': None, 'result': self._execute(method, args, options)})
+                except KeyError as e:
+                    results.append({'error': f'{args[0]} already exists', 'error_name': e.args[0],
+                                    'error_code': 4002})
+                except RuntimeError as e:
+                    results.append({'error': str(e), 'error_name': 'ACIError', 'error_code': 2100})
+        return results
+
+
+def google_user(email, given, family, suspended=False, title=''):
+    user = {'primaryEmail': email, 'name': {'givenName': given, 'familyName': family},
+            'suspended': suspended}
+    if title:
+        user['organizations'] = [{'title': title}]
+    return user
+
+
+def test_sync_applies_only_diff_in_few_batches():
+    ipa = FakeFreeIPA(
+        users={
+            'same': {'givenname': 'Same', 'sn': 'User', 'mail': 'same@test.com'},
+            'moved': {'givenname': 'Moved', 'sn': 'User', 'mail': 'moved@test.com', 'title': 'Dev'},
+            'left': {'givenname': 'Left', 'sn': 'User', 'mail': 'left@test.com'},
+            'admin': {'givenname': 'Admin', 'sn': 'IPA', 'mail': 'admin@test.com'},
+        },
+        groups={'staff': {'same', 'moved'}},
+    )
+    google = [google_user(f'new{i}@test.com', f'N{i}', 'User') for i in range(250)]
+    google += [
+        google_user('same@test.com', 'Same', 'User'),
+        google_user('moved@test.com', 'Moved', 'User', title='Lead'),
+        google_user('left@test.com', 'Left', 'User', suspended=True),
+        google_user('gone@test.com', 'Gone', 'User', suspended=True),
+    ]
+
+    engine = FreeIPASyncEngine(ipa, chunk_size=100)
+    report = engine.sync(google, default_groups=['staff'])
+
+    summary = report.summary()
+    assert summary['created'] == 250 and summary['updated'] == 1 and summary['disabled'] == 1
+    assert summary['unchanged'] == 1 and summary['failed'] == 0
+    assert summary['memberships_added'] == 250
+    assert ipa.users['moved']['title'] == 'Lead'
+    assert ipa.users['left']['nsaccountlock'] is True
+    assert 'gone' not in ipa.users and not ipa.users['admin'].get('nsaccountlock')
+    assert ipa.users['new7']['cn'] == 'N7 User'
+    # user_find + batch user_show; 250 созданий, 1 изменение, 1 блокировка,
+    # 1 group_add_member = 3 batch
+    assert ipa.requests == ['user_find', 'batch', 'batch', 'batch', 'batch']
+    assert report.rpc_calls == 5
+
+    # Повторный запуск ничего не меняет
+    ipa.requests.clear()
+    again = engine.sync(google, default_groups=['staff'])
+    assert again.diff.changes == 0
+    # Только загрузка: 254 записи user_show в трех batch
+    assert ipa.requests == ['user_find', 'batch', 'batch', 'batch']
+    assert all(again.user_results().values())
+
+
+def test_dry_run_and_duplicate_create_is_not_a_failure():
+    ipa = FakeFreeIPA(users={'old': {'givenname': 'Old', 'sn': 'User', 'mail': 'x@other.com'}},
+                      groups={})
+    engine = FreeIPASyncEngine(ipa)
+    google = [google_user('a@test.com', 'A', 'User')]
+
+    plan = engine.sync(google, dry_run=True, disable_missing_domain='other.com')
+    assert list(plan.diff.to_create) == ['a'] and plan.diff.to_disable == ['old']
+    assert ipa.requests == ['user_find', 'batch'] and 'a' not in ipa.users
+
+    # Пользователь появился между расчетом и применением - DuplicateEntry не ошибка
+    ipa.users['a'] = {'givenname': 'A', 'sn': 'User'}
+    engine.apply(plan)
+    assert plan.failures == {} and plan.created == ['a']
+
+
+def test_incremental_sync_reads_only_changed_users():
+    ipa = FakeFreeIPA(users={}, groups={'staff': set()})
+    state = FreeIPASyncStateStore(':memory:')
+    engine = FreeIPASyncEngine(ipa, chunk_size=100)
+    google = [google_user(f'u{i}@test.com', f'U{i}', 'User') for i in range(300)]
+
+    first = engine.sync_incremental(google, state, default_groups=['staff'])
+    assert first.summary()['created'] == 300 and first.diff.cached == 0
+    assert len(state.hashes('user')) == 300
+
+    # Ничего не изменилось: ни одного обращения к FreeIPA
+    ipa.requests.clear()
+    again = engine.sync_incremental(google, state, default_groups=['staff'])
+    assert ipa.requests == [] and again.diff.cached == 300 and again.diff.changes == 0
+
+    # Изменился один пользователь, один удален из Google
+    google[5] = google_user('u5@test.com', 'U5', 'User', title='Lead')
+    google.pop(7)
+    report = engine.sync_incremental(google, state, default_groups=['staff'],
+                                     disable_missing_domain='test.com')
+    assert ipa.requests == ['batch', 'batch']  # user_show двух записей, затем изменения
+    assert report.updated == ['u5'] and report.disabled == ['u7']
+    assert report.diff.cached == 298 and ipa.users['u5']['title'] == 'Lead'
+    assert 'u7' not in state.hashes('user')
+
+    # Ошибка не сохраняется в состоянии - пользователь будет обработан снова
+    ipa.failing.add('u0')
+    google[0] = google_user('u0@test.com', 'Renamed', 'User')
+    failed = engine.sync_incremental(google, state, default_groups=['staff'])
+    assert 'u0 update' in failed.failures and state.results('user')['u0'] == 'failed'
+    ipa.failing.clear()
+    retried = engine.sync_incremental(google, state, default_groups=['staff'])
+    assert retried.updated == ['u0'] and retried.diff.cached == 298
+
+
+def test_state_is_kept_per_server(tmp_path):
+    """Состояние одного сервера не используется для другого; старая схема без сервера сбрасывается"""
+    import sqlite3
+    from src.services.freeipa_sync_state import KIND_USER, server_id
+
+    path = tmp_path / 'state.db'
+    legacy = sqlite3.connect(str(path))
+    legacy.execute('CREATE TABLE sync_state (kind TEXT NOT NULL, key TEXT NOT NULL, content_hash TEXT, '
+                   'result TEXT NOT NULL, synced_at REAL NOT NULL, PRIMARY KEY (kind, key))')
+    legacy.execute("INSERT INTO sync_state VALUES ('user', 'u0', 'h', 'synced', 0)")
+    legacy.commit()
+    legacy.close()
+
+    first = FreeIPASyncStateStore(path, server=server_id('https://IPA1.test.com/', 'test.com'))
+    assert first.hashes(KIND_USER) == {}
+    second = FreeIPASyncStateStore(path, server=server_id('https://ipa2.test.com', 'test.com'))
+    first.record(KIND_USER, {'u0': ('h1', 'synced')})
+    second.record(KIND_USER, {'u0': ('h2', 'synced'), 'u1': ('h3', 'synced')})
+
+    assert first.hashes(KIND_USER) == {'u0': 'h1'}
+    second.clear()
+    assert second.results(KIND_USER) == {}
+    assert first.results(KIND_USER) == {'u0': 'synced'}
+    first.close()
+    second.close()
+
+    reopened = FreeIPASyncStateStore(path, server=server_id('https://ipa1.test.com', 'TEST.com'))
+    assert reopened.hashes(KIND_USER) == {'u0': 'h1'}
+    reopened.close()
+
+
+def test_failed_run_does_not_leave_previous_report():
+    """После неудачного запуска last_sync_report пуст, а не остается от прошлого"""
+    import asyncio
+    import pytest
+    pytest.importorskip('requests')
+    from src.integrations.freeipa_integration import FreeIPAIntegration
+
+    integration = FreeIPAIntegration(user_service=None, group_service=None)
+    integration._connected = True
+    integration._google_service = lambda: None
+    integration.last_sync_report = object()
+
+    assert asyncio.run(integration.sync_all_users_to_freeipa()) == {}
+    assert integration.last_sync_report is None
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_sync_applies_only_diff_in_few_batches()
+    test_dry_run_and_duplicate_create_is_not_a_failure()
+    test_incremental_sync_reads_only_changed_users()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_state_is_kept_per_server(Path(tmp))
+    test_failed_run_does_not_leave_previous_report()
+    print("✅ Все тесты синхронизации FreeIPA пройдены")
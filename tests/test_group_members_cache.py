@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест LRU кэша участников групп.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.api.groups_api import get_group_members
+from src.utils.data_cache import GroupMembersCache
+
+
+def test_lru_eviction():
+    """Самая давно использованная группа вытесняется при переполнении"""
+    cache = GroupMembersCache(max_groups=2)
+    cache.put('a@test.com', [{'email': 'u1@test.com'}])
+    cache.put('b@test.com', [{'email': 'u2@test.com'}])
+
+    # Обращение к 'a' делает её самой свежей
+    assert cache.get('a@test.com') is not None
+    cache.put('c@test.com', [])
+
+    assert cache.contains('a@test.com')
+    assert not cache.contains('b@test.com')
+    assert cache.contains('c@test.com')
+    assert len(cache) == 2
+
+
+def test_expiry_and_invalidate():
+    """Устаревшие и инвалидированные записи не возвращаются"""
+    cache = GroupMembersCache(cache_duration=60)
+    cache.put('Team@Test.com', [{'email': 'u1@test.com'}])
+
+    # Ключ не зависит от регистра
+    assert cache.get('team@test.com') == [{'email': 'u1@test.com'}]
+
+    members, _ = cache._entries['team@test.com']
+    cache._entries['team@test.com'] = (members, datetime.now() - timedelta(seconds=61))
+    assert cache.get('team@test.com') is None
+
+    cache.put('team@test.com', [])
+    cache.invalidate('TEAM@test.com')
+    assert cache.get('team@test.com') is None
+
+
+
+def test_failed_fetch_is_not_an_empty_group():
+    """Ошибку API можно отличить от пустой группы и не класть в кэш"""
+    class FailingDirectory:
+        def members(self):
+            raise RuntimeError('HTTP 503')
+
+    assert get_group_members(FailingDirectory(), 'team@test.com') == []
+    try:
+        get_group_members(FailingDirectory(), 'team@test.com', raise_errors=True)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('ошибка API не проброшена')
+
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_expiry_and_invalidate()
+    test_failed_fetch_is_not_an_empty_group()
+    print("✅ Все тесты кэша участников групп пройдены")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест синхронизации состава групп: минимальная разница и пакетное применение.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch, FakeHttpError
+
+from src.services.group_reconcile import MembershipReconciler, desired_from_org_unit
+from src.utils.data_cache import group_members_cache
+
+
+class FakeDirectory:
+    """Directory API: members().list/insert/delete и batch запросы"""
+
+    def __init__(self, groups):
+        self.groups = {g: dict(m) for g, m in groups.items()}
+        self.list_calls = 0
+        self.batches = []
+
+    def members(self):
+        return self
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def list(self, groupKey, **kwargs):
+        self.list_calls += 1
+        members = [{'email': e, 'role': r} for e, r in self.groups[groupKey].items()]
+        return SimpleNamespace(execute=lambda: {'members': members})
+
+    def insert(self, groupKey, body):
+        def run():
+            if body['email'] in self.groups[groupKey]:
+                raise FakeHttpError(409)
+            self.groups[groupKey][body['email']] = body['role']
+            return body
+        return run
+
+    def delete(self, groupKey, memberKey):
+        return lambda: self.groups[groupKey].pop(memberKey)
+
+
+def test_plan_computes_minimal_diff_and_protects_owners():
+    """В план попадают только отличия; владельцы не удаляются"""
+    group_members_cache.clear()
+    directory = FakeDirectory({'team@test.com': {
+        'keep@test.com': 'MEMBER', 'old@test.com': 'MEMBER', 'boss@test.com': 'OWNER'
+    }})
+    reconciler = MembershipReconciler(directory, rate_per_second=0)
+
+    report = reconciler.reconcile({'team@test.com': {'keep@test.com', 'new@test.com'}}, dry_run=True)
+    diff = report.diffs[0]
+
+    assert diff.to_add == {'new@test.com'}
+    assert diff.to_remove == {'old@test.com'}
+    assert diff.protected == {'boss@test.com'}
+    assert diff.unchanged == 1
+    assert directory.batches == []
+    assert 'old@test.com' in directory.groups['team@test.com']
+
+
+def test_apply_uses_batches_and_updates_cache_in_place():
+    """Изменения применяются пакетами, кэш участников обновляется без повторной загрузки"""
+    group_members_cache.clear()
+    directory = FakeDirectory({'a@test.com': {}, 'b@test.com': {'x@test.com': 'MEMBER'}})
+    reconciler = MembershipReconciler(directory, batch_size=3, rate_per_second=0)
+    desired = {
+        'a@test.com': {f'u{i}@test.com' for i in range(5)},
+        'b@test.com': set(),
+    }
+
+    report = reconciler.reconcile(desired)
+
+    assert report.added == 5 and report.removed == 1
+    assert directory.batches == [3, 3]
+    assert not report.failures
+    assert set(directory.groups['a@test.com']) == desired['a@test.com']
+    assert directory.groups['b@test.com'] == {}
+
+    # Предпросмотр и синхронизация без удаления берут обновленный на месте кэш
+    calls_before = directory.list_calls
+    for report in (reconciler.reconcile(desired, dry_run=True),
+                   reconciler.reconcile(desired, remove_extra=False)):
+        assert report.cache_hits == 2
+        assert report.planned_adds == 0 and report.planned_removes == 0
+    assert directory.list_calls == calls_before
+
+
+def test_removals_use_fresh_membership_not_stale_cache():
+    """Удаления вычисляются по свежему составу, даже если кэш устарел"""
+    group_members_cache.clear()
+    directory = FakeDirectory({'team@test.com': {'keep@test.com': 'MEMBER', 'extra@test.com': 'MEMBER'}})
+    # Кэш не знает о добавленном в обход приложения extra@ и помнит уже удаленного gone@
+    group_members_cache.put('team@test.com', [{'email': 'keep@test.com', 'role': 'MEMBER'},
+                                              {'email': 'gone@test.com', 'role': 'MEMBER'}])
+    reconciler = MembershipReconciler(directory, rate_per_second=0)
+    desired = {'team@test.com': {'keep@test.com'}}
+
+    preview = reconciler.reconcile(desired, dry_run=True)
+    assert preview.cache_hits == 1 and directory.list_calls == 0
+
+    # План из кэша перед применением пересчитывается по свежему составу
+    stale_plan = reconciler.plan(desired)
+    assert stale_plan.diffs[0].to_remove == {'gone@test.com'}
+    reconciler.apply(stale_plan)
+    assert stale_plan.diffs[0].to_remove == {'extra@test.com'}
+    assert directory.groups['team@test.com'] == {'keep@test.com': 'MEMBER'}
+    assert not stale_plan.failures
+
+    directory.groups['team@test.com']['late@test.com'] = 'MEMBER'
+    report = reconciler.reconcile(desired)
+    assert report.cache_hits == 0
+    assert report.removed == 1 and directory.groups['team@test.com'] == {'keep@test.com': 'MEMBER'}
+
+
+def test_desired_from_org_unit_includes_children_and_skips_suspended():
+    users = [
+        {'primaryEmail': 'a@test.com', 'orgUnitPath': '/Sales'},
+        {'primaryEmail': 'b@test.com', 'orgUnitPath': '/Sales/EU'},
+        {'primaryEmail': 'c@test.com', 'orgUnitPath': '/SalesOps'},
+        {'primaryEmail': 'd@test.com', 'orgUnitPath': '/Sales', 'suspended': True},
+    ]
+    assert desired_from_org_unit(users, '/Sales') == {'a@test.com', 'b@test.com'}
+    assert desired_from_org_unit(users, '/Sales', include_children=False) == {'a@test.com'}
+
+
+if __name__ == "__main__":
+    test_plan_computes_minimal_diff_and_protects_owners()
+    test_apply_uses_batches_and_updates_cache_in_place()
+    test_removals_use_fresh_membership_not_stale_cache()
+    test_desired_from_org_unit_includes_children_and_skips_suspended()
+    print("✅ Все тесты синхронизации состава групп пройдены")
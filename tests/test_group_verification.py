@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест асинхронной проверки изменений в группах: hasMember, batch и адаптивные задержки.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch, FakeHttpError
+
+from src.utils.group_verification import GroupChangeVerifier, PropagationEstimator
+
+
+class FakeDirectory:
+    """Directory API, где изменения состава групп применяются с задержкой"""
+
+    def __init__(self, propagation=0.2):
+        self.propagation = propagation
+        self.changes = {}
+        self.batches = []
+        self.list_calls = 0
+
+    def change(self, group, user, member):
+        self.changes[(group, user)] = (member, time.monotonic() + self.propagation)
+
+    def _visible(self, group, user):
+        member, visible_at = self.changes.get((group, user), (False, 0))
+        return member if time.monotonic() >= visible_at else not member
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def members(self):
+        return self
+
+    def hasMember(self, groupKey, memberKey):
+        def run():
+            if not memberKey.endswith('@test.com'):
+                raise FakeHttpError(400)
+            return {'isMember': self._visible(groupKey, memberKey)}
+        return run
+
+    def get(self, groupKey, memberKey):
+        def run():
+            if not self._visible(groupKey, memberKey):
+                raise FakeHttpError(404)
+            return {'email': memberKey}
+        return run
+
+    def list(self, **kwargs):
+        self.list_calls += 1
+        raise AssertionError('список участников не должен загружаться')
+
+
+def make_verifier(directory, timeout=3.0):
+    estimator = PropagationEstimator(initial_delay=0.05, min_delay=0.01, max_delay=0.2)
+    return GroupChangeVerifier(SimpleNamespace(service=directory), timeout=timeout,
+                               estimator=estimator, rate_per_second=0)
+
+
+def test_parallel_verification_is_batched_and_reports_via_callback():
+    directory = FakeDirectory(propagation=0.2)
+    verifier = make_verifier(directory)
+    changes = [(f'g{i % 3}@test.com', f'u{i}@test.com', i % 2 == 0) for i in range(60)]
+    changes.append(('g0@test.com', 'guest@gmail.com', True))
+    for group, user, member in changes:
+        directory.change(group, user, member)
+    reported = []
+
+    async def run():
+        futures = [verifier.submit(g, u, m, callback=reported.append) for g, u, m in changes]
+        return await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+
+    started = time.monotonic()
+    results = asyncio.run(run())
+    elapsed = time.monotonic() - started
+
+    assert all(r.verified for r in results)
+    assert len(reported) == len(changes)
+    assert elapsed < 1.5
+    # Все проверки одного интервала уходят одним batch (hasMember + get для внешнего адреса)
+    assert max(directory.batches) >= 50
+    assert directory.list_calls == 0
+    # Наблюдаемое распространение учтено в задержке первой проверки
+    assert verifier.estimator.samples == len(changes)
+    assert 0.15 <= verifier.estimator.first_delay() <= 0.2
+
+
+def test_unapplied_change_times_out_and_sync_wrapper():
+    directory = FakeDirectory(propagation=0.1)
+    verifier = make_verifier(directory, timeout=0.5)
+
+    result = asyncio.run(verifier.verify('g@test.com', 'ghost@test.com', expect_member=True))
+    assert not result.verified and result.attempts >= 2
+
+    directory.change('g@test.com', 'late@test.com', False)
+    assert verifier.verify_member_removal('g@test.com', 'late@test.com')
+
+
+
+def test_first_delay_converges_down_to_fast_propagation():
+    """Оценка по середине интервала опросов снижается, если изменения видны сразу"""
+    directory = FakeDirectory(propagation=0.01)
+    estimator = PropagationEstimator(initial_delay=0.4, min_delay=0.01, max_delay=1.0)
+    verifier = GroupChangeVerifier(SimpleNamespace(service=directory), timeout=3.0,
+                                   estimator=estimator, batch_window=0.005, rate_per_second=0)
+    delays = [estimator.first_delay()]
+    for i in range(8):
+        directory.change('g@test.com', f'u{i}@test.com', True)
+        assert asyncio.run(verifier.verify('g@test.com', f'u{i}@test.com')).verified
+        delays.append(estimator.first_delay())
+
+    assert all(later <= earlier for earlier, later in zip(delays, delays[1:]))
+    assert delays[-1] < 0.1
+
+
+def test_submitted_check_outlives_caller_event_loop():
+    """Проверка, запущенная из asyncio.run, продолжается после выхода из него"""
+    directory = FakeDirectory(propagation=0.1)
+    verifier = make_verifier(directory)
+    directory.change('g@test.com', 'new@test.com', True)
+    done = threading.Event()
+    reported = []
+
+    def on_verified(result):
+        reported.append(result)
+        done.set()
+
+    async def add_member():
+        verifier.submit('g@test.com', 'new@test.com', True, callback=on_verified)
+        return True
+
+    assert asyncio.run(add_member())
+    assert done.wait(timeout=3)
+    assert reported[0].verified
+
+
+if __name__ == "__main__":
+    test_parallel_verification_is_batched_and_reports_via_callback()
+    test_unapplied_change_times_out_and_sync_wrapper()
+    test_first_delay_converges_down_to_fast_propagation()
+    test_submitted_check_outlives_caller_event_loop()
+    print("✅ Все тесты проверки изменений в группах пройдены")
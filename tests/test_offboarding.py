@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест массового отключения пользователей: обратный поиск доступов и пакетный отзыв.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeBatch, FakeHttpError
+
+from src.api.drive_permissions import PermissionIndex
+from src.services.offboarding import OffboardingEngine
+
+
+class FakeDirectory:
+    """Directory API: groups().list(userKey), users().update, members().delete"""
+
+    def __init__(self, memberships):
+        self.memberships = {g: set(m) for g, m in memberships.items()}
+        self.suspended = set()
+        self.batches = 0
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def groups(self):
+        def list_groups(userKey, **kwargs):
+            return lambda: {'groups': [{'email': g} for g, m in sorted(self.memberships.items())
+                                       if userKey in m]}
+        return SimpleNamespace(list=list_groups)
+
+    def users(self):
+        def update(userKey, body, **kwargs):
+            def run():
+                self.suspended.add(userKey)
+                return {'primaryEmail': userKey, 'suspended': True}
+            return run
+        return SimpleNamespace(update=update)
+
+    def members(self):
+        def delete(groupKey, memberKey):
+            def run():
+                if memberKey not in self.memberships[groupKey]:
+                    raise FakeHttpError(404)
+                self.memberships[groupKey].discard(memberKey)
+            return run
+        return SimpleNamespace(delete=delete)
+
+
+class FakeDrive:
+    """Drive API: permissions().list/delete"""
+
+    def __init__(self, files):
+        self.files = {f: dict(p) for f, p in files.items()}
+        self.batches = 0
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def permissions(self):
+        return self
+
+    def list(self, fileId, **kwargs):
+        return lambda: {'permissions': [{'id': f'p-{e}', 'emailAddress': e, 'role': r}
+                                        for e, r in self.files[fileId].items()]}
+
+    def delete(self, fileId, permissionId, **kwargs):
+        return lambda: self.files[fileId].pop(permissionId[2:])
+
+
+class FakeCalendarSync:
+    def __init__(self, members):
+        self.members = dict(members)
+
+    def get_snapshot(self):
+        return dict(self.members)
+
+    def remove_members(self, emails):
+        for email in emails:
+            self.members.pop(email)
+        return SimpleNamespace(deleted=set(emails), failures={}, batches=1)
+
+
+def test_offboarding_revokes_everything_and_audits_each_user():
+    directory = FakeDirectory({
+        'team@test.com': {'a@test.com', 'b@test.com', 'stay@test.com'},
+        'all@test.com': {'a@test.com', 'stay@test.com'},
+    })
+    drive = FakeDrive({
+        'doc': {'a@test.com': 'writer', 'stay@test.com': 'reader'},
+        'sheet': {'b@test.com': 'owner'},
+    })
+    calendar = FakeCalendarSync({'a@test.com': 'reader', 'stay@test.com': 'writer'})
+    audited = []
+
+    engine = OffboardingEngine(
+        directory, calendar_sync=calendar, drive_service=drive, file_ids=['doc', 'sheet'],
+        index=PermissionIndex(), rate_per_second=0, audit_callback=audited.append
+    )
+    report = engine.run(['A@test.com', 'b@test.com'])
+
+    a, b = report.users['a@test.com'], report.users['b@test.com']
+    assert directory.suspended == {'a@test.com', 'b@test.com'}
+    assert sorted(a.groups_removed) == ['all@test.com', 'team@test.com']
+    assert b.groups_removed == ['team@test.com']
+    assert directory.memberships['all@test.com'] == {'stay@test.com'}
+    assert a.calendar_revoked and not b.calendar_revoked
+    assert calendar.members == {'stay@test.com': 'writer'}
+    assert a.files_revoked == ['doc']
+    assert drive.files['doc'] == {'stay@test.com': 'reader'}
+    # Владельца файла удалить нельзя - это отражено в отчете
+    assert list(b.errors) == ['drive:sheet']
+    assert set(a.timings) == {'suspend', 'groups', 'calendar', 'drive'}
+    assert [u.email for u in audited] == ['a@test.com', 'b@test.com']
+    # Группы: поиск + блокировка + удаление - по одному пакету на всех пользователей
+    assert directory.batches == 3
+
+
+def test_dry_run_only_discovers_access():
+    directory = FakeDirectory({'team@test.com': {'a@test.com'}})
+    calendar = FakeCalendarSync({'a@test.com': 'reader'})
+    audited = []
+    engine = OffboardingEngine(directory, calendar_sync=calendar, rate_per_second=0,
+                               audit_callback=audited.append)
+
+    report = engine.run(['a@test.com'], dry_run=True)
+
+    user = report.users['a@test.com']
+    assert user.groups == ['team@test.com'] and user.calendar_role == 'reader'
+    assert not directory.suspended and directory.memberships['team@test.com'] == {'a@test.com'}
+    assert calendar.members == {'a@test.com': 'reader'}
+    assert audited == []
+
+
+class PagedDirectory(FakeDirectory):
+    """Группы по одной на страницу; страница продолжения один раз отвечает 503"""
+
+    def __init__(self, memberships):
+        super().__init__(memberships)
+        self.page_failures = 1
+
+    def groups(self):
+        def list_groups(userKey, pageToken=None, **kwargs):
+            groups = [g for g, m in sorted(self.memberships.items()) if userKey in m]
+            index = int(pageToken or 0)
+
+            def run():
+                if pageToken and self.page_failures:
+                    self.page_failures -= 1
+                    raise FakeHttpError(503)
+                page = {'groups': [{'email': groups[index]}]}
+                if index + 1 < len(groups):
+                    page['nextPageToken'] = str(index + 1)
+                return page
+            return SimpleNamespace(execute=run) if pageToken else run
+        return SimpleNamespace(list=list_groups)
+
+
+class BrokenCalendarSync(FakeCalendarSync):
+    def remove_members(self, emails):
+        raise FakeHttpError(500)
+
+
+class BrokenIndex(PermissionIndex):
+    def load(self, *args, **kwargs):
+        raise RuntimeError('Drive недоступен')
+
+
+def test_stream_failures_are_reported_per_user():
+    """Сбой календаря и Drive не прерывает отключение; страницы групп читаются с повтором"""
+    directory = PagedDirectory({
+        'all@test.com': {'a@test.com', 'b@test.com'},
+        'team@test.com': {'a@test.com'},
+    })
+    calendar = BrokenCalendarSync({'a@test.com': 'reader'})
+    audited = []
+    engine = OffboardingEngine(
+        directory, calendar_sync=calendar, drive_service=FakeDrive({}), file_ids=['doc'],
+        index=BrokenIndex(), rate_per_second=0, audit_callback=audited.append
+    )
+
+    report = engine.run(['a@test.com', 'b@test.com'])
+
+    a, b = report.users['a@test.com'], report.users['b@test.com']
+    assert sorted(a.groups_removed) == ['all@test.com', 'team@test.com']
+    assert directory.page_failures == 0
+    assert a.suspended and b.suspended
+    assert set(a.errors) == {'calendar', 'drive'}
+    # Пользователя не было в календаре - сбой удаления из календаря его не касается
+    assert set(b.errors) == {'drive'}
+    assert 'Drive недоступен' in b.errors['drive']
+    assert report.summary()['failed'] == 2
+    assert [u.email for u in audited] == ['a@test.com', 'b@test.com']
+
+
+if __name__ == "__main__":
+    test_offboarding_revokes_everything_and_audits_each_user()
+    test_dry_run_only_discovers_access()
+    test_stream_failures_are_reported_per_user()
+    print("✅ Все тесты отключения пользователей пройдены")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест сегментированного журнала аудита: дозапись, ротация, шифрование
+сегментов и чтение последних записей с конца.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.segmented_log import SegmentedLog
+
+
+class FakeCipher:
+    def encrypt_data(self, data):
+        return data[::-1]
+
+    def decrypt_data(self, data):
+        return data[::-1]
+
+
+def test_rotation_by_size_and_retention(tmp_path):
+    log = SegmentedLog(tmp_path, prefix='security_audit', segment_bytes=2000, max_segments=3)
+    for i in range(300):
+        log.append({'action': f'действие {i}', 'details': {'n': i}})
+
+    segments = log.segments()
+    assert len(segments) == 3
+    assert all(path.stat().st_size <= 2000 for path in segments)
+    # Сегменты - обычные JSONL файлы, записи только дописываются
+    last_lines = segments[-1].read_text(encoding='utf-8').splitlines()
+    assert json.loads(last_lines[-1])['action'] == 'действие 299'
+
+    tail = log.tail(5)
+    assert [entry['details']['n'] for entry in tail] == [295, 296, 297, 298, 299]
+    # Самые старые записи удалены вместе с сегментами, но запрос больше хранимого не падает
+    everything = log.tail(1000)
+    assert everything[-1]['details']['n'] == 299 and everything[0]['details']['n'] > 0
+    assert [e['details']['n'] for e in everything] == list(range(everything[0]['details']['n'], 300))
+    log.close()
+
+
+def test_rotation_by_age_and_reopen(tmp_path):
+    log = SegmentedLog(tmp_path, segment_age=0.05)
+    log.append({'n': 1})
+    log.append({'n': 2})
+    time.sleep(0.06)
+    log.append({'n': 3})
+    log.close()
+    assert len(log.segments()) == 2
+
+    # Новый экземпляр дописывает в последний сегмент, пока он не устарел
+    reopened = SegmentedLog(tmp_path, segment_age=3600)
+    reopened.append({'n': 4})
+    assert len(reopened.segments()) == 2
+    assert [entry['n'] for entry in reopened.tail(10)] == [1, 2, 3, 4]
+    reopened.close()
+
+
+def test_encrypted_segments(tmp_path):
+    plain = SegmentedLog(tmp_path, segment_age=3600)
+    plain.append({'action': 'открыт'})
+    plain.close()
+
+    encrypted = SegmentedLog(tmp_path, cipher=FakeCipher(), segment_age=3600)
+    encrypted.append({'action': 'секрет', 'user_email': 'admin@test.com'})
+    encrypted.append({'action': 'секрет 2'})
+    segments = encrypted.segments()
+    # Смена режима начинает новый сегмент
+    assert [path.suffix for path in segments] == ['.jsonl', '.enc']
+    assert 'admin@test.com' not in segments[-1].read_text(encoding='utf-8')
+    assert [e['action'] for e in encrypted.tail(3)] == ['открыт', 'секрет', 'секрет 2']
+
+    # Без ключа зашифрованные сегменты пропускаются
+    without_key = SegmentedLog(tmp_path)
+    assert [e['action'] for e in without_key.tail(3)] == ['открыт']
+    encrypted.close()
+
+
+def test_security_manager_uses_segmented_log(tmp_path, monkeypatch):
+    import pytest
+    pytest.importorskip('cryptography')
+    from src.utils import security_manager as module
+
+    monkeypatch.setattr(module, 'get_log_path', lambda name: tmp_path / name)
+    monkeypatch.setattr(module, 'get_security_path', lambda name: tmp_path / name)
+    legacy = [{'action': f'старое {i}', 'severity': 'INFO'} for i in range(3)]
+    (tmp_path / 'security_audit.json').write_text(json.dumps(legacy), encoding='utf-8')
+
+    manager = module.SecurityManager(encrypt_audit=True)
+    for i in range(1500):
+        manager.audit_action(f'действие {i}', 'admin@test.com')
+
+    assert not (tmp_path / 'security_audit.json').exists()
+    audit = manager.get_audit_log(1503)
+    assert len(audit) == 1503 and audit[0]['action'] == 'старое 0'
+    assert manager.get_audit_log(2)[-1]['action'] == 'действие 1499'
+    manager.audit_log.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+    for test in (test_rotation_by_size_and_retention, test_rotation_by_age_and_reopen,
+                 test_encrypted_segments):
+        with tempfile.TemporaryDirectory() as directory:
+            test(Path(directory))
+    print("✅ Все тесты сегментированного журнала пройдены")
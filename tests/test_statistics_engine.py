@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест инкрементальной статистики пользователей и групп.
+"""
+
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.domain import User, UserStatus
+from src.utils.statistics_engine import StatisticsEngine
+
+
+def _api_user(email, suspended=False, org_unit='/'):
+    return {'primaryEmail': email, 'suspended': suspended, 'orgUnitPath': org_unit}
+
+
+def test_full_load_single_pass():
+    """Полная загрузка считает все разбивки"""
+    engine = StatisticsEngine()
+    engine.load_users([
+        _api_user('a@test.com'),
+        _api_user('b@test.com', suspended=True, org_unit='/Sales'),
+        User(primary_email='c@test.com', full_name='C', org_unit_path='/Sales'),
+    ])
+    engine.load_groups([{'email': 'g@test.com', 'directMembersCount': '3'}])
+
+    stats = engine.snapshot()
+    assert stats['total_users'] == 3
+    assert stats['active_users'] == 2
+    assert stats['suspended_users'] == 1
+    assert stats['users_by_org_unit'] == {'/': 1, '/Sales': 2}
+    assert stats['users_by_status'] == {'active': 2, 'suspended': 1}
+    assert stats['total_groups'] == 1
+    assert stats['group_members'] == 3
+
+
+def test_incremental_updates_match_full_load():
+    """События изменения дают тот же результат, что и полный пересчет"""
+    engine = StatisticsEngine()
+    engine.load_users([_api_user('a@test.com'), _api_user('b@test.com')])
+    engine.load_groups([])
+
+    engine.user_upserted(_api_user('B@test.com', suspended=True, org_unit='/Ops'))
+    engine.user_upserted(User(primary_email='c@test.com', full_name='C',
+                              status=UserStatus.SUSPENDED, suspended=True))
+    engine.user_removed('a@test.com')
+    engine.group_upserted({'email': 'g@test.com', 'directMembersCount': 1})
+    engine.group_members_changed('g@test.com', 2)
+
+    expected = StatisticsEngine()
+    expected.load_users([
+        _api_user('b@test.com', suspended=True, org_unit='/Ops'),
+        _api_user('c@test.com', suspended=True),
+    ])
+    expected.load_groups([{'email': 'g@test.com', 'directMembersCount': 3}])
+
+    assert engine.snapshot() == expected.snapshot()
+    assert engine.get_counts() == (2, 1)
+
+
+def test_events_before_load_are_ignored_and_listeners_notified():
+    """До полной загрузки события не искажают счетчики"""
+    engine = StatisticsEngine()
+    engine.user_upserted(_api_user('a@test.com'))
+    assert engine.get_counts() == (0, 0)
+
+    received = []
+    engine.add_listener(received.append)
+    engine.load_users([_api_user('a@test.com')])
+    engine.user_removed('a@test.com')
+
+    assert [s['total_users'] for s in received] == [1, 0]
+
+
+def test_group_types_come_from_real_api_fields():
+    """Группы Directory API не попадают в выдуманный тип; тип берется из модели и меток Cloud Identity"""
+    from src.core.domain import Group, GroupType
+
+    engine = StatisticsEngine()
+    engine.load_groups([
+        # Так выглядит группа в ответе groups().list Directory API
+        {'kind': 'admin#directory#group', 'id': '01abc', 'etag': '"x"', 'email': 'team@test.com',
+         'name': 'Team', 'directMembersCount': '4', 'description': '', 'adminCreated': True,
+         'nonEditableAliases': ['team@test.com.test-google-a.com']},
+        {'email': 'sec@test.com', 'directMembersCount': '2',
+         'labels': {'cloudidentity.googleapis.com/groups.discussion_forum': '',
+                    'cloudidentity.googleapis.com/groups.security': ''}},
+        Group(email='list@test.com', name='List', group_type=GroupType.DISTRIBUTION, direct_members_count=1),
+    ])
+
+    stats = engine.snapshot()
+    assert stats['total_groups'] == 3
+    assert stats['group_members'] == 7
+    assert stats['groups_by_type'] == {'security': 1, 'distribution': 1}
+
+    engine.group_removed('sec@test.com')
+    engine.group_upserted({'email': 'team@test.com', 'directMembersCount': '5', 'adminCreated': True})
+    assert engine.snapshot()['groups_by_type'] == {'distribution': 1}
+
+
+if __name__ == "__main__":
+    test_full_load_single_pass()
+    test_incremental_updates_match_full_load()
+    test_events_before_load_are_ignored_and_listeners_notified()
+    test_group_types_come_from_real_api_fields()
+    print("✅ Все тесты статистики пройдены")
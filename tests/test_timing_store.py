@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест хранилища времени операций с группами: перцентили, задержки проверок и динамика.
+"""
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.group_verification import PropagationEstimator
+from src.utils.timing_store import KIND_API, KIND_PROPAGATION, OperationTimingStore
+
+DAY = 86400
+
+
+def test_histograms_persist_per_operation_and_group(tmp_path):
+    path = tmp_path / 'timings.db'
+    store = OperationTimingStore(path)
+    for i in range(1, 101):
+        store.record(KIND_API, 'add_member', i / 100, 'Team@test.com', f'u{i}@test.com')
+        store.record(KIND_PROPAGATION, 'add_member', float(i), 'team@test.com')
+    store.record(KIND_PROPAGATION, 'add_member', 500.0, 'team@test.com', success=False)
+    store.close()
+
+    reopened = OperationTimingStore(path)
+    api = reopened.histogram(KIND_API, 'add_member')
+    assert api['count'] == 100 and api['p50'] == 0.5 and api['p99'] == 0.99
+    # Неуспешные проверки (таймауты) не искажают перцентили
+    propagation = reopened.histogram(KIND_PROPAGATION, group_email='TEAM@test.com')
+    assert (propagation['p50'], propagation['p90'], propagation['max']) == (50.0, 90.0, 100.0)
+
+    by_group = reopened.get_statistics(by_group=True)
+    assert by_group[KIND_API]['add_member team@test.com']['count'] == 100
+
+
+def test_estimator_prefers_group_statistics_and_trend_report():
+    store = OperationTimingStore(':memory:')
+    now = time.time()
+    for day in range(3):
+        for _ in range(5):
+            store.record(KIND_PROPAGATION, 'add_member', 2.0 + day, 'slow@test.com',
+                         timestamp=now - (2 - day) * DAY)
+            store.record(KIND_PROPAGATION, 'add_member', 0.5, 'fast@test.com',
+                         timestamp=now - (2 - day) * DAY)
+
+    estimator = PropagationEstimator(initial_delay=1.0, max_delay=15.0, store=store)
+    assert estimator.first_delay('add_member', 'slow@test.com') == 3.0
+    assert estimator.first_delay('add_member', 'fast@test.com') == 0.5
+    # По новой группе замеров нет - берется статистика операции, без замеров - начальная задержка
+    assert estimator.first_delay('add_member', 'new@test.com') == 0.5
+    assert estimator.first_delay('remove_member', 'new@test.com') == 1.0
+
+    estimator.record(1.25, 'remove_member', 'new@test.com', 'u@test.com')
+    assert store.histogram(KIND_PROPAGATION, 'remove_member')['count'] == 1
+
+    trend = store.trend(group_email='slow@test.com')
+    assert [row['p50'] for row in trend] == [2.0, 3.0, 4.0]
+    report = store.trend_report(group_email='slow@test.com')
+    assert 'Изменение p50 за период: +100%' in report
+
+
+def test_old_samples_are_pruned_and_legacy_propagation_dropped(tmp_path):
+    path = tmp_path / 'timings.db'
+    # База прежней версии: время распространения - время первого успешного опроса
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE operation_timings (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                 'timestamp REAL NOT NULL, kind TEXT NOT NULL, operation TEXT NOT NULL, '
+                 'group_email TEXT, user_email TEXT, duration REAL NOT NULL, success INTEGER NOT NULL DEFAULT 1)')
+    conn.execute("INSERT INTO operation_timings (timestamp, kind, operation, duration) "
+                 "VALUES (?, 'propagation', 'add_member', 0.7)", (time.time(),))
+    conn.commit()
+    conn.close()
+
+    store = OperationTimingStore(path)
+    assert store.histogram(KIND_PROPAGATION)['count'] == 0
+    store.record(KIND_API, 'add_member', 0.1, timestamp=time.time() - 100 * DAY)
+    store.record(KIND_API, 'add_member', 0.2)
+    # Запись в фоне: замеры видны чтению без явного flush
+    assert store.histogram(KIND_API)['count'] == 2
+    store.record(KIND_PROPAGATION, 'add_member', 0.3)
+    store.close()
+
+    reopened = OperationTimingStore(path)
+    assert reopened.histogram(KIND_API)['count'] == 1
+    assert reopened.histogram(KIND_PROPAGATION)['count'] == 1
+    reopened.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_histograms_persist_per_operation_and_group(Path(tmp))
+    test_estimator_prefers_group_statistics_and_trend_report()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_old_samples_are_pruned_and_legacy_propagation_dropped(Path(tmp))
+    print("✅ Все тесты хранилища времени операций пройдены")
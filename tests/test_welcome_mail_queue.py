@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест очереди приветственных писем: шаблоны, повторы, журнал и дневной лимит.
+"""
+
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from helpers import FakeHttpError
+
+from src.api.gmail_api import GmailService
+from src.services import welcome_mail_queue
+from src.services.welcome_mail_queue import MailOutbox, WelcomeMailQueue
+from src.utils.exceptions import CredentialsError
+
+
+class FakeSender:
+    """Отправитель с интерфейсом GmailService.deliver_welcome_email"""
+
+    def __init__(self, flaky=()):
+        self.sent = []
+        self.flaky = set(flaky)
+        self.lock = threading.Lock()
+
+    def deliver_welcome_email(self, to_email, user_name, temporary_password, admin_email):
+        with self.lock:
+            if to_email in self.flaky:
+                self.flaky.discard(to_email)
+                raise FakeHttpError(503)
+            self.sent.append((to_email, temporary_password))
+        return {'id': to_email}
+
+
+class FakeCipher:
+    def encrypt_data(self, data):
+        return data[::-1]
+
+    def decrypt_data(self, data):
+        return data[::-1]
+
+
+def test_templates_are_rendered_with_escaping():
+    """Шаблоны подставляют данные пользователя, HTML экранируется"""
+    gmail = GmailService.__new__(GmailService)
+    html_content = gmail._create_html_welcome_template('Анна <b>', 'a@test.com', 'p&ss')
+    text_content = gmail._create_text_welcome_template('Анна', 'a@test.com', 'p&ss')
+
+    assert 'Здравствуйте, Анна &lt;b&gt;!' in html_content
+    assert '<code>p&amp;ss</code>' in html_content
+    assert '.header { background: #4285f4;' in html_content
+    assert 'Временный пароль: p&ss' in text_content
+
+
+def test_queue_sends_with_retry_and_persists_outbox(tmp_path):
+    """Письма отправляются пулом с повтором временных ошибок; журнал отражает результат"""
+    outbox = MailOutbox(str(tmp_path / 'outbox.jsonl'), cipher=FakeCipher())
+    sender = FakeSender(flaky={'u3@test.com'})
+    mail_queue = WelcomeMailQueue(lambda: sender, outbox=outbox, workers=3,
+                                  rate_per_second=0, base_delay=0.01)
+
+    for i in range(10):
+        mail_queue.enqueue(f'u{i}@test.com', f'U{i}', f'Secret{i}!', 'admin@test.com')
+    assert mail_queue.wait(timeout=5)
+    mail_queue.stop()
+
+    assert sorted(sender.sent) == sorted((f'u{i}@test.com', f'Secret{i}!') for i in range(10))
+    assert mail_queue.stats['retried'] == 1
+    assert 'Secret1!' not in outbox.path.read_text(encoding='utf-8')
+    assert outbox.load() == {'pending': [], 'sent_today': 10}
+
+
+def test_pending_mail_survives_restart_and_daily_limit(tmp_path):
+    """Письма сверх дневного лимита откладываются, wait() не ждет их, после перезапуска они отправляются"""
+    outbox = MailOutbox(str(tmp_path / 'outbox.jsonl'), cipher=FakeCipher())
+    sender = FakeSender()
+    mail_queue = WelcomeMailQueue(lambda: sender, outbox=outbox, rate_per_second=0, daily_limit=2)
+    for i in range(3):
+        mail_queue.enqueue(f'u{i}@test.com', f'U{i}', f'Secret{i}!', 'admin@test.com')
+    assert mail_queue.wait(timeout=5)
+    mail_queue.stop()
+    assert len(sender.sent) == 2
+    assert mail_queue.deferred == 1
+    assert mail_queue.stats['deferred'] == 1
+
+    outbox.compact()
+    state = outbox.load()
+    assert [e.to_email for e in state['pending']] == ['u2@test.com']
+    assert state['pending'][0].password == 'Secret2!'
+    # Отправленные сегодня письма переживают сжатие журнала - лимит действует после перезапуска
+    assert state['sent_today'] == 2
+
+    limited = WelcomeMailQueue(lambda: sender, outbox=outbox, rate_per_second=0, daily_limit=2)
+    limited.start()
+    assert limited.wait(timeout=5)
+    limited.stop()
+    assert len(sender.sent) == 2
+    assert limited.deferred == 1
+
+    restarted = WelcomeMailQueue(lambda: sender, outbox=outbox, rate_per_second=0)
+    restarted.start()
+    assert restarted.wait(timeout=5)
+    restarted.stop()
+    assert ('u2@test.com', 'Secret2!') in sender.sent
+
+
+def test_retry_does_not_block_other_mail(tmp_path):
+    """Письмо с временной ошибкой ждет повтора в расписании, а не в рабочем потоке"""
+    sender = FakeSender(flaky={'slow@test.com'})
+    mail_queue = WelcomeMailQueue(lambda: sender, workers=1, rate_per_second=0, base_delay=0.5)
+    mail_queue.enqueue('slow@test.com', 'Slow', 'Secret0!', 'admin@test.com')
+    for i in range(1, 4):
+        mail_queue.enqueue(f'u{i}@test.com', f'U{i}', f'Secret{i}!', 'admin@test.com')
+    # Единственный рабочий поток отправляет остальные письма, пока повтор не наступил
+    assert not mail_queue.wait(timeout=0.3)
+    assert [email for email, _ in sender.sent] == ['u1@test.com', 'u2@test.com', 'u3@test.com']
+    assert mail_queue.wait(timeout=5)
+    mail_queue.stop()
+    assert sender.sent[-1] == ('slow@test.com', 'Secret0!')
+
+
+def test_shared_queue_follows_credentials(tmp_path):
+    """Общая очередь не отправляет письма от чужой учетной записи"""
+    first = SimpleNamespace(service_account_email='sa@test.com', _subject='admin1@test.com')
+    second = SimpleNamespace(service_account_email='sa@test.com', _subject='admin2@test.com')
+    file_paths = SimpleNamespace(get_data_path=lambda name: tmp_path / name)
+    with patch('src.utils.file_paths.file_path_manager', file_paths), \
+            patch.object(welcome_mail_queue, '_default_cipher', lambda: FakeCipher()), \
+            patch.object(welcome_mail_queue, '_default_queue', None):
+        shared = welcome_mail_queue.get_welcome_mail_queue(first)
+        same = SimpleNamespace(service_account_email='sa@test.com', _subject='admin1@test.com')
+        assert welcome_mail_queue.get_welcome_mail_queue(same) is shared
+
+        # Незавершенные письма: смена учетной записи - ошибка, а не тихая подмена
+        with shared._lock:
+            shared._unfinished += 1
+        try:
+            welcome_mail_queue.get_welcome_mail_queue(second)
+            assert False, 'ожидалась CredentialsError'
+        except CredentialsError:
+            pass
+        with shared._lock:
+            shared._unfinished -= 1
+
+        replaced = welcome_mail_queue.get_welcome_mail_queue(second)
+        assert replaced is not shared
+        assert welcome_mail_queue.get_welcome_mail_queue(second) is replaced
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_templates_are_rendered_with_escaping()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_queue_sends_with_retry_and_persists_outbox(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_pending_mail_survives_restart_and_daily_limit(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_retry_does_not_block_other_mail(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_shared_queue_follows_credentials(Path(tmp))
+    print("✅ Все тесты очереди приветственных писем пройдены")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест реестра окон с отложенной загрузкой модулей.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ui.window_registry import LazyWindowRegistry, WINDOW_MODULES
+
+
+def test_lazy_loading():
+    """Модуль окна импортируется только при первом обращении"""
+    registry = LazyWindowRegistry('src.ui', {'colors': ('.ui_components', 'ModernColors')})
+
+    assert not registry.is_loaded('colors')
+    colors = registry.get('colors')
+    assert registry.is_loaded('colors')
+    assert registry.get('colors') is colors
+    assert 'colors' in registry.load_times
+
+
+def test_main_window_does_not_import_windows():
+    """Импорт главного окна не загружает модули окон (проверка в чистом процессе)"""
+    code = (
+        "import sys; import src.ui.main_window; "
+        "print(','.join(m for m in sys.modules if m.startswith('src.ui.')))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=str(Path(__file__).parent.parent),
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    loaded = set(result.stdout.strip().split(','))
+
+    for module_name, _ in WINDOW_MODULES.values():
+        assert 'src.ui' + module_name not in loaded, module_name
+
+
+if __name__ == "__main__":
+    test_lazy_loading()
+    test_main_window_does_not_import_windows()
+    print("✅ Все тесты реестра окон пройдены")